@@ -0,0 +1,10 @@
+"""
+Author       : agent
+Date         : 2026-10-19 12:39:46
+LastEditors  : agent
+LastEditTime : 2026-10-19 12:39:46
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/host/__init__.py
+Description  : Host-side (PC) tools for analysing the recordings of the Nicla Vision. Requires NumPy.
+               Run the tools from the `Blob Detection & Tracking V2` directory, e.g. `python -m host.tracelog`.
+               Nothing in this package is copied to the board.
+"""
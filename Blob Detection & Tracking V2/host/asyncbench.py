@@ -0,0 +1,198 @@
+"""
+Author       : agent
+Date         : 2026-10-19 13:00:39
+LastEditors  : agent
+LastEditTime : 2026-10-19 13:00:39
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/host/asyncbench.py
+Description  : Scheduling benchmark of the cooperative runtime (lib/runtime.py) against the sequential main loop.
+               A sequence is replayed at the camera frame rate on the virtual board clock, mode commands are fed to
+               the UART at given times, and the telemetry intervals and command latencies are reported.
+                   python -m host.asyncbench seq.npz --fps 30 --command 500:G --command 1500:B
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import time
+
+import numpy as np
+
+from host import board
+from host.replay import CACHE_DIR, FrameCache
+
+# Macros
+DEVICE_FPS = 30  # The nominal camera frame rate, snapshot waits for the next frame like on the board
+COMMAND_FLAGS = {"B": 0x81, "G": 0x82, "D": 0x83}  # Must match lib/Ibus.py
+
+
+def pace_snapshots(fps: float) -> None:
+    """
+    @description: Make sensor.snapshot wait for the next frame of the camera on the board clock
+    @param       {float} fps: The camera frame rate
+    @return      {*} None
+    """
+    import sensor
+
+    snapshot = sensor.__dict__.get("_unpaced_snapshot", sensor.snapshot)
+    period_us = int(1000000 / fps)
+    next_frame = [time.ticks_us()]
+
+    def paced_snapshot():
+        wait = time.ticks_diff(next_frame[0], time.ticks_us())
+        if wait > 0:
+            time.sleep_us(wait)
+        else:
+            next_frame[0] = time.ticks_us()  # Late, the next frame is the one being read out
+        next_frame[0] = time.ticks_add(next_frame[0], period_us)
+        return snapshot()
+
+    sensor._unpaced_snapshot = snapshot
+    sensor.snapshot = paced_snapshot
+
+
+def run(
+    frames,
+    mode: str,
+    commands: list,
+    fps: float,
+    use_runtime: bool,
+    telemetry_period_ms: int,
+    thresholds: list = None,
+) -> dict:
+    """
+    @description: Replay a sequence through the cooperative runtime or the sequential loop of main.py
+    @param       {*} frames: The frames of the sequence
+    @param       {str} mode: The mode at the start, "B", "G" or "D"
+    @param       {list} commands: The (time in ms, mode) commands fed to the UART
+    @param       {float} fps: The camera frame rate
+    @param       {bool} use_runtime: Whether to run lib/runtime.py instead of the sequential loop
+    @param       {int} telemetry_period_ms: The telemetry period of the runtime
+    @param       {list} thresholds: The balloon thresholds (default: BALLON of main.py)
+    @return      {dict} send times (ms), frames, command latencies (ms) and the runtime counters
+    """
+    board.install(virtual_sleep=True)
+    import sensor
+    import main as board_main
+    from lib.Ibus import IBus
+
+    board_main.myclock = time.clock()  # Defined by the main script on the board
+    if thresholds:
+        board_main.BALLON = thresholds
+    sensor.set_source(frames)
+    pace_snapshots(fps)
+    ibus = IBus()
+    t_start = time.ticks_ms()
+    sends = []
+    switches = []
+    pending = sorted(commands)
+
+    send = ibus.send
+    receive = ibus.receive
+
+    def timed_send(msg):
+        sends.append(time.ticks_diff(time.ticks_ms(), t_start))
+        send(msg)
+
+    def timed_receive():
+        # Feed the commands that are due, the ESP32 writes them whenever it wants
+        now = time.ticks_diff(time.ticks_ms(), t_start)
+        while pending and pending[0][0] <= now:
+            ibus.uart.feed(bytes([COMMAND_FLAGS[pending.pop(0)[1]]]))
+        return receive()
+
+    def timed_set_mode(current, desired, tracker, **kwargs):
+        result = board_main.set_mode(current, desired, tracker, **kwargs)
+        if current is not None and desired != current:
+            switches.append((time.ticks_diff(time.ticks_ms(), t_start), desired))
+        return result
+
+    ibus.send = timed_send
+    ibus.receive = timed_receive
+    frames_done = [0]
+    runtime = None
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            if use_runtime:
+                from lib.runtime import Runtime
+
+                mode, tracker = timed_set_mode(None, mode, None, max_reference_frames=1)
+                runtime = Runtime(
+                    ibus,
+                    lambda current, desired, tracker: timed_set_mode(current, desired, tracker, max_reference_frames=1),
+                    board_main.get_payload,
+                    mode,
+                    tracker,
+                    telemetry_period_ms=telemetry_period_ms,
+                    frame_period_ms=int(1000 / fps),
+                )
+                runtime.run()
+            else:
+                mode, tracker = timed_set_mode(None, mode, None)
+                while True:
+                    tracker.track()
+                    ibus.send(board_main.get_payload(mode, tracker))
+                    frames_done[0] += 1
+                    received_mode = ibus.receive()
+                    if received_mode in ("B", "G", "D"):
+                        mode, tracker = timed_set_mode(mode, received_mode, tracker)
+        except EOFError:
+            pass  # The end of the sequence
+    latencies = []
+    for at, desired in sorted(commands):
+        applied = [t for t, m in switches if m == desired and t >= at]
+        latencies.append(applied[0] - at if applied else None)
+    return {
+        "sends": sends,
+        "frames": runtime.frames if runtime else frames_done[0],
+        "latencies": latencies,
+        "late": runtime.late if runtime else None,
+    }
+
+
+def summary(name: str, result: dict, commands: list) -> str:
+    """
+    @description: Format the telemetry intervals and command latencies of a run
+    @param       {str} name: The name of the run
+    @param       {dict} result: The result of run
+    @param       {list} commands: The (time in ms, mode) commands
+    @return      {str} One line of the report
+    """
+    intervals = np.diff(result["sends"]) if len(result["sends"]) > 1 else np.zeros(1)
+    line = "{:<11}{:>6} frames {:>6} sends  interval {:>6.1f} ms mean {:>6.1f} ms std {:>6.1f} ms max".format(
+        name, result["frames"], len(result["sends"]), intervals.mean(), intervals.std(), intervals.max()
+    )
+    if result["late"] is not None:
+        line += "  {} late".format(result["late"])
+    for (at, desired), latency in zip(sorted(commands), result["latencies"]):
+        line += "  {}@{}ms: {}".format(desired, at, "never" if latency is None else "{} ms".format(latency))
+    return line
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare the telemetry timing of the cooperative and sequential loops.")
+    parser.add_argument("path", help="The sequence (*.npz or *.mjpeg)")
+    parser.add_argument("--mode", default="B", choices=["B", "G", "D"], help="The mode at the start")
+    parser.add_argument("--command", action="append", default=[], help="A mode command TIME_MS:MODE, repeatable")
+    parser.add_argument("--fps", type=float, default=DEVICE_FPS, help="The camera frame rate on the board")
+    parser.add_argument("--period", type=int, help="The telemetry period in ms (default: TELEMETRY_PERIOD_MS)")
+    parser.add_argument("--thresholds", type=json.loads, help="The balloon thresholds as JSON (default: main.py)")
+    parser.add_argument("--cache", default=CACHE_DIR, help="The directory of the decoded frame cache")
+    args = parser.parse_args()
+
+    commands = []
+    for command in args.command:
+        at, desired = command.split(":")
+        commands.append((int(at), desired.upper()))
+    frames = FrameCache(args.cache).frames(args.path)
+    board.install(virtual_sleep=True)
+    from lib.runtime import TELEMETRY_PERIOD_MS
+
+    period = args.period if args.period else TELEMETRY_PERIOD_MS
+    for name, use_runtime in (("sequential", False), ("runtime", True)):
+        result = run(frames, args.mode, commands, args.fps, use_runtime, period, args.thresholds)
+        print(summary(name, result, commands))
+
+
+if __name__ == "__main__":
+    main()
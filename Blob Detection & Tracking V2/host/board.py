@@ -0,0 +1,159 @@
+"""
+Author       : agent
+Date         : 2026-10-19 12:46:30
+LastEditors  : agent
+LastEditTime : 2026-10-19 12:46:30
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/host/board.py
+Description  : Make the on-board code (main.py, lib/) importable and runnable on the host.
+               install() puts the stand-ins of the OpenMV modules (host/stand_ins) on the import path and adds
+               the MicroPython extensions of the time module (clock, ticks_*, sleep_us, ...).
+"""
+
+import os
+import sys
+import time
+
+# Macros
+STAND_INS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stand_ins")
+BOARD_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # Blob Detection & Tracking V2
+TICKS_PERIOD = 1 << 30  # MicroPython ticks wrap around at 2**30
+
+_slept_us = 0  # Time skipped by sleep calls when sleeping is virtual
+_virtual_sleep = False  # Whether sleep calls advance the clock without blocking
+
+
+class Clock:
+    def __init__(self) -> None:
+        """
+        @description: Stand-in of the OpenMV time.clock object that measures the frame rate.
+        @param       {*} self:
+        @return      {*} None
+        """
+        self._tick = None
+        self._avg_ms = 0.0
+
+    def tick(self) -> None:
+        """
+        @description: Mark the start of a frame.
+        @param       {*} self:
+        @return      {*} None
+        """
+        now = _ticks_us()
+        if self._tick is not None:
+            elapsed_ms = ((now - self._tick) % TICKS_PERIOD) / 1000
+            self._avg_ms = elapsed_ms if not self._avg_ms else 0.9 * self._avg_ms + 0.1 * elapsed_ms
+        self._tick = now
+
+    def avg(self) -> float:
+        """
+        @description: Get the average frame time.
+        @param       {*} self:
+        @return      {float} The average frame time in milliseconds
+        """
+        return self._avg_ms
+
+    def fps(self) -> float:
+        """
+        @description: Get the average frame rate.
+        @param       {*} self:
+        @return      {float} The average frame rate in frames per second
+        """
+        return 1000 / self._avg_ms if self._avg_ms else 0.0
+
+    def reset(self) -> None:
+        """
+        @description: Reset the clock.
+        @param       {*} self:
+        @return      {*} None
+        """
+        self.__init__()
+
+
+def _ticks_us() -> int:
+    """
+    @description: Stand-in of time.ticks_us
+    @return      {int} The wrapping microsecond counter
+    """
+    return (time.perf_counter_ns() // 1000 + _slept_us) % TICKS_PERIOD
+
+
+def _ticks_ms() -> int:
+    """
+    @description: Stand-in of time.ticks_ms
+    @return      {int} The wrapping millisecond counter
+    """
+    return (time.perf_counter_ns() // 1000000 + _slept_us // 1000) % TICKS_PERIOD
+
+
+def _ticks_diff(end: int, start: int) -> int:
+    """
+    @description: Stand-in of time.ticks_diff
+    @param       {int} end: The later ticks value
+    @param       {int} start: The earlier ticks value
+    @return      {int} The signed difference end - start
+    """
+    diff = (end - start) & (TICKS_PERIOD - 1)
+    return diff - TICKS_PERIOD if diff >= TICKS_PERIOD // 2 else diff
+
+
+def _ticks_add(ticks: int, delta: int) -> int:
+    """
+    @description: Stand-in of time.ticks_add
+    @param       {int} ticks: The ticks value
+    @param       {int} delta: The offset to add
+    @return      {int} The wrapped sum
+    """
+    return (ticks + delta) % TICKS_PERIOD
+
+
+def _sleep_us(us: int) -> None:
+    """
+    @description: Stand-in of time.sleep_us, only advances the ticks when sleeping is virtual
+    @param       {int} us: The time to sleep in microseconds
+    @return      {*} None
+    """
+    global _slept_us
+    if us <= 0:
+        return
+    if _virtual_sleep:
+        _slept_us += int(us)
+    else:
+        time.sleep(us / 1000000)
+
+
+def _sleep_ms(ms: int) -> None:
+    """
+    @description: Stand-in of time.sleep_ms
+    @param       {int} ms: The time to sleep in milliseconds
+    @return      {*} None
+    """
+    _sleep_us(ms * 1000)
+
+
+def slept_us() -> int:
+    """
+    @description: Get the time skipped by virtual sleeps
+    @return      {int} The skipped time in microseconds
+    """
+    return _slept_us
+
+
+def install(virtual_sleep: bool = False) -> None:
+    """
+    @description: Install the stand-ins so that main.py and lib/ can be imported on the host
+    @param       {bool} virtual_sleep: Whether sleep_us/sleep_ms only advance the ticks instead of blocking,
+                                       used by replays to skip the sensor waits (default: False)
+    @return      {*} None
+    """
+    global _virtual_sleep
+    _virtual_sleep = virtual_sleep
+    for path in (BOARD_DIR, STAND_INS_DIR):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    time.clock = Clock
+    time.ticks_us = _ticks_us
+    time.ticks_ms = _ticks_ms
+    time.ticks_diff = _ticks_diff
+    time.ticks_add = _ticks_add
+    time.sleep_us = _sleep_us
+    time.sleep_ms = _sleep_ms
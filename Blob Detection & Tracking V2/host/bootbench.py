@@ -0,0 +1,120 @@
+"""
+Author       : agent
+Date         : 2026-10-19 12:52:54
+LastEditors  : agent
+LastEditTime : 2026-10-19 12:52:54
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/host/bootbench.py
+Description  : Startup benchmark: time to the first valid IBus frame after a reboot, cold and warm.
+               The tracker runs over the first part of a sequence and saves its warm-start state, the board then
+               "reboots" at that frame through main.set_mode once without and once with the saved state.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from host import board
+from host.replay import CACHE_DIR, FrameCache
+
+# Macros
+DEVICE_FPS = 30  # The nominal camera frame rate used to convert frames into time on the board
+
+
+def boot(frames, mode: str, warm_state: dict = None) -> dict:
+    """
+    @description: Boot through main.set_mode and track until the first frame with a detection
+    @param       {*} frames: The frames seen after the boot
+    @param       {str} mode: "B" or "G"
+    @param       {dict} warm_state: The saved state to resume from (default: None)
+    @return      {dict} frames, blocking sleeps (ms) and host milliseconds to the first valid frame, None values if it
+                        never came
+    """
+    import sensor
+    import main as board_main
+
+    board_main.myclock = time.clock()  # Defined by the main script on the board
+    sensor.set_source(frames)
+    t_start = time.ticks_ms()
+    slept_us = board.slept_us()
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            _, tracker = board_main.set_mode(None, mode, warm_state=warm_state)
+            tracker.detected = warm_state is None  # A cold boot only returns once find_reference found a blob
+            while not tracker.detected:
+                tracker.track()
+        except EOFError:
+            return {"frames": None, "sleep_ms": None, "host_ms": None}
+    return {
+        "frames": sensor.frame_index(),
+        "sleep_ms": (board.slept_us() - slept_us) / 1000,
+        "host_ms": time.ticks_diff(time.ticks_ms(), t_start),
+    }
+
+
+def bench(frames, mode: str, reboot_at: int) -> dict:
+    """
+    @description: Compare a cold and a warm boot at the same frame of a sequence
+    @param       {*} frames: The frames of the sequence
+    @param       {str} mode: "B" or "G"
+    @param       {int} reboot_at: The frame the board reboots at
+    @return      {dict} The results of the cold and the warm boot (see boot)
+    """
+    board.install(virtual_sleep=True)
+    import sensor
+    import main as board_main
+    from lib.warmstart import WarmStart
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = WarmStart(os.path.join(directory, "warmstart.bin"))
+        store.registers = board_main.REGISTER_PROFILE
+        board_main.myclock = time.clock()
+        # Fly until the reboot, then save the state like the clean exit of main.py
+        sensor.set_source(frames[:reboot_at])
+        tracker = None
+        with contextlib.redirect_stdout(io.StringIO()):
+            try:
+                _, tracker = board_main.set_mode(None, mode)
+                while True:
+                    tracker.track()
+            except EOFError:
+                pass  # The reboot
+        warm_state = store.load() if tracker and store.save(tracker, mode) else None
+    return {
+        "cold": boot(frames[reboot_at:], mode),
+        "warm": boot(frames[reboot_at:], mode, warm_state) if warm_state else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure the time to the first valid IBus frame after a reboot.")
+    parser.add_argument("path", help="The sequence (*.npz or *.mjpeg)")
+    parser.add_argument("--mode", default="B", choices=["B", "G"], help="Balloon (B) or goal (G) tracking")
+    parser.add_argument("--reboot-at", type=int, help="The frame the board reboots at (default: the middle)")
+    parser.add_argument("--fps", type=float, default=DEVICE_FPS, help="The camera frame rate on the board")
+    parser.add_argument("--cache", default=CACHE_DIR, help="The directory of the decoded frame cache")
+    args = parser.parse_args()
+
+    frames = FrameCache(args.cache).frames(args.path)
+    reboot_at = args.reboot_at if args.reboot_at is not None else len(frames) // 2
+    results = bench(frames, args.mode, reboot_at)
+    print("Reboot at frame {} of {}".format(reboot_at, len(frames)))
+    for name, result in results.items():
+        if result is None:
+            print("{:<6}no saved state (nothing was tracked before the reboot)".format(name))
+        elif result["frames"] is None:
+            print("{:<6}no valid frame before the end of the sequence".format(name))
+        else:
+            # On the board every frame costs at least one frame period, plus the blocking sleeps of the tracker
+            board_ms = result["frames"] * 1000 / args.fps + result["sleep_ms"]
+            print(
+                "{:<6}{:>4} frames  {:>7.1f} ms sleeping  ~{:>7.1f} ms on the board at {:g} fps".format(
+                    name, result["frames"], result["sleep_ms"], board_ms, args.fps
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
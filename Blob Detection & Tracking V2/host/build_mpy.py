@@ -0,0 +1,182 @@
+"""
+Author       : agent
+Date         : 2026-10-19 12:53:54
+LastEditors  : agent
+LastEditTime : 2026-10-19 13:57:17
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/host/build_mpy.py
+Description  : Build the deployable bundle of lib/ as precompiled .mpy bytecode.
+               The board then skips compiling the sources at every boot. The .mpy version must match the firmware,
+               use the mpy-cross release of the MicroPython version of the OpenMV firmware (--mpy-cross).
+                   python -m host.build_mpy                      # build/bundle and build/bundle.zip
+                   python -m host.build_mpy --check micropython  # also import the bundle under the unix port
+               The bundle also holds bench_import.py, which prints the same import report on the board.
+               NOTE: --check has not been run yet, no MicroPython unix port was available, so the import time and
+               heap savings of the bundle are unmeasured. Only the mpy-cross build has been exercised.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import zipfile
+
+from host import board
+
+# Macros
+MODULES = ("filters", "curblob", "memroi", "Ibus", "tracker")  # The modules of lib/ compiled, dependencies first
+MARCH = "armv7emdp"  # Cortex-M7 with double precision FPU (Nicla Vision, OpenMV H7)
+BUILD_DIR = os.path.join(board.BOARD_DIR, "build")
+## Import-only stubs of the board modules for the MicroPython unix port, no NumPy there
+STUBS = {
+    "sensor": (
+        "RGB565 = 2\nGRAYSCALE = 1\nHQVGA = 9\nQQVGA = 4\nQVGA = 5\n"
+        "def width():\n    return 240\n"
+        "def height():\n    return 160\n"
+    ),
+    "image": "EDGE_SIMPLE = 0\nEDGE_CANNY = 1\nclass blob:\n    pass\nclass statistics:\n    pass\n",
+    "pyb": "class LED:\n    def __init__(self, i):\n        pass\n\nclass UART:\n    def __init__(self, *args, **kwargs):\n        pass\n",
+    "machine": "class Pin:\n    IN = 0\n    OUT = 1\n    def __init__(self, *args, **kwargs):\n        pass\n",
+    "omv": "def disable_fb(disable=None):\n    return False\n",
+}
+## Measures the import of the modules, run by MicroPython (unix port or board)
+IMPORT_REPORT = """
+import gc
+import sys
+import time
+
+report = {}
+for name in MODULES:
+    gc.collect()
+    free = gc.mem_free()
+    t_start = time.ticks_us()
+    __import__("lib." + name)
+    elapsed = time.ticks_diff(time.ticks_us(), t_start)
+    gc.collect()
+    report[name] = {"import_us": elapsed, "heap_bytes": free - gc.mem_free()}
+print("IMPORT_REPORT " + repr(report).replace("'", '"'))
+"""
+
+
+def find_mpy_cross(path: str = None) -> list:
+    """
+    @description: Find the mpy-cross compiler
+    @param       {str} path: An explicit mpy-cross binary (default: None)
+    @return      {list} The command to run mpy-cross
+    """
+    if path:
+        return [path]
+    binary = shutil.which("mpy-cross")
+    if binary:
+        return [binary]
+    try:
+        import mpy_cross  # noqa: F401, the pip package wraps the binary
+
+        return [sys.executable, "-m", "mpy_cross"]
+    except ImportError:
+        raise FileNotFoundError("mpy-cross not found, install it (pip install mpy-cross) or pass --mpy-cross.")
+
+
+def build(out_dir: str, mpy_cross: list, march: str = MARCH, modules: tuple = MODULES) -> list:
+    """
+    @description: Compile the modules of lib/ into out_dir/lib and write the board-side import report script
+    @param       {str} out_dir: The bundle directory, emptied first
+    @param       {list} mpy_cross: The command to run mpy-cross
+    @param       {str} march: The target architecture of native code (default: armv7emdp)
+    @param       {tuple} modules: The module names in lib/ (default: MODULES)
+    @return      {list} The paths of the compiled files
+    """
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.makedirs(os.path.join(out_dir, "lib"))
+    compiled = []
+    for name in modules:
+        source = os.path.join(board.BOARD_DIR, "lib", name + ".py")
+        target = os.path.join(out_dir, "lib", name + ".mpy")
+        # -s keeps the short source name in tracebacks instead of the build path
+        subprocess.run(
+            mpy_cross + ["-march=" + march, "-s", "lib/{}.py".format(name), "-o", target, source],
+            check=True,
+        )
+        compiled.append(target)
+    with open(os.path.join(out_dir, "bench_import.py"), "w") as f:
+        f.write("MODULES = {!r}\n".format(tuple(modules)) + IMPORT_REPORT)
+    return compiled
+
+
+def package(out_dir: str, archive: str) -> None:
+    """
+    @description: Zip the bundle, unzip it at the root of the board's USB drive
+    @param       {str} out_dir: The bundle directory
+    @param       {str} archive: The zip file to write
+    @return      {*} None
+    """
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as bundle:
+        for root, _, files in os.walk(out_dir):
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                bundle.write(path, os.path.relpath(path, out_dir))
+
+
+def import_report(micropython: str, lib_parent: str, modules: tuple = MODULES) -> dict:
+    """
+    @description: Import the modules under the MicroPython unix port with the board stubs and measure them
+    @param       {str} micropython: The MicroPython unix port binary
+    @param       {str} lib_parent: The directory holding lib/ (sources or bundle)
+    @param       {tuple} modules: The module names in lib/ (default: MODULES)
+    @return      {dict} Per module: import_us and heap_bytes; raises RuntimeError if an import fails
+    """
+    with tempfile.TemporaryDirectory() as stubs:
+        for name, source in STUBS.items():
+            with open(os.path.join(stubs, name + ".py"), "w") as f:
+                f.write(source)
+        script = "import sys\nsys.path.insert(0, {!r})\nsys.path.insert(0, {!r})\nMODULES = {!r}\n".format(
+            stubs, lib_parent, tuple(modules)
+        ) + IMPORT_REPORT
+        result = subprocess.run([micropython, "-c", script], capture_output=True, text=True)
+    for line in result.stdout.splitlines():
+        if line.startswith("IMPORT_REPORT "):
+            return json.loads(line[len("IMPORT_REPORT ") :])
+    raise RuntimeError("Import failed under {}:\n{}{}".format(micropython, result.stdout, result.stderr))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the .mpy bundle of lib/.")
+    parser.add_argument("--out", default=os.path.join(BUILD_DIR, "bundle"), help="The bundle directory")
+    parser.add_argument("--mpy-cross", help="The mpy-cross binary matching the firmware (default: from PATH)")
+    parser.add_argument("--march", default=MARCH, help="The target architecture of native code")
+    parser.add_argument("--check", metavar="MICROPYTHON", help="Import the bundle under this MicroPython unix port")
+    args = parser.parse_args()
+
+    compiled = build(args.out, find_mpy_cross(args.mpy_cross), args.march)
+    package(args.out, args.out.rstrip(os.sep) + ".zip")
+    for path in compiled:
+        source = os.path.join(board.BOARD_DIR, "lib", os.path.basename(path)[:-4] + ".py")
+        print(
+            "{:<14}{:>7} B source  {:>7} B bytecode".format(
+                os.path.basename(path), os.path.getsize(source), os.path.getsize(path)
+            )
+        )
+    print("Bundle written to {} (and .zip), copy its content to the root of the board's USB drive".format(args.out))
+    # MicroPython imports name.py before name.mpy, the sources must not stay next to the bytecode
+    print("Remove {} from the board's lib/ folder".format(", ".join(name + ".py" for name in MODULES)))
+
+    if args.check:
+        before = import_report(args.check, board.BOARD_DIR)
+        after = import_report(args.check, args.out)
+        print("{:<10}{:>14}{:>14}{:>14}{:>14}".format("module", "source us", "mpy us", "source heap", "mpy heap"))
+        for name in MODULES:
+            print(
+                "{:<10}{:>14}{:>14}{:>14}{:>14}".format(
+                    name,
+                    before[name]["import_us"],
+                    after[name]["import_us"],
+                    before[name]["heap_bytes"],
+                    after[name]["heap_bytes"],
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+Author       : agent
+Date         : 2026-10-19 12:48:49
+LastEditors  : agent
+LastEditTime : 2026-10-19 12:48:49
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/host/calibrate.py
+Description  : Offline calibration of color thresholds from labeled frames.
+               The labels are boxes (see host.replay.ground_truth) or pixel masks ("masks" [frames, height, width] in
+               the sequence .npz or in <name>.gt.npz). The pixels of the labels are positives and every other pixel is
+               a negative; the search maximizes the pixel F1 score on 3D L*a*b* (or 1D grayscale) histograms, so its
+               cost does not depend on the number of pixels.
+               Sequences are grouped by lighting condition, the name of the directory they are in.
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+
+from host.detect import lab_table, rgb565_to_gray
+from host.replay import CACHE_DIR, FrameCache, discover, ground_truth
+
+# Macros
+LAB_STEPS = (2, 4, 4)  # The histogram bin widths along L, A, B
+LAB_OFFSETS = (0, -128, -128)  # The smallest L, A, B values
+LAB_BINS = (51, 64, 64)  # The number of histogram bins along L, A, B
+MAX_THRESHOLDS = 2  # The maximum number of thresholds per color
+MIN_GAIN = 0.01  # The minimum F1 gain for adding one more threshold
+MAX_ROUNDS = 20  # The maximum number of coordinate ascent rounds
+START_PERCENTILES = (2, 98)  # The percentiles of the positives giving the initial threshold
+
+
+def label_masks(path: str, shape: tuple) -> np.ndarray:
+    """
+    @description: Get the pixel labels of a sequence, box labels become the ellipses inscribed in the boxes
+    @param       {str} path: The path of the sequence
+    @param       {tuple} shape: The shape of the frames [frames, height, width]
+    @return      {np.ndarray} The labels [frames, height, width] (int8): 1 positive, 0 negative, -1 ignored;
+                              None if the sequence is not labeled
+    """
+    stem = os.path.splitext(path)[0]
+    for candidate in (stem + ".gt.npz", path):
+        if candidate.endswith(".npz") and os.path.exists(candidate):
+            with np.load(candidate) as data:
+                if "masks" in data:
+                    return (np.asarray(data["masks"][: shape[0]]) > 0).astype(np.int8)
+    truth = ground_truth(path)
+    if truth is None:
+        return None
+    labels = np.zeros(shape, dtype=np.int8)
+    yy, xx = np.mgrid[0 : shape[1], 0 : shape[2]]
+    for f, boxes in enumerate(truth["boxes"][: shape[0]]):
+        for x, y, w, h in boxes[~np.isnan(boxes).any(axis=1)]:
+            x0, y0 = int(max(0, x)), int(max(0, y))
+            x1, y1 = int(min(shape[2], x + w)), int(min(shape[1], y + h))
+            if x1 <= x0 or y1 <= y0:
+                continue
+            # Balloons are round, so the corners of a box are ignored instead of counted as positives
+            dx = (xx[y0:y1, x0:x1] + 0.5 - (x + w / 2)) / (w / 2)
+            dy = (yy[y0:y1, x0:x1] + 0.5 - (y + h / 2)) / (h / 2)
+            labels[f, y0:y1, x0:x1] = np.where(dx * dx + dy * dy <= 1, 1, -1)
+    return labels
+
+
+def _bin_index(pixels: np.ndarray, gray: bool) -> np.ndarray:
+    """
+    @description: Get the flat histogram bin of every pixel
+    @param       {np.ndarray} pixels: The pixels (uint16 RGB565 or uint8 grayscale)
+    @param       {bool} gray: Whether to use the grayscale histogram
+    @return      {np.ndarray} The flat bin index of every pixel
+    """
+    if gray:
+        return (rgb565_to_gray(pixels) if pixels.dtype == np.uint16 else pixels).astype(np.int64)
+    lab = lab_table()[:, pixels].astype(np.int64)
+    index = np.zeros(pixels.shape, dtype=np.int64)
+    for channel, step, offset, bins in zip(lab, LAB_STEPS, LAB_OFFSETS, LAB_BINS):
+        index = index * bins + np.clip((channel - offset) // step, 0, bins - 1)
+    return index
+
+
+def histograms(frames: np.ndarray, labels: np.ndarray, gray: bool) -> tuple:
+    """
+    @description: Build the histograms of the positive and negative pixels of a sequence
+    @param       {np.ndarray} frames: The frames [frames, height, width]
+    @param       {np.ndarray} labels: The labels [frames, height, width] (see label_masks)
+    @param       {bool} gray: Whether to use the grayscale histogram
+    @return      {tuple} The positive and negative histograms, [256] or LAB_BINS
+    """
+    shape = (256,) if gray else LAB_BINS
+    size = int(np.prod(shape))
+    index = _bin_index(np.asarray(frames), gray)
+    positive = np.bincount(index[labels == 1], minlength=size).reshape(shape)
+    negative = np.bincount(index[labels == 0], minlength=size).reshape(shape)
+    return positive.astype(np.float64), negative.astype(np.float64)
+
+
+def _count(hist: np.ndarray, box: list) -> float:
+    """
+    @description: Count the pixels of a histogram inside a box of bins
+    @param       {np.ndarray} hist: The histogram
+    @param       {list} box: The (first, last) bin along every axis
+    @return      {float} The number of pixels
+    """
+    return float(hist[tuple(slice(lo, hi + 1) for lo, hi in box)].sum())
+
+
+def _ascend(positive: np.ndarray, negative: np.ndarray, box: list, base: tuple) -> tuple:
+    """
+    @description: Improve a box of bins by coordinate ascent, every step picks the best (first, last) pair of one
+                  axis among all the pairs at once
+    @param       {np.ndarray} positive: The histogram of the positives not covered yet
+    @param       {np.ndarray} negative: The histogram of the negatives not covered yet
+    @param       {list} box: The initial (first, last) bin along every axis
+    @param       {tuple} base: (total positives, positives covered, negatives covered) by the previous thresholds
+    @return      {tuple} The best box and its F1 score
+    """
+    total, covered_tp, covered_fp = base
+    box = [list(bounds) for bounds in box]
+    best = -1.0
+    for _ in range(MAX_ROUNDS):
+        improved = False
+        for axis in range(positive.ndim):
+            others = tuple(slice(lo, hi + 1) if k != axis else slice(None) for k, (lo, hi) in enumerate(box))
+            sum_axes = tuple(k for k in range(positive.ndim) if k != axis)
+            tp = np.concatenate(([0.0], np.cumsum(positive[others].sum(axis=sum_axes))))
+            fp = np.concatenate(([0.0], np.cumsum(negative[others].sum(axis=sum_axes))))
+            # Every (first, last) pair at once: count(first..last) = cumsum[last + 1] - cumsum[first]
+            tp_pairs = covered_tp + tp[np.newaxis, 1:] - tp[:-1, np.newaxis]
+            fp_pairs = covered_fp + fp[np.newaxis, 1:] - fp[:-1, np.newaxis]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                f1 = 2 * tp_pairs / (tp_pairs + fp_pairs + total)
+            f1 = np.where(np.triu(np.ones(f1.shape, dtype=bool)), np.nan_to_num(f1), -1.0)
+            first, last = np.unravel_index(np.argmax(f1), f1.shape)
+            if f1[first, last] > best + 1e-12:
+                best = float(f1[first, last])
+                improved = improved or [first, last] != box[axis]
+                box[axis] = [int(first), int(last)]
+        if not improved:
+            break
+    return box, best
+
+
+def _start(positive: np.ndarray) -> list:
+    """
+    @description: Get the initial box of bins spanning the central percentiles of the positives
+    @param       {np.ndarray} positive: The histogram of the positives
+    @return      {list} The (first, last) bin along every axis
+    """
+    box = []
+    for axis in range(positive.ndim):
+        marginal = positive.sum(axis=tuple(k for k in range(positive.ndim) if k != axis))
+        cdf = np.cumsum(marginal) / max(1.0, marginal.sum())
+        lo, hi = [int(np.searchsorted(cdf, p / 100)) for p in START_PERCENTILES]
+        box.append([min(lo, len(cdf) - 1), min(hi, len(cdf) - 1)])
+    return box
+
+
+def _to_threshold(box: list, gray: bool) -> tuple:
+    """
+    @description: Convert a box of bins into a find_blobs threshold
+    @param       {list} box: The (first, last) bin along every axis
+    @param       {bool} gray: Whether the box is in the grayscale histogram
+    @return      {tuple} The threshold (Lmin, Lmax, Amin, Amax, Bmin, Bmax) or (min, max)
+    """
+    if gray:
+        return (int(box[0][0]), int(box[0][1]))
+    threshold = []
+    for (lo, hi), step, offset in zip(box, LAB_STEPS, LAB_OFFSETS):
+        threshold.extend((int(lo * step + offset), int(hi * step + step - 1 + offset)))
+    threshold[1] = min(threshold[1], 100)
+    return tuple(threshold)
+
+
+def calibrate(positive: np.ndarray, negative: np.ndarray, max_thresholds: int = MAX_THRESHOLDS) -> dict:
+    """
+    @description: Search the thresholds maximizing the pixel F1 score, thresholds are added greedily while they help
+    @param       {np.ndarray} positive: The histogram of the positives
+    @param       {np.ndarray} negative: The histogram of the negatives
+    @param       {int} max_thresholds: The maximum number of thresholds (default: 2)
+    @return      {dict} thresholds, f1, precision, recall
+    """
+    gray = positive.ndim == 1
+    positive, negative = positive.copy(), negative.copy()
+    total = positive.sum()
+    covered_tp = covered_fp = 0.0
+    thresholds, f1 = [], 0.0
+    for _ in range(max_thresholds):
+        starts = [_start(positive), [[0, n - 1] for n in positive.shape]]
+        box, score = max(
+            (_ascend(positive, negative, start, (total, covered_tp, covered_fp)) for start in starts),
+            key=lambda result: result[1],
+        )
+        if score < f1 + MIN_GAIN:
+            break
+        f1 = score
+        thresholds.append(_to_threshold(box, gray))
+        inside = tuple(slice(lo, hi + 1) for lo, hi in box)
+        covered_tp += _count(positive, box)
+        covered_fp += _count(negative, box)
+        positive[inside] = 0  # Covered pixels do not count twice for the next threshold
+        negative[inside] = 0
+    return {
+        "thresholds": thresholds,
+        "f1": f1,
+        "precision": covered_tp / (covered_tp + covered_fp) if covered_tp + covered_fp else 0.0,
+        "recall": covered_tp / total if total else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Calibrate color thresholds from labeled frames.")
+    parser.add_argument("paths", nargs="+", help="Labeled sequences or directories of them, one per lighting condition")
+    parser.add_argument("--name", default="BALLON", help="The name of the threshold list in the output")
+    parser.add_argument("--gray", action="store_true", help="Calibrate a grayscale threshold instead of L*a*b*")
+    parser.add_argument("--max-thresholds", type=int, default=MAX_THRESHOLDS, help="The thresholds per color")
+    parser.add_argument("--every", type=int, default=1, help="Only use every n-th frame")
+    parser.add_argument("--cache", default=CACHE_DIR, help="The directory of the decoded frame cache")
+    parser.add_argument("--out", help="Write the thresholds of every lighting condition to a JSON file")
+    args = parser.parse_args()
+
+    cache = FrameCache(args.cache)
+    conditions = {}
+    for path in discover(args.paths):
+        frames = cache.frames(path)[:: args.every]
+        labels = label_masks(path, cache.frames(path).shape)
+        if labels is None:
+            print("Skipping {} (no labels)".format(path))
+            continue
+        gray = args.gray or frames.dtype == np.uint8
+        positive, negative = histograms(frames, labels[:: args.every], gray)
+        condition = os.path.basename(os.path.dirname(os.path.abspath(path)))
+        if condition in conditions:
+            conditions[condition][0] += positive
+            conditions[condition][1] += negative
+            conditions[condition][2] += 1
+        else:
+            conditions[condition] = [positive, negative, 1]
+
+    results = {}
+    for condition, (positive, negative, n_sequences) in conditions.items():
+        result = calibrate(positive, negative, args.max_thresholds)
+        results[condition] = result
+        print(
+            "# {}: {} sequences, F1 {:.3f}, precision {:.3f}, recall {:.3f}".format(
+                condition, n_sequences, result["f1"], result["precision"], result["recall"]
+            )
+        )
+        print("{} = {}".format(args.name, [tuple(int(v) for v in t) for t in result["thresholds"]]))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({condition: result["thresholds"] for condition, result in results.items()}, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Author       : agent
+Date         : 2026-10-19 13:10:04
+LastEditors  : agent
+LastEditTime : 2026-10-19 13:10:04
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/host/capturebench.py
+Description  : Frame buffer benchmark: latency against throughput of single, double and triple buffered capture.
+               A sequence is read out by the sensor stand-in at the camera frame rate on the virtual board clock, the
+               board's processing time per frame is emulated, and the tracked frame rate, the frame age (true and as
+               estimated by lib/capture.py), the dropped frames and the tracking score are reported per buffer count.
+                   python -m host.capturebench seq.npz --work-ms 40 --buffers 1 2 3
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import time
+
+import numpy as np
+
+from host import board
+from host.evaluate import evaluate
+from host.replay import CACHE_DIR, FrameCache, ground_truth
+
+# Macros
+DEVICE_FPS = 30  # The nominal camera frame rate
+WORK_MS = 25  # The board's processing time of one frame, on top of the host's
+
+
+def run(frames, buffers: int, fps: float, work_ms: float, thresholds: list = None) -> dict:
+    """
+    @description: Track a sequence with a number of frame buffers and an emulated processing time
+    @param       {*} frames: The frames of the sequence
+    @param       {int} buffers: The number of frame buffers
+    @param       {float} fps: The camera frame rate
+    @param       {float} work_ms: The processing time of one frame on the board
+    @param       {list} thresholds: The balloon thresholds (default: BALLON of main.py)
+    @return      {dict} The per-frame outputs (pred, valid, track_id, roi), the true and estimated frame ages (us) of
+                        the tracked frames, the dropped frames and the board time (ms)
+    """
+    board.install(virtual_sleep=True)
+    import sensor
+    import main as board_main
+    from lib.tracker import BLOBTracker
+
+    n_frames = len(frames)
+    result = {
+        "pred": np.zeros((n_frames, 4)),
+        "valid": np.zeros(n_frames, dtype=bool),
+        "track_id": np.zeros(n_frames, dtype=np.int64),
+        "roi": np.zeros((n_frames, 4)),
+        "age_us": [],
+        "estimated_age_us": [],
+    }
+    with contextlib.redirect_stdout(io.StringIO()):
+        board_main.init_sensor(isColored=True)
+        sensor.set_framerate(fps)
+        sensor.set_source(frames)
+        t_start = time.ticks_ms()
+        tracker = None
+        try:
+            tracker = BLOBTracker(
+                thresholds if thresholds else board_main.BALLON,
+                time.clock(),
+                show=False,
+                max_reference_frames=1,
+                frame_buffers=buffers,
+            )
+            while True:
+                tracker.track()
+                time.sleep_us(int(work_ms * 1000))  # The rest of the frame on the board
+                index = sensor.frame_index() - 1
+                blob = tracker.tracked_blob
+                if blob.feature_vector:
+                    result["pred"][index] = blob.feature_vector[0:4]
+                    result["valid"][index] = True
+                result["track_id"][index] = blob.id
+                result["roi"][index] = tracker.roi.get_roi()
+                result["age_us"].append(sensor.frame_stats()["age_us"])
+                result["estimated_age_us"].append(tracker.capture.age_us)
+        except EOFError:
+            pass  # The end of the sequence
+        finally:
+            sensor.set_framebuffers(1)  # Stop the producer thread
+    result["tracked_frames"] = len(result["age_us"])
+    result["dropped"] = sensor.frame_stats()["dropped"]
+    result["estimated_dropped"] = tracker.capture.dropped if tracker else 0
+    result["board_ms"] = time.ticks_diff(time.ticks_ms(), t_start)
+    return result
+
+
+def summary(buffers: int, result: dict, truth: dict) -> dict:
+    """
+    @description: Summarize a run
+    @param       {int} buffers: The number of frame buffers
+    @param       {dict} result: The result of run
+    @param       {dict} truth: The ground truth of the sequence, None without one
+    @return      {dict} The throughput, latency, drop and tracking metrics
+    """
+    age = np.array(result["age_us"] or [0]) / 1000
+    estimated = np.array(result["estimated_age_us"] or [0]) / 1000
+    metrics = {
+        "buffers": buffers,
+        "fps": 1000 * result["tracked_frames"] / max(1, result["board_ms"]),
+        "age_ms": float(age.mean()),
+        "age_ms_max": float(age.max()),
+        "estimated_age_ms": float(estimated.mean()),
+        "dropped": result["dropped"],
+        "estimated_dropped": result["estimated_dropped"],
+    }
+    if truth is not None:
+        n = min(len(result["pred"]), len(truth["boxes"]))
+        scores = evaluate(
+            result["pred"][:n],
+            result["valid"][:n],
+            truth["boxes"][:n],
+            gt_ids=truth["ids"][:n],
+            pred_ids=result["track_id"][:n],
+            roi=result["roi"][:n],
+        )
+        metrics["score"] = scores["score"]
+    return metrics
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare the frame age and drops of the frame buffer counts.")
+    parser.add_argument("path", help="The sequence (*.npz or *.mjpeg)")
+    parser.add_argument("--buffers", type=int, nargs="+", default=[1, 2, 3], help="The frame buffer counts")
+    parser.add_argument("--fps", type=float, default=DEVICE_FPS, help="The camera frame rate on the board")
+    parser.add_argument("--work-ms", type=float, default=WORK_MS, help="The board's processing time of one frame")
+    parser.add_argument("--thresholds", type=json.loads, help="The balloon thresholds as JSON (default: main.py)")
+    parser.add_argument("--cache", default=CACHE_DIR, help="The directory of the decoded frame cache")
+    args = parser.parse_args()
+
+    frames = FrameCache(args.cache).frames(args.path)
+    truth = ground_truth(args.path)
+    for buffers in args.buffers:
+        metrics = summary(buffers, run(frames, buffers, args.fps, args.work_ms, args.thresholds), truth)
+        print("  ".join("{} {}".format(k, round(v, 3) if isinstance(v, float) else v) for k, v in metrics.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+Author       : agent
+Date         : 2026-10-19 12:50:47
+LastEditors  : agent
+LastEditTime : 2026-10-19 12:50:47
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/host/colormodel.py
+Description  : Learned color classifiers compiled to RGB565 lookup tables for lib/colorlut.py.
+               Every color is a Gaussian in L*a*b* fitted to the labeled pixels (see host.calibrate.label_masks); the
+               table accepts the RGB565 values within the Mahalanobis distance that maximizes the pixel F1 score. All
+               the statistics are computed on histograms over the 64K RGB565 values, never per pixel.
+                   python -m host.colormodel train balloons.lut --color PURPLE data/purple --color GREEN data/green
+                   python -m host.colormodel bench balloons.lut data/purple data/green
+"""
+
+import argparse
+import json
+import struct
+import time
+
+import numpy as np
+
+from host import board
+from host.calibrate import label_masks
+from host.detect import find_blobs, lab_table
+from host.replay import CACHE_DIR, FrameCache, discover, ground_truth
+
+# Macros
+LUT_MAGIC = b"BCLU"  # Must match lib/colorlut.py
+LUT_VERSION = 1  # Must match lib/colorlut.py
+HEADER_FMT = "<4sHH"  # Must match lib/colorlut.py
+COLOR_FMT = "<16s6b"  # Must match lib/colorlut.py
+COVARIANCE_FLOOR = 1.0  # Added to the diagonal of the covariance, the quantization of RGB565 is about one unit
+## The find_blobs parameters of BLOBTracker.find_reference, used by the benchmark
+BENCH_PARAMS = {"merge": True, "pixels_threshold": 30, "area_threshold": 50, "margin": 20}
+
+
+def value_histograms(paths: list, cache: FrameCache) -> tuple:
+    """
+    @description: Count the labeled positive and negative pixels of some sequences per RGB565 value
+    @param       {list} paths: The labeled RGB565 sequences
+    @param       {FrameCache} cache: The cache of decoded frames
+    @return      {tuple} The positive and negative histograms [65536]
+    """
+    positive = np.zeros(1 << 16)
+    negative = np.zeros(1 << 16)
+    for path in paths:
+        frames = cache.frames(path)
+        if frames.dtype != np.uint16:
+            raise ValueError("Color models need RGB565 frames: {}".format(path))
+        labels = label_masks(path, frames.shape)
+        if labels is None:
+            print("Skipping {} (no labels)".format(path))
+            continue
+        positive += np.bincount(frames[labels == 1], minlength=1 << 16)
+        negative += np.bincount(frames[labels == 0], minlength=1 << 16)
+    return positive, negative
+
+
+def fit_gaussian(positive: np.ndarray, negative: np.ndarray) -> dict:
+    """
+    @description: Fit a Gaussian to the positives and pick the Mahalanobis cut-off with the best pixel F1 score
+    @param       {np.ndarray} positive: The positive histogram [65536]
+    @param       {np.ndarray} negative: The negative histogram [65536]
+    @return      {dict} mean, covariance, cutoff (squared distance), accept [65536] (bool), f1, precision, recall
+    """
+    lab = lab_table().T.astype(np.float64)
+    total = positive.sum()
+    if total == 0:
+        raise ValueError("No positive pixels to fit")
+    mean = positive @ lab / total
+    centered = lab - mean
+    covariance = (centered * positive[:, np.newaxis]).T @ centered / total + COVARIANCE_FLOOR * np.eye(3)
+    distance = np.einsum("ij,jk,ik->i", centered, np.linalg.inv(covariance), centered)
+    # Accepting the values in order of distance, every prefix is one candidate cut-off
+    order = np.argsort(distance, kind="stable")
+    tp = np.cumsum(positive[order])
+    fp = np.cumsum(negative[order])
+    f1 = 2 * tp / (tp + fp + total)
+    best = int(np.argmax(f1))
+    accept = distance <= distance[order[best]]
+    return {
+        "mean": mean,
+        "covariance": covariance,
+        "cutoff": float(distance[order[best]]),
+        "accept": accept,
+        "f1": float(f1[best]),
+        "precision": float(tp[best] / max(1.0, tp[best] + fp[best])),
+        "recall": float(tp[best] / total),
+    }
+
+
+def bounding_threshold(accept: np.ndarray) -> tuple:
+    """
+    @description: Get the L*a*b* threshold containing every accepted RGB565 value
+    @param       {np.ndarray} accept: Whether every RGB565 value is accepted [65536]
+    @return      {tuple} (Lmin, Lmax, Amin, Amax, Bmin, Bmax)
+    """
+    lab = lab_table()[:, accept]
+    return tuple(int(v) for channel in lab for v in (channel.min(), channel.max()))
+
+
+def save(path: str, names: list, accepts: list) -> None:
+    """
+    @description: Write a color table file for lib/colorlut.py
+    @param       {str} path: The path of the table file
+    @param       {list} names: The name of every color
+    @param       {list} accepts: Whether every RGB565 value is accepted [65536], per color
+    @return      {*} None
+    """
+    with open(path, "wb") as f:
+        f.write(struct.pack(HEADER_FMT, LUT_MAGIC, LUT_VERSION, len(names)))
+        for name, accept in zip(names, accepts):
+            f.write(struct.pack(COLOR_FMT, name.encode()[:16], *bounding_threshold(accept)))
+            f.write(np.packbits(accept, bitorder="little").tobytes())
+
+
+def load(path: str) -> dict:
+    """
+    @description: Read a color table file
+    @param       {str} path: The path of the table file
+    @return      {dict} names, thresholds (the bounding boxes) and table, the bitmask of every RGB565 value (uint32)
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, n_colors = struct.unpack_from(HEADER_FMT, data)
+    if magic != LUT_MAGIC or version != LUT_VERSION:
+        raise ValueError("Not a color table (version {}): {}".format(LUT_VERSION, path))
+    offset = struct.calcsize(HEADER_FMT)
+    names, thresholds = [], []
+    table = np.zeros(1 << 16, dtype=np.uint32)
+    for i in range(n_colors):
+        fields = struct.unpack_from(COLOR_FMT, data, offset)
+        offset += struct.calcsize(COLOR_FMT)
+        names.append(fields[0].rstrip(b"\0").decode())
+        thresholds.append(tuple(fields[1:]))
+        bits = np.frombuffer(data, dtype=np.uint8, count=(1 << 16) // 8, offset=offset)
+        offset += (1 << 16) // 8
+        table[np.unpackbits(bits, bitorder="little").astype(bool)] |= np.uint32(1 << i)
+    return {"names": names, "thresholds": thresholds, "table": table}
+
+
+def train(colors: list, cache: FrameCache) -> tuple:
+    """
+    @description: Train one Gaussian per color, the positives of the other colors count as negatives
+    @param       {list} colors: (name, sequence paths) per color
+    @param       {FrameCache} cache: The cache of decoded frames
+    @return      {tuple} The color names and their fitted models (see fit_gaussian)
+    """
+    histograms = [value_histograms(discover(paths), cache) for _, paths in colors]
+    models = []
+    for i, (positive, negative) in enumerate(histograms):
+        others = sum((h[0] for j, h in enumerate(histograms) if j != i), np.zeros(1 << 16))
+        models.append(fit_gaussian(positive, negative + others))
+    return [name for name, _ in colors], models
+
+
+def _centroids_in_boxes(rows: list, boxes: np.ndarray) -> tuple:
+    """
+    @description: Match candidate blobs to the labeled boxes of a frame by their centroids
+    @param       {list} rows: The blob rows (see host.detect)
+    @param       {np.ndarray} boxes: The labeled boxes [objects, 4] in [x0, y0, w, h], NaN rows are absent
+    @return      {tuple} The number of candidates inside a box and the number of boxes holding a candidate
+    """
+    boxes = boxes[~np.isnan(boxes).any(axis=1)]
+    if not rows or len(boxes) == 0:
+        return 0, 0
+    rows = np.asarray(rows, dtype=np.float64)
+    cx = (rows[:, 5] / rows[:, 4])[:, np.newaxis]
+    cy = (rows[:, 6] / rows[:, 4])[:, np.newaxis]
+    inside = (
+        (cx >= boxes[:, 0]) & (cx < boxes[:, 0] + boxes[:, 2]) & (cy >= boxes[:, 1]) & (cy < boxes[:, 1] + boxes[:, 3])
+    )
+    return int(inside.any(axis=1).sum()), int(inside.any(axis=0).sum())
+
+
+def _row(blob) -> list:
+    """
+    @description: Get the leading columns of a blob row (see host.detect) back from a stand-in blob
+    @param       {image.blob} blob: The blob
+    @return      {list} [x0, y0, x1, y1, pixels, sum x, sum y]
+    """
+    return [
+        blob.x(),
+        blob.y(),
+        blob.x() + blob.w() - 1,
+        blob.y() + blob.h() - 1,
+        blob.pixels(),
+        blob.cxf() * blob.pixels(),
+        blob.cyf() * blob.pixels(),
+    ]
+
+
+def bench(paths: list, cache: FrameCache, lut_path: str, thresholds: list) -> dict:
+    """
+    @description: Compare hand-tuned thresholds with a learned color table on labeled sequences
+    @param       {list} paths: The labeled RGB565 sequences
+    @param       {FrameCache} cache: The cache of decoded frames
+    @param       {str} lut_path: The color table file
+    @param       {list} thresholds: The hand-tuned thresholds
+    @return      {dict} Per method: candidates per frame, precision, recall and milliseconds per frame
+    """
+    board.install()
+    import image
+    from lib.colorlut import ColorLUT
+
+    learned = load(lut_path)
+    color_lut = ColorLUT(lut_path)
+
+    def bounds_and_verify(frame: np.ndarray) -> list:
+        # What the camera does: find_blobs on the bounding boxes, then the sampled check of lib/colorlut.py
+        img = image.Image(frame)
+        blobs = color_lut.verify(img, img.find_blobs(color_lut.thresholds, x_stride=1, **BENCH_PARAMS))
+        return [_row(blob) for blob in blobs]
+
+    methods = {
+        "thresholds": lambda frame: find_blobs(frame, True, thresholds, **BENCH_PARAMS),
+        "lut": lambda frame: find_blobs(frame, True, learned["thresholds"], lut=learned["table"], **BENCH_PARAMS),
+        "bounds+verify": bounds_and_verify,
+    }
+    results = {}
+    for method, detect in methods.items():
+        frames_total = candidates = true_candidates = boxes_total = found = 0
+        elapsed = 0.0
+        for path in paths:
+            frames = cache.frames(path)
+            truth = ground_truth(path)
+            if truth is None:
+                continue
+            for frame, boxes in zip(frames, truth["boxes"]):
+                t_start = time.perf_counter()
+                rows = detect(np.asarray(frame))
+                elapsed += time.perf_counter() - t_start
+                hits, covered = _centroids_in_boxes(rows, boxes)
+                frames_total += 1
+                candidates += len(rows)
+                true_candidates += hits
+                boxes_total += int((~np.isnan(boxes).any(axis=1)).sum())
+                found += covered
+        results[method] = {
+            "candidates_per_frame": candidates / max(1, frames_total),
+            "precision": true_candidates / max(1, candidates),
+            "recall": found / max(1, boxes_total),
+            "ms_per_frame": elapsed * 1000 / max(1, frames_total),
+        }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Train and benchmark learned color tables.")
+    parser.add_argument("--cache", default=CACHE_DIR, help="The directory of the decoded frame cache")
+    commands = parser.add_subparsers(dest="command", required=True)
+    train_parser = commands.add_parser("train", help="Fit one Gaussian per color and compile the table file")
+    train_parser.add_argument("out", help="The table file to write (*.lut)")
+    train_parser.add_argument(
+        "--color", nargs="+", action="append", required=True, metavar=("NAME", "PATH"), help="A color and its sequences"
+    )
+    bench_parser = commands.add_parser("bench", help="Compare a table file with hand-tuned thresholds")
+    bench_parser.add_argument("lut", help="The table file (*.lut)")
+    bench_parser.add_argument("paths", nargs="+", help="Labeled sequences or directories of them")
+    bench_parser.add_argument("--thresholds", help="The thresholds as JSON (default: BALLON of main.py)")
+    args = parser.parse_args()
+
+    cache = FrameCache(args.cache)
+    if args.command == "train":
+        names, models = train([(color[0], color[1:]) for color in args.color], cache)
+        save(args.out, names, [model["accept"] for model in models])
+        for name, model in zip(names, models):
+            print(
+                "{}: F1 {:.3f}, precision {:.3f}, recall {:.3f}, {} RGB565 values, bounds {}".format(
+                    name,
+                    model["f1"],
+                    model["precision"],
+                    model["recall"],
+                    int(model["accept"].sum()),
+                    bounding_threshold(model["accept"]),
+                )
+            )
+    else:
+        if args.thresholds:
+            thresholds = [tuple(t) for t in json.loads(args.thresholds)]
+        else:
+            board.install()
+            import main as board_main
+
+            thresholds = board_main.BALLON
+        results = bench(discover(args.paths), cache, args.lut, thresholds)
+        print("{:<16}{:>14}{:>12}{:>10}{:>14}".format("method", "candidates", "precision", "recall", "ms/frame"))
+        for method, result in results.items():
+            print(
+                "{:<16}{:>14.2f}{:>12.3f}{:>10.3f}{:>14.2f}".format(
+                    method,
+                    result["candidates_per_frame"],
+                    result["precision"],
+                    result["recall"],
+                    result["ms_per_frame"],
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+"""
+Author       : agent
+Date         : 2026-10-19 12:46:30
+LastEditors  : agent
+LastEditTime : 2026-10-19 12:50:47
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/host/detect.py
+Description  : The blob detection engine behind the host stand-in of image.find_blobs.
+               Pixels are classified against all the thresholds at once through a lookup table indexed by the pixel
+               value, components are labeled on run-length encoded rows and their moments are summed in bulk.
+               Blobs are rows of raw moment sums so that merging combines them exactly.
+"""
+
+import functools
+
+import numpy as np
+
+# Macros
+LAB_RANGES = ((0, 100), (-128, 127), (-128, 127))  # The full L, A, B ranges used to complete short thresholds
+GRAY_RANGE = (0, 255)  # The full grayscale range
+## Columns of a blob row
+X0, Y0, X1, Y1, N, SX, SY, SXX, SYY, SXY, CODE, COUNT = range(12)
+BLOB_COLUMNS = 12
+
+
+def rgb565_unpack(pixels: np.ndarray) -> tuple:
+    """
+    @description: Expand RGB565 pixels to 8-bit channels the way OpenMV does (bit replication)
+    @param       {np.ndarray} pixels: The RGB565 pixels (uint16)
+    @return      {tuple} The r, g, b channels (uint8)
+    """
+    pixels = pixels.astype(np.uint16, copy=False)
+    r5 = (pixels >> 11) & 0x1F
+    g6 = (pixels >> 5) & 0x3F
+    b5 = pixels & 0x1F
+    r = (r5 << 3) | (r5 >> 2)
+    g = (g6 << 2) | (g6 >> 4)
+    b = (b5 << 3) | (b5 >> 2)
+    return r.astype(np.uint8), g.astype(np.uint8), b.astype(np.uint8)
+
+
+def rgb565_pack(r: np.ndarray, g: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    @description: Pack 8-bit channels into RGB565 pixels
+    @param       {np.ndarray} r: The red channel (0-255)
+    @param       {np.ndarray} g: The green channel (0-255)
+    @param       {np.ndarray} b: The blue channel (0-255)
+    @return      {np.ndarray} The RGB565 pixels (uint16)
+    """
+    r = np.asarray(r).astype(np.uint16)
+    g = np.asarray(g).astype(np.uint16)
+    b = np.asarray(b).astype(np.uint16)
+    return ((r >> 3) << 11) | ((g >> 2) << 5) | (b >> 3)
+
+
+def rgb565_to_lab(pixels: np.ndarray) -> tuple:
+    """
+    @description: Convert RGB565 pixels to integer L*a*b* (sRGB, D65) like OpenMV
+    @param       {np.ndarray} pixels: The RGB565 pixels (uint16)
+    @return      {tuple} The L, A, B channels (int16)
+    """
+    channels = []
+    for c in rgb565_unpack(pixels):
+        c = c / 255.0
+        channels.append(np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4))
+    r, g, b = channels
+    x = (0.4124 * r + 0.3576 * g + 0.1805 * b) / 0.95047
+    y = 0.2126 * r + 0.7152 * g + 0.0722 * b
+    z = (0.0193 * r + 0.1192 * g + 0.9505 * b) / 1.08883
+    fx, fy, fz = [np.where(t > 0.008856, np.cbrt(t), 7.787 * t + 16 / 116) for t in (x, y, z)]
+    lab_l = np.rint(116 * fy - 16)
+    lab_a = np.rint(500 * (fx - fy))
+    lab_b = np.rint(200 * (fy - fz))
+    return lab_l.astype(np.int16), lab_a.astype(np.int16), lab_b.astype(np.int16)
+
+
+def rgb565_to_gray(pixels: np.ndarray) -> np.ndarray:
+    """
+    @description: Convert RGB565 pixels to grayscale with OpenMV's integer luma weights
+    @param       {np.ndarray} pixels: The RGB565 pixels (uint16)
+    @return      {np.ndarray} The grayscale pixels (uint8)
+    """
+    r, g, b = [c.astype(np.uint32) for c in rgb565_unpack(pixels)]
+    return ((r * 38 + g * 75 + b * 15) >> 7).astype(np.uint8)
+
+
+def normalize_threshold(threshold: tuple, is_rgb565: bool) -> tuple:
+    """
+    @description: Complete a short threshold tuple with the full ranges and order every (min, max) pair
+    @param       {tuple} threshold: The threshold (Lmin, Lmax, Amin, Amax, Bmin, Bmax) or (min, max)
+    @param       {bool} is_rgb565: Whether the threshold is applied to an RGB565 image
+    @return      {tuple} The complete threshold with min <= max in every pair
+    """
+    ranges = LAB_RANGES if is_rgb565 else (GRAY_RANGE,)
+    bounds = []
+    for i, (low, high) in enumerate(ranges):
+        lo = threshold[2 * i] if 2 * i < len(threshold) else low
+        hi = threshold[2 * i + 1] if 2 * i + 1 < len(threshold) else high
+        bounds.extend((min(lo, hi), max(lo, hi)))
+    return tuple(bounds)
+
+
+@functools.lru_cache(maxsize=1)
+def lab_table() -> np.ndarray:
+    """
+    @description: Get the L*a*b* value of every RGB565 pixel, computed once
+    @return      {np.ndarray} The table [3, 65536] of L, A, B (int16), indexed by the RGB565 value
+    """
+    table = np.stack(rgb565_to_lab(np.arange(1 << 16, dtype=np.uint16)))
+    table.setflags(write=False)
+    return table
+
+
+@functools.lru_cache(maxsize=32)
+def _threshold_lut(thresholds: tuple, is_rgb565: bool, invert: bool) -> np.ndarray:
+    """
+    @description: Build the lookup table of threshold bitmasks (see threshold_lut), cached by its arguments
+    @param       {tuple} thresholds: The thresholds as a tuple of tuples
+    @param       {bool} is_rgb565: Whether the table is indexed by RGB565 values
+    @param       {bool} invert: Whether to invert every threshold
+    @return      {np.ndarray} The bitmask of every pixel value (uint32)
+    """
+    channels = lab_table() if is_rgb565 else np.arange(256, dtype=np.int16)[np.newaxis]
+    lut = np.zeros(channels.shape[1], dtype=np.uint32)
+    for i, threshold in enumerate(thresholds):
+        bounds = normalize_threshold(threshold, is_rgb565)
+        inside = np.ones(channels.shape[1], dtype=bool)
+        for c, channel in enumerate(channels):
+            inside &= (channel >= bounds[2 * c]) & (channel <= bounds[2 * c + 1])
+        if invert:
+            inside = ~inside
+        lut[inside] |= np.uint32(1 << i)
+    lut.setflags(write=False)
+    return lut
+
+
+def threshold_lut(thresholds: list, is_rgb565: bool, invert: bool = False) -> np.ndarray:
+    """
+    @description: Get the lookup table giving, for every pixel value, the bitmask of the thresholds it passes.
+                  RGB565 tables have 64K entries and grayscale tables 256, so all the thresholds are tested at once.
+    @param       {list} thresholds: The list of thresholds, threshold i sets bit i
+    @param       {bool} is_rgb565: Whether the table is indexed by RGB565 values
+    @param       {bool} invert: Whether to invert every threshold (default: False)
+    @return      {np.ndarray} The read-only bitmask of every pixel value (uint32)
+    """
+    return _threshold_lut(tuple(tuple(t) for t in thresholds), bool(is_rgb565), bool(invert))
+
+
+def classify(pixels: np.ndarray, is_rgb565: bool, thresholds: list, invert: bool = False) -> np.ndarray:
+    """
+    @description: Compute for every pixel the bitmask of the thresholds it passes
+    @param       {np.ndarray} pixels: The pixels (uint16 RGB565 or uint8 grayscale)
+    @param       {bool} is_rgb565: Whether the pixels are RGB565
+    @param       {list} thresholds: The list of thresholds, threshold i sets bit i
+    @param       {bool} invert: Whether to invert every threshold (default: False)
+    @return      {np.ndarray} The bitmask of every pixel (uint32)
+    """
+    return threshold_lut(thresholds, is_rgb565, invert)[pixels]
+
+
+def _runs(mask: np.ndarray) -> tuple:
+    """
+    @description: Run-length encode a binary mask row by row
+    @param       {np.ndarray} mask: The binary mask [height, width]
+    @return      {tuple} The row, first column and last column of every run (int64), sorted by row then column
+    """
+    padded = np.zeros((mask.shape[0], mask.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    _, stops = np.nonzero(edges == -1)
+    return rows.astype(np.int64), starts.astype(np.int64), stops.astype(np.int64) - 1
+
+
+def _connect(y: np.ndarray, x0: np.ndarray, x1: np.ndarray, width: int) -> np.ndarray:
+    """
+    @description: Group the runs into 4-connected components, two runs touch when they are on adjacent rows and
+                  share a column
+    @param       {np.ndarray} y: The row of every run
+    @param       {np.ndarray} x0: The first column of every run
+    @param       {np.ndarray} x1: The last column of every run
+    @param       {int} width: The width of the mask
+    @return      {np.ndarray} The component index of every run, from 0 to the number of components - 1
+    """
+    n_runs = len(y)
+    # Runs never overlap within a row, so the start and stop keys are both sorted and the runs of the next row
+    # touching a run form a contiguous index range
+    stride = width + 1
+    start_keys = y * stride + x0
+    stop_keys = y * stride + x1
+    first = np.searchsorted(stop_keys, (y + 1) * stride + x0, side="left")
+    last = np.searchsorted(start_keys, (y + 1) * stride + x1, side="right")
+    counts = np.maximum(last - first, 0)
+    upper = np.repeat(np.arange(n_runs), counts)
+    lower = np.repeat(first, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    # Min-label propagation with pointer jumping (a union-find without the Python loop over runs)
+    labels = np.arange(n_runs)
+    while True:
+        smallest = np.minimum(labels[upper], labels[lower])
+        previous = labels.copy()
+        np.minimum.at(labels, upper, smallest)
+        np.minimum.at(labels, lower, smallest)
+        labels = labels[labels]
+        if np.array_equal(labels, previous):
+            break
+    return np.unique(labels, return_inverse=True)[1]
+
+
+def _label(mask: np.ndarray, code: int, stride: tuple = (1, 1)) -> np.ndarray:
+    """
+    @description: Find the 4-connected components of a mask and compute their moments in bulk
+    @param       {np.ndarray} mask: The binary mask
+    @param       {int} code: The color code of the components
+    @param       {tuple} stride: (x_stride, y_stride), like OpenMV a component is only found if one of its pixels
+                                 lies on the stride grid (default: (1, 1))
+    @return      {np.ndarray} The blob rows of the components [components, BLOB_COLUMNS] (int64)
+    """
+    y, x0, x1 = _runs(mask)
+    if len(y) == 0:
+        return np.zeros((0, BLOB_COLUMNS), dtype=np.int64)
+    component = _connect(y, x0, x1, mask.shape[1])
+    n_components = int(component.max()) + 1
+
+    # Closed-form moments of every run
+    n = x1 - x0 + 1
+    sx = (x0 + x1) * n // 2
+    sxx = (x1 * (x1 + 1) * (2 * x1 + 1) - (x0 - 1) * x0 * (2 * x0 - 1)) // 6
+    rows = np.zeros((n_components, BLOB_COLUMNS), dtype=np.int64)
+    for column, values in ((N, n), (SX, sx), (SY, n * y), (SXX, sxx), (SYY, n * y * y), (SXY, sx * y)):
+        rows[:, column] = np.bincount(component, weights=values, minlength=n_components).round().astype(np.int64)
+    rows[:, X0] = rows[:, Y0] = np.iinfo(np.int64).max
+    np.minimum.at(rows[:, X0], component, x0)
+    np.minimum.at(rows[:, Y0], component, y)
+    np.maximum.at(rows[:, X1], component, x1)
+    np.maximum.at(rows[:, Y1], component, y)
+    rows[:, CODE] = code
+    rows[:, COUNT] = 1
+
+    x_stride, y_stride = stride
+    if x_stride > 1 or y_stride > 1:
+        seeded = (y % y_stride == 0) & (x1 // x_stride >= (x0 + x_stride - 1) // x_stride)
+        rows = rows[np.bincount(component, weights=seeded, minlength=n_components) > 0]
+    return rows
+
+
+def merge_rows(rows: list, margin: int) -> list:
+    """
+    @description: Merge blobs whose bounding boxes overlap once one of them is grown by the margin (OpenMV merge)
+    @param       {list} rows: The blob rows
+    @param       {int} margin: The margin in pixels
+    @return      {list} The merged blob rows
+    """
+    rows = [list(row) for row in rows]
+    merged = True
+    while merged:
+        merged = False
+        i = 0
+        while i < len(rows):
+            a = rows[i]
+            j = i + 1
+            while j < len(rows):
+                b = rows[j]
+                if (
+                    a[X0] - margin <= b[X1]
+                    and b[X0] <= a[X1] + margin
+                    and a[Y0] - margin <= b[Y1]
+                    and b[Y0] <= a[Y1] + margin
+                ):
+                    a[X0], a[Y0] = min(a[X0], b[X0]), min(a[Y0], b[Y0])
+                    a[X1], a[Y1] = max(a[X1], b[X1]), max(a[Y1], b[Y1])
+                    for k in (N, SX, SY, SXX, SYY, SXY, COUNT):
+                        a[k] += b[k]
+                    a[CODE] = int(a[CODE]) | int(b[CODE])
+                    rows.pop(j)
+                    merged = True
+                else:
+                    j += 1
+            i += 1
+    return rows
+
+
+def find_blobs(
+    pixels: np.ndarray,
+    is_rgb565: bool,
+    thresholds: list,
+    roi: tuple = None,
+    invert: bool = False,
+    pixels_threshold: int = 10,
+    area_threshold: int = 10,
+    merge: bool = False,
+    margin: int = 0,
+    mask: np.ndarray = None,
+    x_stride: int = 1,
+    y_stride: int = 1,
+    lut: np.ndarray = None,
+) -> list:
+    """
+    @description: Find the blobs of every threshold in an image, the semantics follow OpenMV's find_blobs
+    @param       {np.ndarray} pixels: The pixels (uint16 RGB565 or uint8 grayscale)
+    @param       {bool} is_rgb565: Whether the pixels are RGB565
+    @param       {list} thresholds: The list of thresholds, blobs of threshold i get the code 1 << i
+    @param       {tuple} roi: The region of interest (x, y, w, h) (default: the whole image)
+    @param       {bool} invert: Whether to invert every threshold (default: False)
+    @param       {int} pixels_threshold: The minimum number of pixels of a blob (default: 10)
+    @param       {int} area_threshold: The minimum bounding box area of a blob (default: 10)
+    @param       {bool} merge: Whether to merge overlapping blobs (default: False)
+    @param       {int} margin: The margin used to decide whether two blobs overlap (default: 0)
+    @param       {np.ndarray} mask: Only pixels where the mask is non-zero are considered (default: None)
+    @param       {int} x_stride: The horizontal step of the search for blob pixels (default: 1)
+    @param       {int} y_stride: The vertical step of the search for blob pixels (default: 1)
+    @param       {np.ndarray} lut: A bitmask table indexed by pixel value replacing the thresholds, e.g. a learned
+                                   color table (default: None)
+    @return      {list} The blob rows in full-image coordinates
+    """
+    height, width = pixels.shape
+    x, y, w, h = roi if roi else (0, 0, width, height)
+    x, y = max(0, int(x)), max(0, int(y))
+    x1, y1 = min(width, x + int(w)), min(height, y + int(h))
+    if x1 <= x or y1 <= y:
+        return []
+    if lut is not None:
+        bits = lut[pixels[y:y1, x:x1]]
+        thresholds = range(int(lut.max()).bit_length())
+    else:
+        bits = classify(pixels[y:y1, x:x1], is_rgb565, thresholds, invert)
+    if mask is not None:
+        bits[mask[y:y1, x:x1] == 0] = 0
+    rows = []
+    for i in range(len(thresholds)):
+        found = _label((bits & (1 << i)) > 0, 1 << i, (max(1, x_stride), max(1, y_stride)))
+        area = (found[:, X1] - found[:, X0] + 1) * (found[:, Y1] - found[:, Y0] + 1)
+        rows.extend(found[(found[:, N] >= pixels_threshold) & (area >= area_threshold)].tolist())
+    if merge:
+        rows = merge_rows(rows, margin)
+    for row in rows:
+        # Shift from ROI to image coordinates
+        n = row[N]
+        row[X0] += x
+        row[X1] += x
+        row[Y0] += y
+        row[Y1] += y
+        row[SXX] += 2 * x * row[SX] + n * x * x
+        row[SYY] += 2 * y * row[SY] + n * y * y
+        row[SXY] += x * row[SY] + y * row[SX] + n * x * y
+        row[SX] += n * x
+        row[SY] += n * y
+    return rows
@@ -0,0 +1,263 @@
+"""
+Author       : agent
+Date         : 2026-10-19 12:40:49
+LastEditors  : agent
+LastEditTime : 2026-10-19 13:52:36
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/host/evaluate.py
+Description  : Vectorized tracking-quality evaluation (IoU, precision/recall, ID switches, reacquisition, MOTA/MOTP).
+               Boxes are [x0, y0, w, h] like CurBLOB.feature_vector[0:4] and MemROI.roi.
+"""
+
+import argparse
+
+import numpy as np
+
+from host.tracelog import FLAG_TRACKED, open_trace
+
+# Macros
+IOU_THRESHOLD = 0.5  # The minimum IoU for a prediction to match a ground-truth box
+SCORE_WEIGHTS = {"mota": 1.0, "motp": 0.25, "roi_containment": 0.25}  # The weights of the single tuning score
+
+
+def box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    @description: Compute the intersection over union of two broadcastable arrays of boxes
+    @param       {np.ndarray} a: The boxes [..., 4] in [x0, y0, w, h], NaN boxes are invalid
+    @param       {np.ndarray} b: The boxes [..., 4] in [x0, y0, w, h], NaN boxes are invalid
+    @return      {np.ndarray} The IoU of every pair, 0 where any box is invalid
+    """
+    inter = _intersection(a, b)
+    union = a[..., 2] * a[..., 3] + b[..., 2] * b[..., 3] - inter
+    with np.errstate(invalid="ignore", divide="ignore"):
+        iou = inter / union
+    return np.nan_to_num(iou, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def box_containment(outer: np.ndarray, inner: np.ndarray) -> np.ndarray:
+    """
+    @description: Compute the fraction of the inner boxes covered by the outer boxes
+    @param       {np.ndarray} outer: The covering boxes [..., 4] in [x0, y0, w, h], e.g. the ROI
+    @param       {np.ndarray} inner: The covered boxes [..., 4] in [x0, y0, w, h], e.g. the ground truth
+    @return      {np.ndarray} The covered fraction of every inner box, 0 where any box is invalid
+    """
+    inter = _intersection(outer, inner)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        covered = inter / (inner[..., 2] * inner[..., 3])
+    return np.nan_to_num(covered, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def _intersection(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    @description: Compute the intersection area of two broadcastable arrays of boxes
+    @param       {np.ndarray} a: The boxes [..., 4] in [x0, y0, w, h]
+    @param       {np.ndarray} b: The boxes [..., 4] in [x0, y0, w, h]
+    @return      {np.ndarray} The intersection areas
+    """
+    iw = np.minimum(a[..., 0] + a[..., 2], b[..., 0] + b[..., 2]) - np.maximum(a[..., 0], b[..., 0])
+    ih = np.minimum(a[..., 1] + a[..., 3], b[..., 1] + b[..., 3]) - np.maximum(a[..., 1], b[..., 1])
+    return np.clip(iw, 0, None) * np.clip(ih, 0, None)
+
+
+def _as_objects(boxes: np.ndarray, ids: np.ndarray = None) -> tuple:
+    """
+    @description: Bring the ground truth into the [frames, objects, 4] form
+    @param       {np.ndarray} boxes: The ground-truth boxes [frames, 4] or [frames, objects, 4], NaN if absent
+    @param       {np.ndarray} ids: The object ids [frames] or [frames, objects] (default: the object index)
+    @return      {tuple} The boxes [frames, objects, 4] and the ids [frames, objects]
+    """
+    boxes = np.asarray(boxes, dtype=np.float64)
+    if boxes.ndim == 2:
+        boxes = boxes[:, None, :]
+    if ids is None:
+        ids = np.broadcast_to(np.arange(boxes.shape[1]), boxes.shape[:2])
+    else:
+        ids = np.asarray(ids).reshape(boxes.shape[:2])
+    return boxes, ids
+
+
+def _reacquisition(visible: np.ndarray, matched: np.ndarray, t_ms: np.ndarray) -> tuple:
+    """
+    @description: Measure the time from every loss of a visible target to the next match
+    @param       {np.ndarray} visible: Whether any ground-truth object is visible [frames]
+    @param       {np.ndarray} matched: Whether the prediction matches a ground-truth object [frames]
+    @param       {np.ndarray} t_ms: The time stamps of the frames in milliseconds [frames]
+    @return      {tuple} The reacquisition times in frames and ms, and the number of unrecovered losses
+    """
+    previous = np.concatenate(([False], matched[:-1]))
+    losses = np.flatnonzero(visible & ~matched & previous)
+    recoveries = np.flatnonzero(matched & ~previous)
+    following = np.searchsorted(recoveries, losses, side="right")
+    recovered = following < len(recoveries)
+    ends = recoveries[following[recovered]]
+    starts = losses[recovered]
+    return ends - starts, t_ms[ends] - t_ms[starts], int(np.count_nonzero(~recovered))
+
+
+def evaluate(
+    pred: np.ndarray,
+    pred_valid: np.ndarray,
+    gt: np.ndarray,
+    gt_ids: np.ndarray = None,
+    pred_ids: np.ndarray = None,
+    roi: np.ndarray = None,
+    t_ms: np.ndarray = None,
+    iou_threshold: float = IOU_THRESHOLD,
+) -> dict:
+    """
+    @description: Evaluate a whole tracked sequence against the ground truth in one vectorized pass
+    @param       {np.ndarray} pred: The predicted boxes [frames, 4], e.g. the feature vector boxes
+    @param       {np.ndarray} pred_valid: Whether the tracker reported a box [frames]
+    @param       {np.ndarray} gt: The ground-truth boxes [frames, 4] or [frames, objects, 4], NaN if absent
+    @param       {np.ndarray} gt_ids: The ground-truth object ids (default: the object index)
+    @param       {np.ndarray} pred_ids: The track ids of the predictions [frames] (default: one track)
+    @param       {np.ndarray} roi: The ROI windows [frames, 4] (default: None)
+    @param       {np.ndarray} t_ms: The time stamps of the frames in milliseconds (default: None, no reacquisition
+                                    times in ms)
+    @param       {float} iou_threshold: The minimum IoU of a match (default: 0.5)
+    @return      {dict} The sequence metrics, with the per-frame arrays under "per_frame"
+    """
+    pred = np.asarray(pred, dtype=np.float64)
+    pred_valid = np.asarray(pred_valid, dtype=bool)
+    gt, gt_ids = _as_objects(gt, gt_ids)
+    n_frames = len(pred)
+    frames = np.arange(n_frames)
+    pred_ids = np.zeros(n_frames, dtype=np.int64) if pred_ids is None else np.asarray(pred_ids)
+
+    gt_valid = ~np.isnan(gt).any(axis=-1)  # [frames, objects]
+    visible = gt_valid.any(axis=1)
+    n_gt = int(np.count_nonzero(gt_valid))
+
+    # Match the single prediction of every frame to its best ground-truth object
+    ious = box_iou(pred[:, None, :], gt)
+    ious[~gt_valid | ~pred_valid[:, None]] = 0
+    best = ious.argmax(axis=1)
+    best_iou = ious[frames, best]
+    matched = pred_valid & (best_iou >= iou_threshold)
+    tp = int(np.count_nonzero(matched))
+    fp = int(np.count_nonzero(pred_valid)) - tp
+    fn = n_gt - tp
+
+    # An ID switch is a ground-truth object whose matched track id changes between its matched frames
+    matched_frames = np.flatnonzero(matched)
+    matched_gt = gt_ids[matched_frames, best[matched_frames]]
+    matched_pred = pred_ids[matched_frames]
+    order = np.lexsort((matched_frames, matched_gt))
+    matched_gt, matched_pred = matched_gt[order], matched_pred[order]
+    id_switches = int(np.count_nonzero((matched_gt[1:] == matched_gt[:-1]) & (matched_pred[1:] != matched_pred[:-1])))
+
+    reacquire_frames, reacquire_ms, unrecovered = _reacquisition(
+        visible, matched, frames if t_ms is None else np.asarray(t_ms, dtype=np.float64)
+    )
+
+    metrics = {
+        "frames": n_frames,
+        "gt_objects": n_gt,
+        "tp": tp,
+        "fp": fp,
+        "fn": fn,
+        "precision": tp / (tp + fp) if tp + fp else 0.0,
+        "recall": tp / n_gt if n_gt else 0.0,
+        "id_switches": id_switches,
+        "mota": 1 - (fn + fp + id_switches) / n_gt if n_gt else 0.0,
+        "motp": float(best_iou[matched].mean()) if tp else 0.0,
+        "mean_iou": float(best_iou[visible].mean()) if visible.any() else 0.0,
+        "losses": len(reacquire_frames) + unrecovered,
+        "unrecovered": unrecovered,
+        "reacquire_frames": float(np.median(reacquire_frames)) if len(reacquire_frames) else 0.0,
+    }
+    if t_ms is not None:
+        # Frame indices are no time, the ms metrics need the time stamps of the frames
+        metrics["reacquire_ms"] = float(np.median(reacquire_ms)) if len(reacquire_ms) else 0.0
+        metrics["reacquire_ms_max"] = float(reacquire_ms.max()) if len(reacquire_ms) else 0.0
+    per_frame = {"iou": best_iou, "matched": matched, "gt_index": best}
+
+    if roi is not None:
+        roi = np.asarray(roi, dtype=np.float64)[:, None, :]
+        roi_iou = np.where(gt_valid, box_iou(roi, gt), 0).max(axis=1)
+        roi_containment = np.where(gt_valid, box_containment(roi, gt), 0).max(axis=1)
+        metrics["roi_iou"] = float(roi_iou[visible].mean()) if visible.any() else 0.0
+        metrics["roi_containment"] = float(roi_containment[visible].mean()) if visible.any() else 0.0
+        per_frame["roi_iou"] = roi_iou
+        per_frame["roi_containment"] = roi_containment
+
+    metrics["score"] = score(metrics)
+    metrics["per_frame"] = per_frame
+    return metrics
+
+
+def score(metrics: dict, weights: dict = SCORE_WEIGHTS) -> float:
+    """
+    @description: Combine the metrics into the single score to be maximized when tuning
+    @param       {dict} metrics: The metrics returned by evaluate
+    @param       {dict} weights: The weight of every metric, missing metrics are skipped (default: SCORE_WEIGHTS)
+    @return      {float} The weighted average of the metrics
+    """
+    used = [key for key in weights if key in metrics]
+    total = sum(weights[key] for key in used)
+    return sum(weights[key] * metrics[key] for key in used) / total if total else 0.0
+
+
+def load_ground_truth(path: str) -> dict:
+    """
+    @description: Load the ground truth from a .npz (boxes, ids) or a .csv (frame, id, x, y, w, h) file
+    @param       {str} path: The path of the ground-truth file
+    @return      {dict} The boxes [frames, objects, 4] (NaN if absent) and ids [frames, objects]
+    """
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            boxes, ids = _as_objects(data["boxes"], data["ids"] if "ids" in data else None)
+        return {"boxes": boxes, "ids": ids}
+    rows = np.loadtxt(path, delimiter=",", ndmin=2, comments="#")
+    frame = rows[:, 0].astype(np.int64)
+    object_ids, slot = np.unique(rows[:, 1].astype(np.int64), return_inverse=True)
+    boxes = np.full((frame.max() + 1, len(object_ids), 4), np.nan)
+    boxes[frame, slot] = rows[:, 2:6]
+    ids = np.broadcast_to(object_ids, boxes.shape[:2])
+    return {"boxes": boxes, "ids": ids}
+
+
+def evaluate_trace(records: np.ndarray, ground_truth: dict, iou_threshold: float = IOU_THRESHOLD) -> dict:
+    """
+    @description: Evaluate a trace against the ground truth. Every record holds for the sensor frames taken since the
+                  previous one (a goal frame takes two, a search for a reference blob many), like host/replay.py
+                  holds the output of a track() call; the frames before the first and after the last record have
+                  no prediction
+    @param       {np.ndarray} records: The records of a trace (see host.tracelog.open_trace)
+    @param       {dict} ground_truth: The ground truth (see load_ground_truth)
+    @param       {float} iou_threshold: The minimum IoU of a match (default: 0.5)
+    @return      {dict} The sequence metrics
+    """
+    boxes = ground_truth["boxes"]
+    frames = records["frame"].astype(np.int64)
+    n_frames = len(boxes)
+    if not len(frames):
+        return evaluate(np.zeros((n_frames, 4)), np.zeros(n_frames, dtype=bool), boxes, gt_ids=ground_truth["ids"])
+    # The record of every frame: the first one taken at or after it
+    index = np.minimum(np.searchsorted(frames, np.arange(n_frames), side="left"), len(frames) - 1)
+    predicted = (np.arange(n_frames) >= frames[0]) & (np.arange(n_frames) <= frames[-1])
+    return evaluate(
+        records["feature"][index, :4],
+        ((records["flags"][index] & FLAG_TRACKED) > 0) & predicted,
+        boxes,
+        gt_ids=ground_truth["ids"],
+        pred_ids=records["track_id"][index],
+        roi=records["roi"][index],
+        t_ms=records["t_ms"][index],
+        iou_threshold=iou_threshold,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Evaluate a tracker trace against ground-truth boxes.")
+    parser.add_argument("trace", help="The binary trace (*.bct)")
+    parser.add_argument("ground_truth", help="The ground truth (*.npz with boxes/ids or *.csv frame,id,x,y,w,h)")
+    parser.add_argument("--iou", type=float, default=IOU_THRESHOLD, help="The minimum IoU of a match")
+    args = parser.parse_args()
+    metrics = evaluate_trace(open_trace(args.trace), load_ground_truth(args.ground_truth), args.iou)
+    for key, value in metrics.items():
+        if key != "per_frame":
+            print("{:<18}{}".format(key, round(value, 4) if isinstance(value, float) else value))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Author       : agent
+Date         : 2026-10-19 13:24:57
+LastEditors  : agent
+LastEditTime : 2026-10-19 13:28:07
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/host/ibusdecode.py
+Description  : The ESP32 side of the IBus telemetry on the host: splits a byte stream into checked 32-byte frames and
+               decodes the 14 channels or the compact multi-target frames of lib/compact.py. The compact decoder
+               keeps the boxes of the last frame for the delta entries and skips them after a missed frame until
+               the next key frame.
+                   python -m host.ibusdecode uart_capture.bin
+"""
+
+import argparse
+import json
+
+# Macros
+IBUS_MSG_LEN = 32  # Must match lib/Ibus.py
+IBUS_MSG_HEADER = (0x20, 0x40)  # Must match lib/Ibus.py
+IBUS_CHANNELS = 14
+## Compact frame layout, must match lib/compact.py
+PAYLOAD_BYTES = 28
+COMPACT_MARKER = 0xC
+AGE_STEP_MS = 2
+CANDIDATE_ID = 15
+ABSOLUTE_BITS = (8, 8, 8, 8)  # x, y, w, h
+DELTA_BITS = (6, 6, 4, 4)  # dx, dy, dw, dh
+KINDS = ("B", "G")  # The target kinds by their code
+
+
+def checksum_ok(frame: bytes) -> bool:
+    """
+    @description: Check the checksum of a frame, 0xFFFF minus the sum of the first 30 bytes, high byte last
+    @param       {bytes} frame: The 32-byte frame
+    @return      {bool} Whether the checksum matches
+    """
+    checksum = (0xFFFF - sum(frame[:-2])) & 0xFFFF
+    return frame[-1] == checksum >> 8 and frame[-2] == checksum & 0xFF
+
+
+def scan_frames(stream: bytes) -> tuple:
+    """
+    @description: Find the frames of a byte stream, resynchronizing on the header after a corrupted frame
+    @param       {bytes} stream: The bytes received
+    @return      {tuple} The (offset, frame) of the frames with a valid checksum, the number of bytes skipped and the
+                         offset of the trailing bytes of an incomplete frame
+    """
+    found = []
+    skipped = 0
+    i = 0
+    while i + IBUS_MSG_LEN <= len(stream):
+        if stream[i] == IBUS_MSG_HEADER[0] and stream[i + 1] == IBUS_MSG_HEADER[1]:
+            frame = bytes(stream[i : i + IBUS_MSG_LEN])
+            if checksum_ok(frame):
+                found.append((i, frame))
+                i += IBUS_MSG_LEN
+                continue
+        i += 1
+        skipped += 1
+    # A header near the end may start a frame still being received
+    while i < len(stream) and not (
+        stream[i] == IBUS_MSG_HEADER[0] and (i + 1 == len(stream) or stream[i + 1] == IBUS_MSG_HEADER[1])
+    ):
+        i += 1
+        skipped += 1
+    return found, skipped, i
+
+
+def split_frames(stream: bytes) -> tuple:
+    """
+    @description: Split a byte stream into frames, resynchronizing on the header after a corrupted frame
+    @param       {bytes} stream: The bytes received
+    @return      {tuple} The frames with a valid checksum, the number of bytes skipped and the trailing bytes of an
+                         incomplete frame
+    """
+    found, skipped, tail = scan_frames(stream)
+    return [frame for _, frame in found], skipped, bytes(stream[tail:])
+
+
+def channels(frame: bytes) -> list:
+    """
+    @description: Decode the 14 channels of a standard frame
+    @param       {bytes} frame: The 32-byte frame
+    @return      {list} The signed channel values
+    """
+    values = []
+    for i in range(IBUS_CHANNELS):
+        value = frame[2 + 2 * i] | frame[3 + 2 * i] << 8
+        values.append(value - 0x10000 if value & 0x8000 else value)
+    return values
+
+
+def is_compact(frame: bytes) -> bool:
+    return frame[2] >> 4 == COMPACT_MARKER
+
+
+class _BitReader:
+    def __init__(self, payload: bytes) -> None:
+        self.payload = payload
+        self.pos = 0
+
+    def get(self, bits: int, signed: bool = False) -> int:
+        value = 0
+        for _ in range(bits):
+            value = value << 1 | (self.payload[self.pos >> 3] >> (7 - (self.pos & 7))) & 1
+            self.pos += 1
+        if signed and value >> (bits - 1):
+            value -= 1 << bits
+        return value
+
+
+class CompactDecoder:
+    def __init__(self) -> None:
+        """
+        @description: Constructor of the compact frame decoder of the ESP32 stand-in.
+        @param       {*} self:
+        @return      {*} None
+        """
+        self.boxes = None  # The (x, y, w, h) of the tracked targets of the last frame by (kind, id), None after a gap
+        self.sequence = None  # The sequence number of the last frame
+        self.frames = 0  # Number of frames decoded
+        self.missed = 0  # Number of frames missing from the sequence
+        self.undecodable = 0  # Number of delta entries without their reference
+
+    def decode(self, frame: bytes) -> dict:
+        """
+        @description: Decode a compact frame
+        @param       {*} self:
+        @param       {bytes} frame: The 32-byte frame with a valid checksum
+        @return      {dict} sequence, key, age_ms, level and targets, a list of dicts with kind ("B" or "G"), id (None
+                            for a candidate), detected and x, y, w, h (None for a delta entry without its reference)
+        """
+        reader = _BitReader(frame[2 : 2 + PAYLOAD_BYTES])
+        if reader.get(4) != COMPACT_MARKER:
+            raise ValueError("Not a compact frame")
+        key = bool(reader.get(1))
+        reader.get(3)  # Reserved
+        sequence = reader.get(4)
+        count = reader.get(4)
+        age_ms = reader.get(6) * AGE_STEP_MS
+        level = reader.get(3)
+        if self.sequence is not None:
+            gap = (sequence - self.sequence - 1) & 0xF
+            self.missed += gap
+            if gap:
+                self.boxes = None  # The deltas refer to a frame never received
+        self.sequence = sequence
+        self.frames += 1
+        previous = {} if key else self.boxes
+        boxes = {}
+        targets = []
+        for _ in range(count):
+            delta = reader.get(1)
+            kind = reader.get(1)
+            track_id = reader.get(4)
+            detected = bool(reader.get(1))
+            if delta:
+                values = [reader.get(bits, signed=True) for bits in DELTA_BITS]
+                reference = previous.get((kind, track_id)) if previous is not None else None
+                if reference is None:
+                    self.undecodable += 1
+                    box = None
+                else:
+                    box = [reference[j] + values[j] for j in range(4)]
+            else:
+                box = [reader.get(bits) for bits in ABSOLUTE_BITS]
+            if box is not None and track_id != CANDIDATE_ID:
+                boxes[(kind, track_id)] = box
+            targets.append(
+                {
+                    "kind": KINDS[kind],
+                    "id": None if track_id == CANDIDATE_ID else track_id,
+                    "detected": detected,
+                    "x": box[0] if box else None,
+                    "y": box[1] if box else None,
+                    "w": box[2] if box else None,
+                    "h": box[3] if box else None,
+                }
+            )
+        self.boxes = boxes
+        return {"sequence": sequence, "key": key, "age_ms": age_ms, "level": level, "targets": targets}
+
+
+def decode_stream(stream: bytes, decoder: CompactDecoder = None) -> list:
+    """
+    @description: Decode every frame of a byte stream, standard or compact
+    @param       {bytes} stream: The bytes received
+    @param       {CompactDecoder} decoder: The compact decoder keeping the delta state (default: a new one)
+    @return      {list} The decoded frames, a dict for a compact frame and the channel list for a standard one
+    """
+    decoder = decoder if decoder else CompactDecoder()
+    frames, _, _ = split_frames(stream)
+    return [decoder.decode(frame) if is_compact(frame) else channels(frame) for frame in frames]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Decode the IBus telemetry captured from the board's UART.")
+    parser.add_argument("path", help="The captured bytes")
+    args = parser.parse_args()
+    with open(args.path, "rb") as f:
+        stream = f.read()
+    decoder = CompactDecoder()
+    frames, skipped, tail = split_frames(stream)
+    for frame in frames:
+        print(json.dumps(decoder.decode(frame) if is_compact(frame) else channels(frame)))
+    print(
+        "frames {}  skipped bytes {}  missed {}  undecodable {}".format(
+            len(frames), skipped + len(tail), decoder.missed, decoder.undecodable
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
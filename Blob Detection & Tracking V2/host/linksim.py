@@ -0,0 +1,478 @@
+"""
+Author       : agent
+Date         : 2026-10-19 13:28:07
+LastEditors  : agent
+LastEditTime : 2026-10-19 13:28:07
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/host/linksim.py
+Description  : The ESP32 end of the IBus link on the host, attached to the UART stand-in of the board.
+               The bytes written by the board cross a simulated 8N1 wire, with byte drops, bit errors and a fixed
+               delay, into the receive buffer of the peer. The peer reads that buffer in partial chunks, splits and
+               decodes the frames (host/ibusdecode.py) and repeats its mode flag on the wire back. The board's writes
+               block while its transmit buffer is full (back-pressure), the peer's buffer overflows while it stalls.
+               The frame throughput and latency, the command round trips and the encode and decode times are reported.
+                   python -m host.linksim --compact --drop 0.001 --bit-error 1e-5 --command 500:G --command 1500:D
+"""
+
+import argparse
+import collections
+import json
+import math
+import time
+
+import numpy as np
+
+from host import board
+from host.ibusdecode import CompactDecoder, channels, is_compact, scan_frames
+
+# Macros
+BAUDRATE = 115200  # Must match lib/Ibus.py
+BITS_PER_BYTE = 10  # 8N1: a start bit, 8 data bits and a stop bit
+TX_BUFFER = 1  # The bytes the board's UART holds before write blocks, pyb.UART has no transmit buffer by default
+RX_BUFFER = 256  # The receive buffer of the ESP32 UART driver, the bytes arriving while it is full are lost
+POLL_US = 1000  # The ESP32 reads its UART this often
+MAX_READ = 64  # The most bytes one read of the ESP32 returns
+FLAG_PERIOD_MS = 10  # The ESP32 repeats the requested mode flag this often
+COMMAND_FLAGS = {"B": 0x81, "G": 0x82, "D": 0x83}  # Must match lib/Ibus.py
+FRAME_PERIOD_MS = 33  # The time the board spends on a frame between two sends in run()
+
+
+class Esp32Peer:
+    def __init__(
+        self,
+        uart,
+        baudrate: int = BAUDRATE,
+        drop_rate: float = 0.0,
+        bit_error_rate: float = 0.0,
+        delay_us: int = 0,
+        tx_buffer: int = TX_BUFFER,
+        rx_buffer: int = RX_BUFFER,
+        poll_us: int = POLL_US,
+        max_read: int = MAX_READ,
+        partial_reads: bool = True,
+        flag_period_ms: int = FLAG_PERIOD_MS,
+        stalls: list = (),
+        seed: int = 0,
+    ) -> None:
+        """
+        @description: Constructor of the simulated ESP32, attached to the UART stand-in of the board.
+        @param       {*} self:
+        @param       {*} uart: The UART stand-in (host/stand_ins/pyb.py) of the board's IBus
+        @param       {int} baudrate: The baudrate of both directions (default: 115200)
+        @param       {float} drop_rate: The probability of a byte being lost on the wire, both ways (default: 0)
+        @param       {float} bit_error_rate: The probability of a bit being flipped on the wire, both ways (default: 0)
+        @param       {int} delay_us: The delay added to every byte on the wire, both ways (default: 0)
+        @param       {int} tx_buffer: The bytes the board's UART holds before write blocks (default: 1)
+        @param       {int} rx_buffer: The receive buffer of the ESP32 (default: 256)
+        @param       {int} poll_us: The ESP32 reads its UART this often (default: 1000)
+        @param       {int} max_read: The most bytes one read returns (default: 64)
+        @param       {bool} partial_reads: Whether a read returns a random number of the bytes waiting (default: True)
+        @param       {int} flag_period_ms: The ESP32 repeats the requested mode flag this often (default: 10)
+        @param       {list} stalls: The (start, end) times in ms when the ESP32 does not read (default: none)
+        @param       {int} seed: The seed of the random faults (default: 0)
+        @return      {*} None
+        """
+        self.uart = uart
+        self.byte_us = 1000000 * BITS_PER_BYTE / baudrate  # The time a byte takes on the wire
+        self.drop_rate = drop_rate
+        self.bit_error_rate = bit_error_rate
+        self.delay_us = delay_us
+        self.tx_buffer = max(1, tx_buffer)
+        self.rx_buffer = rx_buffer
+        self.poll_us = poll_us
+        self.max_read = max_read
+        self.partial_reads = partial_reads
+        self.flag_period_us = 1000 * flag_period_ms
+        self.stalls = [(1000 * start, 1000 * end) for start, end in stalls]
+        self.rng = np.random.default_rng(seed)
+        self.start = time.ticks_us()
+        # The wires, the times are in microseconds since the start
+        self.wire = collections.deque()  # The bytes to the peer in flight (arrival, byte, write index)
+        self.wire_free = 0.0  # The time the board's line has sent every byte written
+        self.back = collections.deque()  # The bytes to the board in flight (arrival, byte)
+        self.back_free = 0.0  # The time the peer's line has sent every byte written
+        # The peer
+        self.rx = bytearray()  # The receive buffer of the peer
+        self.rx_tags = []  # The write index of every byte in rx
+        self.pending = bytearray()  # The bytes read, not split into frames yet
+        self.pending_tags = []
+        self.next_poll = 0.0
+        self.next_flag = 0.0
+        self.mode = None  # The mode requested, its flag is repeated
+        self.schedule = []  # The commands to come (time in us, mode)
+        self.decoder = CompactDecoder()
+        # The records
+        self.board_mode = None  # The mode the board runs in, set by mark_mode
+        self.writes = []  # Every write of the board (time, bytes, board mode)
+        self.received = []  # Every frame received (time, write index)
+        self.commands = []  # Every command sent (time, mode)
+        self.mode_changes = []  # Every mode applied by the board (time, mode)
+        self.blocked_us = 0.0  # The time the board's writes blocked
+        self.dropped = 0  # Number of bytes lost on the wire
+        self.flipped = 0  # Number of bits flipped on the wire
+        self.overflows = 0  # Number of bytes lost to the full receive buffer
+        self.skipped = 0  # Number of bytes skipped to resynchronize on a frame
+        self.undetected = 0  # Number of frames with a valid checksum that differ from the frame written
+        self.decode_s = 0.0  # The time spent splitting and decoding the frames (wall clock)
+        uart.attach(self)
+
+    def _clock(self) -> float:
+        return time.ticks_diff(time.ticks_us(), self.start)
+
+    def _corrupt(self, data: bytes) -> list:
+        """
+        @description: Put bytes through the faults of the wire
+        @param       {*} self:
+        @param       {bytes} data: The bytes sent
+        @return      {list} The bytes received in order, None for a lost byte
+        """
+        received = list(data)
+        if self.drop_rate:
+            for i in np.flatnonzero(self.rng.random(len(received)) < self.drop_rate):
+                received[i] = None
+                self.dropped += 1
+        if self.bit_error_rate:
+            flips = self.rng.binomial(8, self.bit_error_rate, len(received))
+            for i in np.flatnonzero(flips):
+                if received[i] is not None:
+                    for bit in self.rng.choice(8, flips[i], replace=False):
+                        received[i] ^= 1 << int(bit)
+                    self.flipped += int(flips[i])
+        return received
+
+    def command(self, mode: str, at_ms: float = None) -> None:
+        """
+        @description: Request a mode from the board, the flag is repeated until another mode is requested
+        @param       {*} self:
+        @param       {str} mode: "B", "G" or "D"
+        @param       {float} at_ms: The time in ms since the start to send it at (default: now)
+        @return      {*} None
+        """
+        at = self._clock() if at_ms is None else 1000 * at_ms
+        self.schedule.append((at, mode))
+        self.schedule.sort()
+
+    def mark_mode(self, mode: str) -> None:
+        """
+        @description: Record the mode the board runs in from now on, the frames written after it answer its command
+        @param       {*} self:
+        @param       {str} mode: "B", "G" or "D"
+        @return      {*} None
+        """
+        self.board_mode = mode
+        self.mode_changes.append((self._clock(), mode))
+
+    def _poll(self, now: float) -> None:
+        """
+        @description: One read of the peer: take the bytes arrived, send the mode flag and split the frames
+        @param       {*} self:
+        @param       {float} now: The time of the read
+        @return      {*} None
+        """
+        while self.wire and self.wire[0][0] <= now:
+            _, byte, index = self.wire.popleft()
+            if len(self.rx) >= self.rx_buffer:
+                self.overflows += 1
+                continue
+            self.rx.append(byte)
+            self.rx_tags.append(index)
+        while self.schedule and self.schedule[0][0] <= now:
+            _, self.mode = self.schedule.pop(0)
+            self.commands.append((now, self.mode))
+            self.next_flag = now  # A new mode is sent at once
+        if self.mode and now >= self.next_flag:
+            self.next_flag = now + self.flag_period_us
+            start = max(now, self.back_free)
+            self.back_free = start + self.byte_us
+            byte = self._corrupt(bytes([COMMAND_FLAGS[self.mode]]))[0]
+            if byte is not None:
+                self.back.append((self.back_free + self.delay_us, byte))
+        if not self.rx or any(start <= now < end for start, end in self.stalls):
+            return
+        count = min(len(self.rx), self.max_read)
+        if self.partial_reads:
+            count = int(self.rng.integers(1, count + 1))
+        self.pending.extend(self.rx[:count])
+        self.pending_tags.extend(self.rx_tags[:count])
+        del self.rx[:count]
+        del self.rx_tags[:count]
+        t_start = time.perf_counter()
+        found, skipped, tail = scan_frames(self.pending)
+        for offset, frame in found:
+            if is_compact(frame):
+                self.decoder.decode(frame)
+            else:
+                channels(frame)
+            index = self.pending_tags[offset]
+            if frame != self.writes[index][1]:
+                self.undetected += 1  # Spliced from several writes or corrupted with the checksum still valid
+            self.received.append((now, index))
+        self.decode_s += time.perf_counter() - t_start
+        self.skipped += skipped
+        del self.pending[:tail]
+        del self.pending_tags[:tail]
+
+    def advance(self) -> None:
+        """
+        @description: Run the link up to the board time, called by the UART stand-in on every access
+        @param       {*} self:
+        @return      {*} None
+        """
+        now = self._clock()
+        while self.next_poll <= now:
+            self._poll(self.next_poll)
+            self.next_poll += self.poll_us
+        while self.back and self.back[0][0] <= now:
+            self.uart.rx.append(self.back.popleft()[1])
+
+    def board_write(self, data) -> int:
+        """
+        @description: Write bytes from the board, blocking while its transmit buffer is full
+        @param       {*} self:
+        @param       {*} data: The bytes written
+        @return      {int} The number of bytes written
+        """
+        self.advance()
+        now = self._clock()
+        queued = max(0, math.ceil((self.wire_free - now) / self.byte_us))  # The bytes not on the wire yet
+        excess = queued + len(data) - self.tx_buffer
+        if excess > 0:
+            # write returns once the last bytes are in the buffer, the link runs meanwhile
+            wait = excess * self.byte_us
+            self.blocked_us += wait
+            time.sleep_us(int(math.ceil(wait)))
+        index = len(self.writes)
+        self.writes.append((now, bytes(data), self.board_mode))
+        for byte in self._corrupt(data):
+            self.wire_free = max(now, self.wire_free) + self.byte_us
+            if byte is not None:
+                self.wire.append((self.wire_free + self.delay_us, byte, index))
+        self.advance()
+        return len(data)
+
+    def drain(self) -> None:
+        """
+        @description: Let the link run until the peer has read every byte written
+        @param       {*} self:
+        @return      {*} None
+        """
+        end = max(self.wire_free + self.delay_us, max([end for _, end in self.stalls], default=0))
+        time.sleep_us(int(max(0, end - self._clock())) + self.poll_us)
+        self.advance()
+        while self.rx:
+            time.sleep_us(self.poll_us)
+            self.advance()
+
+    def report(self) -> dict:
+        """
+        @description: Summarize the link since the start
+        @param       {*} self:
+        @return      {dict} The counters, the throughput, the frame latencies and the command round trips
+        """
+        duration_ms = self._clock() / 1000
+        latencies = np.array([at - self.writes[index][0] for at, index in self.received]) / 1000
+        delivered = set([index for _, index in self.received])
+        round_trips = []
+        for at, mode in self.commands:
+            # The first frame received that the board wrote in the requested mode after the command
+            answered = [
+                received
+                for received, index in self.received
+                if self.writes[index][0] >= at and self.writes[index][2] == mode
+            ]
+            round_trips.append((at / 1000, mode, (answered[0] - at) / 1000 if answered else None))
+        return {
+            "duration_ms": duration_ms,
+            "frames_sent": len(self.writes),
+            "frames_received": len(self.received),
+            "frames_lost": len(self.writes) - len(delivered),
+            "undetected": self.undetected,
+            "bytes_dropped": self.dropped,
+            "bits_flipped": self.flipped,
+            "overflow_bytes": self.overflows,
+            "skipped_bytes": self.skipped,
+            "compact_missed": self.decoder.missed,
+            "compact_undecodable": self.decoder.undecodable,
+            "throughput_fps": 1000 * len(self.received) / duration_ms if duration_ms else 0.0,
+            "latency_ms": {
+                "mean": float(latencies.mean()) if len(latencies) else None,
+                "p95": float(np.percentile(latencies, 95)) if len(latencies) else None,
+                "max": float(latencies.max()) if len(latencies) else None,
+            },
+            "blocked_ms": self.blocked_us / 1000,
+            "round_trips": round_trips,
+            "decode_us": 1000000 * self.decode_s / len(self.received) if self.received else None,
+        }
+
+
+def synthetic_payload(rng, mode: str, frame: int, compact: bool) -> list:
+    """
+    @description: A payload of main.py's shape with a target moving along a circle
+    @param       {*} rng: The random generator
+    @param       {str} mode: The mode of the board
+    @param       {int} frame: The frame number
+    @param       {bool} compact: Whether to build a compact payload (see get_compact_payload of main.py)
+    @return      {list} The payload
+    """
+    x = 120 + round(60 * math.cos(frame / 20))
+    y = 80 + round(40 * math.sin(frame / 20))
+    size = 20 + frame % 8
+    if compact:
+        payload = [3, int(rng.integers(5, 40)), 0]
+        for kind, track_id in ((0, 1), (1, 2)) if mode == "D" else ((0 if mode == "B" else 1, 1),):
+            payload.extend([kind, track_id, 1, x + 10 * kind, y, size, size])
+        for _ in range(int(rng.integers(0, 4))):
+            payload.extend([0 if mode != "G" else 1, -1, 1] + [int(v) for v in rng.integers(10, 200, 4)])
+        return payload
+    flag = 0 if mode == "B" else 1
+    return [flag, x, y, 3 * size, 3 * size, x, y, size, size, 0]
+
+
+def run(
+    duration_ms: int = 5000,
+    frame_period_ms: float = FRAME_PERIOD_MS,
+    compact: bool = False,
+    commands: list = (),
+    seed: int = 0,
+    **link,
+) -> dict:
+    """
+    @description: Run the IBus of the board against the simulated ESP32: every frame period the board sends a payload
+                  and applies the mode received, like the main loop of main.py
+    @param       {int} duration_ms: The board time to run for (default: 5000)
+    @param       {float} frame_period_ms: The time the board spends on a frame (default: 33)
+    @param       {bool} compact: Whether the board sends the compact frames of lib/compact.py (default: False)
+    @param       {list} commands: The (time in ms, mode) commands of the ESP32 (default: none)
+    @param       {int} seed: The seed of the payloads and of the faults (default: 0)
+    @param       {*} link: The keyword arguments of Esp32Peer
+    @return      {dict} The report of the link, with the encode time per frame
+    """
+    board.install(virtual_sleep=True)
+    from lib.Ibus import IBus
+
+    ibus = IBus(compact=compact)
+    peer = Esp32Peer(ibus.uart, seed=seed, **link)
+    for at, mode in commands:
+        peer.command(mode, at)
+    rng = np.random.default_rng(seed)
+    pack = ibus._pack_msg
+    encode_s = [0.0]
+
+    def timed_pack(raw_msg):
+        t_start = time.perf_counter()
+        msg = pack(raw_msg)
+        encode_s[0] += time.perf_counter() - t_start
+        return msg
+
+    ibus._pack_msg = timed_pack
+    mode = "B"
+    peer.mark_mode(mode)
+    t_start = time.ticks_ms()
+    frame = 0
+    while time.ticks_diff(time.ticks_ms(), t_start) < duration_ms:
+        t_frame = time.ticks_us()
+        ibus.send(synthetic_payload(rng, mode, frame, compact))
+        received_mode = ibus.receive()
+        if received_mode in ("B", "G", "D") and received_mode != mode:
+            mode = received_mode
+            peer.mark_mode(mode)
+        frame += 1
+        # The rest of the frame is spent on the image
+        time.sleep_us(max(0, int(1000 * frame_period_ms) - time.ticks_diff(time.ticks_us(), t_frame)))
+    peer.drain()
+    result = peer.report()
+    result["encode_us"] = 1000000 * encode_s[0] / frame if frame else None
+    return result
+
+
+def summary(result: dict) -> str:
+    """
+    @description: Format the report of a run
+    @param       {dict} result: The result of run
+    @return      {str} The report
+    """
+    latency = result["latency_ms"]
+    lines = [
+        "{} frames sent, {} received ({:.1f} fps), {} lost, {} with an undetected error".format(
+            result["frames_sent"],
+            result["frames_received"],
+            result["throughput_fps"],
+            result["frames_lost"],
+            result["undetected"],
+        ),
+        "wire: {} bytes dropped, {} bits flipped, {} bytes overflowed, {} bytes skipped to resynchronize".format(
+            result["bytes_dropped"], result["bits_flipped"], result["overflow_bytes"], result["skipped_bytes"]
+        ),
+    ]
+    if latency["mean"] is not None:
+        lines.append(
+            "frame latency {:.2f} ms mean {:.2f} ms p95 {:.2f} ms max, writes blocked {:.1f} ms".format(
+                latency["mean"], latency["p95"], latency["max"], result["blocked_ms"]
+            )
+        )
+    if result["compact_missed"] or result["compact_undecodable"]:
+        lines.append(
+            "compact: {} frames missed, {} delta entries undecodable".format(
+                result["compact_missed"], result["compact_undecodable"]
+            )
+        )
+    for at, mode, round_trip in result["round_trips"]:
+        answer = "never" if round_trip is None else "{:.1f} ms".format(round_trip)
+        lines.append("command {}@{:.0f}ms: {}".format(mode, at, answer))
+    lines.append(
+        "encode {:.1f} us/frame, decode {:.1f} us/frame (host)".format(
+            result["encode_us"] or 0.0, result["decode_us"] or 0.0
+        )
+    )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the board's IBus against a simulated ESP32 link.")
+    parser.add_argument("--duration", type=int, default=5000, help="The board time to run for in ms")
+    parser.add_argument("--period", type=float, default=FRAME_PERIOD_MS, help="The frame period of the board in ms")
+    parser.add_argument("--compact", action="store_true", help="Send the compact frames of lib/compact.py")
+    parser.add_argument("--command", action="append", default=[], help="A mode command TIME_MS:MODE, repeatable")
+    parser.add_argument("--drop", type=float, default=0.0, help="The probability of a byte being lost")
+    parser.add_argument("--bit-error", type=float, default=0.0, help="The probability of a bit being flipped")
+    parser.add_argument("--delay", type=int, default=0, help="The delay of every byte on the wire in us")
+    parser.add_argument("--tx-buffer", type=int, default=TX_BUFFER, help="The transmit buffer of the board in bytes")
+    parser.add_argument("--rx-buffer", type=int, default=RX_BUFFER, help="The receive buffer of the ESP32 in bytes")
+    parser.add_argument("--poll", type=int, default=POLL_US, help="The read period of the ESP32 in us")
+    parser.add_argument("--max-read", type=int, default=MAX_READ, help="The most bytes one read of the ESP32 returns")
+    parser.add_argument("--whole-reads", action="store_true", help="Read every byte waiting instead of partial reads")
+    parser.add_argument("--flag-period", type=int, default=FLAG_PERIOD_MS, help="The mode flag period in ms")
+    parser.add_argument("--stall", action="append", default=[], help="START_MS:END_MS the ESP32 does not read")
+    parser.add_argument("--seed", type=int, default=0, help="The seed of the payloads and faults")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    commands = []
+    for command in args.command:
+        at, desired = command.split(":")
+        commands.append((int(at), desired.upper()))
+    stalls = []
+    for stall in args.stall:
+        start, end = stall.split(":")
+        stalls.append((int(start), int(end)))
+    result = run(
+        args.duration,
+        args.period,
+        args.compact,
+        commands,
+        args.seed,
+        drop_rate=args.drop,
+        bit_error_rate=args.bit_error,
+        delay_us=args.delay,
+        tx_buffer=args.tx_buffer,
+        rx_buffer=args.rx_buffer,
+        poll_us=args.poll,
+        max_read=args.max_read,
+        partial_reads=not args.whole_reads,
+        flag_period_ms=args.flag_period,
+        stalls=stalls,
+    )
+    print(json.dumps(result) if args.json else summary(result))
+
+
+if __name__ == "__main__":
+    main()
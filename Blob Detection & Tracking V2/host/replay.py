@@ -0,0 +1,338 @@
+"""
+Author       : agent
+Date         : 2026-10-19 12:46:30
+LastEditors  : agent
+LastEditTime : 2026-10-19 13:59:55
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/host/replay.py
+Description  : Replay recorded sequences through the on-board tracker on the host.
+               A sequence is a .npz file (frames and optional boxes/ids/ranges) or a recorded .mjpeg file. The ground
+               truth of a sequence is read from the .npz itself or from <name>.gt.npz / <name>.gt.csv next to it;
+               recorded ranges (millimeters, one per frame) are replayed through the VL53L1X stand-in and recorded
+               time stamps (t_ms, one per frame) give the reacquisition times in ms, which are left out without them.
+               Frames rendered with the IR LED on (frames_ir, see host/synth.py) are returned while the goal tracker
+               has the LED on.
+               Decoded frames are cached as .npy files and memory-mapped so repeated runs skip the decoding.
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import os
+import re
+import time
+
+import numpy as np
+
+from host import board
+from host.detect import rgb565_pack
+from host.evaluate import evaluate, load_ground_truth
+
+# Macros
+SEQUENCE_EXTS = (".npz", ".mjpeg")  # The file types of a sequence
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "bicopter-replay")  # The decoded frame cache
+JPEG_PATTERN = re.compile(rb"\xff\xd8.*?\xff\xd9", re.DOTALL)  # One JPEG image inside an MJPEG stream
+IR_LED_PIN = "PG12"  # Must match the LEDpin of GoalTracker in lib/tracker.py
+
+
+class FrameCache:
+    def __init__(self, directory: str = CACHE_DIR) -> None:
+        """
+        @description: Constructor of the cache of decoded frames, shared by every run and process.
+        @param       {*} self:
+        @param       {str} directory: The directory of the cache (default: ~/.cache/bicopter-replay)
+        @return      {*} None
+        """
+        self.directory = directory
+        self._loaded = {}  # Frames already mapped by this process
+
+    def _key(self, path: str) -> str:
+        """
+        @description: Build the cache key of a sequence, it changes whenever the file changes.
+        @param       {*} self:
+        @param       {str} path: The path of the sequence
+        @return      {str} The cache key
+        """
+        stat = os.stat(path)
+        ident = "{}:{}:{}".format(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        return hashlib.sha1(ident.encode()).hexdigest()
+
+    def frames(self, path: str) -> np.ndarray:
+        """
+        @description: Get the decoded frames of a sequence, decoding it only the first time.
+        @param       {*} self:
+        @param       {str} path: The path of the sequence
+        @return      {np.ndarray} The read-only frames [frames, height, width]
+        """
+        key = self._key(path)
+        if key not in self._loaded:
+            cached = os.path.join(self.directory, key + ".npy")
+            if not os.path.exists(cached):
+                os.makedirs(self.directory, exist_ok=True)
+                temporary = "{}.{}.tmp.npy".format(cached[:-4], os.getpid())
+                np.save(temporary, decode(path))
+                os.replace(temporary, cached)  # Atomic, so concurrent workers never read a partial file
+            self._loaded[key] = np.load(cached, mmap_mode="r")
+        return self._loaded[key]
+
+
+def decode(path: str) -> np.ndarray:
+    """
+    @description: Decode all the frames of a sequence
+    @param       {str} path: The path of the sequence
+    @return      {np.ndarray} The frames [frames, height, width], uint16 RGB565 or uint8 grayscale
+    """
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            return np.asarray(data["frames"])
+    if path.endswith(".mjpeg"):
+        try:
+            from PIL import Image as PILImage
+        except ImportError:
+            raise ImportError("Decoding .mjpeg recordings requires Pillow (pip install pillow).")
+        with open(path, "rb") as f:
+            stream = f.read()
+        frames = []
+        for match in JPEG_PATTERN.finditer(stream):
+            picture = PILImage.open(io.BytesIO(match.group(0)))
+            if picture.mode == "L":
+                frames.append(np.asarray(picture, dtype=np.uint8))
+            else:
+                rgb = np.asarray(picture.convert("RGB"))
+                frames.append(rgb565_pack(rgb[..., 0], rgb[..., 1], rgb[..., 2]))
+        return np.stack(frames)
+    raise ValueError("Unsupported sequence type: {}".format(path))
+
+
+def ground_truth(path: str) -> dict:
+    """
+    @description: Find the ground truth of a sequence
+    @param       {str} path: The path of the sequence
+    @return      {dict} The ground truth (see host.evaluate.load_ground_truth), None if there is none
+    """
+    stem = os.path.splitext(path)[0]
+    for candidate in (stem + ".gt.npz", stem + ".gt.csv"):
+        if os.path.exists(candidate):
+            return load_ground_truth(candidate)
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            if "boxes" in data:
+                return load_ground_truth(path)
+    return None
+
+
+def recorded_ranges(path: str) -> np.ndarray:
+    """
+    @description: Find the ranges recorded with a sequence
+    @param       {str} path: The path of the sequence
+    @return      {np.ndarray} The range of every frame in millimeters (NaN with nothing in range), None if there are none
+    """
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            if "ranges" in data:
+                return np.asarray(data["ranges"], dtype=float)
+    return None
+
+
+def recorded_times(path: str) -> np.ndarray:
+    """
+    @description: Find the time stamps recorded with a sequence
+    @param       {str} path: The path of the sequence
+    @return      {np.ndarray} The time of every frame in milliseconds, None if there are none
+    """
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            if "t_ms" in data:
+                return np.asarray(data["t_ms"], dtype=float)
+    return None
+
+
+def recorded_ir(path: str) -> np.ndarray:
+    """
+    @description: Find the frames rendered with the IR LED on of a sequence
+    @param       {str} path: The path of the sequence
+    @return      {np.ndarray} The frames with the LED on [frames, height, width], None if there are none
+    """
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            if "frames_ir" in data:
+                return np.asarray(data["frames_ir"])
+    return None
+
+
+def _lit_source(frames: np.ndarray, ir_frames: np.ndarray):
+    """
+    @description: Return every frame as it looks with the IR LED in its state at the snapshot
+    @param       {np.ndarray} frames: The frames with the LED off
+    @param       {np.ndarray} ir_frames: The same frames with the LED on
+    @return      {*} A generator of frames for sensor.set_source
+    """
+    import machine
+
+    for i in range(len(frames)):
+        yield ir_frames[i] if machine.PIN_STATES.get(IR_LED_PIN) else frames[i]
+
+
+def discover(paths: list) -> list:
+    """
+    @description: List the sequences in a list of files and directories
+    @param       {list} paths: The files and directories
+    @return      {list} The paths of the sequences, sorted
+    """
+    sequences = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(SEQUENCE_EXTS) and ".gt." not in name:
+                    sequences.append(os.path.join(path, name))
+        else:
+            sequences.append(path)
+    return sequences
+
+
+def run_sequence(
+    frames: np.ndarray,
+    mode: str = "B",
+    thresholds: list = None,
+    quiet: bool = True,
+    ranges: np.ndarray = None,
+    ir_frames: np.ndarray = None,
+    **params
+) -> dict:
+    """
+    @description: Run the on-board tracker over a sequence of frames
+    @param       {np.ndarray} frames: The frames [frames, height, width]
+    @param       {str} mode: "B" for balloons or "G" for goals (default: "B")
+    @param       {list} thresholds: The color thresholds (default: BALLON or GRAY of main.py)
+    @param       {bool} quiet: Whether to silence the prints of the tracker (default: True)
+    @param       {np.ndarray} ranges: The range of every frame, the tracker then predicts the target size from a
+                                      range finder reading them (default: None)
+    @param       {np.ndarray} ir_frames: The frames with the IR LED on, returned instead while the LED is on
+                                         (default: None)
+    @param       {*} params: The keyword arguments of the tracker, e.g. factors or window_size
+    @return      {dict} The per-frame outputs: pred, valid, roi, track_id, candidates, rejections, skipped, cost_ms
+    """
+    board.install(virtual_sleep=True)
+    import sensor
+    import main as board_main
+    from lib.curblob import GATE_STAGES
+    from lib.tracker import BLOBTracker, GoalTracker
+
+    n_frames = len(frames)
+    outputs = {
+        "pred": np.zeros((n_frames, 4)),
+        "valid": np.zeros(n_frames, dtype=bool),
+        "roi": np.zeros((n_frames, 4)),
+        "track_id": np.zeros(n_frames, dtype=np.int64),
+        "candidates": np.zeros(n_frames, dtype=np.int64),
+        "rejections": np.zeros((n_frames, len(GATE_STAGES)), dtype=np.int64),  # Per gating stage
+        "skipped": np.zeros(n_frames, dtype=bool),  # The detection was reused by the motion gate
+        "cost_ms": np.zeros(n_frames),
+    }
+    if thresholds is None and params.get("color_lut"):
+        thresholds = params["color_lut"].thresholds
+    elif thresholds is None:
+        thresholds = board_main.BALLON if mode == "B" else board_main.GRAY
+    tracker_class = BLOBTracker if mode == "B" else GoalTracker
+
+    with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+        board_main.init_sensor(isColored=(mode == "B"))
+        sensor.set_source(frames if ir_frames is None else _lit_source(frames, ir_frames))
+        if ranges is not None:
+            import vl53l1x
+            from lib.ranging import RangeFinder
+
+            vl53l1x.set_source(ranges)
+            params["ranger"] = RangeFinder()
+        try:
+            t_start = time.perf_counter()
+            tracker = tracker_class(thresholds, time.clock(), show=False, **params)
+            skipped_frames = 0
+            index = None
+            while True:
+                # A goal frame takes two snapshots, its output holds for both
+                taken = slice(sensor.frame_index() - 1 if index is None else index + 1, sensor.frame_index())
+                index = sensor.frame_index() - 1
+                outputs["cost_ms"][index] = (time.perf_counter() - t_start) * 1000
+                blob = tracker.tracked_blob
+                if blob.feature_vector:
+                    outputs["pred"][taken] = blob.feature_vector[0:4]
+                    outputs["valid"][taken] = True
+                outputs["roi"][taken] = tracker.roi.get_roi()
+                outputs["track_id"][taken] = blob.id
+                outputs["candidates"][index] = len(tracker.candidates) if tracker.candidates else 0
+                outputs["rejections"][index] = [blob.rejections[stage] for stage in GATE_STAGES]
+                if tracker.motion:
+                    outputs["skipped"][index] = tracker.motion.skipped_frames > skipped_frames
+                    skipped_frames = tracker.motion.skipped_frames
+                t_start = time.perf_counter()
+                tracker.track()
+        except EOFError:
+            pass  # The end of the sequence
+    return outputs
+
+
+def replay(path: str, cache: FrameCache, mode: str = "B", **params) -> dict:
+    """
+    @description: Replay one sequence and evaluate it against its ground truth
+    @param       {str} path: The path of the sequence
+    @param       {FrameCache} cache: The cache of decoded frames
+    @param       {str} mode: "B" for balloons or "G" for goals (default: "B")
+    @param       {*} params: The parameters of the tracker (see run_sequence)
+    @return      {dict} The metrics (see host.evaluate.evaluate) plus the compute cost
+    """
+    frames = cache.frames(path)
+    if "ranges" not in params:
+        params["ranges"] = recorded_ranges(path)
+    if "ir_frames" not in params:
+        params["ir_frames"] = recorded_ir(path)
+    outputs = run_sequence(frames, mode, **params)
+    truth = ground_truth(path)
+    if truth is not None:
+        boxes = np.full((len(frames),) + truth["boxes"].shape[1:], np.nan)
+        ids = np.zeros(boxes.shape[:2], dtype=np.int64)
+        n = min(len(frames), len(truth["boxes"]))
+        boxes[:n] = truth["boxes"][:n]
+        ids[:n] = truth["ids"][:n]
+        t_ms = recorded_times(path)
+        if t_ms is not None and len(t_ms) < len(frames):
+            t_ms = None  # Not a time stamp for every frame, reacquisition is only measured in frames
+        metrics = evaluate(
+            outputs["pred"],
+            outputs["valid"],
+            boxes,
+            gt_ids=ids,
+            pred_ids=outputs["track_id"],
+            roi=outputs["roi"],
+            t_ms=t_ms[: len(frames)] if t_ms is not None else None,
+        )
+        metrics.pop("per_frame")
+    else:
+        metrics = {"frames": len(frames), "tracked": float(outputs["valid"].mean())}
+    metrics["ms_per_frame"] = float(outputs["cost_ms"].sum() / len(frames))
+    metrics["candidates_per_frame"] = float(outputs["candidates"].mean())
+    metrics["skipped_per_frame"] = float(outputs["skipped"].mean())
+    from lib.curblob import GATE_STAGES  # Importable once run_sequence installed the stand-ins
+
+    for i, stage in enumerate(GATE_STAGES):
+        metrics["rejected_{}_per_frame".format(stage)] = float(outputs["rejections"][:, i].mean())
+    return metrics
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay recorded sequences through the tracker.")
+    parser.add_argument("paths", nargs="+", help="Sequences (*.npz, *.mjpeg) or directories of sequences")
+    parser.add_argument("--mode", default="B", choices=["B", "G"], help="Balloon (B) or goal (G) tracking")
+    parser.add_argument("--cache", default=CACHE_DIR, help="The directory of the decoded frame cache")
+    args = parser.parse_args()
+    cache = FrameCache(args.cache)
+    for path in discover(args.paths):
+        metrics = replay(path, cache, args.mode)
+        print(path)
+        width = max(len(key) for key in metrics) + 2  # The rejection counters are the longest names
+        for key, value in metrics.items():
+            print("    {:<{}}{}".format(key, width, round(value, 4) if isinstance(value, float) else value))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,458 @@
+"""
+Author       : agent
+Date         : 2026-10-19 12:46:30
+LastEditors  : agent
+LastEditTime : 2026-10-19 13:56:56
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/host/stand_ins/image.py
+Description  : Host stand-in of the OpenMV image module backed by NumPy arrays.
+               RGB565 images are uint16 arrays, grayscale images are uint8 arrays.
+"""
+
+import io
+import math
+
+import numpy as np
+
+from host import detect
+
+# Macros
+EDGE_SIMPLE = 0
+EDGE_CANNY = 1
+
+
+class blob:
+    def __init__(self, row: list) -> None:
+        """
+        @description: Stand-in of image.blob built from a row of raw moment sums (see host.detect).
+        @param       {*} self:
+        @param       {list} row: The blob row
+        @return      {*} None
+        """
+        self._x = int(row[detect.X0])
+        self._y = int(row[detect.Y0])
+        self._w = int(row[detect.X1]) - self._x + 1
+        self._h = int(row[detect.Y1]) - self._y + 1
+        self._pixels = int(row[detect.N])
+        self._code = int(row[detect.CODE])
+        self._count = int(row[detect.COUNT])
+        n = max(1, self._pixels)
+        self._cx = row[detect.SX] / n
+        self._cy = row[detect.SY] / n
+        # Central second moments, the pixel itself counts as a unit square
+        mu20 = row[detect.SXX] / n - self._cx**2 + 1 / 12
+        mu02 = row[detect.SYY] / n - self._cy**2 + 1 / 12
+        mu11 = row[detect.SXY] / n - self._cx * self._cy
+        spread = math.sqrt(4 * mu11**2 + (mu20 - mu02) ** 2)
+        self._major = max(0.0, (mu20 + mu02 + spread) / 2)  # Variance along the major axis
+        self._minor = max(0.0, (mu20 + mu02 - spread) / 2)  # Variance along the minor axis
+        self._rotation = (0.5 * math.atan2(2 * mu11, mu20 - mu02)) % math.pi
+
+    def x(self) -> int:
+        return self._x
+
+    def y(self) -> int:
+        return self._y
+
+    def w(self) -> int:
+        return self._w
+
+    def h(self) -> int:
+        return self._h
+
+    def rect(self) -> tuple:
+        return (self._x, self._y, self._w, self._h)
+
+    def pixels(self) -> int:
+        return self._pixels
+
+    def area(self) -> int:
+        return self._w * self._h
+
+    def cx(self) -> int:
+        return int(round(self._cx))
+
+    def cy(self) -> int:
+        return int(round(self._cy))
+
+    def cxf(self) -> float:
+        return self._cx
+
+    def cyf(self) -> float:
+        return self._cy
+
+    def rotation(self) -> float:
+        return self._rotation
+
+    def rotation_rad(self) -> float:
+        return self._rotation
+
+    def rotation_deg(self) -> int:
+        return int(math.degrees(self._rotation))
+
+    def code(self) -> int:
+        return self._code
+
+    def count(self) -> int:
+        return self._count
+
+    def density(self) -> float:
+        return self._pixels / self.area()
+
+    def roundness(self) -> float:
+        return self._minor / self._major if self._major else 1.0
+
+    def elongation(self) -> float:
+        return 1 - self.roundness()
+
+    def _axes(self) -> tuple:
+        """
+        @description: Get the unit vectors and the half lengths of the major and minor axes
+        @param       {*} self:
+        @return      {tuple} (ux, uy, major half length, minor half length)
+        """
+        return math.cos(self._rotation), math.sin(self._rotation), 2 * math.sqrt(self._major), 2 * math.sqrt(self._minor)
+
+    def major_axis_line(self) -> tuple:
+        ux, uy, a, _ = self._axes()
+        return (int(self._cx - a * ux), int(self._cy - a * uy), int(self._cx + a * ux), int(self._cy + a * uy))
+
+    def minor_axis_line(self) -> tuple:
+        ux, uy, _, b = self._axes()
+        return (int(self._cx + b * uy), int(self._cy - b * ux), int(self._cx - b * uy), int(self._cy + b * ux))
+
+    def min_corners(self) -> list:
+        ux, uy, a, b = self._axes()
+        return [
+            (int(self._cx + sa * a * ux - sb * b * uy), int(self._cy + sa * a * uy + sb * b * ux))
+            for sa, sb in ((-1, -1), (1, -1), (1, 1), (-1, 1))
+        ]
+
+    def corners(self) -> list:
+        return [
+            (self._x, self._y),
+            (self._x + self._w - 1, self._y),
+            (self._x + self._w - 1, self._y + self._h - 1),
+            (self._x, self._y + self._h - 1),
+        ]
+
+    def __getitem__(self, index: int):
+        return (self._x, self._y, self._w, self._h, self._pixels, self.cx(), self.cy(), self._rotation, self._code, self._count)[
+            index
+        ]
+
+    def __repr__(self) -> str:
+        return '{{"x":{}, "y":{}, "w":{}, "h":{}, "pixels":{}, "code":{}}}'.format(
+            self._x, self._y, self._w, self._h, self._pixels, self._code
+        )
+
+
+class statistics:
+    def __init__(self, channels: list) -> None:
+        """
+        @description: Stand-in of image.statistics computed from the L, A, B (or grayscale) channel values. Every value
+                      is computed on its first read, the trackers mostly read the means of small regions.
+        @param       {*} self:
+        @param       {list} channels: The flattened values of every channel
+        @return      {*} None
+        """
+        self._channels = channels
+        self._stats = {}  # The values read so far by (channel, index)
+
+    def _compute(self, values: np.ndarray, index: int) -> int:
+        if index == 0:
+            return int(round(values.mean()))
+        if index == 2:
+            counts = np.bincount(values - values.min())
+            return int(counts.argmax() + values.min())
+        if index == 3:
+            return int(round(values.std()))
+        if index == 4:
+            return int(values.min())
+        if index == 5:
+            return int(values.max())
+        return int(np.percentile(values, {1: 50, 6: 25, 7: 75}[index]))
+
+    def _get(self, channel: int, index: int) -> int:
+        key = (channel, index)
+        if key not in self._stats:
+            values = self._channels[channel] if channel < len(self._channels) else None
+            self._stats[key] = self._compute(values, index) if values is not None and values.size else 0
+        return self._stats[key]
+
+    def mean(self) -> int:
+        return self._get(0, 0)
+
+    def median(self) -> int:
+        return self._get(0, 1)
+
+    def mode(self) -> int:
+        return self._get(0, 2)
+
+    def stdev(self) -> int:
+        return self._get(0, 3)
+
+    def min(self) -> int:
+        return self._get(0, 4)
+
+    def max(self) -> int:
+        return self._get(0, 5)
+
+    def lq(self) -> int:
+        return self._get(0, 6)
+
+    def uq(self) -> int:
+        return self._get(0, 7)
+
+    def l_mean(self) -> int:
+        return self._get(0, 0)
+
+    def l_median(self) -> int:
+        return self._get(0, 1)
+
+    def l_mode(self) -> int:
+        return self._get(0, 2)
+
+    def l_stdev(self) -> int:
+        return self._get(0, 3)
+
+    def l_min(self) -> int:
+        return self._get(0, 4)
+
+    def l_max(self) -> int:
+        return self._get(0, 5)
+
+    def a_mean(self) -> int:
+        return self._get(1, 0)
+
+    def a_median(self) -> int:
+        return self._get(1, 1)
+
+    def a_stdev(self) -> int:
+        return self._get(1, 3)
+
+    def a_min(self) -> int:
+        return self._get(1, 4)
+
+    def a_max(self) -> int:
+        return self._get(1, 5)
+
+    def b_mean(self) -> int:
+        return self._get(2, 0)
+
+    def b_median(self) -> int:
+        return self._get(2, 1)
+
+    def b_stdev(self) -> int:
+        return self._get(2, 3)
+
+    def b_min(self) -> int:
+        return self._get(2, 4)
+
+    def b_max(self) -> int:
+        return self._get(2, 5)
+
+
+def encode_jpeg(pixels: np.ndarray, quality: int = 50) -> bytes:
+    """
+    @description: Encode RGB565 or grayscale pixels as a JPEG stream
+    @param       {np.ndarray} pixels: The pixels, uint16 for RGB565 and uint8 for grayscale
+    @param       {int} quality: The JPEG quality (default: 50)
+    @return      {bytes} The JPEG stream
+    """
+    try:
+        from PIL import Image as PILImage
+    except ImportError:
+        raise ImportError("Compressing images on the host requires Pillow (pip install pillow).")
+    if pixels.dtype == np.uint16:
+        picture = PILImage.fromarray(np.dstack(detect.rgb565_unpack(pixels)).astype(np.uint8), "RGB")
+    else:
+        picture = PILImage.fromarray(pixels, "L")
+    stream = io.BytesIO()
+    picture.save(stream, format="JPEG", quality=int(quality))
+    return stream.getvalue()
+
+
+class Image:
+    def __init__(self, pixels: np.ndarray) -> None:
+        """
+        @description: Stand-in of image.Image wrapping a NumPy array.
+        @param       {*} self:
+        @param       {np.ndarray} pixels: The pixels, uint16 for RGB565 and uint8 for grayscale
+        @return      {*} None
+        """
+        self.pixels = np.array(pixels, copy=True)
+        if self.pixels.dtype not in (np.uint16, np.uint8):
+            raise ValueError("Only RGB565 (uint16) and grayscale (uint8) images are supported!")
+        self.jpeg = None  # The JPEG stream once compressed, the pixels are kept for the size and the drawing
+
+    def width(self) -> int:
+        return self.pixels.shape[1]
+
+    def height(self) -> int:
+        return self.pixels.shape[0]
+
+    def size(self) -> int:
+        return len(self.jpeg) if self.jpeg is not None else self.pixels.nbytes
+
+    def is_rgb565(self) -> bool:
+        return self.pixels.dtype == np.uint16
+
+    def is_grayscale(self) -> bool:
+        return self.pixels.dtype == np.uint8
+
+    def _crop(self, roi: tuple = None) -> np.ndarray:
+        """
+        @description: Get the pixels inside a region of interest
+        @param       {*} self:
+        @param       {tuple} roi: The region of interest (x, y, w, h) (default: the whole image)
+        @return      {np.ndarray} The view of the pixels inside the ROI
+        """
+        if not roi:
+            return self.pixels
+        x, y, w, h = [int(v) for v in roi]
+        return self.pixels[max(0, y) : max(0, y + h), max(0, x) : max(0, x + w)]
+
+    def find_blobs(
+        self,
+        thresholds: list,
+        invert: bool = False,
+        roi: tuple = None,
+        x_stride: int = 2,
+        y_stride: int = 1,
+        area_threshold: int = 10,
+        pixels_threshold: int = 10,
+        merge: bool = False,
+        margin: int = 0,
+        threshold_cb=None,
+        merge_cb=None,
+        mask=None,
+    ) -> list:
+        # The strides only change where OpenMV looks for seed pixels, the flood fill itself visits every pixel
+        rows = detect.find_blobs(
+            self.pixels,
+            self.is_rgb565(),
+            thresholds,
+            roi=roi,
+            invert=invert,
+            pixels_threshold=pixels_threshold,
+            area_threshold=area_threshold,
+            merge=merge,
+            margin=margin,
+            mask=mask.pixels if mask is not None else None,
+            x_stride=x_stride,
+            y_stride=y_stride,
+        )
+        blobs = [blob(row) for row in rows]
+        if threshold_cb:
+            blobs = [b for b in blobs if threshold_cb(b)]
+        return blobs
+
+    def get_statistics(self, roi: tuple = None, thresholds: list = None, invert: bool = False) -> statistics:
+        pixels = self._crop(roi).ravel()
+        if self.is_rgb565():
+            channels = list(detect.lab_table()[:, pixels].astype(np.int32))
+        else:
+            channels = [pixels.astype(np.int32)]
+        if thresholds:
+            keep = detect.classify(pixels, self.is_rgb565(), thresholds, invert) > 0
+            channels = [c[keep] for c in channels]
+        return statistics(channels)
+
+    def get_pixel(self, x: int, y: int, rgbtuple: bool = True):
+        if not (0 <= x < self.width() and 0 <= y < self.height()):
+            return None
+        value = int(self.pixels[y, x])
+        if self.is_rgb565() and rgbtuple:
+            r, g, b = detect.rgb565_unpack(np.array([value], dtype=np.uint16))
+            return (int(r[0]), int(g[0]), int(b[0]))
+        return value
+
+    def set_pixel(self, x: int, y: int, value) -> "Image":
+        if 0 <= x < self.width() and 0 <= y < self.height():
+            if self.is_rgb565() and isinstance(value, tuple):
+                value = int(detect.rgb565_pack(*value))
+            self.pixels[y, x] = value
+        return self
+
+    def copy(self, roi: tuple = None, copy_to_fb: bool = False) -> "Image":
+        return Image(self._crop(roi))
+
+    def replace(self, other: "Image") -> "Image":
+        self.pixels = np.array(other.pixels, copy=True)
+        return self
+
+    def to_grayscale(self) -> "Image":
+        if self.is_rgb565():
+            self.pixels = detect.rgb565_to_gray(self.pixels)
+        return self
+
+    def negate(self) -> "Image":
+        self.pixels = ~self.pixels
+        return self
+
+    def sub(self, other: "Image", reverse: bool = False, mask=None) -> "Image":
+        a, b = (other.pixels, self.pixels) if reverse else (self.pixels, other.pixels)
+        if self.is_rgb565():
+            channels = [
+                np.clip(ca.astype(np.int16) - cb.astype(np.int16), 0, 255)
+                for ca, cb in zip(detect.rgb565_unpack(a), detect.rgb565_unpack(b))
+            ]
+            result = detect.rgb565_pack(*channels)
+        else:
+            result = np.clip(a.astype(np.int16) - b.astype(np.int16), 0, 255).astype(np.uint8)
+        if mask is not None:
+            self.pixels = np.where(mask.pixels > 0, result, self.pixels).astype(self.pixels.dtype)
+        else:
+            self.pixels = result
+        return self
+
+    def find_edges(self, edge_type: int = EDGE_SIMPLE, threshold: tuple = (100, 200)) -> "Image":
+        gray = self.to_grayscale().pixels.astype(np.int16)
+        magnitude = np.zeros_like(gray)
+        magnitude[:, 1:] += np.abs(np.diff(gray, axis=1))
+        magnitude[1:, :] += np.abs(np.diff(gray, axis=0))
+        self.pixels = np.where(magnitude >= threshold[0], 255, 0).astype(np.uint8)
+        return self
+
+    def dilate(self, size: int, threshold: int = None, mask=None) -> "Image":
+        on = self.pixels > 0
+        grown = np.zeros_like(on)
+        height, width = on.shape
+        padded = np.pad(on, size)
+        for dy in range(2 * size + 1):
+            for dx in range(2 * size + 1):
+                grown |= padded[dy : dy + height, dx : dx + width]
+        full = 0xFFFF if self.is_rgb565() else 0xFF
+        self.pixels = np.where(grown, full, 0).astype(self.pixels.dtype)
+        return self
+
+    def compress(self, quality: int = 50) -> "Image":
+        """
+        @description: Compress the image to JPEG in place, like OpenMV's image.compress
+        @param       {*} self:
+        @param       {int} quality: The JPEG quality (default: 50)
+        @return      {Image} The image, bytearray() is now the JPEG stream
+        """
+        self.jpeg = encode_jpeg(self.pixels, quality)
+        return self
+
+    def compressed(self, quality: int = 50) -> "Image":
+        return Image(self.pixels).compress(quality)
+
+    def bytearray(self) -> bytearray:
+        return bytearray(self.jpeg if self.jpeg is not None else self.pixels.tobytes())
+
+    def flush(self) -> None:
+        return None
+
+    def _draw(self, *args, **kwargs) -> "Image":
+        # Nothing is displayed on the host, drawing is a no-op
+        return self
+
+    draw_rectangle = _draw
+    draw_line = _draw
+    draw_cross = _draw
+    draw_circle = _draw
+    draw_string = _draw
+    draw_edges = _draw
+    draw_keypoints = _draw
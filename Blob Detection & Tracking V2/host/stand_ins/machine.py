@@ -0,0 +1,45 @@
+"""
+Author       : agent
+Date         : 2026-10-19 12:46:30
+LastEditors  : agent
+LastEditTime : 2026-10-19 12:46:30
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/host/stand_ins/machine.py
+Description  : Host stand-in of the machine module (Pin and I2C).
+"""
+
+PIN_STATES = {}  # The output value of every pin by name, lets a replay react to e.g. the IR LED
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    PULL_UP = 1
+    PULL_DOWN = 2
+
+    def __init__(self, name, mode: int = IN, pull: int = None, value: int = None) -> None:
+        self.name = name
+        self.mode = mode
+        PIN_STATES.setdefault(name, 0)
+        if value is not None:
+            self.value(value)
+
+    def value(self, value: int = None):
+        if value is None:
+            return PIN_STATES[self.name]
+        PIN_STATES[self.name] = 1 if value else 0
+        return None
+
+    def on(self) -> None:
+        self.value(1)
+
+    def off(self) -> None:
+        self.value(0)
+
+
+class I2C:
+    def __init__(self, bus, freq: int = 400000, **kwargs) -> None:
+        self.bus = bus
+        self.freq = freq
+
+    def scan(self) -> list:
+        return []
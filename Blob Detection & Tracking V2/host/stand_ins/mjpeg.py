@@ -0,0 +1,38 @@
+"""
+Author       : agent
+Date         : 2026-10-19 13:56:09
+LastEditors  : agent
+LastEditTime : 2026-10-19 13:56:09
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/host/stand_ins/mjpeg.py
+Description  : Host stand-in of the OpenMV mjpeg module.
+               The frames are written as a bare stream of JPEG images without the AVI container of the board,
+               host/replay.py reads both since it only looks for the JPEG images.
+"""
+
+from image import encode_jpeg
+
+
+class Mjpeg:
+    def __init__(self, filename: str, width: int = None, height: int = None) -> None:
+        """
+        @description: Stand-in of mjpeg.Mjpeg, a recording of JPEG frames.
+        @param       {*} self:
+        @param       {str} filename: The file of the recording
+        @param       {int} width: The width of the frames (default: None, the size of the first frame)
+        @param       {int} height: The height of the frames (default: None, the size of the first frame)
+        @return      {*} None
+        """
+        self.file = open(filename, "wb")
+        self.width = width
+        self.height = height
+        self.frames = 0
+
+    def add_frame(self, img, quality: int = 50) -> None:
+        self.file.write(img.jpeg if img.jpeg is not None else encode_jpeg(img.pixels, quality))
+        self.frames += 1
+
+    def count(self) -> int:
+        return self.frames
+
+    def close(self, fps: float = 0) -> None:
+        self.file.close()
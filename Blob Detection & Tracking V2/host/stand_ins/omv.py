@@ -0,0 +1,21 @@
+"""
+Author       : agent
+Date         : 2026-10-19 12:46:30
+LastEditors  : agent
+LastEditTime : 2026-10-19 12:46:30
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/host/stand_ins/omv.py
+Description  : Host stand-in of the omv module.
+"""
+
+_fb_disabled = False
+
+
+def disable_fb(disable: bool = None) -> bool:
+    global _fb_disabled
+    if disable is not None:
+        _fb_disabled = disable
+    return _fb_disabled
+
+
+def board_type() -> str:
+    return "HOST"
@@ -0,0 +1,99 @@
+"""
+Author       : agent
+Date         : 2026-10-19 12:46:30
+LastEditors  : agent
+LastEditTime : 2026-10-19 13:28:07
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/host/stand_ins/pyb.py
+Description  : Host stand-in of the pyb module (LEDs, UART and the millisecond timer).
+"""
+
+import time
+
+
+class LED:
+    def __init__(self, led_id: int) -> None:
+        self.id = led_id
+        self.state = False
+
+    def on(self) -> None:
+        self.state = True
+
+    def off(self) -> None:
+        self.state = False
+
+    def toggle(self) -> None:
+        self.state = not self.state
+
+
+class UART:
+    def __init__(self, bus, baudrate: int = 115200, timeout_char: int = 0, **kwargs) -> None:
+        """
+        @description: Stand-in of pyb.UART, the bytes written are kept in tx and the bytes read come from rx.
+        @param       {*} self:
+        @param       {*} bus: The UART bus
+        @param       {int} baudrate: The baudrate
+        @param       {int} timeout_char: The timeout between characters in milliseconds
+        @return      {*} None
+        """
+        self.bus = bus
+        self.baudrate = baudrate
+        self.timeout_char = timeout_char
+        self.tx = bytearray()  # Bytes written by the board
+        self.rx = bytearray()  # Bytes waiting to be read by the board
+        self.peer = None  # The simulated peer at the other end of the link, None to use tx and rx only
+
+    def attach(self, peer) -> None:
+        """
+        @description: Connect a simulated peer (e.g. the ESP32 of host/linksim.py) that takes the bytes written and
+                      feeds rx as the link time goes by (host only).
+        @param       {*} self:
+        @param       {*} peer: The peer, with advance() and board_write(data)
+        @return      {*} None
+        """
+        self.peer = peer
+
+    def feed(self, data: bytes) -> None:
+        """
+        @description: Queue bytes to be read by the board (host only).
+        @param       {*} self:
+        @param       {bytes} data: The bytes sent by the peer
+        @return      {*} None
+        """
+        self.rx.extend(data)
+
+    def any(self) -> int:
+        if self.peer:
+            self.peer.advance()
+        return len(self.rx)
+
+    def read(self, nbytes: int = None):
+        if self.peer:
+            self.peer.advance()
+        if not self.rx:
+            return None
+        nbytes = len(self.rx) if nbytes is None else nbytes
+        data = bytes(self.rx[:nbytes])
+        del self.rx[:nbytes]
+        return data
+
+    def write(self, data) -> int:
+        if self.peer:
+            return self.peer.board_write(data)
+        self.tx.extend(data)
+        return len(data)
+
+
+def millis() -> int:
+    return time.ticks_ms()
+
+
+def micros() -> int:
+    return time.ticks_us()
+
+
+def elapsed_millis(start: int) -> int:
+    return time.ticks_diff(time.ticks_ms(), start)
+
+
+def delay(ms: int) -> None:
+    time.sleep_ms(ms)
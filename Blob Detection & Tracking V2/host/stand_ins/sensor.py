@@ -0,0 +1,320 @@
+"""
+Author       : agent
+Date         : 2026-10-19 12:46:30
+LastEditors  : agent
+LastEditTime : 2026-10-19 13:10:04
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/host/stand_ins/sensor.py
+Description  : Host stand-in of the OpenMV sensor module, snapshots are replayed from a frame source.
+               set_source() is host only: it takes an iterable of RGB565 (uint16) or grayscale (uint8) frames.
+               With more than one frame buffer, or once set_framerate() was called, a producer thread reads out one
+               frame per frame period on the board clock while the caller tracks the previous one; frame_stats()
+               reports the true age and drops. Otherwise every snapshot takes the next frame of the source.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+import image
+from host import detect
+
+# Macros
+## Pixel formats
+GRAYSCALE = 1
+RGB565 = 2
+## Frame sizes
+QQVGA = 4
+HQVGA = 9
+QVGA = 5
+VGA = 8
+FRAME_SIZES = {QQVGA: (160, 120), HQVGA: (240, 160), QVGA: (320, 240), VGA: (640, 480)}
+POLL_S = 0.0002  # The real time the producer thread waits between two looks at the board clock
+DEFAULT_FRAMERATE = 30  # The frame rate of the producer thread unless set_framerate() was called
+
+_pixformat = RGB565
+_framesize = HQVGA
+_windowing = None  # (x, y, w, h) crop of the frame
+_registers = {}  # The values written to the sensor registers
+_source = None  # Iterator over the replayed frames
+_frame_index = 0  # The source index of the last snapshot plus one
+_source_index = 0  # The index of the next frame of the source
+_settings = {}  # The other settings (auto gain, white balance, ...)
+_framebuffers = 1  # Number of frame buffers, more than one starts the producer thread
+_framerate = None  # The frame rate set by set_framerate(), None leaves a single frame buffer untimed
+_producer = None  # The producer thread, started by the first snapshot
+_stats = {"age_us": 0, "dropped": 0}  # The age of the last frame and the frames dropped so far (host only)
+
+
+class _Producer(threading.Thread):
+    def __init__(self, source, buffers: int, period_us: int, first_index: int) -> None:
+        """
+        @description: The readout of the sensor into the frame buffers. One buffer is held by the caller, so
+                      buffers - 1 frames wait at most: double buffering stalls and misses frames, triple buffering
+                      overwrites the oldest, a single buffer only takes the readout a snapshot waits for. Frames are
+                      stamped on the frame period grid of the board clock.
+        @param       {*} self:
+        @param       {*} source: The iterator over the frames
+        @param       {int} buffers: The number of frame buffers
+        @param       {int} period_us: The frame period
+        @param       {int} first_index: The source index of the first frame
+        @return      {*} None
+        """
+        super().__init__(daemon=True)
+        self.source = source
+        self.buffers = buffers
+        self.period_us = period_us
+        self.index = first_index
+        self.ready = []  # The (source index, image, end of readout) waiting, oldest first
+        self.cond = threading.Condition()
+        self.next_us = time.ticks_add(time.ticks_us(), period_us)  # The end of the next readout
+        self.dropped = 0
+        self.waiting = False  # Whether a snapshot waits for a frame
+        self.done = False  # Whether the source is exhausted
+        self.stopped = False
+
+    def run(self) -> None:
+        while not self.stopped:
+            if time.ticks_diff(self.next_us, time.ticks_us()) > 0:
+                time.sleep(POLL_S)  # Real time, the board clock may jump ahead with virtual sleeps
+                continue
+            try:
+                frame = next(self.source)
+            except StopIteration:
+                frame = None
+            with self.cond:
+                if frame is None:
+                    self.done = True
+                elif len(self.ready) < max(self.buffers - 1, 1 if self.waiting else 0):
+                    self.ready.append((self.index, _convert(frame), self.next_us))
+                elif self.buffers >= 3:
+                    self.ready.pop(0)  # Overwritten by the newer frame
+                    self.ready.append((self.index, _convert(frame), self.next_us))
+                    self.dropped += 1
+                else:
+                    self.dropped += 1  # No free buffer, the readout is missed
+                self.index += 1
+                self.next_us = time.ticks_add(self.next_us, self.period_us)
+                self.cond.notify_all()
+            if frame is None:
+                return
+
+    def take(self) -> tuple:
+        """
+        @description: Wait until every frame due on the board clock is read out, then take the frame snapshot returns
+        @param       {*} self:
+        @return      {tuple} The source index, the image and the end of its readout
+        """
+        while True:
+            with self.cond:
+                while not self.done and time.ticks_diff(self.next_us, time.ticks_us()) <= 0:
+                    self.cond.wait(POLL_S)
+                self.waiting = True  # A single buffer takes the next readout, not the ones before the call
+                if self.ready:
+                    if self.buffers >= 3:
+                        self.dropped += len(self.ready) - 1  # Only the newest frame is returned
+                        self.ready = self.ready[-1:]
+                    self.waiting = False
+                    return self.ready.pop(0)
+                if self.done:
+                    self.waiting = False
+                    raise EOFError("The frame source is exhausted.")
+                wait = time.ticks_diff(self.next_us, time.ticks_us())
+            time.sleep_us(wait)  # Blocks until the next readout, virtual with host.board.install(virtual_sleep=True)
+
+    def stop(self) -> None:
+        self.stopped = True
+        self.join()
+
+
+def _stop_producer() -> None:
+    global _producer, _source_index
+    if _producer:
+        _producer.stop()
+        _source_index = _producer.index
+        _stats["dropped"] += _producer.dropped + len(_producer.ready)  # The buffered frames are lost
+        _producer = None
+
+
+def set_source(frames) -> None:
+    """
+    @description: Set the frames returned by snapshot (host only)
+    @param       {*} frames: An iterable of frames, e.g. an array [frames, height, width] or a generator
+    @return      {*} None
+    """
+    global _source, _frame_index, _source_index
+    _stop_producer()
+    _source = iter(frames)
+    _frame_index = 0
+    _source_index = 0
+    _stats.update(age_us=0, dropped=0)
+
+
+def frame_index() -> int:
+    """
+    @description: Get the number of frames taken from the source (host only)
+    @return      {int} The number of frames taken, the last snapshot is frame frame_index() - 1 (frames dropped by the
+                       frame buffers are counted as taken)
+    """
+    return _frame_index
+
+
+def frame_stats() -> dict:
+    """
+    @description: Get the true age of the last frame and the number of frames dropped so far (host only)
+    @return      {dict} age_us and dropped
+    """
+    return dict(_stats)
+
+
+def reset() -> None:
+    global _pixformat, _framesize, _windowing, _framebuffers, _framerate
+    _stop_producer()
+    _pixformat = RGB565
+    _framesize = HQVGA
+    _windowing = None
+    _framebuffers = 1
+    _framerate = None
+    _registers.clear()
+    _settings.clear()
+
+
+def set_pixformat(pixformat: int) -> None:
+    global _pixformat
+    _stop_producer()  # The buffered frames have the old format
+    _pixformat = pixformat
+
+
+def get_pixformat() -> int:
+    return _pixformat
+
+
+def set_framesize(framesize: int) -> None:
+    global _framesize, _windowing
+    _stop_producer()
+    _framesize = framesize
+    _windowing = None
+
+
+def get_framesize() -> int:
+    return _framesize
+
+
+def set_windowing(roi: tuple) -> None:
+    global _windowing
+    _stop_producer()
+    frame_w, frame_h = FRAME_SIZES[_framesize]
+    if len(roi) == 2:  # (w, h) is centered
+        roi = ((frame_w - roi[0]) // 2, (frame_h - roi[1]) // 2, roi[0], roi[1])
+    _windowing = tuple(int(v) for v in roi)
+
+
+def get_windowing() -> tuple:
+    frame_w, frame_h = FRAME_SIZES[_framesize]
+    return _windowing if _windowing else (0, 0, frame_w, frame_h)
+
+
+def width() -> int:
+    return get_windowing()[2]
+
+
+def height() -> int:
+    return get_windowing()[3]
+
+
+def set_framebuffers(count: int) -> None:
+    global _framebuffers
+    _stop_producer()
+    _framebuffers = max(1, int(count))
+
+
+def get_framebuffers() -> int:
+    return _framebuffers
+
+
+def set_framerate(rate: int) -> None:
+    global _framerate
+    _stop_producer()
+    _framerate = rate
+
+
+def get_framerate() -> int:
+    return _framerate if _framerate else DEFAULT_FRAMERATE
+
+
+def skip_frames(n: int = None, time: int = None) -> None:
+    return None
+
+
+def set_auto_whitebal(enable: bool, rgb_gain_db: tuple = None) -> None:
+    _settings["auto_whitebal"] = enable
+
+
+def set_auto_exposure(enable: bool, exposure_us: int = None) -> None:
+    _settings["auto_exposure"] = enable
+
+
+def set_auto_gain(enable: bool, gain_db: float = None) -> None:
+    _settings["auto_gain"] = enable
+
+
+def __write_reg(address: int, value: int) -> None:
+    _registers[address] = value
+
+
+def __read_reg(address: int) -> int:
+    return _registers.get(address, 0)
+
+
+def snapshot() -> image.Image:
+    """
+    @description: Take the next frame of the source, converted to the pixel format and cropped to the window
+    @return      {image.Image} The frame
+    """
+    global _frame_index, _source_index, _producer
+    if _source is None:
+        raise RuntimeError("No frame source, call sensor.set_source() first!")
+    if _framebuffers > 1 or _framerate:
+        if _producer is None:
+            # The frames buffered by a stopped producer were lost like on a reconfigured sensor
+            _producer = _Producer(_source, _framebuffers, int(1000000 / get_framerate()), _source_index)
+            _producer.start()
+        index, img, ready_us = _producer.take()
+        _frame_index = index + 1
+        _stats.update(age_us=max(0, time.ticks_diff(time.ticks_us(), ready_us)))
+        _stats["dropped"] += _producer.dropped
+        _producer.dropped = 0
+        return img
+    try:
+        frame = next(_source)
+    except StopIteration:
+        raise EOFError("The frame source is exhausted.")
+    _source_index += 1
+    _frame_index = _source_index
+    return _convert(frame)
+
+
+def _convert(frame) -> image.Image:
+    """
+    @description: Convert a frame of the source to the pixel format and crop it to the window
+    @param       {*} frame: The frame
+    @return      {image.Image} The frame
+    """
+    frame = np.asarray(frame)
+    if _pixformat == GRAYSCALE and frame.dtype == np.uint16:
+        frame = detect.rgb565_to_gray(frame)
+    elif _pixformat == RGB565 and frame.dtype == np.uint8:
+        gray = frame.astype(np.uint16)
+        frame = detect.rgb565_pack(gray, gray, gray)
+    if _windowing:
+        x, y, w, h = _windowing
+        frame = frame[y : y + h, x : x + w]
+    return image.Image(frame)
+
+
+def alloc_extra_fb(width: int, height: int, pixformat: int) -> image.Image:
+    return image.Image(np.zeros((height, width), dtype=np.uint16 if pixformat == RGB565 else np.uint8))
+
+
+def dealloc_extra_fb() -> None:
+    return None
@@ -0,0 +1,144 @@
+"""
+Author       : agent
+Date         : 2026-10-19 13:00:39
+LastEditors  : agent
+LastEditTime : 2026-10-19 13:00:39
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/host/stand_ins/uasyncio.py
+Description  : Host stand-in of the MicroPython uasyncio module: a single-threaded scheduler on the board clock.
+               The event loop reads time.ticks_us and waits with time.sleep_us, so with host.board.install(
+               virtual_sleep=True) the idle time between tasks is skipped and the schedule is deterministic.
+               Only what lib/ uses is provided: create_task, run, sleep, sleep_ms, Task.cancel and CancelledError.
+"""
+
+import sys
+import time
+import traceback
+
+
+class CancelledError(BaseException):
+    pass
+
+
+class _Sleep:
+    def __init__(self, us: int) -> None:
+        self.us = max(0, int(us))
+
+    def __await__(self):
+        yield self
+
+
+class Task:
+    def __init__(self, coro) -> None:
+        """
+        @description: Stand-in of uasyncio.Task, a coroutine with its wake-up time.
+        @param       {*} self:
+        @param       {*} coro: The coroutine
+        @return      {*} None
+        """
+        self.coro = coro
+        self.wake_us = time.ticks_us()  # When the task runs next
+        self.result = None
+        self.error = None  # The exception that ended the task
+        self.awaited = False  # Whether another task waits for the result
+        self._done = False
+        self._cancelled = False
+
+    def done(self) -> bool:
+        return self._done
+
+    def cancel(self) -> bool:
+        if self._done:
+            return False
+        self._cancelled = True
+        self.wake_us = time.ticks_us()  # Raise CancelledError at the next step
+        return True
+
+    def __await__(self):
+        self.awaited = True
+        while not self._done:
+            yield _Sleep(0)
+        if self.error:
+            raise self.error
+        return self.result
+
+
+_tasks = []  # The tasks not done yet, in the order they run on equal wake-up times
+stats = {"steps": 0, "idle_us": 0}  # Number of task steps and time the loop waited with nothing to run (host only)
+
+
+def create_task(coro) -> Task:
+    """
+    @description: Schedule a coroutine
+    @param       {*} coro: The coroutine
+    @return      {Task} Its task
+    """
+    task = Task(coro)
+    _tasks.append(task)
+    return task
+
+
+def sleep_ms(ms: int) -> _Sleep:
+    return _Sleep(ms * 1000)
+
+
+def sleep(seconds: float) -> _Sleep:
+    return _Sleep(seconds * 1000000)
+
+
+def _step(task: Task) -> None:
+    """
+    @description: Run a task until it awaits again
+    @param       {Task} task: The task
+    @return      {*} None
+    """
+    stats["steps"] += 1
+    try:
+        if task._cancelled:
+            task._cancelled = False
+            awaited = task.coro.throw(CancelledError())
+        else:
+            awaited = task.coro.send(None)
+    except StopIteration as stop:
+        task._done, task.result = True, stop.value
+    except CancelledError as error:
+        task._done, task.error = True, error
+    except BaseException as error:
+        task._done, task.error = True, error
+        if not task.awaited:
+            # Like MicroPython, an exception nobody waits for is printed and the other tasks go on
+            print("Task exception wasn't retrieved", file=sys.stderr)
+            traceback.print_exception(type(error), error, error.__traceback__)
+    else:
+        if not isinstance(awaited, _Sleep):
+            raise TypeError("Only uasyncio sleeps and tasks can be awaited on the host: {!r}".format(awaited))
+        task.wake_us = time.ticks_add(time.ticks_us(), awaited.us)
+
+
+def run(coro):
+    """
+    @description: Run a coroutine and the tasks it creates until it returns
+    @param       {*} coro: The main coroutine
+    @return      {*} The result of the coroutine
+    """
+    main = create_task(coro)
+    main.awaited = True  # run() returns its result or raises its exception
+    try:
+        while not main._done:
+            now = time.ticks_us()
+            # The earliest wake-up time first, the least recently run first on ties
+            task = min(_tasks, key=lambda t: time.ticks_diff(t.wake_us, now))
+            delay = time.ticks_diff(task.wake_us, now)
+            if delay > 0:
+                stats["idle_us"] += delay
+                time.sleep_us(delay)
+            _tasks.remove(task)
+            _step(task)
+            if not task._done:
+                _tasks.append(task)
+    finally:
+        for task in _tasks:
+            task.coro.close()
+        _tasks.clear()
+    if main.error:
+        raise main.error
+    return main.result
@@ -0,0 +1,72 @@
+"""
+Author       : agent
+Date         : 2026-10-19 13:21:25
+LastEditors  : agent
+LastEditTime : 2026-10-19 13:21:25
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/host/stand_ins/vl53l1x.py
+Description  : Host stand-in of the VL53L1X driver, readings are replayed from recorded ranges.
+               set_source() is host only: it takes one range per frame, read at the frame the sensor stand-in
+               returned last, or ranges with their time stamps (e.g. the "range" and "t" of the flight recorder
+               states), read at the board time since set_source(). NaN or None reads as nothing in range.
+"""
+
+import time
+
+import sensor
+
+# Macros
+OUT_OF_RANGE_MM = 0  # The reading with nothing in range
+
+_ranges = []  # The recorded ranges in millimeters
+_stamps = None  # Their time stamps in milliseconds, None for one range per frame
+_start_ms = 0  # The board time of set_source()
+_reads = 0  # Number of readings so far (host only)
+
+
+def set_source(ranges, stamps_ms=None) -> None:
+    """
+    @description: Set the ranges returned by read (host only)
+    @param       {*} ranges: The ranges in millimeters, one per frame without stamps_ms
+    @param       {*} stamps_ms: The time stamps of the ranges, the first one is replayed at set_source() (default: None)
+    @return      {*} None
+    """
+    global _ranges, _stamps, _start_ms, _reads
+    _ranges = list(ranges)
+    _stamps = [stamp - stamps_ms[0] for stamp in stamps_ms] if stamps_ms is not None and len(stamps_ms) else None
+    _start_ms = time.ticks_ms()
+    _reads = 0
+
+
+def reads() -> int:
+    """
+    @description: Get the number of readings since set_source (host only)
+    @return      {int} The number of readings
+    """
+    return _reads
+
+
+def _current():
+    if not _ranges:
+        return None
+    if _stamps is None:
+        index = sensor.frame_index() - 1
+    else:
+        elapsed = time.ticks_diff(time.ticks_ms(), _start_ms)
+        index = -1
+        while index + 1 < len(_stamps) and _stamps[index + 1] <= elapsed:
+            index += 1
+    return _ranges[min(max(index, 0), len(_ranges) - 1)]
+
+
+class VL53L1X:
+    def __init__(self, i2c, address: int = 0x29) -> None:
+        self.i2c = i2c
+        self.address = address
+
+    def read(self) -> int:
+        global _reads
+        _reads += 1
+        distance = _current()
+        if distance is None or distance != distance:  # NaN
+            return OUT_OF_RANGE_MM
+        return int(distance)
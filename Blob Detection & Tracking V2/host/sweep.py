@@ -0,0 +1,351 @@
+"""
+Author       : agent
+Date         : 2026-10-19 12:46:30
+LastEditors  : agent
+LastEditTime : 2026-10-19 13:18:15
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/host/sweep.py
+Description  : Parallel parameter sweep of the tracker over a replay corpus.
+               The sweep is described by a JSON spec, for example
+               {
+                   "mode": "B",
+                   "search": "grid" | "random" | "bayes",
+                   "trials": 40,
+                   "seed": 0,
+                   "params": {
+                       "FACTORS_BALLON": [[0.1, 0.1, 0.1, 0.1], [0.2, 0.2, 0.3, 0.3]],
+                       "FEATURE_DISTANCE_THRESHOLD_BALLOON": {"range": [100, 400, 50]},
+                       "WINDOW_SIZE": [3, 5, 8]
+                   }
+               }
+               Parameters that are not swept keep their value from main.py (or the tracker default).
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from host.replay import CACHE_DIR, FrameCache, discover, replay
+
+# Macros
+## Sweepable parameters: spec name -> (tracker keyword, mode it applies to, None for both)
+PARAMETERS = {
+    "FACTORS_BALLON": ("factors", "B"),
+    "FACTORS_GOAL": ("factors", "G"),
+    "FEATURE_DISTANCE_THRESHOLD_BALLOON": ("feature_distance_threshold", "B"),
+    "FEATURE_DISTANCE_THRESHOLD_GOAL": ("feature_distance_threshold", "G"),
+    "MAX_UNTRACKED_FRAMES_BALLOON": ("max_untracked_frames", "B"),
+    "MAX_UNTRACKED_FRAMES_GOAL": ("max_untracked_frames", "G"),
+    "WINDOW_SIZE": ("window_size", None),  # CurBLOB.window_size
+    "NORM_LEVEL": ("norm_level", None),  # curblob.NORM_LEVEL
+    "DENSITY_THRESHOLD": ("density_threshold", "B"),  # BLOBTracker.find_reference
+    "ROUNDNESS_THRESHOLD": ("roundness_threshold", "B"),  # BLOBTracker.find_reference
+    "SEARCH_PIXEL_BUDGET": ("search_budget", "B"),  # lib/search.py TileSearch
+    "ADAPTIVE_BLOB_FILTER": ("adaptive_blob_filter", None),  # Tracker._blob_filter
+    "GATING": ("gating", None),  # CurBLOB gating cascade
+    "FEATURE_FILTERS": ("feature_filters", None),  # lib/filters.py specs, one or one per feature
+    "DYNAMIC_WINDOW": ("dynamic_window", "B"),  # lib/window.py SensorWindow
+    "FRAME_BUFFERS": ("frame_buffers", "B"),  # lib/capture.py Capture
+    "MOTION_GATE": ("motion_gate", None),  # lib/motion.py ChangeDetector
+    "REID_MEMORY": ("reid_memory", "B"),  # lib/reid.py ReIDMemory
+    "THRESHOLDS": ("thresholds", None),  # The color thresholds, e.g. BALLON of main.py
+}
+BAYES_STARTUP = 8  # Number of random trials before the Parzen estimator guides the search
+BAYES_GAMMA = 0.25  # The share of trials considered good by the Parzen estimator
+BAYES_CANDIDATES = 32  # Number of candidates drawn from the good trials per suggestion
+_cache = None  # The frame cache of a worker process
+
+
+def expand(values) -> list:
+    """
+    @description: Expand the values of a parameter in the spec into a list
+    @param       {*} values: A list of values or {"range": [start, stop, step]} (stop included)
+    @return      {list} The values of the parameter
+    """
+    if isinstance(values, dict):
+        start, stop, step = values["range"]
+        count = int(math.floor((stop - start) / step + 1e-9)) + 1
+        return [start + i * step for i in range(count)]
+    return list(values)
+
+
+def tracker_params(config: dict, mode: str) -> dict:
+    """
+    @description: Translate a configuration in spec names into tracker keyword arguments
+    @param       {dict} config: The parameter values by spec name
+    @param       {str} mode: "B" or "G"
+    @return      {dict} The keyword arguments of run_sequence
+    """
+    params = {}
+    for name, value in config.items():
+        if name not in PARAMETERS:
+            raise ValueError("Unknown parameter {}, expected one of {}".format(name, ", ".join(PARAMETERS)))
+        keyword, applies_to = PARAMETERS[name]
+        if applies_to in (None, mode):
+            params[keyword] = [tuple(t) for t in value] if keyword == "thresholds" else value
+    return params
+
+
+def main_defaults(mode: str) -> dict:
+    """
+    @description: Read the current values of the tuned parameters from main.py
+    @param       {str} mode: "B" or "G"
+    @return      {dict} The parameter values by spec name
+    """
+    from host import board
+
+    board.install(virtual_sleep=True)
+    import main as board_main
+
+    defaults = {}
+    for name, (_, applies_to) in PARAMETERS.items():
+        if applies_to in (None, mode) and hasattr(board_main, name):
+            defaults[name] = getattr(board_main, name)
+    return defaults
+
+
+class ParzenSearch:
+    def __init__(self, space: dict, seed: int = 0) -> None:
+        """
+        @description: A small tree-structured Parzen estimator over discrete parameter values.
+        @param       {*} self:
+        @param       {dict} space: The candidate values of every parameter
+        @param       {int} seed: The random seed (default: 0)
+        @return      {*} None
+        """
+        self.space = space
+        self.rng = random.Random(seed)
+        self.history = []  # (value indices, score) of the finished trials
+
+    def _random(self) -> dict:
+        """
+        @description: Draw the value indices of a random trial.
+        @param       {*} self:
+        @return      {dict} The value index of every parameter
+        """
+        return {name: self.rng.randrange(len(values)) for name, values in self.space.items()}
+
+    def _density(self, trials: list, name: str) -> list:
+        """
+        @description: Estimate the smoothed probability of every value of a parameter within some trials.
+        @param       {*} self:
+        @param       {list} trials: The trials (value indices, score)
+        @param       {str} name: The parameter
+        @return      {list} The probability of every value index
+        """
+        counts = [1.0] * len(self.space[name])  # Laplace prior
+        for indices, _ in trials:
+            counts[indices[name]] += 1
+        total = sum(counts)
+        return [count / total for count in counts]
+
+    def ask(self) -> dict:
+        """
+        @description: Suggest the value indices of the next trial.
+        @param       {*} self:
+        @return      {dict} The value index of every parameter
+        """
+        if len(self.history) < BAYES_STARTUP:
+            return self._random()
+        ranked = sorted(self.history, key=lambda trial: trial[1], reverse=True)
+        n_good = max(1, int(len(ranked) * BAYES_GAMMA))
+        good, bad = ranked[:n_good], ranked[n_good:]
+        good_density = {name: self._density(good, name) for name in self.space}
+        bad_density = {name: self._density(bad, name) for name in self.space}
+        best, best_ratio = None, -1.0
+        for _ in range(BAYES_CANDIDATES):
+            candidate = {
+                name: self.rng.choices(range(len(values)), weights=good_density[name])[0]
+                for name, values in self.space.items()
+            }
+            ratio = 1.0
+            for name, index in candidate.items():
+                ratio *= good_density[name][index] / bad_density[name][index]
+            if ratio > best_ratio:
+                best, best_ratio = candidate, ratio
+        return best
+
+    def tell(self, indices: dict, score: float) -> None:
+        """
+        @description: Report the score of a finished trial.
+        @param       {*} self:
+        @param       {dict} indices: The value indices of the trial
+        @param       {float} score: The score of the trial
+        @return      {*} None
+        """
+        self.history.append((indices, score))
+
+
+def _init_worker(cache_dir: str) -> None:
+    """
+    @description: Give every worker process its own handle on the shared frame cache
+    @param       {str} cache_dir: The directory of the decoded frame cache
+    @return      {*} None
+    """
+    global _cache
+    _cache = FrameCache(cache_dir)
+
+
+def run_trial(job: tuple) -> dict:
+    """
+    @description: Replay the whole corpus with one configuration (runs in a worker process)
+    @param       {tuple} job: (sequences, mode, configuration by spec name)
+    @return      {dict} The frame-weighted mean of the metrics over the corpus
+    """
+    sequences, mode, config = job
+    cache = _cache or FrameCache()
+    params = tracker_params(config, mode)
+    totals = {}
+    n_frames = 0
+    for path in sequences:
+        metrics = replay(path, cache, mode, **params)
+        frames = metrics["frames"]
+        n_frames += frames
+        for key, value in metrics.items():
+            totals[key] = totals.get(key, 0.0) + value * frames
+    return {key: value / n_frames for key, value in totals.items()} if n_frames else {}
+
+
+def pareto_front(results: list, accuracy: str = "score", cost: str = "ms_per_frame") -> set:
+    """
+    @description: Find the results that no other result beats in both accuracy and cost
+    @param       {list} results: The results of the trials
+    @param       {str} accuracy: The metric to maximize (default: "score")
+    @param       {str} cost: The metric to minimize (default: "ms_per_frame")
+    @return      {set} The indices of the results on the Pareto front
+    """
+    front = set()
+    for i, a in enumerate(results):
+        dominated = any(
+            b["metrics"][accuracy] >= a["metrics"][accuracy]
+            and b["metrics"][cost] <= a["metrics"][cost]
+            and (b["metrics"][accuracy] > a["metrics"][accuracy] or b["metrics"][cost] < a["metrics"][cost])
+            for b in results
+        )
+        if not dominated:
+            front.add(i)
+    return front
+
+
+def sweep(spec: dict, sequences: list, workers: int = None, cache_dir: str = CACHE_DIR) -> list:
+    """
+    @description: Run a parameter sweep over a corpus across a process pool
+    @param       {dict} spec: The sweep spec (see the module description)
+    @param       {list} sequences: The paths of the sequences
+    @param       {int} workers: The number of worker processes (default: the number of CPUs)
+    @param       {str} cache_dir: The directory of the decoded frame cache
+    @return      {list} The results {"config", "metrics"} ranked by score
+    """
+    mode = spec.get("mode", "B")
+    search = spec.get("search", "grid")
+    space = {name: expand(values) for name, values in spec["params"].items()}
+    defaults = main_defaults(mode)
+    names = list(space)
+    workers = workers or os.cpu_count()
+    rng = random.Random(spec.get("seed", 0))
+
+    if search == "grid":
+        batches = [[dict(zip(names, values)) for values in itertools.product(*space.values())]]
+    elif search == "random":
+        batches = [[{name: rng.choice(values) for name, values in space.items()} for _ in range(spec.get("trials", 20))]]
+    elif search == "bayes":
+        batches = None  # Suggested batch by batch
+        optimizer = ParzenSearch(space, spec.get("seed", 0))
+    else:
+        raise ValueError("Invalid search {}, expected grid, random or bayes".format(search))
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cache_dir,)) as pool:
+        if batches is not None:
+            for batch in batches:
+                jobs = [(sequences, mode, dict(defaults, **config)) for config in batch]
+                for config, metrics in zip(batch, pool.map(run_trial, jobs)):
+                    results.append({"config": config, "metrics": metrics})
+        else:
+            remaining = spec.get("trials", 20)
+            while remaining > 0:
+                size = min(workers, remaining)
+                suggestions = [optimizer.ask() for _ in range(size)]
+                batch = [{name: space[name][index] for name, index in indices.items()} for indices in suggestions]
+                jobs = [(sequences, mode, dict(defaults, **config)) for config in batch]
+                for indices, config, metrics in zip(suggestions, batch, pool.map(run_trial, jobs)):
+                    optimizer.tell(indices, metrics.get("score", metrics.get("tracked", 0.0)))
+                    results.append({"config": config, "metrics": metrics})
+                remaining -= size
+
+    key = "score" if results and "score" in results[0]["metrics"] else "tracked"
+    results.sort(key=lambda result: result["metrics"].get(key, 0.0), reverse=True)
+    for i in pareto_front(results, accuracy=key):
+        results[i]["pareto"] = True
+    return results
+
+
+def print_table(results: list, top: int = 20) -> None:
+    """
+    @description: Print the ranked results as a table of accuracy versus compute cost
+    @param       {list} results: The ranked results of the sweep
+    @param       {int} top: The number of rows to print (default: 20)
+    @return      {*} None
+    """
+    columns = ["score", "mota", "motp", "recall", "precision", "id_switches", "ms_per_frame", "candidates_per_frame"]
+    columns = [c for c in columns if results and c in results[0]["metrics"]] or ["tracked", "ms_per_frame"]
+    print("{:>4} {:>1} ".format("rank", "P") + " ".join("{:>12}".format(c[:12]) for c in columns) + "  config")
+    for rank, result in enumerate(results[:top], 1):
+        metrics = result["metrics"]
+        print(
+            "{:>4} {:>1} ".format(rank, "*" if result.get("pareto") else "")
+            + " ".join("{:>12.4f}".format(metrics.get(c, float("nan"))) for c in columns)
+            + "  "
+            + json.dumps(result["config"])
+        )
+
+
+def write_csv(results: list, path: str) -> None:
+    """
+    @description: Write all the results of the sweep to a CSV file
+    @param       {list} results: The ranked results of the sweep
+    @param       {str} path: The path of the CSV file
+    @return      {*} None
+    """
+    metric_keys = sorted({key for result in results for key in result["metrics"]})
+    config_keys = sorted({key for result in results for key in result["config"]})
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["rank", "pareto"] + config_keys + metric_keys)
+        for rank, result in enumerate(results, 1):
+            writer.writerow(
+                [rank, int(bool(result.get("pareto")))]
+                + [json.dumps(result["config"].get(key)) for key in config_keys]
+                + [result["metrics"].get(key) for key in metric_keys]
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sweep the tracker parameters over a replay corpus.")
+    parser.add_argument("spec", help="The JSON sweep spec")
+    parser.add_argument("corpus", nargs="+", help="Sequences (*.npz, *.mjpeg) or directories of sequences")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+    parser.add_argument("--cache", default=CACHE_DIR, help="The directory of the decoded frame cache")
+    parser.add_argument("--out", default=None, help="Write all the ranked results to this CSV file")
+    parser.add_argument("--top", type=int, default=20, help="Number of results to print")
+    args = parser.parse_args()
+
+    with open(args.spec) as f:
+        spec = json.load(f)
+    sequences = discover(args.corpus)
+    # Decode every sequence once up front so the workers only memory-map the cache
+    cache = FrameCache(args.cache)
+    for path in sequences:
+        cache.frames(path)
+    results = sweep(spec, sequences, args.workers, args.cache)
+    print_table(results, args.top)
+    if args.out:
+        write_csv(results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,529 @@
+"""
+Author       : agent
+Date         : 2026-10-19 13:32:28
+LastEditors  : agent
+LastEditTime : 2026-10-19 13:44:58
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/host/synth.py
+Description  : Procedural scenes for the balloon and goal trackers on the host. Balloons are shaded with the colors
+               inside the LAB thresholds of main.py and float around; distractors take the other balloon colors or
+               colors just outside the thresholds; the light drifts, the camera shakes and both blur.
+               Goals are retroreflective: dark under the ambient light, saturated while the IR LED is on. The LED pin
+               is read through the machine stand-in as every frame is rendered, so a scene streamed into
+               sensor.set_source answers the LED of the goal tracker; a saved scene with goals keeps every frame with
+               the LED off and on for host/replay.py. Frames are rendered on demand with their ground truth, a long
+               run never holds more than one frame.
+                   python -m host.synth scene.npz --frames 600 --balloons 2 --goals 1 --distractors 4
+                   python -m host.synth goal.npz --balloons 0 --goals 1 && python -m host.replay goal.npz --mode G
+                   python -m host.synth --bench --frames 1000 --size QVGA
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from host import board
+from host.detect import lab_table, normalize_threshold, rgb565_pack, rgb565_to_gray, rgb565_unpack
+
+# Macros
+# Must match host/stand_ins/sensor.py
+FRAME_SIZES = {"QQVGA": (160, 120), "HQVGA": (240, 160), "QVGA": (320, 240), "VGA": (640, 480)}
+IR_LED_PIN = "PG12"  # Must match the LEDpin of GoalTracker in lib/tracker.py
+## Colors
+COLOR_MARGIN = 2  # Balloon colors keep this far inside the thresholds, a little drift of the light keeps them in
+NEAR_MARGIN = 10  # Near-miss distractor colors are this far outside the thresholds at most
+HUE_SPREAD = 4  # The largest A + B difference between the shades of a body, a larger spread looks striped
+BACKGROUND_RGB = (118, 120, 112)  # The mean color of the background, gray so that no threshold takes it
+BACKGROUND_CONTRAST = 30  # The spread of the background texture
+BACKGROUND_CELL = 24  # The size of the background texture cells
+## Camera
+SHAKE_PX = 12  # The largest camera offset from the start
+SHAKE_ACCEL = 0.6  # The random acceleration of the camera per frame
+BLUR_PAD = 8  # The margin rendered around the frame for the camera motion blur
+EXPOSURE = 0.5  # The fraction of the frame period the shutter is open, scales the motion blur
+FRAME_RATE = 30  # The simulated camera frame rate, only gives the time stamps of the saved frames
+MAX_TAPS = 8  # The most positions averaged along a motion blur
+NOISE_SIGMA = 2.0  # The sensor noise in 8-bit units
+## Light
+GAIN_LIMITS = (0.6, 1.4)  # The limits of the drifting brightness
+GAIN_DRIFT = 0.01  # The random walk of the brightness per frame
+TINT_DRIFT = 0.004  # The random walk of the red and blue gains per frame
+VIGNETTE = 0.25  # The darkening at the corners
+## Goals
+GOAL_ALBEDO = 12  # The gray level of a goal under the ambient light
+GOAL_INNER = 0.65  # The inner radius of a goal ring relative to the outer one
+IR_GAIN = 400  # The brightness a goal reflects while the IR LED is on
+IR_FLOOD = 6  # The brightness the rest of the scene reflects while the IR LED is on
+## Motion
+BALLOON_ACCEL = 0.2  # The random acceleration of a balloon per frame
+GOAL_ACCEL = 0.1  # The random acceleration of a goal per frame
+DAMPING = 0.97  # The velocity kept from one frame to the next
+RADIUS_LIMITS = (6, 30)  # The limits of a balloon radius, the goals are twice as large
+RADIUS_DRIFT = 0.02  # The random walk of the log radius per frame (moving closer or away)
+MIN_VISIBLE_PX = 3  # A target with less of its box in the frame is left out of the ground truth
+
+
+def palette(threshold: tuple, margin: int = COLOR_MARGIN) -> np.ndarray:
+    """
+    @description: Get the colors inside a LAB threshold
+    @param       {tuple} threshold: The LAB threshold (Lmin, Lmax, Amin, Amax, Bmin, Bmax)
+    @param       {int} margin: The distance to keep from the bounds of the threshold, dropped if no color is left
+    @return      {np.ndarray} The RGB565 colors (uint16)
+    """
+    lab = lab_table()
+    bounds = np.array(normalize_threshold(threshold, True)).reshape(3, 2)
+    for m in (margin, 0):
+        inside = np.all((lab >= bounds[:, :1] + m) & (lab <= bounds[:, 1:] - m), axis=0)
+        if inside.any():
+            break
+    return np.flatnonzero(inside).astype(np.uint16)
+
+
+def near_palette(thresholds: list, margin: int = NEAR_MARGIN) -> np.ndarray:
+    """
+    @description: Get the colors just outside of every threshold, the near misses a detector should reject
+    @param       {list} thresholds: The LAB thresholds
+    @param       {int} margin: How far outside the colors may be
+    @return      {np.ndarray} The RGB565 colors (uint16)
+    """
+    lab = lab_table()
+    inside = np.zeros(lab.shape[1], dtype=bool)
+    near = np.zeros(lab.shape[1], dtype=bool)
+    for threshold in thresholds:
+        bounds = np.array(normalize_threshold(threshold, True)).reshape(3, 2)
+        inside |= np.all((lab >= bounds[:, :1]) & (lab <= bounds[:, 1:]), axis=0)
+        near |= np.all((lab >= bounds[:, :1] - margin) & (lab <= bounds[:, 1:] + margin), axis=0)
+    return np.flatnonzero(near & ~inside).astype(np.uint16)
+
+
+def main_thresholds() -> tuple:
+    """
+    @description: Get the LAB thresholds of main.py, installing the board stand-ins if needed
+    @return      {tuple} The thresholds of the tracked balloons (BALLON) and of the other balloon colors
+    """
+    if board.STAND_INS_DIR not in sys.path:
+        board.install()
+    import main as board_main
+
+    others = [threshold for threshold in board_main.GREEN + board_main.PURPLE if threshold not in board_main.BALLON]
+    return list(board_main.BALLON), others
+
+
+def _smooth_noise(rng, height: int, width: int, cell: int) -> np.ndarray:
+    """
+    @description: Smooth random texture, random values on a coarse grid interpolated bilinearly
+    @param       {*} rng: The random generator
+    @param       {int} height: The height of the texture
+    @param       {int} width: The width of the texture
+    @param       {int} cell: The size of the grid cells
+    @return      {np.ndarray} The texture [height, width] (float32, about -1 to 1)
+    """
+    grid = rng.uniform(-1, 1, (height // cell + 2, width // cell + 2)).astype(np.float32)
+    y = np.arange(height, dtype=np.float32) / cell
+    x = np.arange(width, dtype=np.float32) / cell
+    y0 = y.astype(np.int64)
+    x0 = x.astype(np.int64)
+    fy = (y - y0)[:, None]
+    fx = (x - x0)[None, :]
+    top = grid[y0][:, x0] * (1 - fx) + grid[y0][:, x0 + 1] * fx
+    bottom = grid[y0 + 1][:, x0] * (1 - fx) + grid[y0 + 1][:, x0 + 1] * fx
+    return top * (1 - fy) + bottom * fy
+
+
+class Body:
+    def __init__(self, kind: str, body_id: int, x: float, y: float, radius: float, colors: np.ndarray) -> None:
+        """
+        @description: A moving object of the scene: a balloon ("B"), a goal ("G") or a distractor ("X", "bar").
+        @param       {*} self:
+        @param       {str} kind: "B", "G", "X" (an ellipse) or "bar" (a thin bar)
+        @param       {int} body_id: The id in the ground truth
+        @param       {float} x: The x of the center in scene coordinates (the frame at the start)
+        @param       {float} y: The y of the center in scene coordinates
+        @param       {float} radius: The horizontal radius
+        @param       {np.ndarray} colors: The colors of the shading, darkest first (float32 RGB)
+        @return      {*} None
+        """
+        self.kind = kind
+        self.id = body_id
+        self.x = x
+        self.y = y
+        self.vx = 0.0
+        self.vy = 0.0
+        self.radius = radius
+        self.aspect = 1.15 if kind == "B" else (0.15 if kind == "bar" else 1.0)  # The height over the width
+        self.colors = colors
+
+
+class Scene:
+    def __init__(
+        self,
+        size: str = "HQVGA",
+        balloons: int = 1,
+        goals: int = 0,
+        distractors: int = 2,
+        thresholds: list = None,
+        distractor_thresholds: list = None,
+        grayscale: bool = False,
+        seed: int = 0,
+        noise: float = NOISE_SIGMA,
+        shake: float = SHAKE_ACCEL,
+        drift: float = GAIN_DRIFT,
+        exposure: float = EXPOSURE,
+        led_pin: str = IR_LED_PIN,
+    ) -> None:
+        """
+        @description: Constructor of a procedural scene.
+        @param       {*} self:
+        @param       {str} size: The frame size, a key of FRAME_SIZES (default: "HQVGA")
+        @param       {int} balloons: Number of balloons (default: 1)
+        @param       {int} goals: Number of retroreflective goals (default: 0)
+        @param       {int} distractors: Number of distractors (default: 2)
+        @param       {list} thresholds: The LAB thresholds of the balloon colors (default: BALLON of main.py)
+        @param       {list} distractor_thresholds: The LAB thresholds of the other balloon colors, taken by the
+                                                   distractors with the near misses (default: the others of main.py)
+        @param       {bool} grayscale: Whether to render grayscale (uint8) frames instead of RGB565 (default: False)
+        @param       {int} seed: The seed of the scene (default: 0)
+        @param       {float} noise: The sensor noise in 8-bit units (default: 2)
+        @param       {float} shake: The random acceleration of the camera, 0 for a still camera (default: 0.6)
+        @param       {float} drift: The random walk of the brightness, 0 for a steady light (default: 0.01)
+        @param       {float} exposure: The fraction of the frame period the shutter is open, 0 for no motion blur
+                                       (default: 0.5)
+        @param       {str} led_pin: The pin of the IR LED (default: "PG12")
+        @return      {*} None
+        """
+        if thresholds is None or distractor_thresholds is None:
+            tracked, others = main_thresholds()
+            thresholds = tracked if thresholds is None else thresholds
+            distractor_thresholds = others if distractor_thresholds is None else distractor_thresholds
+        self.width, self.height = FRAME_SIZES[size]
+        self.grayscale = grayscale
+        self.rng = np.random.default_rng(seed)
+        self.noise = noise
+        self.shake = shake
+        self.drift = drift
+        self.exposure = exposure
+        self.led_pin = led_pin
+        self.index = 0  # The index of the next frame
+        # The camera, offset from its position at the start
+        self.camera = np.zeros(2)
+        self.camera_v = np.zeros(2)
+        # The light
+        self.gain = 1.0
+        self.tint = np.ones(3, dtype=np.float32)  # The gains of the red, green and blue channels
+        y, x = np.mgrid[0 : self.height, 0 : self.width].astype(np.float32)
+        r2 = ((x / self.width - 0.5) ** 2 + (y / self.height - 0.5) ** 2) * 2
+        self.vignette = (1 - VIGNETTE * r2)[:, :, None]
+        # The background, large enough for the shake and the blur
+        pad = SHAKE_PX + BLUR_PAD + 1
+        self.pad = pad
+        h, w = self.height + 2 * pad, self.width + 2 * pad
+        texture = _smooth_noise(self.rng, h, w, BACKGROUND_CELL) + 0.3 * _smooth_noise(self.rng, h, w, 5)
+        sky = np.linspace(1.15, 0.85, h, dtype=np.float32)[:, None]  # Brighter at the top
+        self.background = (
+            np.array(BACKGROUND_RGB, dtype=np.float32) * sky[:, :, None]
+            + (BACKGROUND_CONTRAST * texture)[:, :, None]
+        ).astype(np.float32)
+        # The bodies, the targets first
+        self.bodies = []
+        balloon_colors = [palette(threshold) for threshold in thresholds]
+        for i in range(balloons):
+            colors = balloon_colors[i % len(balloon_colors)]
+            self.bodies.append(Body("B", i, *self._spawn(RADIUS_LIMITS), self._shades(colors)))
+        gray = np.full((1, 3), GOAL_ALBEDO, dtype=np.float32)
+        for i in range(goals):
+            self.bodies.append(Body("G", balloons + i, *self._spawn([2 * r for r in RADIUS_LIMITS]), gray))
+        near = near_palette(list(thresholds) + list(distractor_thresholds))
+        other_colors = [palette(threshold) for threshold in distractor_thresholds]
+        for i in range(distractors):
+            colors = other_colors[i % len(other_colors)] if other_colors and i % 2 else near
+            kind = "bar" if i % 3 == 2 else "X"
+            self.bodies.append(Body(kind, -1 - i, *self._spawn(RADIUS_LIMITS), self._shades(colors)))
+        self.truth = None  # The ground truth of the last frame rendered
+
+    def _spawn(self, radius_limits: tuple) -> tuple:
+        radius = float(self.rng.uniform(*radius_limits))
+        x = float(self.rng.uniform(radius, self.width - radius))
+        y = float(self.rng.uniform(radius, self.height - radius))
+        return x, y, radius
+
+    def _shades(self, colors: np.ndarray) -> np.ndarray:
+        """
+        @description: Pick the shades of a body: the colors of about one hue around a random color, darkest first
+        @param       {*} self:
+        @param       {np.ndarray} colors: The RGB565 colors to pick from
+        @return      {np.ndarray} The shades [shades, 3] (float32 RGB)
+        """
+        lab = lab_table()[:, colors].astype(np.int64)
+        center = lab[:, int(self.rng.integers(0, len(colors)))]
+        hue = np.abs(lab[1] - center[1]) + np.abs(lab[2] - center[2]) <= HUE_SPREAD
+        shades = colors[hue][np.argsort(lab[0, hue], kind="stable")]
+        return np.stack(rgb565_unpack(shades), axis=1).astype(np.float32)
+
+    def _led(self) -> bool:
+        # The IR LED is off until the board code sets up the pin through the machine stand-in
+        machine = sys.modules.get("machine")
+        return bool(getattr(machine, "PIN_STATES", {}).get(self.led_pin, 0))
+
+    def _draw(self, canvas: np.ndarray, ir: np.ndarray, body: Body, origin: np.ndarray, led: bool) -> None:
+        """
+        @description: Draw a body into the canvas, averaged along its motion while the shutter is open
+        @param       {*} self:
+        @param       {np.ndarray} canvas: The canvas [height, width, 3] (float32 RGB)
+        @param       {np.ndarray} ir: The IR reflection [height, width] (float32), None while the LED is off
+        @param       {Body} body: The body
+        @param       {np.ndarray} origin: The scene coordinates of the top left corner of the canvas
+        @param       {bool} led: Whether the IR LED is on
+        @return      {*} None
+        """
+        rx = body.radius
+        ry = body.radius * body.aspect
+        # The relative motion to the camera is blurred by the camera pass
+        sweep = np.array([body.vx, body.vy]) * self.exposure
+        taps = int(min(MAX_TAPS, np.ceil(np.hypot(*sweep)) + 1))
+        cx = body.x - origin[0]
+        cy = body.y - origin[1]
+        x0 = int(max(0, np.floor(cx - rx - abs(sweep[0]) / 2 - 1)))
+        x1 = int(min(canvas.shape[1], np.ceil(cx + rx + abs(sweep[0]) / 2 + 2)))
+        y0 = int(max(0, np.floor(cy - ry - abs(sweep[1]) / 2 - 1)))
+        y1 = int(min(canvas.shape[0], np.ceil(cy + ry + abs(sweep[1]) / 2 + 2)))
+        if x0 >= x1 or y0 >= y1:
+            return
+        yy, xx = np.mgrid[y0:y1, x0:x1].astype(np.float32)
+        alpha = np.zeros(yy.shape, dtype=np.float32)
+        color = np.zeros(yy.shape + (3,), dtype=np.float32)
+        for t in np.linspace(-0.5, 0.5, taps) if taps > 1 else (0.0,):
+            dx = (xx - (cx + t * sweep[0])) / rx
+            dy = (yy - (cy + t * sweep[1])) / ry
+            if body.kind == "bar":
+                edge = np.minimum(1 - np.abs(dx), 1 - np.abs(dy))
+            else:
+                edge = 1 - np.sqrt(dx * dx + dy * dy)
+            coverage = np.clip(edge * min(rx, ry) + 0.5, 0, 1)  # Anti-aliased over about a pixel
+            if body.kind == "G":
+                inner = np.clip((edge - (1 - GOAL_INNER)) * min(rx, ry) + 0.5, 0, 1)
+                coverage = coverage - inner  # A ring
+            # The light comes from the top left, the shading picks the colors darkest first
+            shade = np.clip(1 - np.sqrt((dx + 0.35) ** 2 + (dy + 0.35) ** 2) / 1.35, 0, 1)
+            shades = body.colors[(shade * (len(body.colors) - 1)).astype(np.int64)]
+            alpha += coverage
+            color += shades * coverage[:, :, None]
+        alpha /= taps
+        color /= np.maximum(alpha * taps, 1e-6)[:, :, None]
+        patch = canvas[y0:y1, x0:x1]
+        patch += (color - patch) * alpha[:, :, None]
+        if ir is not None and body.kind == "G" and led:
+            ir[y0:y1, x0:x1] += IR_GAIN * alpha
+
+    def _ground_truth(self, led: bool) -> dict:
+        """
+        @description: The boxes of the targets in the frame, clipped to the frame
+        @param       {*} self:
+        @param       {bool} led: Whether the IR LED was on
+        @return      {dict} index, boxes [targets, 4] (NaN if out of the frame), ids, kinds ("B" or "G"), led, gain and
+                            camera
+        """
+        targets = [body for body in self.bodies if body.kind in ("B", "G")]
+        boxes = np.full((len(targets), 4), np.nan)
+        for i, body in enumerate(targets):
+            rx = body.radius
+            ry = body.radius * body.aspect
+            x0 = max(0.0, body.x - self.camera[0] - rx)
+            y0 = max(0.0, body.y - self.camera[1] - ry)
+            x1 = min(float(self.width), body.x - self.camera[0] + rx)
+            y1 = min(float(self.height), body.y - self.camera[1] + ry)
+            if x1 - x0 >= MIN_VISIBLE_PX and y1 - y0 >= MIN_VISIBLE_PX:
+                boxes[i] = [x0, y0, x1 - x0, y1 - y0]
+        return {
+            "index": self.index,
+            "boxes": boxes,
+            "ids": np.array([body.id for body in targets], dtype=np.int64),
+            "kinds": [body.kind for body in targets],
+            "led": led,
+            "gain": self.gain,
+            "camera": tuple(self.camera),
+        }
+
+    def render(self, led: bool = None) -> np.ndarray:
+        """
+        @description: Render the current frame; the ground truth is left in self.truth
+        @param       {*} self:
+        @param       {bool} led: Whether the IR LED is on (default: None, read from the LED pin now)
+        @return      {np.ndarray} The frame [height, width], RGB565 (uint16) or grayscale (uint8)
+        """
+        led = self._led() if led is None else led
+        b = BLUR_PAD
+        origin = self.camera - b  # The scene coordinates of the canvas corner
+        cx0 = int(np.floor(self.camera[0])) + self.pad - b
+        cy0 = int(np.floor(self.camera[1])) + self.pad - b
+        canvas = self.background[cy0 : cy0 + self.height + 2 * b, cx0 : cx0 + self.width + 2 * b].copy()
+        origin = origin - (self.camera - np.floor(self.camera))  # The background moves by whole pixels
+        ir = np.zeros(canvas.shape[:2], dtype=np.float32) if led else None
+        for body in self.bodies:
+            self._draw(canvas, ir, body, origin, led)
+        # The camera motion smears everything
+        sweep = self.camera_v * self.exposure
+        taps = int(min(MAX_TAPS, np.ceil(np.hypot(*sweep)) + 1))
+        offsets = [np.rint(t * sweep).astype(np.int64) for t in np.linspace(-0.5, 0.5, taps)] if taps > 1 else [(0, 0)]
+        frame = np.zeros((self.height, self.width, 3), dtype=np.float32)
+        reflected = np.zeros((self.height, self.width), dtype=np.float32) if led else None
+        for dx, dy in offsets:
+            frame += canvas[b + dy : b + dy + self.height, b + dx : b + dx + self.width]
+            if led:
+                reflected += ir[b + dy : b + dy + self.height, b + dx : b + dx + self.width]
+        frame *= (self.gain / len(offsets)) * self.tint
+        frame *= self.vignette
+        if led:
+            frame += (IR_FLOOD + reflected / len(offsets))[:, :, None]
+        if self.noise:
+            frame += self.rng.standard_normal(frame.shape, dtype=np.float32) * self.noise
+        np.clip(frame, 0, 255, out=frame)
+        pixels = rgb565_pack(frame[:, :, 0], frame[:, :, 1], frame[:, :, 2])
+        self.truth = self._ground_truth(led)
+        return rgb565_to_gray(pixels) if self.grayscale else pixels
+
+    def step(self) -> None:
+        """
+        @description: Move the camera, the light and the bodies on by one frame
+        @param       {*} self:
+        @return      {*} None
+        """
+        rng = self.rng
+        self.index += 1
+        # The camera shakes around its start
+        self.camera_v = DAMPING * self.camera_v + rng.normal(0, self.shake, 2) - 0.02 * self.camera
+        self.camera = np.clip(self.camera + self.camera_v, -SHAKE_PX, SHAKE_PX)
+        # The light drifts back toward its mean
+        self.gain = float(np.clip(self.gain + rng.normal(0, self.drift) + 0.01 * (1 - self.gain), *GAIN_LIMITS))
+        tint = self.tint + rng.normal(0, TINT_DRIFT * (self.drift > 0), 3) + 0.01 * (1 - self.tint)
+        tint[1] = 1.0
+        self.tint = tint.astype(np.float32)
+        for body in self.bodies:
+            accel = GOAL_ACCEL if body.kind == "G" else BALLOON_ACCEL
+            body.vx = DAMPING * body.vx + rng.normal(0, accel)
+            body.vy = DAMPING * body.vy + rng.normal(0, accel)
+            body.x += body.vx
+            body.y += body.vy
+            # Bounce back before leaving the frame for good
+            if body.x < -body.radius / 2 or body.x > self.width + body.radius / 2:
+                body.vx = -body.vx
+                body.x = float(np.clip(body.x, -body.radius / 2, self.width + body.radius / 2))
+            if body.y < -body.radius / 2 or body.y > self.height + body.radius / 2:
+                body.vy = -body.vy
+                body.y = float(np.clip(body.y, -body.radius / 2, self.height + body.radius / 2))
+            if body.kind != "G":
+                body.radius = float(np.clip(body.radius * np.exp(rng.normal(0, RADIUS_DRIFT)), *RADIUS_LIMITS))
+
+    def stream(self, count: int = None, lit: bool = False):
+        """
+        @description: Render the frames one at a time
+        @param       {*} self:
+        @param       {int} count: The number of frames, None for no end (default: None)
+        @param       {bool} lit: Whether to render every frame with the IR LED off and on instead of reading the LED
+                                 pin (default: False)
+        @return      {*} A generator of (frame, ground truth), or of ((frame, frame with the LED on), ground truth)
+        """
+        rendered = 0
+        while count is None or rendered < count:
+            if lit:
+                frame = self.render(led=False)
+                truth = self.truth
+                frame = (frame, self.render(led=True))
+            else:
+                frame = self.render()
+                truth = self.truth
+            self.step()
+            rendered += 1
+            yield frame, truth
+
+    def frames(self, count: int = None, truth: list = None):
+        """
+        @description: Render the frames one at a time, e.g. for sensor.set_source
+        @param       {*} self:
+        @param       {int} count: The number of frames, None for no end (default: None)
+        @param       {list} truth: The list the ground truth of every frame is appended to (default: not kept)
+        @return      {*} A generator of frames
+        """
+        for frame, frame_truth in self.stream(count):
+            if truth is not None:
+                truth.append(frame_truth)
+            yield frame
+
+
+def save(path: str, scene: Scene, count: int) -> None:
+    """
+    @description: Render frames into a sequence for host/replay.py (frames, boxes, ids, kinds, led, t_ms). A scene
+                  with goals also saves every frame with the IR LED on (frames_ir), which the replay returns while
+                  the board code has the LED on, since a saved frame cannot answer the LED like a streamed one
+    @param       {str} path: The path of the .npz file
+    @param       {Scene} scene: The scene
+    @param       {int} count: The number of frames
+    @return      {*} None
+    """
+    lit = any(body.kind == "G" for body in scene.bodies)
+    rendered = list(scene.stream(count, lit=lit))
+    truth = [t for _, t in rendered]
+    extra = {}
+    if lit:
+        frames = np.stack([frame[0] for frame, _ in rendered])
+        extra["frames_ir"] = np.stack([frame[1] for frame, _ in rendered])
+    else:
+        frames = np.stack([frame for frame, _ in rendered])
+    np.savez_compressed(
+        path,
+        frames=frames,
+        boxes=np.stack([t["boxes"] for t in truth]),
+        ids=np.stack([t["ids"] for t in truth]),
+        kinds=np.array(truth[0]["kinds"] if truth else []),
+        led=np.array([t["led"] for t in truth]),
+        t_ms=np.arange(len(frames)) * 1000.0 / FRAME_RATE,
+        **extra
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Render a procedural balloon and goal scene.")
+    parser.add_argument("path", nargs="?", help="The .npz file to write")
+    parser.add_argument("--frames", type=int, default=300, help="The number of frames")
+    parser.add_argument("--size", default="HQVGA", choices=sorted(FRAME_SIZES), help="The frame size")
+    parser.add_argument("--balloons", type=int, default=1, help="Number of balloons")
+    parser.add_argument("--goals", type=int, default=0, help="Number of retroreflective goals")
+    parser.add_argument("--distractors", type=int, default=2, help="Number of distractors")
+    parser.add_argument("--gray", action="store_true", help="Render grayscale frames")
+    parser.add_argument("--noise", type=float, default=NOISE_SIGMA, help="The sensor noise in 8-bit units")
+    parser.add_argument("--shake", type=float, default=SHAKE_ACCEL, help="The camera shake, 0 for a still camera")
+    parser.add_argument("--drift", type=float, default=GAIN_DRIFT, help="The light drift, 0 for a steady light")
+    parser.add_argument("--exposure", type=float, default=EXPOSURE, help="The shutter fraction, 0 for no blur")
+    parser.add_argument("--seed", type=int, default=0, help="The seed of the scene")
+    parser.add_argument("--bench", action="store_true", help="Only measure the rendering rate")
+    args = parser.parse_args()
+
+    scene = Scene(
+        args.size,
+        args.balloons,
+        args.goals,
+        args.distractors,
+        grayscale=args.gray,
+        seed=args.seed,
+        noise=args.noise,
+        shake=args.shake,
+        drift=args.drift,
+        exposure=args.exposure,
+    )
+    if args.bench or not args.path:
+        t_start = time.perf_counter()
+        for _ in scene.frames(args.frames):
+            pass
+        elapsed = time.perf_counter() - t_start
+        print(
+            "{} frames {}x{} in {:.2f} s, {:.0f} fps".format(
+                args.frames, scene.width, scene.height, elapsed, args.frames / elapsed
+            )
+        )
+        return
+    save(args.path, scene, args.frames)
+    print("Wrote {} frames to {}".format(args.frames, args.path))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Author       : agent
+Date         : 2026-10-19 12:39:46
+LastEditors  : agent
+LastEditTime : 2026-10-19 14:00:03
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/host/tracelog.py
+Description  : Memory-mapped reader of the binary tracker traces written by lib/trace.py.
+"""
+
+import argparse
+import os
+import struct
+
+import numpy as np
+
+# Macros
+TRACE_MAGIC = b"BCTR"  # Must match lib/trace.py
+HEADER_FMT = "<4sHH8x"  # Must match lib/trace.py
+HEADER_SIZE = struct.calcsize(HEADER_FMT)
+TIMING_STAGES = ("snapshot", "detect", "find_blobs", "update", "total")  # Must match lib/trace.py
+GATE_STAGES = ("code", "overlap", "size", "distance")  # Must match lib/curblob.py
+
+## Flags, must match lib/trace.py
+FLAG_TRACKED = 0x01
+FLAG_DETECTED = 0x02
+FLAG_REACQUIRED = 0x04
+FLAG_LOST = 0x08
+
+## Record layouts by trace version, little endian and packed exactly like lib/trace.py RECORD_FMT
+_RECORD_FIELDS_V1 = [
+    ("frame", "<u4"),
+    ("t_ms", "<u4"),
+    ("mode", "u1"),
+    ("flags", "u1"),
+    ("untracked", "u1"),
+    ("n_thresholds", "u1"),
+    ("track_id", "<u2"),
+    ("n_candidates", "<u2"),
+    ("feature", "<f4", (5,)),
+    ("roi", "<i2", (4,)),
+    ("thresholds", "i1", (2, 6)),
+    ("timings", "<u4", (len(TIMING_STAGES),)),
+]
+_RECORD_FIELDS_V2 = _RECORD_FIELDS_V1 + [("rejections", "<u2", (len(GATE_STAGES),))]
+RECORD_DTYPES = {
+    1: np.dtype(_RECORD_FIELDS_V1),
+    2: np.dtype(_RECORD_FIELDS_V2),
+    3: np.dtype(_RECORD_FIELDS_V2 + [("frame_age_us", "<u4"), ("dropped", "<u2")]),
+}
+
+
+def read_header(path: str) -> tuple:
+    """
+    @description: Read and validate the header of a trace file
+    @param       {str} path: The path of the trace file
+    @return      {tuple} The version and the record dtype of the trace
+    """
+    with open(path, "rb") as f:
+        header = f.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE:
+        raise ValueError("{} is too short to be a trace file!".format(path))
+    magic, version, record_size = struct.unpack(HEADER_FMT, header)
+    if magic != TRACE_MAGIC:
+        raise ValueError("{} is not a trace file!".format(path))
+    if version not in RECORD_DTYPES:
+        raise ValueError("Unsupported trace version {} in {}!".format(version, path))
+    dtype = RECORD_DTYPES[version]
+    if dtype.itemsize != record_size:
+        raise ValueError("Record size mismatch in {}: {} != {}".format(path, record_size, dtype.itemsize))
+    return version, dtype
+
+
+def open_trace(path: str) -> np.ndarray:
+    """
+    @description: Memory-map a trace file as a structured array, columns are views and nothing is copied
+    @param       {str} path: The path of the trace file
+    @return      {np.ndarray} The records of the trace, a truncated last record is ignored
+    """
+    _, dtype = read_header(path)
+    n_records = (os.path.getsize(path) - HEADER_SIZE) // dtype.itemsize
+    if n_records == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=HEADER_SIZE, shape=(n_records,))
+
+
+def open_corpus(paths: list) -> list:
+    """
+    @description: Memory-map a list of trace files, directories are searched for *.bct files
+    @param       {list} paths: The paths of the trace files or directories
+    @return      {list} The (path, records) pairs of every trace found
+    """
+    traces = []
+    for path in paths:
+        if os.path.isdir(path):
+            names = sorted(name for name in os.listdir(path) if name.endswith(".bct"))
+            traces.extend((os.path.join(path, name), open_trace(os.path.join(path, name))) for name in names)
+        else:
+            traces.append((path, open_trace(path)))
+    return traces
+
+
+def timing(records: np.ndarray, stage: str) -> np.ndarray:
+    """
+    @description: Get the timing column of one processing stage
+    @param       {np.ndarray} records: The records of a trace
+    @param       {str} stage: The name of the stage, one of TIMING_STAGES
+    @return      {np.ndarray} The stage timings in microseconds (a view)
+    """
+    return records["timings"][:, TIMING_STAGES.index(stage)]
+
+
+def summarize(records: np.ndarray) -> dict:
+    """
+    @description: Compute the summary statistics of a trace
+    @param       {np.ndarray} records: The records of a trace
+    @return      {dict} The summary statistics
+    """
+    n = len(records)
+    if n == 0:
+        return {"frames": 0}
+    flags = records["flags"]
+    total = timing(records, "total")
+    valid_total = total[total > 0]
+    summary = {
+        "frames": n,
+        "duration_s": float((records["t_ms"][-1] - records["t_ms"][0]) / 1000),
+        "tracked": float(np.count_nonzero(flags & FLAG_TRACKED) / n),
+        "detected": float(np.count_nonzero(flags & FLAG_DETECTED) / n),
+        "losses": int(np.count_nonzero(flags & FLAG_LOST)),
+        "tracks": int(len(np.unique(records["track_id"][(flags & FLAG_TRACKED) > 0]))),
+        "candidates": float(records["n_candidates"].mean()),
+        "frame_us": float(valid_total.mean()) if len(valid_total) else 0.0,
+        "frame_us_p95": float(np.percentile(valid_total, 95)) if len(valid_total) else 0.0,
+    }
+    if "rejections" in records.dtype.names:
+        # Candidates rejected per frame by every gating stage, the later stages cost more per candidate
+        for i, stage in enumerate(GATE_STAGES):
+            summary["rejected_" + stage] = float(records["rejections"][:, i].mean())
+    if "frame_age_us" in records.dtype.names:
+        # Estimated by lib/capture.py, zero when the tracker took the frames without it
+        summary["frame_age_us"] = float(records["frame_age_us"].mean())
+        summary["frame_age_us_max"] = int(records["frame_age_us"].max())
+        summary["dropped"] = int(records["dropped"].sum(dtype=np.int64))
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Summarize binary tracker traces (*.bct).")
+    parser.add_argument("paths", nargs="+", help="Trace files or directories of trace files")
+    args = parser.parse_args()
+    for path, records in open_corpus(args.paths):
+        summary = summarize(records)
+        print(path)
+        width = max(len(key) for key in summary) + 2  # The rejection and frame age fields are longer than the rest
+        for key, value in summary.items():
+            print("    {:<{}}{}".format(key, width, round(value, 3) if isinstance(value, float) else value))
+
+
+if __name__ == "__main__":
+    main()
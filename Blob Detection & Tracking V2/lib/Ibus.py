@@ -14,18 +14,28 @@ IBUS_MSG_LEN = 32  # The length of the iBus message
 IBUS_MSG_HEADER = [0x20, 0x40]  # The header of the iBus message
 NICLA_TGT = 0x81  # Flag to set Nicla in target mode
 NICLA_GAL = 0x82  # Flag to set Nicla in goal mode
+NICLA_DUAL = 0x83  # Flag to set Nicla in dual mode (balloons and goals interleaved)
 
 
 class IBus:
-    def __init__(self, pinset: str = "LP1", baudrate: int = 115200, timeout: int = 2000) -> None:
+    def __init__(
+        self, pinset: str = "LP1", baudrate: int = 115200, timeout: int = 2000, compact: bool = False
+    ) -> None:
         """
         @description: Initialize the iBus object.
         @param       {*} self:
         @param       {str} pinset: The set of RX and TX pins for the UART (Should not be changed)
         @param       {int} baudrate: The baudrate of the UART (Default: 115200)
         @param       {int} timeout: The timeout time for the UART (Default: 2000)
+        @param       {bool} compact: Whether to send the compact multi-target frames of lib/compact.py instead of the
+                                     14 channels (Default: False)
         @return      {*} None
         """
+        self.encoder = None  # The compact frame encoder, encodes at send time so every frame sent is in sequence
+        if compact:
+            from lib.compact import CompactEncoder
+
+            self.encoder = CompactEncoder()
         # Initialize the UART
         self.uart = UART(pinset, baudrate, timeout_char=timeout)  # (TX, RX) = (P1, P0) = (PB14, PB15)
         # Flush the buffer
@@ -35,19 +45,26 @@ class IBus:
         """
         @description: Pack the raw_msg into a iBus message.
         @param       {*} self:
-        @param       {list} raw_msg: The raw message to be packed
+        @param       {list} raw_msg: The raw message to be packed, a compact payload list with the compact frames
         @return      {bytearray} The packed iBus message
         """
         msg = bytearray(IBUS_MSG_LEN)
         msg[0] = IBUS_MSG_HEADER[0]
         msg[1] = IBUS_MSG_HEADER[1]
-        # Check the raw_msg length
-        if len(raw_msg) > 14:
-            raise ValueError("The length of the raw_msg is too long!")
-        for i in range(len(raw_msg)):
-            raw_byte_tuple = bytearray(raw_msg[i].to_bytes(2, "little"))  # Convert the int to a byte tuple
-            msg[2 * i + 2] = raw_byte_tuple[0]
-            msg[2 * i + 3] = raw_byte_tuple[1]
+        if self.encoder:
+            # The bit-packed payload replaces the channels
+            payload = self.encoder.encode(raw_msg)
+            for i in range(len(payload)):
+                msg[i + 2] = payload[i]
+        else:
+            # Check the raw_msg length
+            if len(raw_msg) > 14:
+                raise ValueError("The length of the raw_msg is too long!")
+            for i in range(len(raw_msg)):
+                # Convert the int to a byte tuple, negative values are sent in two's complement
+                raw_byte_tuple = bytearray((raw_msg[i] & 0xFFFF).to_bytes(2, "little"))
+                msg[2 * i + 2] = raw_byte_tuple[0]
+                msg[2 * i + 3] = raw_byte_tuple[1]
 
         # Calculate the checksum
         chA, chB = self._checksum(msg[:-2])
@@ -85,8 +102,7 @@ class IBus:
         @param       {list} raw_msg: The raw message to be sent
         @return      {*} None
         """
-        # Flush the buffer
-        self._flush_buffer()
+        # The bytes received are left for receive, a flag arriving while a frame is processed is not lost
         # Pack the message
         msg = self._pack_msg(raw_msg)
         self.uart.write(msg)
@@ -95,16 +111,21 @@ class IBus:
         """
         @description: Receive the message from the UART.
         @param       {*} self: -
-        @return      {str} The flag to set Nicla in target mode or goal mode
+        @return      {str} The mode requested: "B" (target), "G" (goal) or "D" (dual); "N" if malformed, None if nothing
         """
         if self.uart.any():
             msg = self.uart.read()
-            if msg == NICLA_TGT:
-                return "T"
-            elif msg == NICLA_GAL:
-                return "G"
-            else:
-                return "N"  # Receive malformed message
+            if not msg:
+                return "N"
+            # The latest flag wins if several arrived since the last frame, a corrupted byte does not hide it
+            for flag in reversed(msg):
+                if flag == NICLA_TGT:
+                    return "B"
+                elif flag == NICLA_GAL:
+                    return "G"
+                elif flag == NICLA_DUAL:
+                    return "D"
+            return "N"  # Receive malformed message
 
 
 if __name__ == "__main__":
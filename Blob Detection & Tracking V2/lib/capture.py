@@ -0,0 +1,76 @@
+"""
+Author       : agent
+Date         : 2026-10-19 13:10:04
+LastEditors  : agent
+LastEditTime : 2026-10-19 13:10:04
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/lib/capture.py
+Description  : Multi-buffered capture: with two or three frame buffers the sensor reads out the next frame while the
+               current one is tracked. The firmware does not stamp the frames, so the age of every frame and the
+               frames dropped before it are estimated from the time snapshot blocked and the frame period.
+"""
+
+import sensor
+import time
+
+# Macros
+FRAME_BUFFERS = 1  # 1 waits for a new frame in every snapshot, 2 double buffers, 3 triple buffers (newest frame)
+FRAME_PERIOD_US = 33333  # The frame period of the sensor
+WAIT_SLACK_US = 1000  # A snapshot blocking longer than this waited for the readout of the frame it returns
+
+
+class Capture:
+    def __init__(self, buffers: int = FRAME_BUFFERS, frame_period_us: int = FRAME_PERIOD_US) -> None:
+        """
+        @description: Constructor of the capture, sets the number of frame buffers of the sensor.
+        @param       {*} self:
+        @param       {int} buffers: The number of frame buffers (default: 1)
+        @param       {int} frame_period_us: The frame period of the sensor (default: 33333)
+        @return      {*} None
+        """
+        self.buffers = buffers
+        self.frame_period_us = frame_period_us
+        sensor.set_framebuffers(buffers)
+        self.frames = 0  # Number of frames taken
+        self.dropped = 0  # Number of frames read out but never returned, overwritten or missed while stalled
+        self.new_drops = 0  # Number of frames dropped right before the last one
+        self.age_us = 0  # The time from the end of the readout of the last frame to its return
+        self.max_age_us = 0
+        self.wait_us = 0  # The time the last snapshot blocked
+        self._newest_us = None  # The estimated end of the readout of the newest frame of the sensor
+        self._returned_us = None  # The time the previous snapshot returned
+
+    def snapshot(self):
+        """
+        @description: Take the next frame and estimate its age and the frames dropped before it.
+        @param       {*} self:
+        @return      {image.Image} The frame
+        """
+        t_call = time.ticks_us()
+        img = sensor.snapshot()
+        now = time.ticks_us()
+        self.wait_us = time.ticks_diff(now, t_call)
+        period = self.frame_period_us
+        if self._newest_us is None or self.buffers == 1 or self.wait_us > WAIT_SLACK_US:
+            # The frame was read out while snapshot waited, the frame period is counted from it
+            elapsed = 0 if self._newest_us is None else time.ticks_diff(now, self._newest_us)
+            self.new_drops = max(0, (elapsed + period // 2) // period - 1)
+            ready_us = now
+            self._newest_us = now
+        else:
+            # The frame was buffered, the sensor went on reading out one frame per period since the newest one
+            count = max(1, time.ticks_diff(now, self._newest_us) // period)
+            newest_us = time.ticks_add(self._newest_us, count * period)
+            if self.buffers >= 3:
+                ready_us = newest_us  # The older frames were overwritten
+            else:
+                # The only free buffer was filled at the first readout after the previous return, then the sensor stalled
+                since = max(0, time.ticks_diff(self._returned_us, self._newest_us))
+                ready_us = time.ticks_add(self._newest_us, min(count, since // period + 1) * period)
+            self.new_drops = count - 1
+            self._newest_us = newest_us
+        self._returned_us = now
+        self.frames += 1
+        self.dropped += self.new_drops
+        self.age_us = max(0, time.ticks_diff(now, ready_us))
+        self.max_age_us = max(self.max_age_us, self.age_us)
+        return img
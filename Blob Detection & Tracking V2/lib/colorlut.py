@@ -0,0 +1,92 @@
+"""
+Author       : agent
+Date         : 2026-10-19 12:50:47
+LastEditors  : agent
+LastEditTime : 2026-10-19 12:50:47
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/lib/colorlut.py
+Description  : The learned color classifier compiled offline (see host/colormodel.py) to an RGB565 lookup table.
+               find_blobs still runs on the L*a*b* bounding box of every color, then the candidate blobs are checked
+               by sampling their pixels through the table, which drops the loose corners of the box.
+"""
+
+import struct
+
+# Macros
+LUT_MAGIC = b"BCLU"  # The magic bytes at the start of every table file
+LUT_VERSION = 1  # The version of the file layout
+HEADER_FMT = "<4sHH"  # Magic, version, number of colors
+COLOR_FMT = "<16s6b"  # Name, L*a*b* bounding box (Lmin, Lmax, Amin, Amax, Bmin, Bmax)
+BITSET_SIZE = 8192  # One bit per RGB565 value
+SAMPLE_GRID = 5  # The blob is sampled on a SAMPLE_GRID x SAMPLE_GRID grid
+SAMPLE_SPAN = 0.6  # The share of the blob rectangle covered by the grid, the corners of round blobs are skipped
+MIN_MATCH_RATIO = 0.5  # The minimum share of the samples the table must accept
+
+
+class ColorLUT:
+    def __init__(self, path: str, min_match_ratio: float = MIN_MATCH_RATIO) -> None:
+        """
+        @description: Constructor of the color lookup table, loads a table file.
+        @param       {*} self:
+        @param       {str} path: The path of the table file
+        @param       {float} min_match_ratio: The minimum share of accepted samples for a blob to pass (default: 0.5)
+        @return      {*} None
+        """
+        self.min_match_ratio = min_match_ratio
+        self.names = []  # The name of every color
+        self.thresholds = []  # The L*a*b* bounding box of every color, code 1 << i belongs to color i
+        self.bitsets = []  # The table of every color, bit (v & 7) of byte v >> 3 is set when RGB565 value v matches
+        with open(path, "rb") as f:
+            magic, version, n_colors = struct.unpack(HEADER_FMT, f.read(struct.calcsize(HEADER_FMT)))
+            if magic != LUT_MAGIC or version != LUT_VERSION:
+                raise ValueError("Not a color table (version {}): {}".format(LUT_VERSION, path))
+            for _ in range(n_colors):
+                fields = struct.unpack(COLOR_FMT, f.read(struct.calcsize(COLOR_FMT)))
+                self.names.append(fields[0].rstrip(b"\0").decode())
+                self.thresholds.append(tuple(fields[1:]))
+                self.bitsets.append(bytearray(f.read(BITSET_SIZE)))
+
+    def contains(self, color: int, value: int) -> bool:
+        """
+        @description: Check whether an RGB565 value belongs to a color.
+        @param       {*} self:
+        @param       {int} color: The index of the color
+        @param       {int} value: The RGB565 value
+        @return      {bool} Whether the table accepts the value
+        """
+        return (self.bitsets[color][value >> 3] >> (value & 7)) & 1 == 1
+
+    def match_ratio(self, img, blob) -> float:
+        """
+        @description: Get the share of the sampled pixels of a blob accepted by the table of its color.
+        @param       {*} self:
+        @param       {image} img: The RGB565 image the blob was found in
+        @param       {image.blob} blob: The blob
+        @return      {float} The share of accepted samples, a merged blob passes if any of its colors does
+        """
+        x0 = blob.x() + blob.w() * (1 - SAMPLE_SPAN) / 2
+        y0 = blob.y() + blob.h() * (1 - SAMPLE_SPAN) / 2
+        step_x = blob.w() * SAMPLE_SPAN / (SAMPLE_GRID - 1)
+        step_y = blob.h() * SAMPLE_SPAN / (SAMPLE_GRID - 1)
+        best = 0.0
+        for color in range(len(self.bitsets)):
+            if not blob.code() & (1 << color):
+                continue
+            matched = 0
+            for i in range(SAMPLE_GRID):
+                y = int(y0 + i * step_y)
+                for j in range(SAMPLE_GRID):
+                    value = img.get_pixel(int(x0 + j * step_x), y, rgbtuple=False)
+                    if value is not None and self.contains(color, value):
+                        matched += 1
+            best = max(best, matched / (SAMPLE_GRID * SAMPLE_GRID))
+        return best
+
+    def verify(self, img, blobs: list) -> list:
+        """
+        @description: Keep the blobs whose pixels are accepted by the table.
+        @param       {*} self:
+        @param       {image} img: The RGB565 image the blobs were found in
+        @param       {list} blobs: The candidate blobs found with self.thresholds
+        @return      {list} The blobs that pass
+        """
+        return [blob for blob in blobs if self.match_ratio(img, blob) >= self.min_match_ratio]
@@ -0,0 +1,121 @@
+"""
+Author       : agent
+Date         : 2026-10-19 13:24:57
+LastEditors  : agent
+LastEditTime : 2026-10-19 13:24:57
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/lib/compact.py
+Description  : The compact IBus telemetry frame: the 28 payload bytes between the IBus header and checksum hold a
+               bit-packed header and one entry per target, so several targets fit where the 14 channels hold one.
+               An entry is absolute or, outside of key frames, the difference to the same target in the previous
+               frame; a receiver that missed a frame decodes the absolute entries and waits for the next key frame.
+               Layout, most significant bit first:
+                   header  marker 4 (0xC) | key 1 | reserved 3 | sequence 4 | count 4 | frame age 6 | level 3
+                   entry   delta 1 | kind 1 | id 4 | detected 1 | absolute: x 8, y 8, w 8, h 8
+                                                                | delta:    dx 6, dy 6, dw 4, dh 4
+               x, y is the center of the box; the id 15 marks a candidate blob outside of any track.
+"""
+
+# Macros
+PAYLOAD_BYTES = 28  # The bytes between the IBus header and the checksum
+COMPACT_MARKER = 0xC  # The first 4 bits of a compact payload, never the low byte of a channel-0 flag (-1 to 2)
+COMPACT_FLAG = 3  # The flag of a compact payload list built by main.py
+KEYFRAME_INTERVAL = 10  # A key frame, without delta entries, every this many frames
+AGE_STEP_MS = 2  # The unit of the frame age, which saturates at 63 units
+CANDIDATE_ID = 15  # The id of a candidate blob, track ids are sent modulo 15
+## Field widths in bits
+HEADER_BITS = 25
+ENTRY_BITS = 7  # delta, kind, id, detected
+ABSOLUTE_BITS = (8, 8, 8, 8)  # x, y, w, h
+DELTA_BITS = (6, 6, 4, 4)  # dx, dy, dw, dh
+## Target kinds
+BALLOON = 0
+GOAL = 1
+
+
+def _put(buf: bytearray, pos: int, value: int, bits: int) -> int:
+    """
+    @description: Write the low bits of a value into a buffer, most significant bit first
+    @param       {bytearray} buf: The zeroed buffer
+    @param       {int} pos: The bit position to write at
+    @param       {int} value: The value, negative values are written in two's complement
+    @param       {int} bits: The number of bits
+    @return      {int} The bit position after the value
+    """
+    for i in range(bits - 1, -1, -1):
+        if (value >> i) & 1:
+            buf[pos >> 3] |= 0x80 >> (pos & 7)
+        pos += 1
+    return pos
+
+
+def _fits(value: int, bits: int) -> bool:
+    # Whether a value fits a signed field
+    return -(1 << (bits - 1)) <= value < (1 << (bits - 1))
+
+
+class CompactEncoder:
+    def __init__(self, keyframe_interval: int = KEYFRAME_INTERVAL) -> None:
+        """
+        @description: Constructor of the compact frame encoder, it remembers the boxes sent in the last frame.
+        @param       {*} self:
+        @param       {int} keyframe_interval: A key frame every this many frames (default: 10)
+        @return      {*} None
+        """
+        self.keyframe_interval = keyframe_interval
+        self.sequence = 0  # The sequence number of the next frame, modulo 16
+        self.sent = {}  # The (x, y, w, h) of every tracked target of the last frame by (kind, id)
+        self.since_key = keyframe_interval  # Frames since the last key frame, the first frame is one
+        self.dropped = 0  # Number of targets left out of a full frame
+
+    def encode(self, payload: list) -> bytearray:
+        """
+        @description: Pack a compact payload list into the payload bytes of one IBus frame. The targets are packed in
+                      order until the frame is full.
+        @param       {*} self:
+        @param       {list} payload: [COMPACT_FLAG, age_ms, level, kind, id, detected, x, y, w, h, kind, ...]
+        @return      {bytearray} The PAYLOAD_BYTES bytes
+        """
+        buf = bytearray(PAYLOAD_BYTES)
+        key = self.since_key >= self.keyframe_interval
+        self.since_key = 0 if key else self.since_key + 1
+        age = min(63, max(0, payload[1]) // AGE_STEP_MS)
+        pos = _put(buf, 0, COMPACT_MARKER, 4)
+        pos = _put(buf, pos, 1 if key else 0, 1)
+        pos = _put(buf, pos, 0, 3)
+        pos = _put(buf, pos, self.sequence, 4)
+        count_pos = pos
+        pos += 4  # The count is written once the entries are packed
+        pos = _put(buf, pos, age, 6)
+        pos = _put(buf, pos, min(7, max(0, payload[2])), 3)
+        count = 0
+        sent = {}
+        for i in range(3, len(payload) - 6, 7):
+            kind, track_id, detected = payload[i], payload[i + 1], payload[i + 2]
+            box = [min(255, max(0, int(value))) for value in payload[i + 3 : i + 7]]
+            track_id = CANDIDATE_ID if track_id is None or track_id < 0 else track_id % CANDIDATE_ID
+            previous = None if key or track_id == CANDIDATE_ID else self.sent.get((kind, track_id))
+            delta = None
+            if previous:
+                delta = [box[j] - previous[j] for j in range(4)]
+                for j in range(4):
+                    if not _fits(delta[j], DELTA_BITS[j]):
+                        delta = None  # Moved too far, sent as an absolute entry
+                        break
+            widths = DELTA_BITS if delta else ABSOLUTE_BITS
+            if pos + ENTRY_BITS + sum(widths) > 8 * PAYLOAD_BYTES:
+                self.dropped += (len(payload) - i) // 7
+                break
+            pos = _put(buf, pos, 1 if delta else 0, 1)
+            pos = _put(buf, pos, kind, 1)
+            pos = _put(buf, pos, track_id, 4)
+            pos = _put(buf, pos, 1 if detected else 0, 1)
+            values = delta if delta else box
+            for j in range(4):
+                pos = _put(buf, pos, values[j], widths[j])
+            if track_id != CANDIDATE_ID:
+                sent[(kind, track_id)] = box
+            count += 1
+        _put(buf, count_pos, count, 4)
+        self.sent = sent
+        self.sequence = (self.sequence + 1) & 0xF
+        return buf
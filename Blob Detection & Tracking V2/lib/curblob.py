@@ -9,10 +9,17 @@ Description  : The current blob object that memorizes previous states
 
 import image
 import math
+from lib.filters import make_filter
 
 # Macros
 NORM_LEVEL = 2  # Default to use L2 norm, change to L1 to reduce computation
 MAX_FEATURE_DIST = 32767  # The maximum feature distance
+## Gating cascade, cheap tests run before the feature distance
+GATE_SIZE_MARGIN = 1.0  # The predicted box is grown on every side by this share of its larger side
+GATE_MOTION_MARGIN = 10  # ... and by this many pixels per frame since the last match
+GATE_SIZE_RATIO = 4  # The largest ratio between the candidate area and the expected area, either way
+GATE_STAGES = ("code", "overlap", "size", "distance")  # The rejection stages, in the order they run
+FEATURE_FILTERS = "mean"  # The smoothing filter of the features, one spec for all or a list of one per feature
 
 
 class CurBLOB:
@@ -23,30 +30,53 @@ class CurBLOB:
         feature_dist_threshold: int = 200,
         window_size=5,
         blob_id=0,
+        gating: bool = False,
+        feature_filters=FEATURE_FILTERS,
     ) -> None:
         """
         @description: Constructor of the blob object that memorizes previous states.
         @param       {*} self:
-        @param       {*} initial_blob: The first blob appeared after the reset
+        @param       {*} initial_blob: The first blob appeared after the reset, None if no blob has been found yet
         @param       {int} norm_level: The norm level for the feature distance (default to L2)
         @param       {int} feature_dist_threshold: The threshold for the feature distance (default to 200)
         @param       {*} window_size: The window size for the moving average (default to 3)
         @param       {*} blob_id: The id of the blob
+        @param       {bool} gating: Whether to reject candidates by color code, predicted box overlap and size before
+                                    computing their feature distance (default to False)
+        @param       {*} feature_filters: A list of the filter specs of the features (x, y, w, h, rotation) or one spec
+                                          for all, see lib/filters.py (default to "mean", the moving average)
         @return      {*} None
         """
-        self.blob_history = [initial_blob]
-        self.feature_vector = [
-            initial_blob.x(),
-            initial_blob.y(),
-            initial_blob.w(),
-            initial_blob.h(),
-            initial_blob.rotation_deg(),
-        ]
+        if not isinstance(feature_filters, list):
+            feature_filters = [feature_filters] * 5
+        self.filters = [make_filter(spec) for spec in feature_filters]  # The smoothing filter of every feature
+        if initial_blob:
+            self.blob_history = [initial_blob]
+            self.feature_vector = [
+                self.filters[i].reset(value)
+                for i, value in enumerate(
+                    (
+                        initial_blob.x(),
+                        initial_blob.y(),
+                        initial_blob.w(),
+                        initial_blob.h(),
+                        initial_blob.rotation_deg(),
+                    )
+                )
+            ]
+        else:
+            # No blob yet, the tracker looks for a reference blob on its next frame
+            self.blob_history = None
+            self.feature_vector = None
         self.norm_level = norm_level
         self.untracked_frames = 0  # number of frames that the blob is not tracked
         self.feature_dist_threshold = feature_dist_threshold  # threshold for feature distance
         self.window_size = window_size  # window size for moving average
         self.id = blob_id  # id of the blob
+        self.next_id = blob_id + 1  # id of the next new track, re-identified tracks keep theirs
+        self.gating = gating  # whether to run the gating cascade
+        self.rejections = {stage: 0 for stage in GATE_STAGES}  # candidates rejected per stage in the last update
+        self.expected_size = None  # the (w, h) predicted from the range for this frame, None to expect the tracked size
 
     def reset(self) -> None:
         """
@@ -57,23 +87,100 @@ class CurBLOB:
         self.blob_history = None
         self.feature_vector = None
         self.untracked_frames = 0
+        self.expected_size = None
 
-    def reinit(self, blob: image.blob) -> None:
+    def reinit(self, blob: image.blob, blob_id: int = None) -> None:
         """
         @description: Reinitialize the current blob with a new blob
         @param       {*} self:
         @param       {image.blob} blob: The new blob to be reinitialized with
+        @param       {int} blob_id: The id of a re-identified track to continue, None to start a new track
         @return      {*} None
         """
         self.blob_history = [blob]  # reset the blob history
         self.feature_vector = [
-            blob.x(),
-            blob.y(),
-            blob.w(),
-            blob.h(),
-            blob.rotation_deg(),
+            self.filters[i].reset(value)
+            for i, value in enumerate((blob.x(), blob.y(), blob.w(), blob.h(), blob.rotation_deg()))
         ]
         self.untracked_frames = 0  # reset the untracked frames
+        if blob_id is None:
+            self.id = self.next_id  # a reinitialized blob starts a new track
+            self.next_id += 1
+        else:
+            self.id = blob_id  # a re-identified blob continues its old track
+
+    def velocity(self) -> tuple:
+        """
+        @description: Estimate the velocity of the blob center from the blob history
+        @param       {*} self:
+        @return      {tuple} The velocity (vx, vy) in pixels per tracked frame
+        """
+        if not self.blob_history or len(self.blob_history) < 2:
+            return (0, 0)
+        first, last = self.blob_history[0], self.blob_history[-1]
+        steps = len(self.blob_history) - 1
+        vx = (last.x() + last.w() / 2 - first.x() - first.w() / 2) / steps
+        vy = (last.y() + last.h() / 2 - first.y() - first.h() / 2) / steps
+        return (vx, vy)
+
+    def size_spread(self) -> float:
+        """
+        @description: Compute the standard deviation of the bounding box area over the blob history
+        @param       {*} self:
+        @return      {float} The standard deviation of the area in pixels, 0 without a history
+        """
+        if not self.blob_history:
+            return 0
+        areas = [blob.w() * blob.h() for blob in self.blob_history]
+        mean = sum(areas) / len(areas)
+        return math.sqrt(sum([(area - mean) ** 2 for area in areas]) / len(areas))
+
+    def _size(self) -> tuple:
+        """
+        @description: Get the size a candidate is expected to have: predicted from the range if there is a prediction,
+                      the tracked size otherwise
+        @param       {*} self:
+        @return      {tuple} The expected (w, h)
+        """
+        if self.expected_size:
+            return self.expected_size
+        return self.feature_vector[2], self.feature_vector[3]
+
+    def _gate(self, list_of_blob: list) -> list:
+        """
+        @description: Reject the candidates that cannot be the blob before their feature distance is computed: another
+                      color code, no overlap with the predicted box grown by a motion margin, or a very different size
+        @param       {*} self:
+        @param       {list} list_of_blob: The candidate blobs
+        @return      {list} The candidates passing every stage
+        """
+        code = self.blob_history[-1].code()
+        x, y, w, h = self.feature_vector[0:4]
+        frames = self.untracked_frames + 1  # Frames since the last match
+        vx, vy = self.velocity()
+        margin = GATE_SIZE_MARGIN * max(w, h) + GATE_MOTION_MARGIN * frames
+        # The predicted box, grown by the margin
+        gx0 = x + vx * frames - margin
+        gy0 = y + vy * frames - margin
+        gx1 = x + vx * frames + w + margin
+        gy1 = y + vy * frames + h + margin
+        ew, eh = self._size()
+        area = max(1, ew * eh)
+        passed = []
+        for b in list_of_blob:
+            if b.code() != code:
+                self.rejections["code"] += 1
+                continue
+            bx, by, bw, bh = b.rect()
+            if bx > gx1 or by > gy1 or bx + bw < gx0 or by + bh < gy0:
+                self.rejections["overlap"] += 1
+                continue
+            ratio = bw * bh / area
+            if ratio > GATE_SIZE_RATIO or ratio * GATE_SIZE_RATIO < 1:
+                self.rejections["size"] += 1
+                continue
+            passed.append(b)
+        return passed
 
     def compare(self, new_blob: image.blob) -> int:
         """
@@ -90,6 +197,9 @@ class CurBLOB:
             new_blob.rotation_deg(),
         )  # get the feature vector of the new blob
         old_feature = self.feature_vector  # get the feature vector of the current blob
+        if self.expected_size:
+            # The size terms measure the distance to the size predicted from the range
+            old_feature = old_feature[0:2] + list(self.expected_size) + old_feature[4:5]
         if not new_blob.code() == self.blob_history[-1].code():  # Check if the color is the same
             return MAX_FEATURE_DIST  # Different colors automatically grant a maximum distance
         elif self.norm_level == 1:  # The norm level is L1
@@ -104,15 +214,21 @@ class CurBLOB:
         @param       {list} list_of_blob: The list of blobs to be compared with
         @return      {list} The rectangle of the best candidate blob
         """
+        for stage in GATE_STAGES:
+            self.rejections[stage] = 0
         if list_of_blob is None:  # For the case that no blob is detected
             self.untracked_frames += 1
             return None
 
         min_dist = 32767
         candidate_blob = None
+        if self.gating:
+            list_of_blob = self._gate(list_of_blob)
         # Find the blob with minimum feature distance
         for b in list_of_blob:  # This should reference the input parameter 'list_of_blob', not 'blobs'
             dist = self.compare(b)
+            if dist >= self.feature_dist_threshold:
+                self.rejections["distance"] += 1
             if dist < min_dist:
                 min_dist = dist
                 candidate_blob = b
@@ -120,7 +236,6 @@ class CurBLOB:
         if min_dist < self.feature_dist_threshold:
             # Update the feature history if the feature distance is below the threshold
             self.untracked_frames = 0  # Reset the number of untracked frames
-            history_size = len(self.blob_history)  # Get the number of blobs in the history
             self.blob_history.append(candidate_blob)
             # Calculate the feature vector of the candidate blob
             candidate_feature = (
@@ -130,17 +245,10 @@ class CurBLOB:
                 candidate_blob.h(),
                 candidate_blob.rotation_deg(),
             )
-
-            if history_size < self.window_size:
-                # Calculate the moving average directly if the blob history is not filled
-                for i in range(5):
-                    # Calculate the moving average
-                    self.feature_vector[i] = (self.feature_vector[i] * history_size + candidate_feature[i]) / (
-                        history_size + 1
-                    )
-            else:
-                # Remove the oldest blob from the history and calculate the moving average
-                oldest_blob = self.blob_history[0]
+            oldest_feature = None  # The raw feature leaving the window, None while the window fills
+            if len(self.blob_history) > self.window_size:
+                # Remove the oldest blob from the history
+                oldest_blob = self.blob_history.pop(0)
                 oldest_feature = (
                     oldest_blob.x(),
                     oldest_blob.y(),
@@ -148,11 +256,11 @@ class CurBLOB:
                     oldest_blob.h(),
                     oldest_blob.rotation_deg(),
                 )
-                for i in range(5):
-                    self.feature_vector[i] = (
-                        self.feature_vector[i] * self.window_size + candidate_feature[i] - oldest_feature[i]
-                    ) / self.window_size
-                self.blob_history.pop(0)
+            for i in range(5):
+                # Update the smoothing filter of every feature incrementally
+                self.feature_vector[i] = self.filters[i].update(
+                    candidate_feature[i], oldest_feature[i] if oldest_feature else None
+                )
             return list(candidate_blob.rect())
         else:
             # Increase the number of untracked frames if no good candidate is found
@@ -0,0 +1,108 @@
+"""
+Author       : agent
+Date         : 2026-10-19 12:58:19
+LastEditors  : agent
+LastEditTime : 2026-10-19 13:55:36
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/lib/dual.py
+Description  : The dual-mode tracker: balloon frames and goal frames interleaved at a fixed ratio, both trackers stay
+               alive on one RGB565 sensor configuration so no mode switch (sensor reset and reacquisition) is needed.
+"""
+
+# Macros
+DUAL_RATIO = (3, 1)  # Number of balloon frames and goal frames in every cycle of the schedule
+MAX_AGE = 32767  # The largest age reported, it must fit in an IBus channel
+
+
+class DualTracker:
+    def __init__(self, balloon_tracker, goal_tracker, ratio: tuple = DUAL_RATIO) -> None:
+        """
+        @description: Constructor of the dual-mode tracker.
+        @param       {*} self:
+        @param       {BLOBTracker} balloon_tracker: The balloon tracker, built with max_reference_frames so it never blocks
+        @param       {GoalTracker} goal_tracker: The goal tracker, built with max_reference_frames so it never blocks
+        @param       {tuple} ratio: Number of balloon frames and goal frames in every cycle (default: (3, 1))
+        @return      {*} None
+        """
+        if ratio[0] < 0 or ratio[1] < 0 or ratio[0] + ratio[1] == 0:
+            raise ValueError("Invalid dual-mode ratio!")
+        self.trackers = {"B": balloon_tracker, "G": goal_tracker}
+        self.schedule = "B" * ratio[0] + "G" * ratio[1]  # The mode of every frame of a cycle
+        self.slot = 0  # The position of the next frame in the schedule
+        self.mode = self.schedule[0]  # The mode of the last processed frame
+        self.ages = {"B": -1, "G": -1}  # Frames since each target was last detected, -1 while it has no track
+        self.clock = balloon_tracker.clock
+
+    @property
+    def balloon(self):
+        return self.trackers["B"]
+
+    @property
+    def goal(self):
+        return self.trackers["G"]
+
+    @property
+    def current(self):
+        return self.trackers[self.mode]
+
+    # The state of the last processed frame, so the recorder and the warm start see a single tracker
+    @property
+    def tracked_blob(self):
+        return self.current.tracked_blob
+
+    @property
+    def roi(self):
+        return self.current.roi
+
+    @property
+    def img(self):
+        return self.current.img
+
+    @property
+    def candidates(self):
+        return self.current.candidates
+
+    @property
+    def detected(self):
+        return self.current.detected
+
+    @property
+    def timings(self):
+        return self.current.timings
+
+    @property
+    def current_thresholds(self):
+        return self.current.current_thresholds
+
+    @property
+    def capture(self):
+        return self.current.capture
+
+    @property
+    def ranger(self):
+        return self.current.ranger
+
+    @property
+    def window(self):
+        return self.current.window
+
+    @property
+    def frames_taken(self):
+        return self.current.frames_taken
+
+    def track(self) -> tuple:
+        """
+        @description: Process the next frame of the schedule with its tracker, the other tracker keeps its state
+        @param       {*} self:
+        @return      {tuple} The feature vector of the tracked blob of this frame's tracker and whether it is tracked
+        """
+        self.mode = self.schedule[self.slot]
+        self.slot = (self.slot + 1) % len(self.schedule)
+        result = self.current.track()
+        for mode, tracker in self.trackers.items():
+            if not tracker.tracked_blob.feature_vector:
+                self.ages[mode] = -1  # No track
+            elif mode == self.mode and tracker.detected:
+                self.ages[mode] = 0
+            else:
+                self.ages[mode] = min(MAX_AGE, self.ages[mode] + 1) if self.ages[mode] >= 0 else 1
+        return result
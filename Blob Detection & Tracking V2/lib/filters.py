@@ -0,0 +1,255 @@
+"""
+Author       : agent
+Date         : 2026-10-19 13:03:50
+LastEditors  : agent
+LastEditTime : 2026-10-19 13:54:23
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/lib/filters.py
+Description  : Incremental smoothing filters of one feature of the tracked blob, selected per dimension by CurBLOB.
+               Every filter is fed the new raw value and the raw value leaving CurBLOB's window (None while the window
+               fills), so the windowed filters share the blob history instead of keeping their own.
+"""
+
+# Macros
+EMA_ALPHA = 0.5  # The weight of the new value in the exponential moving average
+AB_ALPHA = 0.5  # The position gain of the alpha-beta filter
+AB_BETA = 0.1  # The rate gain of the alpha-beta filter
+HAMPEL_SIGMAS = 3  # A value further than this many robust standard deviations from the median is an outlier
+MAD_SCALE = 1.4826  # The median absolute deviation times this estimates the standard deviation of a normal law
+HAMPEL_MIN_MAD = 1  # The smallest median absolute deviation in pixels, a still blob's 1 px jitter is not an outlier
+
+
+class MovingAverage:
+    def __init__(self) -> None:
+        """
+        @description: The boxcar average over the window, O(1) per update.
+        @param       {*} self:
+        @return      {*} None
+        """
+        self.total = 0
+        self.count = 0
+
+    def reset(self, value: float) -> float:
+        """
+        @description: Restart the average from one value
+        @param       {*} self:
+        @param       {float} value: The first value of the feature
+        @return      {float} The value
+        """
+        self.total = value
+        self.count = 1
+        return value
+
+    def update(self, value: float, evicted: float = None) -> float:
+        """
+        @description: Add the new value to the running sum and drop the evicted one
+        @param       {*} self:
+        @param       {float} value: The new raw value of the feature
+        @param       {float} evicted: The raw value leaving CurBLOB's window, None while it fills (default: None)
+        @return      {float} The mean of the window
+        """
+        self.total += value
+        if evicted is None:
+            self.count += 1
+        else:
+            self.total -= evicted
+        return self.total / self.count
+
+
+class EMA:
+    def __init__(self, alpha: float = EMA_ALPHA) -> None:
+        """
+        @description: The exponential moving average, O(1) per update.
+        @param       {*} self:
+        @param       {float} alpha: The weight of the new value (default: 0.5)
+        @return      {*} None
+        """
+        self.alpha = alpha
+        self.value = 0
+
+    def reset(self, value: float) -> float:
+        """
+        @description: Restart the average from one value
+        @param       {*} self:
+        @param       {float} value: The first value of the feature
+        @return      {float} The value
+        """
+        self.value = value
+        return value
+
+    def update(self, value: float, evicted: float = None) -> float:
+        """
+        @description: Move the average toward the new value, the evicted value is not needed
+        @param       {*} self:
+        @param       {float} value: The new raw value of the feature
+        @param       {float} evicted: The raw value leaving CurBLOB's window, None while it fills (default: None)
+        @return      {float} The smoothed value
+        """
+        self.value += self.alpha * (value - self.value)
+        return self.value
+
+
+class AlphaBeta:
+    def __init__(self, alpha: float = AB_ALPHA, beta: float = AB_BETA) -> None:
+        """
+        @description: The alpha-beta filter, tracks the value and its rate per update so a moving target does not lag.
+        @param       {*} self:
+        @param       {float} alpha: The position gain (default: 0.5)
+        @param       {float} beta: The rate gain (default: 0.1)
+        @return      {*} None
+        """
+        self.alpha = alpha
+        self.beta = beta
+        self.value = 0
+        self.rate = 0
+
+    def reset(self, value: float) -> float:
+        """
+        @description: Restart the filter from one value at rest
+        @param       {*} self:
+        @param       {float} value: The first value of the feature
+        @return      {float} The value
+        """
+        self.value = value
+        self.rate = 0
+        return value
+
+    def update(self, value: float, evicted: float = None) -> float:
+        """
+        @description: Predict the value from the rate, then correct the value and the rate by the residual
+        @param       {*} self:
+        @param       {float} value: The new raw value of the feature
+        @param       {float} evicted: The raw value leaving CurBLOB's window, None while it fills (default: None)
+        @return      {float} The filtered value
+        """
+        predicted = self.value + self.rate
+        residual = value - predicted
+        self.value = predicted + self.alpha * residual
+        self.rate += self.beta * residual
+        return self.value
+
+
+class RunningMedian:
+    def __init__(self) -> None:
+        """
+        @description: The median of the window, kept as a sorted window: O(log w) search, O(w) shift of a small list.
+        @param       {*} self:
+        @return      {*} None
+        """
+        self.window = []  # The values of the window, sorted
+
+    def _position(self, value: float) -> int:
+        # Binary search of the leftmost position of value, MicroPython has no bisect module
+        lo, hi = 0, len(self.window)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.window[mid] < value:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _slide(self, value: float, evicted: float = None) -> None:
+        if evicted is not None:
+            self.window.pop(self._position(evicted))
+        self.window.insert(self._position(value), value)
+
+    def median(self) -> float:
+        n = len(self.window)
+        if n % 2:
+            return self.window[n // 2]
+        return (self.window[n // 2 - 1] + self.window[n // 2]) / 2
+
+    def reset(self, value: float) -> float:
+        """
+        @description: Restart the window from one value
+        @param       {*} self:
+        @param       {float} value: The first value of the feature
+        @return      {float} The value
+        """
+        self.window = [value]
+        return value
+
+    def update(self, value: float, evicted: float = None) -> float:
+        """
+        @description: Insert the new value into the sorted window and remove the evicted one
+        @param       {*} self:
+        @param       {float} value: The new raw value of the feature
+        @param       {float} evicted: The raw value leaving CurBLOB's window, None while it fills (default: None)
+        @return      {float} The median of the window
+        """
+        self._slide(value, evicted)
+        return self.median()
+
+
+class Hampel(RunningMedian):
+    def __init__(self, n_sigmas: float = HAMPEL_SIGMAS, smoother=None) -> None:
+        """
+        @description: The Hampel outlier rejection: a value far from the window median, in robust standard deviations
+                      (scaled median absolute deviation), is replaced by the median before the optional smoother.
+        @param       {*} self:
+        @param       {float} n_sigmas: The outlier distance in robust standard deviations (default: 3)
+        @param       {*} smoother: The filter fed the cleaned values, None to output them as they are (default: None)
+        @return      {*} None
+        """
+        super().__init__()
+        self.n_sigmas = n_sigmas
+        self.smoother = smoother
+        self.cleaned = []  # The cleaned values of the window, oldest first, a windowed smoother evicts these
+        self.outliers = 0  # Number of values replaced by the median
+
+    def reset(self, value: float) -> float:
+        """
+        @description: Restart the window and the smoother from one value
+        @param       {*} self:
+        @param       {float} value: The first value of the feature
+        @return      {float} The value, smoothed if there is a smoother
+        """
+        super().reset(value)
+        self.cleaned = [value]
+        self.outliers = 0
+        return self.smoother.reset(value) if self.smoother else value
+
+    def update(self, value: float, evicted: float = None) -> float:
+        """
+        @description: Replace the new value by the median if it is an outlier, then feed it to the smoother
+        @param       {*} self:
+        @param       {float} value: The new raw value of the feature
+        @param       {float} evicted: The raw value leaving CurBLOB's window, None while it fills (default: None)
+        @return      {float} The cleaned value, smoothed if there is a smoother
+        """
+        self._slide(value, evicted)  # The raw value stays in the window, the cleaned one goes to the smoother
+        median = self.median()
+        deviations = sorted([abs(v - median) for v in self.window])
+        n = len(deviations)
+        mad = deviations[n // 2] if n % 2 else (deviations[n // 2 - 1] + deviations[n // 2]) / 2
+        mad = max(mad, HAMPEL_MIN_MAD)  # A constant window has a zero MAD, any change would be an outlier
+        if n >= 3 and abs(value - median) > self.n_sigmas * MAD_SCALE * mad:
+            value = median
+            self.outliers += 1
+        self.cleaned.append(value)
+        evicted_cleaned = self.cleaned.pop(0) if evicted is not None else None
+        return self.smoother.update(value, evicted_cleaned) if self.smoother else value
+
+
+# The filters by name, a spec is a name or a tuple of a name and the constructor arguments
+FILTERS = {
+    "mean": MovingAverage,
+    "ema": EMA,
+    "alphabeta": AlphaBeta,
+    "median": RunningMedian,
+    "hampel": Hampel,
+}
+
+
+def make_filter(spec):
+    """
+    @description: Build a filter from its spec, e.g. "median", ("ema", 0.3) or ("hampel", 3, ("alphabeta", 0.5, 0.1))
+    @param       {*} spec: The name of the filter or a tuple of its name and arguments
+    @return      {*} The filter
+    """
+    if isinstance(spec, str):
+        return FILTERS[spec]()
+    name, args = spec[0], list(spec[1:])
+    if name == "hampel" and len(args) > 1 and args[1] is not None:
+        args[1] = make_filter(args[1])  # The smoother
+    return FILTERS[name](*args)
@@ -0,0 +1,107 @@
+"""
+Author       : agent
+Date         : 2026-10-19 13:11:25
+LastEditors  : agent
+LastEditTime : 2026-10-19 13:11:25
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/lib/governor.py
+Description  : The quality governor: watches the processing time of every frame and steps through the degradation
+               levels to stay within the frame-time budget, then restores the quality once there is headroom again.
+               Every level keeps the degradations of the levels below it.
+"""
+
+# Macros
+FRAME_BUDGET_US = 25000  # The processing time allowed per frame, the rest of the frame period is the sensor's
+SMOOTHING = 0.25  # The weight of the new frame in the smoothed processing time
+DEGRADE_FRAMES = 3  # Number of frames in a row over the budget before the next level
+RESTORE_FRAMES = 30  # Number of frames in a row with headroom before the previous level
+HEADROOM = 0.6  # A level is restored when the smoothed time is under this share of the budget
+DEGRADED_STRIDE = 2  # The x_stride and y_stride of find_blobs from the STRIDE level
+SEARCH_SHRINK = 0.5  # The share of the lost-target search budget kept at the SEARCH level
+## Degradation levels, in order
+FULL = 0  # Everything on
+NO_OVERLAY = 1  # No drawing on the frame buffer
+STRIDE = 2  # find_blobs skips every other row and column
+NO_EDGE_REMOVAL = 3  # The goal tracker does not mask the edges
+FROZEN_THRESHOLDS = 4  # The thresholds stop adapting
+SEARCH = 5  # The lost-target search scans fewer pixels per frame
+MAX_LEVEL = SEARCH
+
+
+class Governor:
+    def __init__(self, budget_us: int = FRAME_BUDGET_US) -> None:
+        """
+        @description: Constructor of the quality governor.
+        @param       {*} self:
+        @param       {int} budget_us: The processing time allowed per frame (default: 25000)
+        @return      {*} None
+        """
+        self.budget_us = budget_us
+        self.level = FULL  # The current degradation level, sent with the telemetry
+        self.frame_us = 0  # The smoothed processing time
+        self.changes = 0  # Number of level changes
+        self.tracker = None  # The tracker the level is applied to
+        self._originals = []  # The (tracker, settings) before any degradation
+        self._over = 0  # Number of frames in a row over the budget
+        self._under = 0  # Number of frames in a row with headroom
+
+    def _trackers(self, tracker) -> list:
+        # The dual mode degrades both of its trackers
+        return list(tracker.trackers.values()) if hasattr(tracker, "trackers") else [tracker]
+
+    def attach(self, tracker) -> None:
+        """
+        @description: Remember the settings of a new tracker, e.g. after a mode change, and apply the current level
+        @param       {*} self:
+        @param       {*} tracker: The tracker
+        @return      {*} None
+        """
+        self.tracker = tracker
+        self._originals = []
+        for t in self._trackers(tracker):
+            budget = t.search.pixel_budget if getattr(t, "search", None) else 0
+            self._originals.append((t, (t.show, t.stride, t.edge_removal, t.freeze_thresholds, budget)))
+        self._apply()
+
+    def _apply(self) -> None:
+        """
+        @description: Set the tracker settings of the current level from the remembered ones
+        @param       {*} self:
+        @return      {*} None
+        """
+        for t, (show, stride, edge_removal, freeze_thresholds, budget) in self._originals:
+            t.show = show and self.level < NO_OVERLAY
+            t.stride = max(stride, DEGRADED_STRIDE) if self.level >= STRIDE else stride
+            t.edge_removal = edge_removal and self.level < NO_EDGE_REMOVAL
+            t.freeze_thresholds = freeze_thresholds or self.level >= FROZEN_THRESHOLDS
+            if budget:
+                t.search.pixel_budget = int(budget * SEARCH_SHRINK) if self.level >= SEARCH else budget
+
+    def update(self, tracker) -> int:
+        """
+        @description: Account for the last frame of the tracker and change the level if needed. The processing time
+                      leaves out the time the tracker waited for the sensor, which no level can shorten.
+        @param       {*} self:
+        @param       {*} tracker: The tracker that processed the frame
+        @return      {int} The level for the next frame
+        """
+        if tracker is not self.tracker:
+            self.attach(tracker)
+        timings = tracker.timings
+        if "total" not in timings:
+            return self.level  # No frame processed yet, e.g. still looking for a reference blob
+        busy_us = max(0, timings["total"] - timings.get("snapshot", 0) - timings.get("sleep", 0))
+        self.frame_us = busy_us if not self.frame_us else self.frame_us + SMOOTHING * (busy_us - self.frame_us)
+        self._over = self._over + 1 if self.frame_us > self.budget_us else 0
+        self._under = self._under + 1 if self.frame_us < HEADROOM * self.budget_us else 0
+        if self._over >= DEGRADE_FRAMES and self.level < MAX_LEVEL:
+            self._set_level(self.level + 1)
+        elif self._under >= RESTORE_FRAMES and self.level > FULL:
+            self._set_level(self.level - 1)
+        return self.level
+
+    def _set_level(self, level: int) -> None:
+        self.level = level
+        self.changes += 1
+        self._over = 0
+        self._under = 0
+        self._apply()
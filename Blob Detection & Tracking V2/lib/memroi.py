@@ -13,6 +13,7 @@ FF_POSITION = 0.5  # The forgetting factor for the position
 FF_SIZE = 0.5  # The forgetting factor for the size
 GF_POSITION = 0.5  # The gain factor for the position
 GF_SIZE = 0.5  # The gain factor for the size
+RANGE_ROI_SCALE = 4  # With a size predicted from the range, the ROI is at most this many target sizes
 
 
 class MemROI:
@@ -102,13 +103,21 @@ class MemROI:
         new_h = rect1[3] + fs * (rect2[3] - rect1[3])
         return [new_cx - new_w / 2, new_cy - new_h / 2, new_w, new_h]
 
-    def update(self, new_roi: list = None) -> None:
+    def update(self, new_roi: list = None, expected_size: tuple = None) -> None:
         """
         @description: Update the ROI with a new ROI.
         @param       {*} self:
         @param       {list} new_roi: The new roi to map to [x0, y0, w, h]
+        @param       {tuple} expected_size: The target size (w, h) predicted from the range, the ROI covers at least
+                                            the whole target and grows to at most RANGE_ROI_SCALE times it (default: None)
         @return      {*} None
         """
+        if new_roi is not None and expected_size:
+            # A partial detection still stands for the whole target, around the same center
+            cx, cy = self._center(new_roi)
+            w = max(new_roi[2], expected_size[0])
+            h = max(new_roi[3], expected_size[1])
+            new_roi = [cx - w / 2, cy - h / 2, w, h]
         if new_roi is None:  # No new detection is found in the maximum tracking window
             self.roi = self._map(self.roi, self.frame_params, 0)  # Map the ROI to the frame by the forgetting factors
         else:
@@ -120,6 +129,12 @@ class MemROI:
                 1.3 * new_roi[3],
             ]
             self.roi = self._map(self.roi, expanded_roi, 1)  # Map the ROI to the new_roi by the gain factors
+        if expected_size:
+            # The target is no larger than the range says, the ROI stops growing around its center
+            cx, cy = self._center(self.roi)
+            w = min(self.roi[2], RANGE_ROI_SCALE * expected_size[0])
+            h = min(self.roi[3], RANGE_ROI_SCALE * expected_size[1])
+            self.roi = [cx - w / 2, cy - h / 2, w, h]
         self._clamp()  # Clamp the ROI to be within the frame
 
     def reset(self) -> None:
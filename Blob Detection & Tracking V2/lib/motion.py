@@ -0,0 +1,125 @@
+"""
+Author       : agent
+Date         : 2026-10-19 13:13:48
+LastEditors  : agent
+LastEditTime : 2026-10-19 13:57:37
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/lib/motion.py
+Description  : The change detector gating the detection. After a full detection, the tracked box plus a margin on
+               every side is split into MOTION_CELLS x MOTION_CELLS cells, and the mean L, A and B of every cell
+               (one get_statistics each) are kept as the reference. On the next frames the same cells are sampled
+               again: the region is unchanged while both the mean absolute difference of the cell means and the
+               number of cells with a clearly changed mean stay low, and the tracker then reuses the last detection.
+               A full detection is forced every MOTION_REFRESH_FRAMES frames; a miss, a loss or a move of the sensor
+               window drops the reference, so there is nothing to compare until the next successful detection.
+"""
+
+# Macros
+MOTION_CELLS = 3  # The region is split into MOTION_CELLS x MOTION_CELLS cells, one get_statistics each
+MOTION_MARGIN = 0.25  # The margin checked around the tracked box on every side, as a share of its size
+MOTION_THRESHOLD = 0.5  # The mean absolute difference of the cell means (L, A, B) under which the region is unchanged
+MOTION_CELL_THRESHOLD = 2  # A cell whose mean L, A or B moved by more than this has changed
+MOTION_CHANGED_CELLS = 0  # The most changed cells of an unchanged region
+MOTION_REFRESH_FRAMES = 10  # Number of frames in a row the detection may be reused before a full one
+
+
+class ChangeDetector:
+    def __init__(
+        self,
+        cells: int = MOTION_CELLS,
+        threshold: float = MOTION_THRESHOLD,
+        refresh_frames: int = MOTION_REFRESH_FRAMES,
+        cell_threshold: float = MOTION_CELL_THRESHOLD,
+        changed_cells: int = MOTION_CHANGED_CELLS,
+    ) -> None:
+        """
+        @description: Constructor of the change detector.
+        @param       {*} self:
+        @param       {int} cells: Number of cells along each side of the region (default: 3)
+        @param       {float} threshold: The mean absolute difference of the cell means of an unchanged region
+                                        (default: 0.5)
+        @param       {int} refresh_frames: Number of frames in a row that may skip the detection (default: 10)
+        @param       {float} cell_threshold: The difference of a changed cell (default: 2)
+        @param       {int} changed_cells: The most changed cells of an unchanged region (default: 0)
+        @return      {*} None
+        """
+        self.cells = cells
+        self.threshold = threshold
+        self.refresh_frames = refresh_frames
+        self.cell_threshold = cell_threshold
+        self.changed_cells = changed_cells
+        self.rois = []  # The (x, y, w, h) of the cells in image coordinates
+        self.reference = []  # The mean L, A and B of every cell of the last frame with a full detection
+        self.mad = 0  # The mean absolute difference of the last check
+        self.changed = 0  # Number of changed cells of the last check
+        self.skipped = 0  # Number of frames skipped in a row
+        self.skipped_frames = 0  # Number of frames skipped in total
+
+    def _sample(self, img) -> list:
+        values = []
+        for roi in self.rois:
+            statistics = img.get_statistics(roi=roi)
+            values.append((statistics.l_mean(), statistics.a_mean(), statistics.b_mean()))
+        return values
+
+    def set_reference(self, img, rect: list, margin: float = MOTION_MARGIN) -> None:
+        """
+        @description: Take the cell means of the frame of a full detection over a region
+        @param       {*} self:
+        @param       {image} img: The frame
+        @param       {list} rect: The tracked box [x, y, w, h] in image coordinates
+        @param       {float} margin: The margin added on every side as a share of the size, clipped to the image
+                                     (default: 0.25)
+        @return      {*} None
+        """
+        dx = margin * rect[2]
+        dy = margin * rect[3]
+        x0 = max(0, int(rect[0] - dx))
+        y0 = max(0, int(rect[1] - dy))
+        x1 = min(img.width(), int(rect[0] + rect[2] + dx))
+        y1 = min(img.height(), int(rect[1] + rect[3] + dy))
+        self.rois = []
+        if x1 > x0 and y1 > y0:
+            cols = min(self.cells, x1 - x0)
+            rows = min(self.cells, y1 - y0)
+            for row in range(rows):
+                y = y0 + (y1 - y0) * row // rows
+                h = y0 + (y1 - y0) * (row + 1) // rows - y
+                for col in range(cols):
+                    x = x0 + (x1 - x0) * col // cols
+                    self.rois.append((x, y, x0 + (x1 - x0) * (col + 1) // cols - x, h))
+        self.reference = self._sample(img)
+        self.skipped = 0
+
+    def invalidate(self) -> None:
+        """
+        @description: Forget the reference, e.g. after a loss or when the pixels moved in the image
+        @param       {*} self:
+        @return      {*} None
+        """
+        self.reference = []
+
+    def unchanged(self, img) -> bool:
+        """
+        @description: Check whether the cell means are unchanged since the reference, counting the frame as
+                      skipped if they are
+        @param       {*} self:
+        @param       {image} img: The new frame
+        @return      {bool} Whether the detection of the reference frame may be reused
+        """
+        if not self.reference or self.skipped >= self.refresh_frames:
+            return False
+        values = self._sample(img)
+        total = 0
+        changed = 0
+        for i in range(len(values)):
+            differences = [abs(values[i][c] - self.reference[i][c]) for c in range(3)]
+            total += sum(differences)
+            if max(differences) > self.cell_threshold:
+                changed += 1
+        self.mad = total / (3 * len(values))
+        self.changed = changed
+        if self.mad > self.threshold or changed > self.changed_cells:
+            return False
+        self.skipped += 1
+        self.skipped_frames += 1
+        return True
@@ -0,0 +1,120 @@
+"""
+Author       : agent
+Date         : 2026-10-19 13:21:25
+LastEditors  : agent
+LastEditTime : 2026-10-19 13:21:25
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/lib/ranging.py
+Description  : The VL53L1X range finder, read at its own rate, and the apparent target size predicted from the range.
+               The range finder looks along the camera axis with a narrower field of view, so a reading only
+               measures the target while the target is near the middle of the frame.
+"""
+
+import math
+import time
+from machine import I2C
+from vl53l1x import VL53L1X
+from lib.memroi import FRAME_PARAMS
+
+# Macros
+RANGE_PERIOD_MS = 50  # The period of the readings, the VL53L1X ranges at up to 50 Hz
+RANGE_MAX_AGE_MS = 200  # An older reading no longer predicts the size
+RANGE_LIMITS_MM = (40, 4000)  # The readings outside are taken as nothing in range
+RANGE_SMOOTHING = 0.5  # The weight of a new reading in the smoothed range
+RANGE_FOV_DEG = 27  # The field of view of the range finder, centered on the camera axis
+CAMERA_HFOV_DEG = 70.8  # The horizontal field of view of the camera
+I2C_BUS = 2  # The I2C bus of the range finder
+
+
+class RangeFinder:
+    def __init__(
+        self,
+        period_ms: int = RANGE_PERIOD_MS,
+        i2c_bus: int = I2C_BUS,
+        frame_params: list = FRAME_PARAMS,
+        hfov_deg: float = CAMERA_HFOV_DEG,
+    ) -> None:
+        """
+        @description: Constructor of the range finder.
+        @param       {*} self:
+        @param       {int} period_ms: The period of the readings (default: 50)
+        @param       {int} i2c_bus: The I2C bus of the VL53L1X (default: 2)
+        @param       {list} frame_params: The full frame [x0, y0, w, h] (default: FRAME_PARAMS of memroi)
+        @param       {float} hfov_deg: The horizontal field of view of the camera (default: 70.8)
+        @return      {*} None
+        """
+        self.device = VL53L1X(I2C(i2c_bus))
+        self.period_ms = period_ms
+        x0, y0, w, h = frame_params
+        self.focal_px = w / 2 / math.tan(math.radians(hfov_deg) / 2)  # The focal length in pixels
+        self.center = (x0 + w / 2, y0 + h / 2)
+        self.fov_px = self.focal_px * math.tan(math.radians(RANGE_FOV_DEG) / 2)  # The radius seen by the range finder
+        self.distance_mm = None  # The smoothed range, None with nothing in range
+        self.stamp = None  # The time of the last reading
+        self.readings = 0  # Number of readings
+        self.errors = 0  # Number of failed readings
+        self._due = time.ticks_ms()  # The time of the next reading
+
+    def poll(self) -> bool:
+        """
+        @description: Read a new range if one is due, cheap otherwise; both the runtime task and the trackers poll
+        @param       {*} self:
+        @return      {bool} Whether a new range was read
+        """
+        now = time.ticks_ms()
+        if time.ticks_diff(now, self._due) < 0:
+            return False
+        self._due = time.ticks_add(now, self.period_ms)
+        try:
+            distance = self.device.read()
+        except OSError:
+            self.errors += 1  # A bus error, the last range ages out
+            return False
+        self.readings += 1
+        if distance < RANGE_LIMITS_MM[0] or distance > RANGE_LIMITS_MM[1]:
+            self.distance_mm = None
+        elif self.range_mm() is None:
+            self.distance_mm = distance
+        else:
+            self.distance_mm += RANGE_SMOOTHING * (distance - self.distance_mm)
+        self.stamp = now
+        return True
+
+    async def run(self) -> None:
+        """
+        @description: Read the range at its own rate, as a task of the cooperative runtime
+        @param       {*} self:
+        @return      {*} None
+        """
+        try:
+            import uasyncio as asyncio
+        except ImportError:
+            import asyncio  # Newer firmwares name it asyncio
+
+        while True:
+            self.poll()
+            await asyncio.sleep_ms(self.period_ms)
+
+    def range_mm(self) -> float:
+        """
+        @description: Get the smoothed range if it is recent enough
+        @param       {*} self:
+        @return      {float} The range in millimeters, None without a recent reading of something in range
+        """
+        if self.distance_mm is None or time.ticks_diff(time.ticks_ms(), self.stamp) > RANGE_MAX_AGE_MS:
+            return None
+        return self.distance_mm
+
+    def apparent_size(self, size_mm: tuple, cx: float, cy: float) -> tuple:
+        """
+        @description: Predict the size in the frame of a target centered at (cx, cy) from the range
+        @param       {*} self:
+        @param       {tuple} size_mm: The size (w, h) of the target in millimeters
+        @param       {float} cx: The x of the target center in full-frame coordinates
+        @param       {float} cy: The y of the target center in full-frame coordinates
+        @return      {tuple} The size (w, h) in pixels, None without a range or if the target is outside the field of
+                             view of the range finder
+        """
+        distance = self.range_mm()
+        if distance is None or math.sqrt((cx - self.center[0]) ** 2 + (cy - self.center[1]) ** 2) > self.fov_px:
+            return None
+        return (self.focal_px * size_mm[0] / distance, self.focal_px * size_mm[1] / distance)
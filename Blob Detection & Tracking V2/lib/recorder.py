@@ -0,0 +1,264 @@
+"""
+Author       : agent
+Date         : 2026-10-19 12:38:31
+LastEditors  : agent
+LastEditTime : 2026-10-19 13:56:56
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/lib/recorder.py
+Description  : The on-device flight recorder for frames and per-frame tracker states.
+"""
+
+import os
+import time
+import json
+
+# Macros
+RECORD_DIR = "/rec"  # The directory on the local storage to write the recordings to
+DECIMATION = 5  # Record one out of every DECIMATION frames
+BUDGET_PCT = 10  # The maximum share of the flight frame time spent on recording (percent)
+JPEG_QUALITY = 50  # The JPEG quality of the recorded frames
+MAX_CANDIDATES = 8  # The maximum number of candidate blobs logged per frame
+EMA_RATE = 0.1  # The update rate of the moving averages of the frame and recording time
+ROI_HEADER_FMT = "<IhhHHI"  # Frame index, crop x, y, w, h in full-frame coordinates and JPEG size of a crop record
+
+
+class Recorder:
+    def __init__(
+        self,
+        directory: str = RECORD_DIR,
+        decimation: int = DECIMATION,
+        budget_pct: float = BUDGET_PCT,
+        roi_only: bool = False,
+        quality: int = JPEG_QUALITY,
+        max_candidates: int = MAX_CANDIDATES,
+        trace: bool = True,
+    ) -> None:
+        """
+        @description: Constructor of the recorder that logs frames and tracker states with bounded overhead.
+        @param       {*} self:
+        @param       {str} directory: The directory to write the recordings to (default: /rec)
+        @param       {int} decimation: Record one out of every decimation frames (default: 5)
+        @param       {float} budget_pct: The maximum share of the flight frame time spent on recording (default: 10)
+        @param       {bool} roi_only: Whether to record only the ROI crop instead of the full frame (default: False)
+        @param       {int} quality: The JPEG quality of the recorded frames (default: 50)
+        @param       {int} max_candidates: The maximum number of candidate blobs logged per frame (default: 8)
+        @param       {bool} trace: Whether to write the binary trace of every frame (default: True)
+        @return      {*} None
+        """
+        self.directory = directory
+        self.decimation = max(1, decimation)
+        self.budget = budget_pct / 100
+        self.roi_only = roi_only
+        self.quality = quality
+        self.max_candidates = max_candidates
+        self.trace = trace
+        self.name = None  # The base path of the current recording
+        self.frame_count = 0  # Number of frames seen since the recording started
+        self.saved_frames = 0  # Number of images written
+        self.saved_states = 0  # Number of states written
+        self.skipped = 0  # Number of decimated frames skipped because the budget was exhausted
+        self.credit = 0  # The recording time available in microseconds
+        self.frame_us = 0  # Moving average of the flight frame time without recording
+        self.image_us = 0  # Moving average of the time to write an image
+        self.state_us = 0  # Moving average of the time to write a state
+        self._last_call = None  # Time stamp of the previous call to log
+        self._t_start = 0  # The time stamp of the start of the recording, the states store the time since
+        self._last_cost = 0  # Time spent in the previous call to log
+        self._mjpeg = None
+        self._state_file = None
+        self._roi_file = None
+        self._trace_writer = None
+
+    def _next_name(self) -> str:
+        """
+        @description: Find the next free recording name in the recording directory.
+        @param       {*} self:
+        @return      {str} The base path of the new recording
+        """
+        try:
+            os.mkdir(self.directory)
+        except OSError:
+            pass  # The directory already exists
+        existing = os.listdir(self.directory)
+        index = 0
+        while "flight_{:03d}.log".format(index) in existing:
+            index += 1
+        return "{}/flight_{:03d}".format(self.directory, index)
+
+    def start(self) -> str:
+        """
+        @description: Start a new recording.
+        @param       {*} self:
+        @return      {str} The base path of the new recording
+        """
+        self.stop()
+        self.name = self._next_name()
+        self._state_file = open(self.name + ".log", "w")
+        if self.roi_only:
+            self._roi_file = open(self.name + ".roi", "wb")
+        if self.trace:
+            from lib.trace import TraceWriter
+
+            self._trace_writer = TraceWriter(self.name + ".bct")
+        self.frame_count = 0
+        self.saved_frames = 0
+        self.saved_states = 0
+        self.skipped = 0
+        self.credit = 0
+        self._last_call = None
+        self._t_start = time.ticks_ms()
+        print("Recording to {}".format(self.name))
+        return self.name
+
+    def stop(self, fps: float = 0) -> None:
+        """
+        @description: Close all the files of the current recording.
+        @param       {*} self:
+        @param       {float} fps: The frame rate written to the mjpeg header (default: 0)
+        @return      {*} None
+        """
+        if self._mjpeg:
+            self._mjpeg.close(fps)
+            self._mjpeg = None
+        if self._roi_file:
+            self._roi_file.close()
+            self._roi_file = None
+        if self._trace_writer:
+            self._trace_writer.close()
+            self._trace_writer = None
+        if self._state_file:
+            self._state_file.close()
+            self._state_file = None
+            print(
+                "Recording {} stopped: {} states, {} images, {} skipped".format(
+                    self.name, self.saved_states, self.saved_frames, self.skipped
+                )
+            )
+
+    def _update_budget(self, t_now: int) -> None:
+        """
+        @description: Accumulate the recording credit of the frame that just finished.
+        @param       {*} self:
+        @param       {int} t_now: The current time stamp in microseconds
+        @return      {*} None
+        """
+        if self._last_call is None:
+            return
+        # The flight frame time is the time between two calls minus the time we spent recording
+        frame_us = max(0, time.ticks_diff(t_now, self._last_call) - self._last_cost)
+        self.frame_us = frame_us if not self.frame_us else self.frame_us + EMA_RATE * (frame_us - self.frame_us)
+        # Cap the credit so a long idle period cannot be spent as one big burst
+        self.credit = min(self.credit + self.budget * frame_us, self.budget * self.frame_us * self.decimation)
+
+    def _write_image(self, img, roi: list, window=None) -> int:
+        """
+        @description: Write the full frame or the ROI crop to the local storage, a windowed frame as a crop record.
+        @param       {*} self:
+        @param       {image} img: The image to be recorded
+        @param       {list} roi: The ROI of the tracker [x0, y0, w, h] in full-frame coordinates
+        @param       {SensorWindow} window: The dynamic sensor window the image was read out with (default: None)
+        @return      {int} The index of the written image
+        """
+        windowed = window is not None and window.image_window != list(window.frame_params)
+        if self.roi_only or windowed:
+            # A crop record places an image of any size in the full frame: the ROI crop, or the whole window the
+            # sensor read out, which does not fit the full-frame mjpeg
+            import struct
+
+            x0, y0 = window.image_window[0:2] if window else (0, 0)
+            crop = (0, 0, img.width(), img.height())
+            if self.roi_only:
+                crop = (window.to_local(roi, window.image_window) if window else roi) or crop  # None outside the window
+                jpg = img.copy(roi=crop).compress(quality=self.quality)
+            else:
+                jpg = img.compressed(quality=self.quality)
+            data = jpg.bytearray()
+            if not self._roi_file:
+                self._roi_file = open(self.name + ".roi", "wb")
+            header = (self.frame_count - 1, crop[0] + x0, crop[1] + y0, crop[2], crop[3], len(data))
+            self._roi_file.write(struct.pack(ROI_HEADER_FMT, *header))
+            self._roi_file.write(data)
+        else:
+            if not self._mjpeg:
+                import mjpeg
+
+                self._mjpeg = mjpeg.Mjpeg(self.name + ".mjpeg", img.width(), img.height())
+            self._mjpeg.add_frame(img, quality=self.quality)
+        self.saved_frames += 1
+        return self.saved_frames - 1
+
+    def _write_state(self, tracker, payload: list, mode: str, image_index: int) -> None:
+        """
+        @description: Write the tracker state of the current frame as one JSON line.
+        @param       {*} self:
+        @param       {Tracker} tracker: The tracker to be recorded
+        @param       {list} payload: The IBus payload sent for this frame
+        @param       {str} mode: The detection mode
+        @param       {int} image_index: The index of the recorded image (-1 if no image is recorded)
+        @return      {*} None
+        """
+        blobs = tracker.candidates or []
+        feature_vector = tracker.tracked_blob.feature_vector
+        state = {
+            "i": self.frame_count - 1,
+            "t": time.ticks_diff(time.ticks_ms(), self._t_start),
+            "mode": mode,
+            "thr": tracker.current_thresholds,
+            "roi": tracker.roi.get_roi(),  # The ROI of the next frame in full-frame coordinates
+            "win": tracker.window.image_window if tracker.window else None,  # The window of the image, None if full
+            "fv": [round(f, 2) for f in feature_vector] if feature_vector else None,
+            "lost": tracker.tracked_blob.untracked_frames,
+            "blobs": [[b.x(), b.y(), b.w(), b.h(), b.pixels(), b.code()] for b in blobs[: self.max_candidates]],
+            "n": len(blobs),
+            "ibus": payload,
+            "tm": tracker.timings,
+            "range": tracker.ranger.range_mm() if tracker.ranger else None,
+            "img": image_index,
+        }
+        self._state_file.write(json.dumps(state))
+        self._state_file.write("\n")
+        self.saved_states += 1
+
+    def log(self, tracker, payload: list = None, mode: str = None) -> bool:
+        """
+        @description: Record the current frame if it is due and the time budget allows it.
+        @param       {*} self:
+        @param       {Tracker} tracker: The tracker to be recorded
+        @param       {list} payload: The IBus payload sent for this frame (default: None)
+        @param       {str} mode: The detection mode (default: None)
+        @return      {bool} Whether anything was recorded for this frame
+        """
+        if not self._state_file:
+            return False
+        t_start = time.ticks_us()
+        self._update_budget(t_start)
+        self._last_call = t_start
+        self._last_cost = 0
+        if self._trace_writer:
+            # The fixed-size trace record is cheap enough to be written for every frame
+            self._trace_writer.write(tracker, mode)
+            self._last_cost = time.ticks_diff(time.ticks_us(), t_start)
+            self.credit -= self._last_cost
+        self.frame_count += 1
+        if (self.frame_count - 1) % self.decimation or tracker.img is None:
+            return False
+        # Only start a write whose expected cost is covered by the credit, the state alone is the fallback
+        with_image = self.credit >= self.image_us + self.state_us
+        if not with_image and self.credit < self.state_us:
+            self.skipped += 1
+            return False
+
+        image_index = -1
+        if with_image:
+            t_image = time.ticks_us()
+            image_index = self._write_image(tracker.img, tracker.roi.get_roi(), tracker.window)
+            image_us = time.ticks_diff(time.ticks_us(), t_image)
+            self.image_us = image_us if not self.image_us else self.image_us + EMA_RATE * (image_us - self.image_us)
+        t_state = time.ticks_us()
+        self._write_state(tracker, payload, mode, image_index)
+        t_end = time.ticks_us()
+        state_us = time.ticks_diff(t_end, t_state)
+        self.state_us = state_us if not self.state_us else self.state_us + EMA_RATE * (state_us - self.state_us)
+
+        self.credit -= time.ticks_diff(t_end, t_start) - self._last_cost
+        self._last_cost = time.ticks_diff(t_end, t_start)
+        return True
@@ -0,0 +1,143 @@
+"""
+Author       : agent
+Date         : 2026-10-19 13:18:15
+LastEditors  : agent
+LastEditTime : 2026-10-19 13:18:15
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/lib/reid.py
+Description  : The short-term re-identification memory: a few recently lost tracks with their last box, velocity and
+               color signature. A reference candidate close to where a remembered track is predicted to be by now,
+               of a similar size and color, continues that track with its old id instead of starting a new one.
+               Entries expire with age, a target gone for longer is as likely to be another one.
+"""
+
+# Macros
+REID_CAPACITY = 4  # Number of lost tracks remembered, the oldest is forgotten first
+REID_MAX_AGE = 60  # Number of frames a lost track is remembered
+REID_POSITION_GATE = 1.5  # The largest distance from the predicted center, as a multiple of the larger side
+REID_MOTION_MARGIN = 4  # ... grown by this many pixels per frame since the loss
+REID_VELOCITY_FRAMES = 15  # The prediction stops moving after this many frames, the velocity is only short-term
+REID_SIZE_RATIO = 3  # The largest ratio between the candidate area and the remembered area, either way
+REID_COLOR_THRESHOLD = 15  # The largest mean absolute difference of the color signatures (LAB units)
+
+
+class ReIDMemory:
+    def __init__(self, capacity: int = REID_CAPACITY, max_age: int = REID_MAX_AGE) -> None:
+        """
+        @description: Constructor of the re-identification memory.
+        @param       {*} self:
+        @param       {int} capacity: Number of lost tracks remembered (default: 4)
+        @param       {int} max_age: Number of frames a lost track is remembered (default: 60)
+        @return      {*} None
+        """
+        self.capacity = capacity
+        self.max_age = max_age
+        self.entries = []  # The lost tracks [id, box, velocity, color signature, frame of the loss], oldest first
+        self.frame = 0  # The frame counter the ages are counted with
+        self.matches = 0  # Number of tracks re-identified
+
+    def signature(self, statistics) -> tuple:
+        """
+        @description: The compact color signature of a blob: the mean and the spread of every LAB channel
+        @param       {*} self:
+        @param       {image.statistics} statistics: The color statistics of the blob rectangle
+        @return      {tuple} (l_mean, a_mean, b_mean, l_stdev, a_stdev, b_stdev)
+        """
+        return (
+            statistics.l_mean(),
+            statistics.a_mean(),
+            statistics.b_mean(),
+            statistics.l_stdev(),
+            statistics.a_stdev(),
+            statistics.b_stdev(),
+        )
+
+    def tick(self) -> None:
+        """
+        @description: Count a frame and forget the expired tracks
+        @param       {*} self:
+        @return      {*} None
+        """
+        self.frame += 1
+        self.entries = [entry for entry in self.entries if self.frame - entry[4] <= self.max_age]
+
+    def remember(self, track_id: int, box: list, velocity: tuple, color: tuple) -> None:
+        """
+        @description: Remember a lost track, the oldest one is forgotten when the memory is full
+        @param       {*} self:
+        @param       {int} track_id: The id of the track
+        @param       {list} box: The last box [x, y, w, h] of the track
+        @param       {tuple} velocity: The velocity (vx, vy) of the box center in pixels per frame
+        @param       {tuple} color: The color signature of the last detection
+        @return      {*} None
+        """
+        self.entries = [entry for entry in self.entries if entry[0] != track_id]
+        self.entries.append([track_id, list(box), velocity, color, self.frame])
+        if len(self.entries) > self.capacity:
+            self.entries.pop(0)
+
+    def _cost(self, entry: list, blob, color) -> float:
+        """
+        @description: The matching cost of a candidate against a lost track, each gate contributes up to 1
+        @param       {*} self:
+        @param       {list} entry: The lost track
+        @param       {image.blob} blob: The candidate in full-frame coordinates
+        @param       {*} color: The function returning the color signature of the candidate
+        @return      {float} The cost, None if the candidate fails a gate
+        """
+        _, (x, y, w, h), (vx, vy), remembered, frame = entry
+        age = self.frame - frame
+        steps = min(age, REID_VELOCITY_FRAMES)
+        dx = blob.x() + blob.w() / 2 - (x + w / 2 + vx * steps)
+        dy = blob.y() + blob.h() / 2 - (y + h / 2 + vy * steps)
+        gate = REID_POSITION_GATE * max(w, h) + REID_MOTION_MARGIN * age
+        distance = (dx * dx + dy * dy) ** 0.5
+        if distance > gate:
+            return None
+        area = max(1, w * h)
+        ratio = blob.w() * blob.h() / area
+        if ratio > REID_SIZE_RATIO or ratio * REID_SIZE_RATIO < 1:
+            return None
+        # The color is computed last, only for the candidates close enough
+        candidate = color()
+        difference = sum([abs(candidate[i] - remembered[i]) for i in range(len(remembered))]) / len(remembered)
+        if difference > REID_COLOR_THRESHOLD:
+            return None
+        return distance / gate + difference / REID_COLOR_THRESHOLD
+
+    def match(self, blobs: list, color_of) -> tuple:
+        """
+        @description: Find the candidate matching a lost track best; the matched track is forgotten
+        @param       {*} self:
+        @param       {list} blobs: The reference candidates in full-frame coordinates
+        @param       {*} color_of: The function computing the color signature of a candidate
+        @return      {tuple} The candidate and the id of its track, (None, None) if none matches
+        """
+        best = None
+        best_cost = None
+        colors = [None] * len(blobs)  # The color signature of every candidate, computed once on demand
+
+        def color(i):
+            if colors[i] is None:
+                colors[i] = color_of(blobs[i])
+            return colors[i]
+
+        for entry in self.entries:
+            for i in range(len(blobs)):
+                cost = self._cost(entry, blobs[i], lambda: color(i))
+                if cost is not None and (best_cost is None or cost < best_cost):
+                    best = (i, entry)
+                    best_cost = cost
+        if best is None:
+            return None, None
+        i, entry = best
+        self.entries.remove(entry)
+        self.matches += 1
+        return blobs[i], entry[0]
+
+    def clear(self) -> None:
+        """
+        @description: Forget every lost track
+        @param       {*} self:
+        @return      {*} None
+        """
+        self.entries = []
@@ -0,0 +1,183 @@
+"""
+Author       : agent
+Date         : 2026-10-19 13:00:39
+LastEditors  : agent
+LastEditTime : 2026-10-19 13:21:25
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/lib/runtime.py
+Description  : The cooperative main loop: a capture and tracking task, a fixed-rate IBus telemetry task reading the
+               latest payload from a double buffer, and a command listener, scheduled by uasyncio.
+"""
+
+import time
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio  # Newer firmwares name it asyncio
+
+# Macros
+TELEMETRY_PERIOD_MS = 40  # The period of the IBus telemetry frames
+COMMAND_PERIOD_MS = 50  # The period of the command polling
+FRAME_PERIOD_MS = 0  # The camera frame period, the track task yields until the next frame is due (0 yields once)
+MODES = ("B", "G", "D")  # The modes the ESP32 may request
+
+
+class DoubleBuffer:
+    def __init__(self, initial=None) -> None:
+        """
+        @description: Constructor of the double buffer: the writer fills the back slot then flips, the reader always
+                      gets the last complete value.
+        @param       {*} self:
+        @param       {*} initial: The value read before the first publish (default: None)
+        @return      {*} None
+        """
+        self._slots = [initial, initial]
+        self._front = 0  # The slot holding the last complete value
+        self.count = 0  # Number of values published
+        self.stamp = time.ticks_ms()  # The time of the last publish
+
+    def publish(self, value) -> None:
+        """
+        @description: Write a new value into the back slot and make it the front one.
+        @param       {*} self:
+        @param       {*} value: The value
+        @return      {*} None
+        """
+        back = 1 - self._front
+        self._slots[back] = value
+        self._front = back
+        self.count += 1
+        self.stamp = time.ticks_ms()
+
+    def latest(self):
+        """
+        @description: Read the last complete value.
+        @param       {*} self:
+        @return      {*} The value
+        """
+        return self._slots[self._front]
+
+
+class Runtime:
+    def __init__(
+        self,
+        ibus,
+        set_mode,
+        get_payload,
+        mode: str,
+        tracker,
+        on_frame=None,
+        telemetry_period_ms: int = TELEMETRY_PERIOD_MS,
+        command_period_ms: int = COMMAND_PERIOD_MS,
+        frame_period_ms: int = FRAME_PERIOD_MS,
+        ranger=None,
+    ) -> None:
+        """
+        @description: Constructor of the cooperative runtime.
+        @param       {*} self:
+        @param       {IBus} ibus: The link to the ESP32
+        @param       {function} set_mode: set_mode(current_mode, desired_mode, tracker) -> (mode, tracker) of main.py
+        @param       {function} get_payload: get_payload(mode, tracker) -> list of main.py
+        @param       {str} mode: The current detection mode
+        @param       {*} tracker: The current tracker
+        @param       {function} on_frame: Called as on_frame(mode, tracker, payload) after every frame (default: None)
+        @param       {int} telemetry_period_ms: The period of the telemetry frames (default: 40)
+        @param       {int} command_period_ms: The period of the command polling (default: 50)
+        @param       {int} frame_period_ms: The camera frame period; snapshot blocks until the next frame, so the track
+                                            task waits for it in the event loop instead (default: 0)
+        @param       {RangeFinder} ranger: The range finder read by its own task at its own rate, see lib/ranging.py
+                                           (default: None)
+        @return      {*} None
+        """
+        self.ibus = ibus
+        self.set_mode = set_mode
+        self.get_payload = get_payload
+        self.mode = mode
+        self.tracker = tracker
+        self.on_frame = on_frame
+        self.telemetry_period_ms = telemetry_period_ms
+        self.command_period_ms = command_period_ms
+        self.frame_period_ms = frame_period_ms
+        self.ranger = ranger
+        self.telemetry = DoubleBuffer()  # The payload of the last tracked frame
+        self.requested_mode = None  # The mode received from the ESP32, applied between two frames
+        self.frames = 0  # Number of frames tracked
+        self.sent = 0  # Number of telemetry frames sent
+        self.late = 0  # Number of telemetry frames sent after their slot, e.g. during a long frame
+
+    async def track_task(self) -> None:
+        """
+        @description: Take and track the frames, yielding to the other tasks until the next frame is due.
+        @param       {*} self:
+        @return      {*} None
+        """
+        while True:
+            t_frame = time.ticks_ms()
+            requested, self.requested_mode = self.requested_mode, None
+            if requested and requested != self.mode:
+                # The sensor is reset here, never in the middle of a frame
+                self.mode, self.tracker = self.set_mode(self.mode, requested, self.tracker)
+            self.tracker.track()
+            payload = self.get_payload(self.mode, self.tracker)
+            self.telemetry.publish(payload)
+            self.frames += 1
+            if self.on_frame:
+                self.on_frame(self.mode, self.tracker, payload)
+            delay = time.ticks_diff(time.ticks_add(t_frame, self.frame_period_ms), time.ticks_ms())
+            await asyncio.sleep_ms(max(0, delay))
+
+    async def telemetry_task(self) -> None:
+        """
+        @description: Send the latest payload at a fixed rate, the deadlines do not drift with the frame time.
+        @param       {*} self:
+        @return      {*} None
+        """
+        deadline = time.ticks_ms()
+        while True:
+            payload = self.telemetry.latest()
+            if payload is not None:
+                self.ibus.send(payload)
+                self.sent += 1
+            deadline = time.ticks_add(deadline, self.telemetry_period_ms)
+            delay = time.ticks_diff(deadline, time.ticks_ms())
+            if delay < 0:
+                # A frame held the loop past the slot, restart the schedule instead of sending a burst
+                self.late += 1
+                deadline = time.ticks_ms()
+                delay = 0
+            await asyncio.sleep_ms(delay)
+
+    async def command_task(self) -> None:
+        """
+        @description: Poll the ESP32 for mode commands, the track task applies them.
+        @param       {*} self:
+        @return      {*} None
+        """
+        while True:
+            received_mode = self.ibus.receive()
+            if received_mode in MODES:  # Nothing or a malformed message keeps the current mode
+                self.requested_mode = received_mode
+            await asyncio.sleep_ms(self.command_period_ms)
+
+    async def main(self) -> None:
+        """
+        @description: Start the tasks, returns when the track task stops.
+        @param       {*} self:
+        @return      {*} None
+        """
+        tasks = [asyncio.create_task(self.telemetry_task()), asyncio.create_task(self.command_task())]
+        if self.ranger:
+            tasks.append(asyncio.create_task(self.ranger.run()))
+        try:
+            await self.track_task()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def run(self) -> None:
+        """
+        @description: Run the tasks until the track task stops.
+        @param       {*} self:
+        @return      {*} None
+        """
+        asyncio.run(self.main())
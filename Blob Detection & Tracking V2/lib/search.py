@@ -0,0 +1,155 @@
+"""
+Author       : agent
+Date         : 2026-10-19 12:55:24
+LastEditors  : agent
+LastEditTime : 2026-10-19 12:55:24
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/lib/search.py
+Description  : The lost-target search scheduler: the frame is split into tiles ranked by how likely the target is in
+               them, and every frame only the best tiles fitting a pixel budget are scanned.
+"""
+
+import math
+from lib.memroi import FRAME_PARAMS
+
+# Macros
+GRID = (4, 4)  # Number of tile columns and rows
+OVERLAP = 10  # Each tile is grown by this many pixels on every side so blobs on a border are not cut
+PIXEL_BUDGET = 9600  # The number of pixels scanned per frame, a quarter of HQVGA
+SIGMA_BASE = 0.25  # The spread of the position prior right after the loss, as a share of the frame diagonal
+SIGMA_GROWTH = 0.05  # The growth of the spread per lost frame, as a share of the frame diagonal
+EDGE_MARGIN = 10  # A target closer than this to the frame border (pixels) is assumed to have left through it
+EDGE_BOOST = 3.0  # The prior multiplier of the tiles along the border the target left through
+MISS_DECAY = 0.3  # The prior multiplier of a tile for every scan that did not find the target
+PRIOR_FLOOR = 0.01  # The smallest prior, so every tile is eventually scanned
+
+
+class TileSearch:
+    def __init__(
+        self,
+        frame_params: list = FRAME_PARAMS,
+        grid: tuple = GRID,
+        overlap: int = OVERLAP,
+        pixel_budget: int = PIXEL_BUDGET,
+    ) -> None:
+        """
+        @description: Constructor of the tile search scheduler.
+        @param       {*} self:
+        @param       {list} frame_params: The frame [x0, y0, w, h] (default: FRAME_PARAMS of memroi)
+        @param       {tuple} grid: Number of tile columns and rows (default: (4, 4))
+        @param       {int} overlap: The margin added around every tile in pixels (default: 10)
+        @param       {int} pixel_budget: The number of pixels scanned per frame, at least one tile (default: 9600)
+        @return      {*} None
+        """
+        self.frame_params = frame_params
+        self.pixel_budget = pixel_budget
+        x0, y0, width, height = frame_params
+        self.tiles = []  # [x, y, w, h] of every tile, overlap included
+        self.centers = []  # The center of every tile
+        self.edges = []  # The frame borders ("L", "R", "T", "B") every tile touches
+        cols, rows = grid
+        for row in range(rows):
+            for col in range(cols):
+                tx0 = x0 + width * col // cols
+                ty0 = y0 + height * row // rows
+                tx1 = x0 + width * (col + 1) // cols
+                ty1 = y0 + height * (row + 1) // rows
+                self.centers.append(((tx0 + tx1) / 2, (ty0 + ty1) / 2))
+                gx0, gy0 = max(x0, tx0 - overlap), max(y0, ty0 - overlap)
+                gx1, gy1 = min(x0 + width, tx1 + overlap), min(y0 + height, ty1 + overlap)
+                self.tiles.append([gx0, gy0, gx1 - gx0, gy1 - gy0])
+                edges = ""
+                edges += "L" if col == 0 else ""
+                edges += "R" if col == cols - 1 else ""
+                edges += "T" if row == 0 else ""
+                edges += "B" if row == rows - 1 else ""
+                self.edges.append(edges)
+        self.misses = [0] * len(self.tiles)  # Number of scans of every tile since the loss
+        self.active = False  # Whether a search is running
+        self.lost_frames = 0  # Number of frames since the loss
+        self.last_center = None  # The last known center of the target
+        self.velocity = (0, 0)  # The last known velocity of the target in pixels per frame
+        self.exit_edges = ""  # The frame borders the target was touching when lost
+        self.scanned = []  # The tile indices scanned in the current frame
+
+    def start(self, last_rect: list = None, velocity: tuple = (0, 0)) -> None:
+        """
+        @description: Start a search after a loss.
+        @param       {*} self:
+        @param       {list} last_rect: The last known rectangle [x, y, w, h] of the target, None for no prior
+        @param       {tuple} velocity: The last known velocity (vx, vy) in pixels per frame (default: (0, 0))
+        @return      {*} None
+        """
+        self.active = True
+        self.lost_frames = 0
+        self.misses = [0] * len(self.tiles)
+        self.velocity = velocity
+        self.exit_edges = ""
+        if last_rect:
+            x, y, w, h = last_rect[0:4]
+            self.last_center = (x + w / 2, y + h / 2)
+            fx, fy, fw, fh = self.frame_params
+            self.exit_edges += "L" if x <= fx + EDGE_MARGIN else ""
+            self.exit_edges += "R" if x + w >= fx + fw - EDGE_MARGIN else ""
+            self.exit_edges += "T" if y <= fy + EDGE_MARGIN else ""
+            self.exit_edges += "B" if y + h >= fy + fh - EDGE_MARGIN else ""
+        else:
+            self.last_center = None
+
+    def stop(self) -> None:
+        """
+        @description: Stop the search once the target is found.
+        @param       {*} self:
+        @return      {*} None
+        """
+        self.active = False
+
+    def priors(self) -> list:
+        """
+        @description: Compute the prior of every tile: a Gaussian around the position extrapolated with the velocity,
+                      spreading with the time since the loss, boosted along the exit border and decayed by misses.
+        @param       {*} self:
+        @return      {list} The prior of every tile
+        """
+        if self.last_center is None:
+            return [max(PRIOR_FLOOR, MISS_DECAY ** misses) for misses in self.misses]
+        diagonal = math.sqrt(self.frame_params[2] ** 2 + self.frame_params[3] ** 2)
+        sigma = diagonal * (SIGMA_BASE + SIGMA_GROWTH * self.lost_frames)
+        px = self.last_center[0] + self.velocity[0] * self.lost_frames
+        py = self.last_center[1] + self.velocity[1] * self.lost_frames
+        priors = []
+        for i, (cx, cy) in enumerate(self.centers):
+            prior = math.exp(-((cx - px) ** 2 + (cy - py) ** 2) / (2 * sigma * sigma))
+            for edge in self.exit_edges:
+                if edge in self.edges[i]:
+                    prior *= EDGE_BOOST
+                    break
+            priors.append(max(PRIOR_FLOOR, prior * MISS_DECAY ** self.misses[i]))
+        return priors
+
+    def next_rois(self) -> list:
+        """
+        @description: Pick the tiles to scan in this frame, the most likely first, within the pixel budget.
+        @param       {*} self:
+        @return      {list} The ROIs [x, y, w, h] to scan
+        """
+        priors = self.priors()
+        order = sorted(range(len(self.tiles)), key=lambda i: priors[i], reverse=True)
+        self.scanned = []
+        pixels = 0
+        for i in order:
+            area = self.tiles[i][2] * self.tiles[i][3]
+            if self.scanned and pixels + area > self.pixel_budget:
+                continue  # A smaller tile further down may still fit
+            self.scanned.append(i)
+            pixels += area
+        return [self.tiles[i] for i in self.scanned]
+
+    def miss(self) -> None:
+        """
+        @description: Report that the tiles of this frame did not contain the target.
+        @param       {*} self:
+        @return      {*} None
+        """
+        for i in self.scanned:
+            self.misses[i] += 1
+        self.lost_frames += 1
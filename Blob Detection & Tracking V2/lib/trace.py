@@ -0,0 +1,139 @@
+"""
+Author       : agent
+Date         : 2026-10-19 12:39:46
+LastEditors  : agent
+LastEditTime : 2026-10-19 13:51:59
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/lib/trace.py
+Description  : The fixed-record binary trace of the per-frame tracker telemetry.
+"""
+
+import struct
+import time
+from lib.curblob import GATE_STAGES
+
+# Macros
+TRACE_MAGIC = b"BCTR"  # The magic bytes at the start of every trace file
+TRACE_VERSION = 3  # The version of the record layout, bump it whenever RECORD_FMT changes
+HEADER_FMT = "<4sHH8x"  # Magic, version, record size, padding to 16 bytes
+MAX_THRESHOLDS = 2  # The number of (L, A, B) threshold tuples stored per record
+TIMING_STAGES = ("snapshot", "detect", "find_blobs", "update", "total")  # The stage timings stored per record
+# Sensor frame index since the boot, time since the trace was opened (ms), mode, flags, untracked frames, number of
+# thresholds, track id, number of candidates, feature vector (x, y, w, h, rotation), ROI (x, y, w, h), thresholds,
+# stage timings (us), candidates rejected per gating stage, frame age (us), frames dropped before this one
+RECORD_FMT = "<IIBBBBHH5f4h{}b{}I{}HIH".format(6 * MAX_THRESHOLDS, len(TIMING_STAGES), len(GATE_STAGES))
+RECORDS_PER_BLOCK = 16  # Number of records buffered before a write to the storage
+
+## Flags
+FLAG_TRACKED = 0x01  # The feature vector is valid
+FLAG_DETECTED = 0x02  # The tracked blob was matched in this frame
+FLAG_REACQUIRED = 0x04  # A new track was started in this frame
+FLAG_LOST = 0x08  # The track was dropped in this frame
+
+
+class TraceWriter:
+    def __init__(self, path: str, records_per_block: int = RECORDS_PER_BLOCK) -> None:
+        """
+        @description: Constructor of the trace writer, writes the header of a new trace file.
+        @param       {*} self:
+        @param       {str} path: The path of the trace file
+        @param       {int} records_per_block: Number of records buffered before a write (default: 16)
+        @return      {*} None
+        """
+        self.record_size = struct.calcsize(RECORD_FMT)
+        self.records_per_block = records_per_block
+        self.file = open(path, "wb")
+        self.file.write(struct.pack(HEADER_FMT, TRACE_MAGIC, TRACE_VERSION, self.record_size))
+        self._block = bytearray(self.record_size * records_per_block)  # Preallocated to avoid heap churn
+        self._block_view = memoryview(self._block)
+        self._buffered = 0  # Number of records in the block
+        self._last = {}  # The track id and whether it was tracked of the previous record of every tracker
+        self._t_start = time.ticks_ms()  # The records store the time since, the raw ticks wrap around
+        self.frame_count = 0  # Number of records written
+
+    def _pack_thresholds(self, thresholds: list) -> list:
+        """
+        @description: Flatten the thresholds into MAX_THRESHOLDS full (L, A, B) tuples.
+        @param       {*} self:
+        @param       {list} thresholds: The list of threshold tuples, short tuples span the full range
+        @return      {list} The flattened thresholds clamped to signed bytes
+        """
+        flat = []
+        for i in range(MAX_THRESHOLDS):
+            threshold = thresholds[i] if i < len(thresholds) else ()
+            for j in range(6):
+                if j < len(threshold):
+                    value = int(threshold[j])
+                else:
+                    value = 127 if j % 2 else -128
+                flat.append(min(127, max(-128, value)))
+        return flat
+
+    def write(self, tracker, mode: str = "B") -> None:
+        """
+        @description: Append the state of the tracker after its last frame.
+        @param       {*} self:
+        @param       {Tracker} tracker: The tracker to be traced
+        @param       {str} mode: The detection mode (default: "B")
+        @return      {*} None
+        """
+        blob = tracker.tracked_blob
+        feature_vector = blob.feature_vector
+        # The dual-mode tracker alternates between its trackers, a track is only compared with the same tracker's
+        key = id(getattr(tracker, "current", tracker))
+        last_id, last_tracked = self._last.get(key, (None, False))
+        flags = 0
+        if feature_vector:
+            flags |= FLAG_TRACKED
+            if blob.untracked_frames == 0:
+                flags |= FLAG_DETECTED
+            if blob.id != last_id:
+                flags |= FLAG_REACQUIRED
+        else:
+            feature_vector = (0, 0, 0, 0, 0)
+            if last_tracked:
+                flags |= FLAG_LOST
+        self._last[key] = (blob.id, bool(flags & FLAG_TRACKED))
+        candidates = tracker.candidates
+        capture = tracker.capture
+        values = (
+            (
+                max(0, tracker.frames_taken - 1),  # The sensor frame of the record, not the record count
+                time.ticks_diff(time.ticks_ms(), self._t_start),
+                ord(mode[0]) if mode else 0,
+                flags,
+                min(255, blob.untracked_frames),
+                min(MAX_THRESHOLDS, len(tracker.current_thresholds)),
+                blob.id & 0xFFFF,
+                len(candidates) if candidates else 0,
+            )
+            + tuple(feature_vector)
+            + tuple(tracker.roi.get_roi())
+            + tuple(self._pack_thresholds(tracker.current_thresholds))
+            + tuple(tracker.timings.get(stage, 0) for stage in TIMING_STAGES)
+            + tuple(min(65535, blob.rejections[stage]) for stage in GATE_STAGES)
+            + ((capture.age_us, min(65535, capture.new_drops)) if capture else (0, 0))
+        )
+        struct.pack_into(RECORD_FMT, self._block, self._buffered * self.record_size, *values)
+        self.frame_count += 1
+        self._buffered += 1
+        if self._buffered == self.records_per_block:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        @description: Write the buffered records to the storage.
+        @param       {*} self:
+        @return      {*} None
+        """
+        if self._buffered:
+            self.file.write(self._block_view[: self._buffered * self.record_size])
+            self._buffered = 0
+
+    def close(self) -> None:
+        """
+        @description: Flush the buffered records and close the trace file.
+        @param       {*} self:
+        @return      {*} None
+        """
+        self.flush()
+        self.file.close()
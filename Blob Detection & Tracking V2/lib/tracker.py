@@ -10,14 +10,29 @@ Description  : The tracker class for blob tracking, contains the BLOBTracker and
 from machine import Pin
 import sensor, image
 from pyb import LED
-from lib.curblob import CurBLOB
+from lib.curblob import CurBLOB, NORM_LEVEL, FEATURE_FILTERS
 from lib.memroi import MemROI
 import time
 import math
 import omv
 
+# Macros
+FRAGMENT_FRACTION = 0.25  # The smallest share of the expected area a fragment of the target may have and still be kept
+SIZE_SPREAD_GAIN = 2  # Number of standard deviations of the recent area subtracted from the expected area
+AREA_SCALE_MAX = 8  # The derived area threshold is at least the fixed one and at most this multiple of it
+MARGIN_FRACTION = 0.3  # The merge margin as a share of the larger side of the expected blob
+MARGIN_SCALE_MAX = 2  # The derived margin is at least the fixed one and at most this multiple of it
+REFERENCE_PIXELS_THRESHOLD = 30  # The smallest pixel count of a reference blob
+REFERENCE_AREA_THRESHOLD = 50  # The smallest bounding box area of a reference blob
+BALLOON_SIZE_MM = (400, 400)  # The (w, h) of a ballon, its apparent size is predicted from the range
+GOAL_SIZE_MM = (900, 900)  # The (w, h) of the retroreflective goal
+GOAL_DENSITY_THRESHOLD = 0.05  # The minimum density of a reference goal, the frame of the goal is hollow
+GOAL_ROUNDNESS_THRESHOLD = 0.1  # The minimum roundness of a reference goal, thin glints of the IR LED are below
+
 
 class Tracker:
+    frames_taken = 0  # Number of frames taken from the sensor since the boot, shared by the trackers of the sensor
+
     def __init__(
         self,
         thresholds: list,
@@ -45,6 +60,26 @@ class Tracker:
         self.max_untracked_frames = max_untracked_frames  # The maximum number of untracked frames
         self.dynamic_threshold = dynamic_threshold  # Whether to use dynamic threshold
         self.threshold_update_rate = threshold_update_rate  # The rate of threshold update
+        self.img = None  # The last processed image
+        self.candidates = []  # The candidate blobs found in the last processed image
+        self.detected = False  # Whether the tracked blob was found in the last processed image
+        self.tracked_blob = None  # The tracked blob, set up by the child class
+        self.blob_filter = (0, 0, 0)  # The fixed (pixels_threshold, area_threshold, margin) of find_blobs
+        self.adaptive_blob_filter = False  # Whether to derive the find_blobs filter from the expected size
+        self.timings = {}  # The stage timings of the last processed frame in microseconds
+        self.capture = None  # The multi-buffered capture, None to take the frames with sensor.snapshot
+        self.stride = 1  # The x_stride and y_stride of find_blobs while tracking, raised by the quality governor
+        self.edge_removal = True  # Whether the goal tracker masks the edges, cleared by the quality governor
+        self.freeze_thresholds = False  # Whether the thresholds stop adapting, set by the quality governor
+        self.motion = None  # The change detector reusing the last detection in a static scene, None to detect always
+        self.window = None  # The dynamic sensor window of the ballon tracker, None to read out the full frame
+        self.reacquisitions = 0  # Number of tracks restarted from the frame they were lost in
+        self.reid = None  # The memory of the recently lost tracks of the ballon tracker, None to start new tracks
+        self.reference_id = None  # The lost track the last reference blob was re-identified as, None for a new track
+        self.ranger = None  # The range finder predicting the apparent target size, None to expect the tracked size
+        self.target_size_mm = None  # The (w, h) of the target, set by the child class
+        self.density_threshold = 0  # The minimum density of a reference blob, set by the child class
+        self.roundness_threshold = 0  # The minimum roundness of a reference blob, set by the child class
         self.r_LED = LED(1)  # The red LED
         self.g_LED = LED(2)  # The green LED
         self.b_LED = LED(3)  # The blue LED
@@ -57,6 +92,122 @@ class Tracker:
         # TODO: Implement this function in the child class
         pass
 
+    def resume(self, warm_state: dict):
+        """
+        @description: Restore the ROI and thresholds of a saved state, the tracked blob is then predicted to be where it
+                      was and the first frames search the saved ROI
+        @param       {*} self:
+        @param       {dict} warm_state: The saved state (see lib/warmstart.py)
+        @return      {StoredBlob} The blob rebuilt from the saved feature vector
+        """
+        from lib.warmstart import StoredBlob
+
+        self.roi.roi = list(warm_state["roi"])
+        if self.dynamic_threshold and len(warm_state["thresholds"]) == len(self.current_thresholds):
+            self.current_thresholds = list(warm_state["thresholds"])  # The last adapted thresholds
+        return StoredBlob(warm_state["feature_vector"], warm_state["code"])
+
+    def _blob_filter(self) -> tuple:
+        """
+        @description: Get the filter of find_blobs for this frame. With a track, small blobs are rejected by find_blobs
+                      from the expected size and its recent spread, or from the size predicted from the range when
+                      there is one, and the merge margin follows the size. The fixed filter is the floor, a large
+                      target only tightens it
+        @param       {*} self:
+        @return      {tuple} The pixels_threshold, area_threshold and margin
+        """
+        pixels_threshold, area_threshold, margin = self.blob_filter
+        if not self.tracked_blob or not self.tracked_blob.feature_vector:
+            return pixels_threshold, area_threshold, margin
+        if self.tracked_blob.expected_size:
+            # The range predicts the size of the whole target whatever the recent detections were
+            w, h = self.tracked_blob.expected_size
+            expected = w * h
+        elif self.adaptive_blob_filter:
+            w, h = self.tracked_blob.feature_vector[2:4]
+            # Fragments are filtered out before they are merged, the threshold stays a fraction of the smallest likely area
+            expected = max(0, w * h - SIZE_SPREAD_GAIN * self.tracked_blob.size_spread())
+        else:
+            return pixels_threshold, area_threshold, margin
+        new_area = FRAGMENT_FRACTION * expected
+        new_area = min(area_threshold * AREA_SCALE_MAX, max(area_threshold, new_area))
+        new_margin = MARGIN_FRACTION * max(w, h)
+        new_margin = min(margin * MARGIN_SCALE_MAX, max(margin, new_margin))
+        # The pixel count keeps the fill ratio of the fixed filter
+        return int(pixels_threshold * new_area / area_threshold), int(new_area), int(new_margin)
+
+    def _range_size(self) -> tuple:
+        """
+        @description: Predict the apparent size of the tracked target in this frame from the range
+        @param       {*} self:
+        @return      {tuple} The expected (w, h), None without a range finder, a recent range or a track near the
+                             middle of the frame
+        """
+        if not self.ranger or not self.tracked_blob or not self.tracked_blob.feature_vector:
+            return None
+        self.ranger.poll()  # Reads only when a range is due, the runtime may poll it from its own task as well
+        x, y, w, h = self.tracked_blob.feature_vector[0:4]
+        return self.ranger.apparent_size(self.target_size_mm, x + w / 2, y + h / 2)
+
+    def _snapshot(self) -> image:
+        """
+        @description: Take the next frame, through the multi-buffered capture if there is one
+        @param       {*} self:
+        @return      {image} The frame
+        """
+        if self.reid:
+            self.reid.tick()  # The lost tracks age with every frame
+        if self.capture:
+            img = self.capture.snapshot()
+            Tracker.frames_taken += 1 + self.capture.new_drops  # The dropped frames were read out too
+        else:
+            img = sensor.snapshot()
+            Tracker.frames_taken += 1
+        if self.window:
+            self.window.snapshot_taken()  # The window moves after the detection, the image keeps the old one
+        return img
+
+    def _stamp(self, stage: str, t_start: int) -> int:
+        """
+        @description: Record the time elapsed since t_start for a processing stage
+        @param       {*} self:
+        @param       {str} stage: The name of the stage
+        @param       {int} t_start: The time stamp when the stage started in microseconds
+        @return      {int} The current time stamp in microseconds
+        """
+        t_now = time.ticks_us()
+        self.timings[stage] = time.ticks_diff(t_now, t_start)
+        return t_now
+
+    def _reacquire(self, img: image, blob: image.blob, t_start: int, blob_id: int = None) -> tuple:
+        """
+        @description: Start a new track from a blob of the frame the old track was lost in, no new frame is taken
+        @param       {*} self:
+        @param       {image} img: The frame of the loss
+        @param       {image.blob} blob: The new reference blob in full-frame coordinates
+        @param       {int} t_start: The time stamp when the frame started in microseconds
+        @param       {int} blob_id: The id of the re-identified track the blob continues, None for a new track id
+        @return      {tuple} The feature vector of the new track and True
+        """
+        self.tracked_blob.reset()
+        self.tracked_blob.reinit(blob, blob_id)
+        if self.motion:
+            self.motion.invalidate()
+        rect = blob.rect()
+        statistics = img.get_statistics(roi=self.window.rect_to_local(rect) if self.window else rect)
+        self.update_thresholds(reset=True)  # Like a loss followed by a new reference blob
+        self.update_thresholds(statistics)
+        if self.reid:
+            self.color = self.reid.signature(statistics)
+        self.roi.update(self.tracked_blob.feature_vector[0:4])
+        if self.window:
+            self.window.update(self.roi.get_roi())
+        self.update_leds(tracking=True, detecting=True, lost=False)
+        self.detected = True
+        self.reacquisitions += 1
+        self._stamp("total", t_start)
+        return self.tracked_blob.feature_vector, True
+
     def draw_initial_blob(self, img: image, blob: image.blob, sleep_us: int = 200000) -> None:
         """
         @description:
@@ -93,6 +244,24 @@ class Tracker:
                 max_area = blob.pixels()
         return max_blob
 
+    def _reference_candidates(self, blobs: list) -> list:
+        """
+        @description: Keep the blobs that pass the criteria of a reference blob, the thresholds are set by the child class
+        @param       {*} self:
+        @param       {list} blobs: The blobs of the frame
+        @return      {list} The dense, round and large enough blobs
+        """
+        nice_blobs = []
+        for blob in blobs:
+            if (
+                blob.pixels() >= REFERENCE_PIXELS_THRESHOLD
+                and blob.area() >= REFERENCE_AREA_THRESHOLD
+                and blob.density() > self.density_threshold
+                and blob.roundness() > self.roundness_threshold
+            ):
+                nice_blobs.append(blob)
+        return nice_blobs
+
     def _comp_new_threshold(self, statistics: image.statistics, mul_stdev: float = 3) -> tuple:
         """
         @description: Compute the new threshold based on the color statistics
@@ -145,7 +314,7 @@ class Tracker:
         @param       {bool} reset: If we want to reset the threshold (default: False)
         @return      {*} None
         """
-        if not self.dynamic_threshold:
+        if not self.dynamic_threshold or (self.freeze_thresholds and not reset):
             return
         if recall:
             new_threshold = [threshold for threshold in self.original_thresholds]  # Deep copy the original thresholds
@@ -197,6 +366,22 @@ class BLOBTracker(Tracker):
         dynamic_threshold: bool = False,
         threshold_update_rate: float = 0,
         feature_distance_threshold: float = 200,
+        window_size: int = 5,
+        norm_level: int = NORM_LEVEL,
+        density_threshold: float = 0.25,
+        roundness_threshold: float = 0.35,
+        color_lut=None,
+        warm_state: dict = None,
+        search_budget: int = 0,
+        max_reference_frames: int = 0,
+        adaptive_blob_filter: bool = False,
+        gating: bool = False,
+        feature_filters=FEATURE_FILTERS,
+        dynamic_window: bool = False,
+        frame_buffers: int = 0,
+        motion_gate: bool = False,
+        reid_memory: bool = False,
+        ranger=None,
     ) -> None:
         """
         @description: Constructor of the BLOBTracker class
@@ -208,6 +393,31 @@ class BLOBTracker(Tracker):
         @param       {bool} dynamic_threshold: Whether to use dynamic threshold (default: False)
         @param       {float} threshold_update_rate: The rate of threshold update (default: 0)
         @param       {float} feature_distance_threshold: The feature distance threshold (default: 200)
+        @param       {int} window_size: The window size of the moving average of the tracked blob (default: 5)
+        @param       {int} norm_level: The norm level of the feature distance (default: NORM_LEVEL)
+        @param       {float} density_threshold: The minimum density of a reference blob (default: 0.25)
+        @param       {float} roundness_threshold: The minimum roundness of a reference blob (default: 0.35)
+        @param       {ColorLUT} color_lut: The learned color table checking the candidate blobs (default: None)
+        @param       {dict} warm_state: The saved state to resume from instead of waiting for a reference blob (default: None)
+        @param       {int} search_budget: The pixels scanned per frame by the tile search after a loss, 0 to block in
+                                          find_reference until a blob is in view (default: 0)
+        @param       {int} max_reference_frames: The frames find_reference looks at before giving up, 0 to wait until a
+                                                 blob is in view; when set, the constructor does not look for one and
+                                                 track does instead (default: 0)
+        @param       {bool} adaptive_blob_filter: Whether to derive the pixel, area and merge margin filters of
+                                                  find_blobs from the tracked blob size (default: False)
+        @param       {bool} gating: Whether the tracked blob rejects candidates by color code, predicted box overlap and
+                                    size before their feature distance (default: False)
+        @param       {*} feature_filters: The smoothing filters of the tracked blob features, see CurBLOB (default: "mean")
+        @param       {bool} dynamic_window: Whether the sensor only reads out a window around the ROI while tracking,
+                                            the whole sensor must then be owned by this tracker (default: False)
+        @param       {int} frame_buffers: The frame buffers of the sensor, see lib/capture.py; 0 keeps the sensor
+                                          setting and does not estimate the frame age (default: 0)
+        @param       {bool} motion_gate: Whether to reuse the last detection while the tracked box is unchanged, see
+                                         lib/motion.py (default: False)
+        @param       {bool} reid_memory: Whether a reference blob matching a recently lost track continues it with its
+                                         old id, see lib/reid.py (default: False)
+        @param       {RangeFinder} ranger: The range finder predicting the ballon size, see lib/ranging.py (default: None)
         @return      {*} None
         """
         super().__init__(
@@ -218,111 +428,308 @@ class BLOBTracker(Tracker):
             dynamic_threshold,
             threshold_update_rate,
         )  # Initialize the parent class
+        self.density_threshold = density_threshold  # The minimum density of a reference blob
+        self.roundness_threshold = roundness_threshold  # The minimum roundness of a reference blob
+        self.color_lut = color_lut  # The learned color table, the thresholds are then its bounding boxes
+        self.search = None  # The tile search scheduler used after a loss
+        if search_budget:
+            from lib.search import TileSearch
+
+            self.search = TileSearch(pixel_budget=search_budget)
+        self.max_reference_frames = max_reference_frames  # The frames find_reference may take, 0 for no limit
+        self.blob_filter = (75, 100, 20)  # The pixels_threshold, area_threshold and margin without a track
+        self.adaptive_blob_filter = adaptive_blob_filter
         self.roi = MemROI(ffp=factors[0], ffs=factors[1], gfp=factors[2], gfs=factors[3]) # The ROI of the ballon
-        init_blob, statistics = self.find_reference()  # Find the blob with the largest area
-        self.tracked_blob = CurBLOB(init_blob, feature_dist_threshold=feature_distance_threshold)  # The tracked blob
+        self.ranger = ranger
+        self.target_size_mm = BALLOON_SIZE_MM
+        if dynamic_window:
+            from lib.window import SensorWindow
+
+            self.window = SensorWindow()
+        if frame_buffers:
+            from lib.capture import Capture
+
+            self.capture = Capture(frame_buffers)  # Set up before find_reference takes the first frame
+        if motion_gate:
+            from lib.motion import ChangeDetector
+
+            self.motion = ChangeDetector()
+        self.color = None  # The color signature of the last detection, remembered with the track on a loss
+        if reid_memory:
+            from lib.reid import ReIDMemory
+
+            self.reid = ReIDMemory()
+        if warm_state:
+            init_blob = self.resume(warm_state)  # Track from the saved state right away
+        elif max_reference_frames:
+            init_blob = None  # Do not block, track looks for the reference blob
+        else:
+            init_blob, statistics = self.find_reference()  # Find the blob with the largest area
+        self.tracked_blob = CurBLOB(
+            init_blob,
+            norm_level=norm_level,
+            feature_dist_threshold=feature_distance_threshold,
+            window_size=window_size,
+            gating=gating,
+            feature_filters=feature_filters,
+        )  # The tracked blob
 
     def track(self):
         """
         @description: Track the blob with dynamic threshold and ROI
         @return      {tuple} The feature vector of the tracked blob and whether the blob is tracked
         """
+        self.timings = {}  # A frame that returns early records no stage of the previous one
         # Initialize the blob with the max blob in view if it is not initialized
         if not self.tracked_blob.blob_history:
             # There is no blob history, initialize the blob
             self.update_leds(tracking=False, detecting=False, lost=True)  # Set the LEDs to indicate tracking
-            reference_blob, statistics = self.find_reference(time_show_us=0)  # Find the blob with the largest area
-            self.tracked_blob.reinit(reference_blob)  # Initialize the tracked blob with the reference blob
+            if self.search and self.search.active:
+                # Scan only the most likely tiles after a loss, there is no prior to rank them before the first track
+                reference_blob, statistics = self.search_reference()
+                if not reference_blob:
+                    return None, False
+            else:
+                # Find the blob with the largest area
+                reference_blob, statistics = self.find_reference(time_show_us=0, max_frames=self.max_reference_frames)
+                if not reference_blob:
+                    return None, False
+            # Initialize the tracked blob with the reference blob, as the lost track it was re-identified as if any
+            self.tracked_blob.reinit(reference_blob, self.reference_id)
             self.update_thresholds(statistics)  # Update the dynamic threshold
+            if self.reid:
+                self.color = self.reid.signature(statistics)
             self.roi.update(self.tracked_blob.feature_vector[0:4])  # Update the ROI
+            if self.window:
+                self.window.update(self.roi.get_roi())  # Read out only around the ROI from the next frame
             self.update_leds(tracking=True, detecting=True, lost=False)
+            self.detected = True
             return (
                 self.tracked_blob.feature_vector,
                 True,
             )  # Return the feature vector and True
         # Track the blob
         self.clock.tick()
-        img = sensor.snapshot()
-        list_of_blobs = img.find_blobs(
-            self.current_thresholds,
-            merge=True,
-            pixels_threshold=75,
-            area_threshold=100,
-            margin=20,
-            roi=self.roi.get_roi(),
-            x_stride=1,
-            y_stride=1,
-        )
+        t_start = time.ticks_us()
+        img = self._snapshot()
+        t_stage = self._stamp("snapshot", t_start)
+        if self.motion and self.detected and self.motion.unchanged(img):
+            # Nothing changed around the target, the last detection still holds
+            self.img = img
+            self._stamp("total", t_start)
+            return self.tracked_blob.feature_vector, True
+        self.tracked_blob.expected_size = self._range_size()
+        pixels_threshold, area_threshold, margin = self._blob_filter()
+        roi = self.window.to_local(self.roi.get_roi()) if self.window else self.roi.get_roi()
+        list_of_blobs = []  # Nothing to search if the ROI left the window
+        if roi:
+            list_of_blobs = img.find_blobs(
+                self.current_thresholds,
+                merge=True,
+                pixels_threshold=pixels_threshold,
+                area_threshold=area_threshold,
+                margin=margin,
+                roi=roi,
+                x_stride=self.stride,
+                y_stride=self.stride,
+            )
+            if self.color_lut:
+                list_of_blobs = self.color_lut.verify(img, list_of_blobs)
+            if self.window:
+                list_of_blobs = self.window.to_frame(list_of_blobs)  # Full-frame coordinates from here on
+        t_stage = self._stamp("find_blobs", t_stage)
+        self.img = img
+        self.candidates = list_of_blobs
         blob_rect = self.tracked_blob.update(list_of_blobs)
+        t_stage = self._stamp("update", t_stage)
 
         if self.tracked_blob.untracked_frames >= self.max_untracked_frames:
+            if self.reid and self.color:
+                # Remember the lost track, it may come back
+                self.reid.remember(
+                    self.tracked_blob.id, self.tracked_blob.feature_vector[0:4], self.tracked_blob.velocity(), self.color
+                )
+            # A blob of this frame good enough to be a reference blob starts the new track right away
+            nice_blobs = self._reference_candidates(list_of_blobs)
+            if nice_blobs:
+                best_blob = self._pick_reference(img, nice_blobs)
+                return self._reacquire(img, best_blob, t_start, self.reference_id)
             # If the blob fails to track for 15 frames, reset the tracking and find a new reference blob
             # self.roi.reset() (NOTE: ROI is not reset since we are assuming that the blob tends to appear in the same region when it is lost)
+            if self.search:
+                self.search.start(self.tracked_blob.feature_vector[0:4], self.tracked_blob.velocity())
             self.tracked_blob.reset()
+            if self.window:
+                self.window.reset()  # Look for the blob in the full frame again
+            if self.motion:
+                self.motion.invalidate()
             self.update_leds(tracking=False, detecting=False, lost=True)
             print("Blob lost")
             self.update_thresholds(reset=True)  # Reset the dynamic threshold
+            self.detected = False
             return None, False
+        self.detected = bool(blob_rect)
         if blob_rect:
             # If we discover the reference blob again
-            self.roi.update(blob_rect)  # Update the ROI
+            self.roi.update(blob_rect, self.tracked_blob.expected_size)  # Update the ROI
             self.update_leds(tracking=True, detecting=True, lost=False)
-            statistics = img.get_statistics(roi=blob_rect)
+            statistics = img.get_statistics(roi=self.window.rect_to_local(blob_rect) if self.window else blob_rect)
             self.update_thresholds(statistics)  # Update the dynamic threshold
+            if self.reid:
+                self.color = self.reid.signature(statistics)
         else:
             # If we do not discover the reference blob
             self.update_leds(
                 tracking=True, detecting=False, lost=False
             )  # Set the LEDs to indicate tracking but not detecting
-            self.roi.update()  # Reset the ROI
+            self.roi.update(None, self.tracked_blob.expected_size)  # Reset the ROI
             self.update_thresholds(recall=True)  # Recall the original threshold
 
+        if self.motion:
+            # Taken before the overlay is drawn into the same frame buffer
+            if not self.detected:
+                self.motion.invalidate()  # A miss is never reused
+            elif self.window:
+                self.motion.set_reference(img, self.window.rect_to_local(self.tracked_blob.feature_vector[0:4]))
+            else:
+                self.motion.set_reference(img, self.tracked_blob.feature_vector[0:4])
         if self.show:
-            x0, y0, w, h = [math.floor(self.tracked_blob.feature_vector[i]) for i in range(4)]
-            img.draw_rectangle(x0, y0, w, h)
-            img.draw_rectangle(self.roi.get_roi(), color=(255, 255, 0))
+            rect = [math.floor(self.tracked_blob.feature_vector[i]) for i in range(4)]
+            roi = self.roi.get_roi()
+            if self.window:
+                rect, roi = self.window.rect_to_local(rect), self.window.rect_to_local(roi)
+            img.draw_rectangle(rect)
+            img.draw_rectangle(roi, color=(255, 255, 0))
             st = "FPS: {}".format(str(round(self.clock.fps(), 2)))
             img.draw_string(0, 0, st, color=(255, 0, 0))
+        if self.window:
+            changes = self.window.changes
+            self.window.update(self.roi.get_roi())  # Follow the ROI of the next frame
+            if self.motion and self.window.changes != changes:
+                self.motion.invalidate()  # The sampled pixels moved in the next frame
+        self._stamp("total", t_start)
         return self.tracked_blob.feature_vector, True
 
     def find_reference(
         self,
-        density_threshold: float = 0.25,
-        roundness_threshold: float = 0.35,
+        density_threshold: float = None,
+        roundness_threshold: float = None,
         time_show_us: int = 50000,
+        max_frames: int = 0,
     ) -> tuple:
         """
         @description: Find the a good blob to be the reference blob
         @param       {*} self:
-        @param       {float} density_threshold: The density threshold of the blob
-        @param       {float} roundness_threshold: The roundness threshold of the blob
+        @param       {float} density_threshold: The density threshold of the blob (default: self.density_threshold)
+        @param       {float} roundness_threshold: The roundness threshold of the blob (default: self.roundness_threshold)
         @param       {int} time_show_us: The time to show the blob on the screen
-        @return      {tuple} The reference blob and its color statistics
+        @param       {int} max_frames: The number of frames to look at before giving up, 0 for no limit (default: 0)
+        @return      {tuple} The reference blob and its color statistics, (None, None) if none was found in max_frames
         """
+        frames = 0
         while True:
-            nice_blobs = []  # A list of good blobs
             self.clock.tick()
-            img = sensor.snapshot()
-            list_of_blob = img.find_blobs(
-                self.original_thresholds,
-                merge=True,
-                pixels_threshold=30,
-                area_threshold=50,
-                margin=20,
-                x_stride=1,
-                y_stride=1,
+            img = self._snapshot()
+            nice_blobs = self._nice_blobs(
+                img, density_threshold=density_threshold, roundness_threshold=roundness_threshold
             )
-            for blob in list_of_blob:
-                # Find a set of good initial blobs by filtering out the not-so-dense and not-so-round blobs
-                if blob.density() > density_threshold and blob.roundness() > roundness_threshold:
-                    nice_blobs.append(blob)
             if nice_blobs:  # If we find a good blob, break the loop
                 break
-        best_blob = self._find_max(nice_blobs)  # Find the best blob
+            frames += 1
+            if max_frames and frames >= max_frames:
+                self.img = img
+                self.candidates = []
+                return None, None
+        best_blob = self._pick_reference(img, nice_blobs)  # Find the best blob
         self.draw_initial_blob(img, best_blob, time_show_us)  # Draw the initial blob
         statistics = img.get_statistics(roi=best_blob.rect())  # Get the color statistics of the blob in actual image
         return best_blob, statistics
 
+    def search_reference(self) -> tuple:
+        """
+        @description: Look for a reference blob in the next tiles of the lost-target search, takes a single frame
+        @param       {*} self:
+        @return      {tuple} The reference blob and its color statistics, (None, None) if these tiles hold none
+        """
+        self.clock.tick()
+        t_start = time.ticks_us()
+        img = self._snapshot()
+        t_stage = self._stamp("snapshot", t_start)
+        nice_blobs = []
+        for roi in self.search.next_rois():
+            nice_blobs.extend(self._nice_blobs(img, roi=roi))
+        self._stamp("find_blobs", t_stage)
+        self.img = img
+        self.candidates = nice_blobs
+        if not nice_blobs:
+            self.search.miss()
+            self._stamp("total", t_start)
+            return None, None
+        self.search.stop()
+        best_blob = self._pick_reference(img, nice_blobs)  # Blobs on tile overlaps may be found twice
+        statistics = img.get_statistics(roi=best_blob.rect())
+        self._stamp("total", t_start)
+        return best_blob, statistics
+
+    def _nice_blobs(
+        self,
+        img: image,
+        roi: list = None,
+        density_threshold: float = None,
+        roundness_threshold: float = None,
+    ) -> list:
+        """
+        @description: Find the dense and round blobs that make a good reference blob
+        @param       {*} self:
+        @param       {image} img: The image to search
+        @param       {list} roi: The region to search (default: None for the whole frame)
+        @param       {float} density_threshold: The density threshold of the blob (default: self.density_threshold)
+        @param       {float} roundness_threshold: The roundness threshold of the blob (default: self.roundness_threshold)
+        @return      {list} The good blobs
+        """
+        if density_threshold is None:
+            density_threshold = self.density_threshold
+        if roundness_threshold is None:
+            roundness_threshold = self.roundness_threshold
+        list_of_blob = img.find_blobs(
+            self.original_thresholds,
+            merge=True,
+            pixels_threshold=REFERENCE_PIXELS_THRESHOLD,
+            area_threshold=REFERENCE_AREA_THRESHOLD,
+            margin=20,
+            roi=roi if roi else (0, 0, img.width(), img.height()),
+            x_stride=1,
+            y_stride=1,
+        )
+        if self.color_lut:
+            list_of_blob = self.color_lut.verify(img, list_of_blob)
+        nice_blobs = []  # A list of good blobs
+        for blob in list_of_blob:
+            # Find a set of good initial blobs by filtering out the not-so-dense and not-so-round blobs
+            if blob.density() > density_threshold and blob.roundness() > roundness_threshold:
+                nice_blobs.append(blob)
+        return nice_blobs
+
+    def _pick_reference(self, img: image, nice_blobs: list) -> image.blob:
+        """
+        @description: Pick the reference blob among the good ones: the best match of a recently lost track if there is
+                      one, which then continues that track, the largest one otherwise
+        @param       {*} self:
+        @param       {image} img: The frame of the blobs
+        @param       {list} nice_blobs: The good blobs in full-frame coordinates
+        @return      {image.blob} The reference blob, the track it continues is left in self.reference_id
+        """
+        self.reference_id = None
+        if self.reid and self.reid.entries:
+            local = self.window.rect_to_local if self.window else (lambda rect: rect)
+            blob, self.reference_id = self.reid.match(
+                nice_blobs, lambda blob: self.reid.signature(img.get_statistics(roi=local(blob.rect())))
+            )
+            if blob:
+                return blob
+        return self._find_max(nice_blobs)
+
+
 class GoalTracker(Tracker):
     def __init__(
         self,
@@ -336,6 +743,17 @@ class GoalTracker(Tracker):
         feature_distance_threshold: float = 200,
         LEDpin: str = "PG12",
         sensor_sleep_time: int = 50000,
+        window_size: int = 5,
+        norm_level: int = NORM_LEVEL,
+        warm_state: dict = None,
+        max_reference_frames: int = 0,
+        adaptive_blob_filter: bool = False,
+        gating: bool = False,
+        feature_filters=FEATURE_FILTERS,
+        motion_gate: bool = False,
+        ranger=None,
+        density_threshold: float = GOAL_DENSITY_THRESHOLD,
+        roundness_threshold: float = GOAL_ROUNDNESS_THRESHOLD,
     ) -> None:
         """
         @description:
@@ -349,6 +767,24 @@ class GoalTracker(Tracker):
         @param       {float} feature_distance_threshold: The feature distance threshold (default: 200)
         @param       {str} LEDpin: The pin of the IR LED (default: "PG12")
         @param       {int} sensor_sleep_time: The time to sleep after the sensor captures a new image (default: 50000)
+        @param       {int} window_size: The window size of the moving average of the tracked blob (default: 5)
+        @param       {int} norm_level: The norm level of the feature distance (default: NORM_LEVEL)
+        @param       {dict} warm_state: The saved state to resume from instead of waiting for a reference blob (default: None)
+        @param       {int} max_reference_frames: The frames find_reference looks at before giving up, 0 to wait until a
+                                                 blob is in view; when set, the constructor does not look for one and
+                                                 track does instead (default: 0)
+        @param       {bool} adaptive_blob_filter: Whether to derive the pixel, area and merge margin filters of
+                                                  find_blobs from the tracked blob size (default: False)
+        @param       {bool} gating: Whether the tracked blob rejects candidates by color code, predicted box overlap and
+                                    size before their feature distance (default: False)
+        @param       {*} feature_filters: The smoothing filters of the tracked blob features, see CurBLOB (default: "mean")
+        @param       {bool} motion_gate: Whether to reuse the last detection while the tracked box is unchanged in the
+                                         frame without the IR LED, see lib/motion.py (default: False)
+        @param       {RangeFinder} ranger: The range finder predicting the goal size, see lib/ranging.py (default: None)
+        @param       {float} density_threshold: The minimum density of a reference goal, low for the hollow frame
+                                                (default: GOAL_DENSITY_THRESHOLD)
+        @param       {float} roundness_threshold: The minimum roundness of a reference goal, rejects the thin glints
+                                                  (default: GOAL_ROUNDNESS_THRESHOLD)
         @return      {*}
         """
         super().__init__(
@@ -359,51 +795,106 @@ class GoalTracker(Tracker):
             dynamic_threshold,
             threshold_update_rate,
         )
-        self.roi = MemROI(ffp=factors[0], ffs=factors[1], gfp=factors[2], gfs=factors[3]) # The ROI of the goal
-        blob, statistics = self.find_reference()  # Find the blob with the largest area
-        self.tracked_blob = CurBLOB(blob, feature_dist_threshold=feature_distance_threshold) # The tracked blob
+        # The IR LED is needed by detect, so it is set up before looking for the reference blob
         self.IR_LED = Pin(LEDpin, Pin.OUT)
         self.IR_LED.value(0)
         self.sensor_sleep_time = sensor_sleep_time
+        self.max_reference_frames = max_reference_frames  # The frames find_reference may take, 0 for no limit
+        self.blob_filter = (20, 40, 10)  # The pixels_threshold, area_threshold and margin without a track
+        self.density_threshold = density_threshold  # The minimum density of a reference goal
+        self.roundness_threshold = roundness_threshold  # The minimum roundness of a reference goal
+        self.adaptive_blob_filter = adaptive_blob_filter
+        self.roi = MemROI(ffp=factors[0], ffs=factors[1], gfp=factors[2], gfs=factors[3]) # The ROI of the goal
+        self.ranger = ranger
+        self.target_size_mm = GOAL_SIZE_MM
+        if motion_gate:
+            from lib.motion import ChangeDetector
+
+            self.motion = ChangeDetector()
+        if warm_state:
+            blob = self.resume(warm_state)  # Track from the saved state right away
+        elif max_reference_frames:
+            blob = None  # Do not block, track looks for the reference blob
+        else:
+            blob, statistics = self.find_reference()  # Find the blob with the largest area
+        self.tracked_blob = CurBLOB(
+            blob,
+            norm_level=norm_level,
+            feature_dist_threshold=feature_distance_threshold,
+            window_size=window_size,
+            gating=gating,
+            feature_filters=feature_filters,
+        )  # The tracked blob
 
-    def track(self, edge_removal: bool = True) -> tuple:
+    def track(self, edge_removal: bool = None) -> tuple:
         """
         @description: Track the blob with dynamic threshold and ROI
         @param       {*} self:
-        @param       {bool} edge_removal: Whether to remove the edge noises (default: True)
+        @param       {bool} edge_removal: Whether to remove the edge noises (default: self.edge_removal)
         @return      {tuple} The feature vector of the tracked blob and whether the blob is tracked
         """
+        self.timings = {}  # A frame that returns early records no stage of the previous one
         # Initialize the blob with the max blob in view if it is not initialized
         if not self.tracked_blob.blob_history:
             self.update_leds(tracking=False, detecting=False, lost=True)  # Set the LEDs to indicate tracking
-            reference_blob, statistics = self.find_reference(time_show_us=0)  # Find the blob with the largest area
+            # Find the blob with the largest area
+            reference_blob, statistics = self.find_reference(time_show_us=0, max_frames=self.max_reference_frames)
+            if not reference_blob:
+                return None, False
             self.tracked_blob.reinit(reference_blob)  # Initialize the tracked blob with the reference blob
             self.update_thresholds(statistics)  # Update the dynamic threshold
             self.roi.update(self.tracked_blob.feature_vector[0:4])  # Update the ROI
+            if self.motion:
+                self.motion.invalidate()  # Sampled over the ROI of the lost track
             self.update_leds(tracking=True, detecting=True, lost=False)
+            self.detected = True
             return self.tracked_blob.feature_vector, True
         # Track the blob
-        img, list_of_blobs = self.detect(isColored=True, edge_removal=edge_removal)
+        t_start = time.ticks_us()
+        if edge_removal is None:
+            edge_removal = self.edge_removal
+        self.tracked_blob.expected_size = self._range_size()
+        img, list_of_blobs = self.detect(
+            isColored=True, edge_removal=edge_removal, motion_gate=bool(self.motion and self.detected)
+        )
+        t_stage = self._stamp("detect", t_start)
+        if img is None:
+            # Nothing changed around the target, the last detection still holds
+            self._stamp("total", t_start)
+            return self.tracked_blob.feature_vector, True
+        self.img = img
+        self.candidates = list_of_blobs
         blob_rect = self.tracked_blob.update(list_of_blobs)
+        t_stage = self._stamp("update", t_stage)
 
         if self.tracked_blob.untracked_frames >= self.max_untracked_frames:
+            # A blob of this frame good enough to be a reference goal starts the new track right away
+            nice_blobs = self._reference_candidates(list_of_blobs)
+            if nice_blobs:
+                return self._reacquire(img, self._find_max(nice_blobs), t_start)
             # If the blob fails to track for 15 frames, reset the tracking and find a new reference blob
             self.update_leds(tracking=False, detecting=False, lost=True)
             self.tracked_blob.reset()
+            if self.motion:
+                self.motion.invalidate()
             # self.roi.reset() (NOTE: ROI is not reset since we are assuming that the blob tends to appear in the same region when it is lost)
             print("Goal lost")
             self.update_thresholds(reset=True)
+            self.detected = False
             return None, False
+        self.detected = bool(blob_rect)
+        if self.motion and not self.detected:
+            self.motion.invalidate()  # A miss is never reused
         if blob_rect:
             # If we discover the reference blob again
-            self.roi.update(blob_rect)
+            self.roi.update(blob_rect, self.tracked_blob.expected_size)
             self.update_leds(tracking=True, detecting=True, lost=False)
             statistics = img.get_statistics(roi=blob_rect)
             self.update_thresholds(statistics)
         else:
             # If we do not discover the reference blob
             self.update_leds(tracking=True, detecting=False, lost=False)
-            self.roi.update()
+            self.roi.update(None, self.tracked_blob.expected_size)
             self.update_thresholds(recall=True)
         if self.show:
             x0, y0, w, h = [math.floor(self.tracked_blob.feature_vector[i]) for i in range(4)]
@@ -412,36 +903,62 @@ class GoalTracker(Tracker):
             st = "FPS: {}".format(str(round(self.clock.fps(), 2)))
             img.draw_string(0, 0, st, color=(0, 0, 0))
             img.flush()
+        self._stamp("total", t_start)
         return self.tracked_blob.feature_vector, True
 
     def find_reference(
         self,
         time_show_us: int = 50000,
+        max_frames: int = 0,
     ) -> tuple:
         """
         @description: Find the a good blob to be the reference blob
         @param       {*} self:
         @param       {int} time_show_us: The time to show the blob on the screen
-        @return      {tuple} The reference blob and its color statistics
+        @param       {int} max_frames: The number of frames to look at before giving up, 0 for no limit (default: 0)
+        @return      {tuple} The reference blob and its color statistics, (None, None) if none was found in max_frames
         """
+        frames = 0
         while True:
             self.clock.tick()
-            img, nice_blobs = self.detect(isColored=True, edge_removal=False)
+            img, list_of_blobs = self.detect(isColored=True, edge_removal=False)
+            nice_blobs = self._reference_candidates(list_of_blobs)
             if nice_blobs:
                 break
+            frames += 1
+            if max_frames and frames >= max_frames:
+                self.img = img
+                self.candidates = []
+                return None, None
         best_blob = self._find_max(nice_blobs)  # Find the best blob, will never return None if nice_blobs is not empty
         self.draw_initial_blob(img, best_blob, time_show_us)  # Draw the initial blob
         statistics = img.get_statistics(roi=best_blob.rect())  # Get the color statistics of the blob in actual image
         return best_blob, statistics
 
-    def detect(self, isColored=False, edge_removal=True):
+    def detect(self, isColored=False, edge_removal=True, motion_gate=False):
+        """
+        @description: Take a frame without and one with the IR LED and find the blobs of their difference
+        @param       {*} self:
+        @param       {bool} isColored: Whether the frames are RGB565 (default: False)
+        @param       {bool} edge_removal: Whether to mask the edges of the frame without the IR LED (default: True)
+        @param       {bool} motion_gate: Whether to stop after the first frame if the ROI is unchanged (default: False)
+        @return      {tuple} The difference image and its blobs, (None, None) if the detection was skipped
+        """
         omv.disable_fb(True)  # No show on screen
+        self.timings["sleep"] = 0  # The time waited for the sensor, left out by the quality governor
         # Get an extra frame buffer and take a snapshot
         if isColored:
             extra_fb = sensor.alloc_extra_fb(sensor.width(), sensor.height(), sensor.RGB565)
         else:
             extra_fb = sensor.alloc_extra_fb(sensor.width(), sensor.height(), sensor.GRAYSCALE)
-        extra_fb.replace(sensor.snapshot())
+        extra_fb.replace(self._snapshot())
+        if motion_gate and self.motion.unchanged(extra_fb):
+            sensor.dealloc_extra_fb()
+            omv.disable_fb(False)
+            return None, None
+        if self.motion and self.tracked_blob and self.tracked_blob.feature_vector:
+            # Compared with the next frame without the IR LED, the box moves little in one frame
+            self.motion.set_reference(extra_fb, self.tracked_blob.feature_vector[0:4])
 
         # Turn on the Infrared LED
         self.IR_LED.value(1)
@@ -449,7 +966,7 @@ class GoalTracker(Tracker):
         # Time block 1:
         # Do something other than wait, preferrably detection filtering and tracking
         self.sensor_sleep(time_last_snapshot)
-        img = sensor.snapshot()
+        img = self._snapshot()
 
         # Turn off the Infrared LED
         self.IR_LED.value(0)
@@ -469,13 +986,14 @@ class GoalTracker(Tracker):
             edge_mask = extra_fb.dilate(3, 3).negate()
 
         img.negate()
+        pixels_threshold, area_threshold, margin = self._blob_filter()
         list_of_blob = list_of_blob = img.find_blobs(
             self.current_thresholds,
-            area_threshold=40,
-            pixels_threshold=20,
-            margin=10,
-            x_stride=1,
-            y_stride=1,
+            area_threshold=area_threshold,
+            pixels_threshold=pixels_threshold,
+            margin=margin,
+            x_stride=self.stride,
+            y_stride=self.stride,
             merge=True,
             mask=edge_mask,
         )
@@ -494,4 +1012,5 @@ class GoalTracker(Tracker):
         elapsed = self.sensor_sleep_time - (int((time.time_ns() - last_time_stamp) / 1000))
         if elapsed > 0:
             time.sleep_us(elapsed)
+            self.timings["sleep"] = self.timings.get("sleep", 0) + elapsed
         return None
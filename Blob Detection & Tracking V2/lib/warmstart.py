@@ -0,0 +1,175 @@
+"""
+Author       : agent
+Date         : 2026-10-19 12:52:54
+LastEditors  : agent
+LastEditTime : 2026-10-19 13:54:09
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/lib/warmstart.py
+Description  : The warm-start state saved to flash so a reboot resumes tracking from the last good state.
+               The state holds the detection mode, the current thresholds, the ROI, the feature vector and color code of
+               the tracked blob and the sensor register profile, packed in a few dozen bytes.
+"""
+
+import os
+import struct
+import time
+
+# Macros
+WARM_PATH = "/warmstart.bin"  # The file of the warm-start state on the flash
+WARM_MAGIC = b"BCWS"  # The magic bytes at the start of the file
+WARM_VERSION = 1  # The version of the file layout
+SAVE_INTERVAL_MS = 60000  # The minimum time between two periodic saves, limits the flash wear
+MAX_THRESHOLDS = 2  # The number of threshold tuples stored
+MAX_REGISTERS = 64  # The maximum number of (register, value) pairs stored
+# Magic, version, mode, number of thresholds, thresholds, ROI, feature vector, color code, number of registers
+STATE_FMT = "<4sHcB{}b4h5fHB".format(6 * MAX_THRESHOLDS)
+
+
+class StoredBlob:
+    def __init__(self, feature_vector: list, code: int) -> None:
+        """
+        @description: A blob rebuilt from a saved feature vector, stands in for image.blob in CurBLOB's history.
+        @param       {*} self:
+        @param       {list} feature_vector: The feature vector [x, y, w, h, rotation in degrees]
+        @param       {int} code: The color code of the blob
+        @return      {*} None
+        """
+        self._rect = tuple(int(v) for v in feature_vector[0:4])
+        self._rotation_deg = int(feature_vector[4])
+        self._code = code
+
+    def x(self) -> int:
+        return self._rect[0]
+
+    def y(self) -> int:
+        return self._rect[1]
+
+    def w(self) -> int:
+        return self._rect[2]
+
+    def h(self) -> int:
+        return self._rect[3]
+
+    def rect(self) -> tuple:
+        return self._rect
+
+    def cx(self) -> int:
+        return self._rect[0] + self._rect[2] // 2
+
+    def cy(self) -> int:
+        return self._rect[1] + self._rect[3] // 2
+
+    def pixels(self) -> int:
+        return self._rect[2] * self._rect[3]
+
+    def area(self) -> int:
+        return self._rect[2] * self._rect[3]
+
+    def rotation_deg(self) -> int:
+        return self._rotation_deg
+
+    def rotation(self) -> float:
+        return self._rotation_deg * 3.141592653589793 / 180
+
+    def code(self) -> int:
+        return self._code
+
+
+class WarmStart:
+    def __init__(self, path: str = WARM_PATH, save_interval_ms: int = SAVE_INTERVAL_MS) -> None:
+        """
+        @description: Constructor of the warm-start store.
+        @param       {*} self:
+        @param       {str} path: The file of the state (default: /warmstart.bin)
+        @param       {int} save_interval_ms: The minimum time between two periodic saves (default: 60000)
+        @return      {*} None
+        """
+        self.path = path
+        self.save_interval_ms = save_interval_ms
+        self.registers = []  # The sensor register profile [(register, value)] in use, a state saved with another is stale
+        self._last_save = time.ticks_ms()
+
+    def load(self) -> dict:
+        """
+        @description: Load the saved state.
+        @param       {*} self:
+        @return      {dict} mode, thresholds, roi, feature_vector, code, registers; None if there is no valid state or
+                     the state was saved with another register profile
+        """
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None  # Nothing saved yet
+        size = struct.calcsize(STATE_FMT)
+        if len(data) < size:
+            return None
+        fields = struct.unpack(STATE_FMT, data[:size])
+        if fields[0] != WARM_MAGIC or fields[1] != WARM_VERSION:
+            return None
+        n_thresholds = fields[3]
+        flat = fields[4 : 4 + 6 * MAX_THRESHOLDS]
+        thresholds = [tuple(flat[6 * i : 6 * i + 6]) for i in range(n_thresholds)]
+        roi = list(fields[4 + 6 * MAX_THRESHOLDS : 8 + 6 * MAX_THRESHOLDS])
+        feature_vector = list(fields[8 + 6 * MAX_THRESHOLDS : 13 + 6 * MAX_THRESHOLDS])
+        code = fields[13 + 6 * MAX_THRESHOLDS]
+        n_registers = fields[14 + 6 * MAX_THRESHOLDS]
+        packed = data[size : size + 2 * n_registers]
+        registers = [(packed[2 * i], packed[2 * i + 1]) for i in range(len(packed) // 2)]
+        if registers != [tuple(pair) for pair in self.registers[:MAX_REGISTERS]]:
+            return None  # The thresholds and the feature vector were learned under another exposure and gains
+        return {
+            "mode": fields[2].decode(),
+            "thresholds": thresholds,
+            "roi": roi,
+            "feature_vector": feature_vector,
+            "code": code,
+            "registers": registers,
+        }
+
+    def save(self, tracker, mode: str) -> bool:
+        """
+        @description: Save the state of a tracker, only if it is tracking so the last good state is kept.
+        @param       {*} self:
+        @param       {Tracker} tracker: The tracker
+        @param       {str} mode: The detection mode, "B" or "G"
+        @return      {bool} Whether the state was saved
+        """
+        blob = tracker.tracked_blob
+        if not blob.feature_vector or not blob.blob_history:
+            return False
+        flat = []
+        for i in range(MAX_THRESHOLDS):
+            threshold = tracker.current_thresholds[i] if i < len(tracker.current_thresholds) else ()
+            for j in range(6):
+                flat.append(max(-128, min(127, int(threshold[j]))) if j < len(threshold) else 0)
+        values = (
+            (WARM_MAGIC, WARM_VERSION, mode.encode(), min(MAX_THRESHOLDS, len(tracker.current_thresholds)))
+            + tuple(flat)
+            + tuple(int(v) for v in tracker.roi.get_roi())
+            + tuple(float(v) for v in blob.feature_vector[0:5])
+            + (blob.blob_history[-1].code(), min(MAX_REGISTERS, len(self.registers)))
+        )
+        packed = bytearray()
+        for register, value in self.registers[:MAX_REGISTERS]:
+            packed.append(register)
+            packed.append(value)
+        # Write a new file then rename it, a reset during the write never leaves a broken state
+        temporary = self.path + ".tmp"
+        with open(temporary, "wb") as f:
+            f.write(struct.pack(STATE_FMT, *values))
+            f.write(packed)
+        os.rename(temporary, self.path)
+        self._last_save = time.ticks_ms()
+        return True
+
+    def update(self, tracker, mode: str) -> bool:
+        """
+        @description: Save the state periodically, at most once every save_interval_ms and only while detecting.
+        @param       {*} self:
+        @param       {Tracker} tracker: The tracker
+        @param       {str} mode: The detection mode, "B" or "G"
+        @return      {bool} Whether the state was saved
+        """
+        if not tracker.detected or time.ticks_diff(time.ticks_ms(), self._last_save) < self.save_interval_ms:
+            return False
+        return self.save(tracker, mode)
@@ -0,0 +1,195 @@
+"""
+Author       : agent
+Date         : 2026-10-19 13:06:03
+LastEditors  : agent
+LastEditTime : 2026-10-19 13:55:36
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/lib/window.py
+Description  : The dynamic sensor window: the sensor only reads out a margin around the tracking ROI, so the readout
+               and the processing shrink with the target. The window moves with hysteresis and goes back to the full
+               frame on loss; blobs found in the window are translated back to full-frame coordinates.
+"""
+
+import math
+import sensor
+from lib.memroi import FRAME_PARAMS
+
+# Macros
+WINDOW_MARGIN = 0.25  # The margin around the ROI as a share of its larger side
+MIN_MARGIN = 16  # The smallest margin around the ROI in pixels
+WINDOW_ALIGN = 8  # The window corners and sizes are multiples of this many pixels
+MIN_WINDOW = (64, 48)  # The smallest window (w, h)
+EDGE_HYSTERESIS = 8  # The window moves once the ROI comes closer than this to one of its inner edges
+SHRINK_RATIO = 0.5  # The window shrinks only when the new one is smaller than this share of the current area
+
+
+class OffsetBlob:
+    def __init__(self, blob, dx: int, dy: int) -> None:
+        """
+        @description: A blob found in the window, seen in full-frame coordinates.
+        @param       {*} self:
+        @param       {image.blob} blob: The blob in window coordinates
+        @param       {int} dx: The x offset of the window
+        @param       {int} dy: The y offset of the window
+        @return      {*} None
+        """
+        self.blob = blob
+        self.dx = dx
+        self.dy = dy
+
+    def x(self) -> int:
+        return self.blob.x() + self.dx
+
+    def y(self) -> int:
+        return self.blob.y() + self.dy
+
+    def rect(self) -> tuple:
+        x, y, w, h = self.blob.rect()
+        return (x + self.dx, y + self.dy, w, h)
+
+    def cx(self) -> int:
+        return self.blob.cx() + self.dx
+
+    def cy(self) -> int:
+        return self.blob.cy() + self.dy
+
+    def cxf(self) -> float:
+        return self.blob.cxf() + self.dx
+
+    def cyf(self) -> float:
+        return self.blob.cyf() + self.dy
+
+    def __getattr__(self, name: str):
+        # Size, shape, color code and statistics do not depend on the window
+        return getattr(self.blob, name)
+
+
+class SensorWindow:
+    def __init__(self, frame_params: list = FRAME_PARAMS) -> None:
+        """
+        @description: Constructor of the dynamic sensor window, starts at the full frame.
+        @param       {*} self:
+        @param       {list} frame_params: The full frame [x0, y0, w, h] (default: FRAME_PARAMS of memroi)
+        @return      {*} None
+        """
+        self.frame_params = frame_params
+        self.window = list(frame_params)  # The current window [x, y, w, h] in full-frame coordinates
+        self.image_window = list(frame_params)  # The window the last snapshot was read out with, the next may differ
+        self.changes = 0  # Number of times the sensor was reprogrammed
+
+    def is_full(self) -> bool:
+        return self.window == list(self.frame_params)
+
+    def offset(self) -> tuple:
+        return self.window[0], self.window[1]
+
+    def snapshot_taken(self) -> None:
+        self.image_window = list(self.window)
+
+    def to_local(self, rect: list, window: list = None) -> tuple:
+        """
+        @description: Translate a full-frame rectangle into the window, clipped to it.
+        @param       {*} self:
+        @param       {list} rect: The rectangle [x, y, w, h] in full-frame coordinates
+        @param       {list} window: The window [x, y, w, h] to translate into (default: the current window)
+        @return      {tuple} The rectangle in window coordinates, None if it is outside the window
+        """
+        wx, wy, ww, wh = window if window else self.window
+        x0 = max(wx, rect[0])
+        y0 = max(wy, rect[1])
+        x1 = min(wx + ww, rect[0] + rect[2])
+        y1 = min(wy + wh, rect[1] + rect[3])
+        if x1 <= x0 or y1 <= y0:
+            return None
+        return (int(x0 - wx), int(y0 - wy), int(x1 - x0), int(y1 - y0))
+
+    def rect_to_local(self, rect: list) -> tuple:
+        """
+        @description: Translate a full-frame rectangle into window coordinates, e.g. to draw it
+        @param       {*} self:
+        @param       {list} rect: The rectangle [x, y, w, h] in full-frame coordinates
+        @return      {tuple} The rectangle in window coordinates
+        """
+        return (int(rect[0] - self.window[0]), int(rect[1] - self.window[1]), int(rect[2]), int(rect[3]))
+
+    def to_frame(self, blobs: list) -> list:
+        """
+        @description: Translate the blobs found in the window into full-frame coordinates
+        @param       {*} self:
+        @param       {list} blobs: The blobs in window coordinates
+        @return      {list} The blobs in full-frame coordinates
+        """
+        if not blobs or self.is_full():
+            return blobs
+        dx, dy = self.offset()
+        return [OffsetBlob(blob, dx, dy) for blob in blobs]
+
+    def _fit(self, rect: list) -> list:
+        """
+        @description: Compute the aligned window holding a rectangle and its margin
+        @param       {*} self:
+        @param       {list} rect: The rectangle [x, y, w, h] in full-frame coordinates
+        @return      {list} The window [x, y, w, h]
+        """
+        fx, fy, fw, fh = self.frame_params
+        margin = max(MIN_MARGIN, WINDOW_MARGIN * max(rect[2], rect[3]))
+        x0 = max(fx, math.floor((rect[0] - margin) / WINDOW_ALIGN) * WINDOW_ALIGN)
+        y0 = max(fy, math.floor((rect[1] - margin) / WINDOW_ALIGN) * WINDOW_ALIGN)
+        x1 = min(fx + fw, math.ceil((rect[0] + rect[2] + margin) / WINDOW_ALIGN) * WINDOW_ALIGN)
+        y1 = min(fy + fh, math.ceil((rect[1] + rect[3] + margin) / WINDOW_ALIGN) * WINDOW_ALIGN)
+        # Grow the window to the minimum size, inside the frame
+        if x1 - x0 < MIN_WINDOW[0]:
+            x0 = max(fx, min(x0 - (MIN_WINDOW[0] - (x1 - x0)) // 2, fx + fw - MIN_WINDOW[0]))
+            x1 = x0 + MIN_WINDOW[0]
+        if y1 - y0 < MIN_WINDOW[1]:
+            y0 = max(fy, min(y0 - (MIN_WINDOW[1] - (y1 - y0)) // 2, fy + fh - MIN_WINDOW[1]))
+            y1 = y0 + MIN_WINDOW[1]
+        return [int(x0), int(y0), int(x1 - x0), int(y1 - y0)]
+
+    def _near_edge(self, rect: list) -> bool:
+        """
+        @description: Check whether a rectangle comes close to an edge of the window that is not a frame border
+        @param       {*} self:
+        @param       {list} rect: The rectangle [x, y, w, h] in full-frame coordinates
+        @return      {bool} Whether the window has to move
+        """
+        wx, wy, ww, wh = self.window
+        fx, fy, fw, fh = self.frame_params
+        if wx > fx and rect[0] - wx < EDGE_HYSTERESIS:
+            return True
+        if wy > fy and rect[1] - wy < EDGE_HYSTERESIS:
+            return True
+        if wx + ww < fx + fw and wx + ww - (rect[0] + rect[2]) < EDGE_HYSTERESIS:
+            return True
+        if wy + wh < fy + fh and wy + wh - (rect[1] + rect[3]) < EDGE_HYSTERESIS:
+            return True
+        return False
+
+    def _apply(self, window: list) -> None:
+        if window == self.window:
+            return
+        sensor.set_windowing(tuple(window))  # Takes effect from the next snapshot
+        self.window = window
+        self.changes += 1
+
+    def update(self, rect: list = None) -> None:
+        """
+        @description: Move the window around the ROI of the next frame, with hysteresis: it only moves when the ROI
+                      nears one of its edges, and only shrinks when the new window is much smaller.
+        @param       {*} self:
+        @param       {list} rect: The ROI [x, y, w, h] of the next frame, None to go back to the full frame
+        @return      {*} None
+        """
+        if rect is None:
+            self.reset()
+            return
+        fitted = self._fit(rect)
+        if self._near_edge(rect) or fitted[2] * fitted[3] < SHRINK_RATIO * self.window[2] * self.window[3]:
+            self._apply(fitted)
+
+    def reset(self) -> None:
+        """
+        @description: Go back to the full frame, e.g. after a loss.
+        @param       {*} self:
+        @return      {*} None
+        """
+        self._apply(list(self.frame_params))
@@ -19,6 +19,7 @@ PURPLE = [(8, 19, 7, 18, -24, -5)]  # Color threshold for purple balloons
 GRAY = [(0, 20)]  # Color threshold for goals with blinking method
 BALLON = PURPLE  # The current color threshold for ballon detection
 # BALLON = GREEN + PURPLE # For both green and purple balloons
+COLOR_LUT = None  # Path of a learned color table (see host/colormodel.py) replacing BALLON, e.g. "/balloons.lut"
 
 ## Tracker Tresholds
 SHOW = True  # Whether to show the blob
@@ -28,6 +29,76 @@ MAX_UNTRACKED_FRAMES_GOAL = 5  # Maximum number of frames to be
 FEATURE_DISTANCE_THRESHOLD_GOAL = 200  # Maximum distance between two features to be considered the same feature
 FACTORS_BALLON = [0.1, 0.1, 0.1, 0.1]
 FACTORS_GOAL = [0.1, 0.1, 0.1, 0.1]
+ADAPTIVE_BLOB_FILTER = False  # Whether find_blobs rejects blobs too small for the tracked target's size
+## Smoothing filter of the tracked x, y, w, h, rotation (see lib/filters.py), one spec for all or one per feature,
+## e.g. [("hampel", 3, "alphabeta"), ("hampel", 3, "alphabeta"), "median", "median", "mean"]
+FEATURE_FILTERS = "mean"
+DYNAMIC_WINDOW = False  # Whether the sensor only reads out a window around the tracked ballon (see lib/window.py)
+MOTION_GATE = False  # Whether to reuse the last detection while the tracked box is unchanged (see lib/motion.py)
+REID_MEMORY = False  # Whether a ballon coming back after a loss continues its old track (see lib/reid.py)
+FRAME_BUFFERS = 0  # Frame buffers of the ballon mode (see lib/capture.py), 0 keeps the sensor's, 2 or 3 read ahead
+
+## Lost-target search
+SEARCH_PIXEL_BUDGET = 0  # Pixels scanned per frame by the tile search after a loss (see lib/search.py), 0 for off
+
+## Dual mode
+DEFAULT_MODE = "B"  # The mode after the boot: "B" (ballon), "G" (goal) or "D" (both, interleaved)
+DUAL_RATIO = (3, 1)  # Number of ballon frames and goal frames in every cycle of the dual mode
+DUAL_REFERENCE_FRAMES = 1  # Frames a lost target is looked for in its turn before the other target gets the sensor
+
+## Cooperative runtime
+ASYNC_RUNTIME = False  # Whether to run the tracking, telemetry and command tasks with uasyncio (see lib/runtime.py)
+TELEMETRY_PERIOD_MS = 40  # The period of the IBus telemetry frames in the cooperative runtime
+FRAME_PERIOD_MS = 33  # The camera frame period, the other tasks run while the next frame is exposed
+ASYNC_REFERENCE_FRAMES = 1  # Frames find_reference may take in the cooperative runtime before yielding
+
+## Telemetry
+COMPACT_TELEMETRY = False  # Whether to send every tracked target and candidate in bit-packed frames (see lib/compact.py)
+COMPACT_CANDIDATES = 4  # The most candidate blobs sent after the tracked targets in the compact frames
+
+## Quality governor
+QUALITY_GOVERNOR = False  # Whether to degrade the processing when frames run over the budget (see lib/governor.py)
+FRAME_BUDGET_US = 25000  # The processing time allowed per frame, the rest of the frame period is the sensor's
+
+## Range finder
+RANGE_ASSIST = False  # Whether the VL53L1X range predicts the target size for the ROI and the filters (see lib/ranging.py)
+
+## Sensor register profile, written in order after the sensor reset
+REGISTER_PROFILE = [
+    # Image pipeline and exposure
+    (0xFE, 0b00000000),  # change to registers at page 0
+    (0x80, 0b10111100),  # enable gamma, CC, edge enhancer, interpolation, de-noise
+    (0x81, 0b01101100),  # enable BLK dither mode, low light Y stretch, autogray enable
+    (0x82, 0b00000100),  # enable anti blur, disable AWB
+    (0x03, 0b00000000),  # high bits of exposure control
+    (0x04, 0b01000000),  # low bits of exposure control
+    (0xB0, 0b01100000),  # global gain
+    # RGB gains
+    (0xA3, 0b01110000),  # G gain odd
+    (0xA4, 0b01110000),  # G gain even
+    (0xA5, 0b10000000),  # R gain odd
+    (0xA6, 0b10000000),  # R gain even
+    (0xA7, 0b10000000),  # B gain odd
+    (0xA8, 0b10000000),  # B gain even
+    (0xA9, 0b10000000),  # G gain odd 2
+    (0xAA, 0b10000000),  # G gain even 2
+    (0xFE, 0b00000010),  # change to registers at page 2
+    # (0xd0, 0b00000000),  # change global saturation, strangely constrained by auto saturation
+    (0xD1, 0b01000000),  # change Cb saturation
+    (0xD2, 0b01000000),  # change Cr saturation
+    (0xD3, 0b01001000),  # luma contrast
+    # (0xd5, 0b00000000),  # luma offset
+]
+
+## Warm start
+WARM_START = False  # Whether to save the tracking state to the flash and resume from it after a reboot
+WARM_START_PATH = "/warmstart.bin"  # The file of the warm-start state
+
+## Flight recorder
+RECORD = False  # Whether to record frames and tracker states to the local storage
+RECORD_ROI_ONLY = False  # Whether to record only the ROI crop instead of the full frame
+RECORD_DECIMATION = 5  # Record one out of every RECORD_DECIMATION frames
+RECORD_BUDGET_PCT = 10  # The maximum share of the frame time spent on recording (percent)
 
 
 # Functions
@@ -53,48 +124,38 @@ def init_sensor(isColored: bool = True, framesize=sensor.HQVGA, windowsize=None)
     # sensor.__write_reg(0xad, 0b01001100) # R ratio
     # sensor.__write_reg(0xae, 0b01010100) # G ratio
     # sensor.__write_reg(0xaf, 0b01101000) # B ratio
-    # RGB gains
-    sensor.__write_reg(0xFE, 0b00000000)  # change to registers at page 0
-    sensor.__write_reg(0x80, 0b10111100)  # enable gamma, CC, edge enhancer, interpolation, de-noise
-    sensor.__write_reg(0x81, 0b01101100)  # enable BLK dither mode, low light Y stretch, autogray enable
-    sensor.__write_reg(0x82, 0b00000100)  # enable anti blur, disable AWB
-    sensor.__write_reg(0x03, 0b00000000)  # high bits of exposure control
-    sensor.__write_reg(0x04, 0b01000000)  # low bits of exposure control
-    sensor.__write_reg(0xB0, 0b01100000)  # global gain
-
-    # RGB gains
-    sensor.__write_reg(0xA3, 0b01110000)  # G gain odd
-    sensor.__write_reg(0xA4, 0b01110000)  # G gain even
-    sensor.__write_reg(0xA5, 0b10000000)  # R gain odd
-    sensor.__write_reg(0xA6, 0b10000000)  # R gain even
-    sensor.__write_reg(0xA7, 0b10000000)  # B gain odd
-    sensor.__write_reg(0xA8, 0b10000000)  # B gain even
-    sensor.__write_reg(0xA9, 0b10000000)  # G gain odd 2
-    sensor.__write_reg(0xAA, 0b10000000)  # G gain even 2
-    sensor.__write_reg(0xFE, 0b00000010)  # change to registers at page 2
-    # sensor.__write_reg(0xd0, 0b00000000) # change global saturation, strangely constrained by auto saturation
-    sensor.__write_reg(0xD1, 0b01000000)  # change Cb saturation
-    sensor.__write_reg(0xD2, 0b01000000)  # change Cr saturation
-    sensor.__write_reg(0xD3, 0b01001000)  # luma contrast
-    # sensor.__write_reg(0xd5, 0b00000000) # luma offset
+    for register, value in REGISTER_PROFILE:
+        sensor.__write_reg(register, value)
     # sensor.skip_frames(time=2000) # Let the camera adjust.
 
 
-def set_mode(current_mode: str, desired_mode: str, mytracker=None) -> tuple:
+def set_mode(
+    current_mode: str, desired_mode: str, mytracker=None, warm_state: dict = None, max_reference_frames: int = 0
+) -> tuple:
     """
     @description: Set the mode of the detection
     @param       {str} current_mode: The current mode of the detection
     @param       {str} desired_mode: The desired mode of the detection
     @param       {*} mytracker: The tracker object (default to None)
+    @param       {dict} warm_state: The saved state to resume from, see lib/warmstart.py (default to None)
+    @param       {int} max_reference_frames: The frames the tracker looks for a reference blob in before returning,
+                                              0 to block until one is found (default to 0)
     @return      {tuple} The current mode and the tracker
     """
 
-    def change_mode(mode):
-        init_sensor(isColored=(mode == "B"))
+    def make_tracker(mode, max_reference_frames, dynamic_window=False, frame_buffers=0):
+        # The saved state only applies to the mode it was saved in
+        state = warm_state if warm_state and warm_state["mode"] == mode else None
         thresholds = BALLON if mode == "B" else GRAY
 
         # Initialize the tracker
         if mode == "B":
+            color_lut = None
+            if COLOR_LUT:
+                from lib.colorlut import ColorLUT
+
+                color_lut = ColorLUT(COLOR_LUT)
+                thresholds = color_lut.thresholds
             blob_tracker = BLOBTracker(
                 thresholds,
                 myclock,
@@ -102,6 +163,17 @@ def set_mode(current_mode: str, desired_mode: str, mytracker=None) -> tuple:
                 max_untracked_frames=MAX_UNTRACKED_FRAMES_BALLOON,
                 feature_distance_threshold=FEATURE_DISTANCE_THRESHOLD_BALLOON,
                 factors=FACTORS_BALLON,
+                color_lut=color_lut,
+                warm_state=state,
+                search_budget=SEARCH_PIXEL_BUDGET,
+                max_reference_frames=max_reference_frames,
+                adaptive_blob_filter=ADAPTIVE_BLOB_FILTER,
+                feature_filters=FEATURE_FILTERS,
+                motion_gate=MOTION_GATE,
+                reid_memory=REID_MEMORY,
+                ranger=myranger,
+                dynamic_window=dynamic_window,
+                frame_buffers=frame_buffers,
             )
         elif mode == "G":
             blob_tracker = GoalTracker(
@@ -111,20 +183,40 @@ def set_mode(current_mode: str, desired_mode: str, mytracker=None) -> tuple:
                 max_untracked_frames=MAX_UNTRACKED_FRAMES_GOAL,
                 feature_distance_threshold=FEATURE_DISTANCE_THRESHOLD_GOAL,
                 factors=FACTORS_GOAL,
+                warm_state=state,
+                max_reference_frames=max_reference_frames,
+                adaptive_blob_filter=ADAPTIVE_BLOB_FILTER,
+                feature_filters=FEATURE_FILTERS,
+                motion_gate=MOTION_GATE,
+                ranger=myranger,
             )
         else:
             raise ValueError("Invalid blob type!")
         return blob_tracker
 
+    def change_mode(mode):
+        if mode == "D":
+            from lib.dual import DualTracker
+
+            # Both trackers share the RGB565 configuration, the goal frames difference two color frames
+            init_sensor(isColored=True)
+            return DualTracker(
+                make_tracker("B", DUAL_REFERENCE_FRAMES), make_tracker("G", DUAL_REFERENCE_FRAMES), DUAL_RATIO
+            )
+        init_sensor(isColored=(mode == "B"))
+        # The window and the frame buffers are only set by a ballon tracker owning the sensor: the goal tracker needs
+        # the whole frame, and two buffered frames would not straddle the IR LED toggle it differences
+        return make_tracker(mode, max_reference_frames, dynamic_window=DYNAMIC_WINDOW, frame_buffers=FRAME_BUFFERS)
+
     # Check if the mode is valid
-    if desired_mode not in ["B", "G"]:
+    if desired_mode not in ["B", "G", "D"]:
         print("Invalid mode! Defaulting to ballon mode 'B'.")
         desired_mode = "B"
 
     # If no tracker or a mode change is required, update the tracker
     if not mytracker or current_mode != desired_mode:
         mytracker = change_mode(desired_mode)
-        print(f"Switched to {'ballon' if desired_mode == 'B' else 'goal'} tracking mode.")
+        print("Switched to {} tracking mode.".format({"B": "ballon", "G": "goal", "D": "dual"}[desired_mode]))
     else:
         print("Already in the desired mode, no change required.")
 
@@ -132,29 +224,195 @@ def set_mode(current_mode: str, desired_mode: str, mytracker=None) -> tuple:
     return desired_mode, mytracker
 
 
+def get_payload(detection_mode: str, mytracker) -> list:
+    """
+    @description: Build the IBus payload of the tracked blob
+    @param       {str} detection_mode: The current mode of the detection
+    @param       {*} mytracker: The tracker object
+    @return      {list} The IBus payload [flag, x_roi, y_roi, w_roi, h_roi, x_blob, y_blob, w_blob, h_blob, level],
+                        see get_dual_payload for the dual mode and get_compact_payload for the compact frames; level is
+                        the degradation level of the quality governor
+    """
+    level = mygovernor.level if mygovernor else 0
+    if COMPACT_TELEMETRY:
+        return get_compact_payload(detection_mode, mytracker, level)
+    if detection_mode == "D":
+        return get_dual_payload(mytracker) + [level]
+    if not mytracker.tracked_blob.feature_vector:
+        return [-1, 0, 0, 0, 0, 0, 0, 0, 0, level]
+    roi = mytracker.roi.get_roi()
+    blob = mytracker.tracked_blob.feature_vector
+    x_roi = round(roi[0] + roi[2] / 2)
+    y_roi = round(roi[1] + roi[3] / 2)
+    w_roi = round(roi[2])
+    h_roi = round(roi[3])
+
+    x_blob = round(blob[0] + blob[2] / 2)
+    y_blob = round(blob[1] + blob[3] / 2)
+    w_blob = round(blob[2])
+    h_blob = round(blob[3])
+    flag = 0 if detection_mode == "B" else 1
+    return [flag, x_roi, y_roi, w_roi, h_roi, x_blob, y_blob, w_blob, h_blob, level]
+
+
+def get_dual_payload(mytracker) -> list:
+    """
+    @description: Build the IBus payload of both targets of the dual mode, the ROIs do not fit in the 14 channels.
+                  The age of a target is the number of frames since it was last detected (0 for this frame), -1 with
+                  zeros for the blob while it has no track.
+    @param       {DualTracker} mytracker: The dual-mode tracker
+    @return      {list} The IBus payload [2, age_ballon, x_ballon, y_ballon, w_ballon, h_ballon,
+                                              age_goal, x_goal, y_goal, w_goal, h_goal], get_payload appends the
+                                              degradation level
+    """
+    payload = [2]
+    for mode in ("B", "G"):
+        blob = mytracker.trackers[mode].tracked_blob.feature_vector
+        if mytracker.ages[mode] < 0 or not blob:
+            payload.extend([-1, 0, 0, 0, 0])
+        else:
+            payload.extend(
+                [
+                    mytracker.ages[mode],
+                    round(blob[0] + blob[2] / 2),
+                    round(blob[1] + blob[3] / 2),
+                    round(blob[2]),
+                    round(blob[3]),
+                ]
+            )
+    return payload
+
+
+def get_compact_payload(detection_mode: str, mytracker, level: int = 0) -> list:
+    """
+    @description: Build the payload of the compact frame: the tracked targets first, then the other candidate blobs of
+                  the frame; the IBus encoder packs as many as fit (see lib/compact.py)
+    @param       {str} detection_mode: The current mode of the detection
+    @param       {*} mytracker: The tracker object
+    @param       {int} level: The degradation level of the quality governor (default to 0)
+    @return      {list} [3, age_ms, level, kind, id, detected, x, y, w, h, kind, ...]; age_ms is the time from the
+                        readout of the frame to now, the id of a candidate is -1
+    """
+    if detection_mode == "D":
+        trackers = [(mode, tracker, mytracker.ages[mode] == 0) for mode, tracker in mytracker.trackers.items()]
+        frame_mode, frame_tracker = mytracker.mode, mytracker.current  # The tracker of this frame
+    else:
+        trackers = [(detection_mode, mytracker, mytracker.detected)]
+        frame_mode, frame_tracker = detection_mode, mytracker
+    timings = frame_tracker.timings
+    age_us = timings.get("total", 0) - timings.get("snapshot", 0)
+    if frame_tracker.capture:
+        age_us += frame_tracker.capture.age_us
+    payload = [3, age_us // 1000, level]
+    for mode, tracker, detected in trackers:
+        blob = tracker.tracked_blob.feature_vector
+        if blob:
+            payload.extend([0 if mode == "B" else 1, tracker.tracked_blob.id, 1 if detected else 0])
+            payload.extend([round(blob[0] + blob[2] / 2), round(blob[1] + blob[3] / 2), round(blob[2]), round(blob[3])])
+    tracked = frame_tracker.tracked_blob
+    matched = tracked.blob_history[-1] if frame_tracker.detected and tracked.blob_history else None
+    candidates = 0
+    for blob in frame_tracker.candidates or []:
+        if candidates >= COMPACT_CANDIDATES:
+            break
+        if matched and blob.rect() == matched.rect():
+            continue  # Sent as the tracked target
+        x, y, w, h = blob.rect()
+        payload.extend([0 if frame_mode == "B" else 1, -1, 1, round(x + w / 2), round(y + h / 2), w, h])
+        candidates += 1
+    return payload
+
+
+mygovernor = None  # The quality governor, set up by the main program
+myranger = None  # The range finder shared by the trackers, set up by the main program
+
+
 if __name__ == "__main__":
+    boot_ms = time.ticks_ms()  # The boot time stamp for the time to the first valid IBus frame
     myclock = time.clock()  # Create a clock object to track the FPS
-    detection_mode = "B"  # Default to ballon mode
-    myibus = IBus()  # Initialize inter-board communication
-    detection_mode, mytracker = set_mode(None, detection_mode)  # Initialize the tracker
-
-    while True:
-        mytracker.track()
-        if mytracker.tracked_blob.feature_vector:
-            roi = mytracker.roi.get_roi()
-            blob = mytracker.tracked_blob.feature_vector
-            x_roi = round(roi[0] + roi[2] / 2)
-            y_roi = round(roi[1] + roi[3] / 2)
-            w_roi = round(roi[2])
-            h_roi = round(roi[3])
-
-            x_blob = round(blob[0] + blob[2] / 2)
-            y_blob = round(blob[1] + blob[3] / 2)
-            w_blob = round(blob[2])
-            h_blob = round(blob[3])
-            flag = 0 if detection_mode == "B" else 1
-            myibus.send([flag, x_roi, y_roi, w_roi, h_roi, x_blob, y_blob, w_blob, h_blob])
+    detection_mode = DEFAULT_MODE
+    myibus = IBus(compact=COMPACT_TELEMETRY)  # Initialize inter-board communication
+
+    mywarmstart = None
+    warm_state = None
+    if WARM_START:
+        from lib.warmstart import WarmStart
+
+        mywarmstart = WarmStart(WARM_START_PATH)
+        mywarmstart.registers = REGISTER_PROFILE  # A state saved with an older profile is discarded
+        warm_state = mywarmstart.load()
+        if warm_state:
+            if detection_mode != "D":
+                detection_mode = warm_state["mode"]  # The dual mode resumes the tracker the state was saved from
+    if RANGE_ASSIST:
+        from lib.ranging import RangeFinder
+
+        myranger = RangeFinder()  # Set up before the trackers, they predict the target size from it
+    reference_frames = ASYNC_REFERENCE_FRAMES if ASYNC_RUNTIME else 0  # The cooperative runtime never blocks
+    # Initialize the tracker
+    detection_mode, mytracker = set_mode(
+        None, detection_mode, warm_state=warm_state, max_reference_frames=reference_frames
+    )
+
+    myrecorder = None
+    if RECORD:
+        from lib.recorder import Recorder
+
+        myrecorder = Recorder(decimation=RECORD_DECIMATION, budget_pct=RECORD_BUDGET_PCT, roi_only=RECORD_ROI_ONLY)
+        myrecorder.start()
+
+    if QUALITY_GOVERNOR:
+        from lib.governor import Governor
+
+        mygovernor = Governor(FRAME_BUDGET_US)
+
+    first_valid = False  # Whether a detection has been sent since the boot
+
+    def on_frame(detection_mode, mytracker, msg):
+        global first_valid
+        if not first_valid and mytracker.detected:
+            first_valid = True
+            print("First valid IBus frame {} ms after boot".format(time.ticks_diff(time.ticks_ms(), boot_ms)))
+        frame_mode = mytracker.mode if detection_mode == "D" else detection_mode  # The tracker of this frame
+        if myrecorder:
+            myrecorder.log(mytracker, msg, frame_mode)
+        if mywarmstart:
+            mywarmstart.update(mytracker, frame_mode)
+        if mygovernor:
+            mygovernor.update(mytracker)  # The level of the next frame
+
+    try:
+        if ASYNC_RUNTIME:
+            from lib.runtime import Runtime
+
+            myruntime = Runtime(
+                myibus,
+                lambda current, desired, tracker: set_mode(
+                    current, desired, tracker, max_reference_frames=reference_frames
+                ),
+                get_payload,
+                detection_mode,
+                mytracker,
+                on_frame=on_frame,
+                telemetry_period_ms=TELEMETRY_PERIOD_MS,
+                frame_period_ms=FRAME_PERIOD_MS,
+                ranger=myranger,
+            )
+            try:
+                myruntime.run()
+            finally:
+                detection_mode, mytracker = myruntime.mode, myruntime.tracker
         else:
-            myibus.send([-1, 0, 0, 0, 0, 0, 0, 0, 0])
-        received_mode = myibus.receive()
-        detection_mode, mytracker = set_mode(detection_mode, received_mode, mytracker)
+            while True:
+                mytracker.track()
+                msg = get_payload(detection_mode, mytracker)
+                myibus.send(msg)
+                on_frame(detection_mode, mytracker, msg)
+                received_mode = myibus.receive()
+                if received_mode in ("B", "G", "D"):  # Nothing or a malformed message keeps the current mode
+                    detection_mode, mytracker = set_mode(detection_mode, received_mode, mytracker)
+    finally:
+        if mywarmstart:
+            mywarmstart.save(mytracker, mytracker.mode if detection_mode == "D" else detection_mode)
+        if myrecorder:
+            myrecorder.stop(myclock.fps())
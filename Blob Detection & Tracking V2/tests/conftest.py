@@ -0,0 +1,19 @@
+"""
+Author       : agent
+Date         : 2026-10-19 13:52:14
+LastEditors  : agent
+LastEditTime : 2026-10-19 13:52:14
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/tests/conftest.py
+Description  : The host checks of the on-board code run on the stand-ins of host/stand_ins, installed before any
+               test imports lib/ or main.py.
+                   python -m pytest tests
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from host import board  # noqa: E402
+
+board.install(virtual_sleep=True)
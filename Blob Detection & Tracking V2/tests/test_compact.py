@@ -0,0 +1,120 @@
+"""
+Author       : agent
+Date         : 2026-10-19 14:00:31
+LastEditors  : agent
+LastEditTime : 2026-10-19 14:00:31
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/tests/test_compact.py
+Description  : The IBus frames sent by lib/Ibus.py decode back to the same values with host/ibusdecode.py, the
+               compact multi-target frames of lib/compact.py included.
+"""
+
+import random
+
+from host.ibusdecode import CompactDecoder, decode_stream
+from lib.compact import BALLOON, CANDIDATE_ID, COMPACT_FLAG, GOAL, KEYFRAME_INTERVAL
+from lib.Ibus import IBus
+
+# Macros
+FRAMES = 3 * KEYFRAME_INTERVAL  # Long enough for delta entries and a few key frames
+
+
+def payload(targets: list, age_ms: int = 10, level: int = 1) -> list:
+    """
+    @description: Build the compact payload list main.py sends
+    @param       {list} targets: The (kind, id, detected, x, y, w, h) of every target
+    @param       {int} age_ms: The age of the frame (default: 10)
+    @param       {int} level: The quality level (default: 1)
+    @return      {list} The payload list
+    """
+    values = [COMPACT_FLAG, age_ms, level]
+    for target in targets:
+        values.extend(target)
+    return values
+
+
+def moving_targets(rng: random.Random) -> list:
+    """
+    @description: Make the targets of a sequence: a ballon and a goal moving by small steps, with a jump now and then
+                  that does not fit a delta entry, and a candidate blob
+    @param       {random.Random} rng: The random generator
+    @return      {list} The targets of every frame
+    """
+    ballon = [120, 80, 30, 30]
+    goal = [60, 40, 50, 40]
+    frames = []
+    for i in range(FRAMES):
+        ballon = [min(255, max(0, v + rng.randint(-3, 3))) for v in ballon]
+        goal = [min(255, max(0, v + rng.randint(-2, 2))) for v in goal]
+        if i % 7 == 6:
+            ballon[0] = (ballon[0] + 100) % 256  # Too far for the 6-bit delta
+        candidate = [rng.randint(0, 255) for _ in range(4)]
+        frames.append(
+            [(BALLOON, 3, True, *ballon), (GOAL, 20, i % 2 == 0, *goal), (BALLOON, None, True, *candidate)]
+        )
+    return frames
+
+
+def test_standard_round_trip():
+    ibus = IBus()
+    values = [1, -1, 0, 239, 159, 32767, -32768, 42]
+    ibus.send(values)
+    (decoded,) = decode_stream(bytes(ibus.uart.tx))
+    assert decoded == values + [0] * (14 - len(values))
+
+
+def test_compact_round_trip():
+    ibus = IBus(compact=True)
+    frames = moving_targets(random.Random(0))
+    for targets in frames:
+        ibus.send(payload(targets))
+    decoder = CompactDecoder()
+    decoded = decode_stream(bytes(ibus.uart.tx), decoder)
+    assert len(decoded) == FRAMES
+    assert decoder.missed == 0 and decoder.undecodable == 0
+    assert ibus.encoder.dropped == 0
+    for i, (frame, targets) in enumerate(zip(decoded, frames)):
+        assert frame["sequence"] == i % 16
+        assert frame["key"] == (i % (KEYFRAME_INTERVAL + 1) == 0)
+        assert (frame["age_ms"], frame["level"]) == (10, 1)
+        assert len(frame["targets"]) == len(targets)
+        for target, (kind, track_id, detected, x, y, w, h) in zip(frame["targets"], targets):
+            assert target["kind"] == ("B" if kind == BALLOON else "G")
+            assert target["id"] == (None if track_id is None else track_id % CANDIDATE_ID)
+            assert target["detected"] == detected
+            assert [target["x"], target["y"], target["w"], target["h"]] == [x, y, w, h]
+
+
+def test_compact_waits_for_a_key_frame_after_a_gap():
+    ibus = IBus(compact=True)
+    frames = moving_targets(random.Random(1))
+    stream = bytearray()
+    for i, targets in enumerate(frames):
+        ibus.uart.tx = bytearray()
+        ibus.send(payload(targets[:2]))
+        if i != 3:  # The fourth frame is lost on the link
+            stream.extend(ibus.uart.tx)
+    decoder = CompactDecoder()
+    decoded = decode_stream(bytes(stream), decoder)
+    assert decoder.missed == 1
+    for frame, targets in zip(decoded[3:], frames[4:]):
+        if frame["key"]:
+            break
+        for target, expected in zip(frame["targets"], targets):
+            box = [target["x"], target["y"], target["w"], target["h"]]
+            # An absolute entry still decodes, a delta entry has lost its reference
+            assert box == list(expected[3:]) or box == [None] * 4
+    assert decoder.undecodable > 0
+    # From the next key frame on every entry decodes again
+    key = next(i for i in range(3, len(decoded)) if decoded[i]["key"])
+    for frame, targets in zip(decoded[key:], frames[key + 1 :]):
+        assert [[t["x"], t["y"], t["w"], t["h"]] for t in frame["targets"]] == [list(t[3:]) for t in targets[:2]]
+
+
+def test_compact_drops_the_targets_that_do_not_fit():
+    ibus = IBus(compact=True)
+    targets = [(BALLOON, i, True, 10 * i, 10 * i, 20, 20) for i in range(10)]
+    ibus.send(payload(targets))
+    (frame,) = decode_stream(bytes(ibus.uart.tx))
+    assert 0 < len(frame["targets"]) < len(targets)
+    assert ibus.encoder.dropped == len(targets) - len(frame["targets"])
+    assert [t["id"] for t in frame["targets"]] == list(range(len(frame["targets"])))
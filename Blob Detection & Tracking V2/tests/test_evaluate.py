@@ -0,0 +1,58 @@
+"""
+Author       : agent
+Date         : 2026-10-19 13:52:14
+LastEditors  : agent
+LastEditTime : 2026-10-19 13:52:14
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/tests/test_evaluate.py
+Description  : The trace written on the board and the replay on the host evaluate a synthetic sequence alike.
+"""
+
+import contextlib
+import io
+import time
+
+from host import synth
+from host.evaluate import evaluate_trace, load_ground_truth
+from host.replay import FrameCache, replay
+from host.tracelog import open_trace
+
+# Macros
+FRAMES = 120  # The length of the synthetic sequence
+TOLERANCE = 0.02  # The largest difference of a metric, the replay also predicts the last frame of the constructor
+
+
+def test_trace_agrees_with_replay(tmp_path):
+    path = str(tmp_path / "scene.npz")
+    synth.save(path, synth.Scene("QQVGA", balloons=1, goals=0, distractors=1, seed=1), FRAMES)
+
+    import numpy as np
+    import sensor
+    import main as board_main
+    from lib.trace import TraceWriter
+    from lib.tracker import BLOBTracker, Tracker
+
+    # The board loop: one record after every track()
+    trace_path = str(tmp_path / "scene.bct")
+    with contextlib.redirect_stdout(io.StringIO()):
+        board_main.init_sensor(isColored=True)
+        with np.load(path) as data:
+            sensor.set_source(np.asarray(data["frames"]))
+        Tracker.frames_taken = 0  # A new boot
+        tracker = BLOBTracker(board_main.BALLON, time.clock(), show=False)
+        writer = TraceWriter(trace_path)
+        try:
+            while True:
+                tracker.track()
+                writer.write(tracker, "B")
+        except EOFError:
+            pass
+        writer.close()
+
+    records = open_trace(trace_path)
+    assert Tracker.frames_taken == FRAMES  # Every frame taken is counted, also inside the reference searches
+    assert (np.diff(records["frame"].astype(int)) > 0).all()
+    traced = evaluate_trace(records, load_ground_truth(path))
+    replayed = replay(path, FrameCache(str(tmp_path / "cache")), "B")
+    assert traced["frames"] == replayed["frames"] == FRAMES
+    for key in ("mota", "mean_iou", "precision", "recall"):
+        assert abs(traced[key] - replayed[key]) <= TOLERANCE, key
@@ -0,0 +1,84 @@
+"""
+Author       : agent
+Date         : 2026-10-19 13:54:38
+LastEditors  : agent
+LastEditTime : 2026-10-19 13:54:38
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/tests/test_filters.py
+Description  : The incremental filters of lib/filters.py match their definition over CurBLOB's sliding window.
+"""
+
+import random
+
+import pytest
+
+from lib.filters import AlphaBeta, EMA, Hampel, MovingAverage, RunningMedian, make_filter
+
+# Macros
+WINDOW = 5  # The length of the sliding window, like CurBLOB's history
+
+
+def run(flt, values, window=WINDOW):
+    """
+    @description: Feed a filter like CurBLOB does: reset on the first value, then the new and the evicted raw values
+    @param       {*} flt: The filter
+    @param       {list} values: The raw values of the feature
+    @param       {int} window: The length of the window (default: WINDOW)
+    @return      {list} The outputs of the filter
+    """
+    outputs = [flt.reset(values[0])]
+    for i in range(1, len(values)):
+        outputs.append(flt.update(values[i], values[i - window] if i >= window else None))
+    return outputs
+
+
+def median(values):
+    ordered = sorted(values)
+    n = len(ordered)
+    return ordered[n // 2] if n % 2 else (ordered[n // 2 - 1] + ordered[n // 2]) / 2
+
+
+def test_windowed_filters_match_their_definition():
+    rng = random.Random(0)
+    values = [rng.randint(0, 160) for _ in range(50)]
+    windows = [values[max(0, i - WINDOW + 1) : i + 1] for i in range(len(values))]
+    assert run(MovingAverage(), values) == pytest.approx([sum(w) / len(w) for w in windows])
+    assert run(RunningMedian(), values) == pytest.approx([median(w) for w in windows])
+
+
+def test_recursive_filters():
+    values = [0, 10, 10, 10]
+    assert run(EMA(0.5), values) == pytest.approx([0, 5, 7.5, 8.75])
+    # A constant-rate ramp is tracked without lag once the rate has converged
+    outputs = run(AlphaBeta(0.5, 0.1), list(range(0, 400, 4)))
+    assert outputs[-1] == pytest.approx(396, abs=0.5)
+
+
+def test_hampel_replaces_a_spike_by_the_median():
+    hampel = Hampel()
+    outputs = run(hampel, [50, 51, 49, 50, 150, 51, 50])
+    assert outputs[4] == 50
+    assert hampel.outliers == 1
+    assert outputs[5] == 51
+
+
+def test_hampel_passes_the_jitter_of_a_still_blob():
+    hampel = Hampel()
+    outputs = run(hampel, [80, 80, 80, 80, 81, 82, 83])
+    assert outputs == [80, 80, 80, 80, 81, 82, 83]
+    assert hampel.outliers == 0
+
+
+def test_hampel_smoother_evicts_the_cleaned_values():
+    hampel = Hampel(3, MovingAverage())
+    values = [50, 50, 50, 50, 50, 200, 50, 50, 50, 50, 50]
+    outputs = run(hampel, values)
+    assert outputs == pytest.approx([50] * len(values))
+
+
+def test_make_filter():
+    assert isinstance(make_filter("median"), RunningMedian)
+    assert make_filter(("ema", 0.3)).alpha == 0.3
+    hampel = make_filter(("hampel", 2, ("alphabeta", 0.4, 0.2)))
+    assert hampel.n_sigmas == 2
+    assert isinstance(hampel.smoother, AlphaBeta)
+    assert (hampel.smoother.alpha, hampel.smoother.beta) == (0.4, 0.2)
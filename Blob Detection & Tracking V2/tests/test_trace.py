@@ -0,0 +1,142 @@
+"""
+Author       : agent
+Date         : 2026-10-19 14:01:20
+LastEditors  : agent
+LastEditTime : 2026-10-19 14:01:20
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/tests/test_trace.py
+Description  : The binary trace written by lib/trace.py reads back field for field with host/tracelog.py.
+"""
+
+import struct
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from host import tracelog
+from lib.curblob import GATE_STAGES
+from lib.trace import RECORD_FMT, TRACE_VERSION, TraceWriter
+
+
+def make_tracker():
+    """
+    @description: Build a stand-in of the tracker state the trace writer reads, set() moves it to the next frame
+    @return      {*} The tracker
+    """
+    blob = SimpleNamespace(
+        feature_vector=None,
+        id=0,
+        untracked_frames=0,
+        rejections={stage: i + 1 for i, stage in enumerate(GATE_STAGES)},
+    )
+    return SimpleNamespace(
+        tracked_blob=blob,
+        candidates=[None] * 3,
+        capture=SimpleNamespace(age_us=1500, new_drops=1),
+        roi=SimpleNamespace(get_roi=lambda: [10, 20, 30, 40]),
+        current_thresholds=[(30, 60, 10, 50, -20, 20)],
+        timings={"snapshot": 100, "total": 900},
+        frames_taken=0,
+    )
+
+
+def set_state(tracker, feature_vector, track_id: int, untracked: int, frames_taken: int):
+    """
+    @description: Set the state of the tracker after a frame
+    @param       {*} tracker: The tracker of make_tracker
+    @param       {*} feature_vector: The feature vector of the tracked blob, None without a track
+    @param       {int} track_id: The id of the track
+    @param       {int} untracked: The frames since the blob was last matched
+    @param       {int} frames_taken: The frames taken from the sensor so far
+    @return      {*} The tracker
+    """
+    tracker.tracked_blob.feature_vector = feature_vector
+    tracker.tracked_blob.id = track_id
+    tracker.tracked_blob.untracked_frames = untracked
+    tracker.frames_taken = frames_taken
+    return tracker
+
+
+def test_record_layout_matches():
+    assert tracelog.RECORD_DTYPES[TRACE_VERSION].itemsize == struct.calcsize(RECORD_FMT)
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "flight.bct")
+    writer = TraceWriter(path, records_per_block=4)
+    tracker = make_tracker()
+    states = [
+        ([1.5, 2.5, 30.0, 40.0, 12.0], 7, 0, 1),  # Acquired
+        ([2.0, 3.0, 30.0, 40.0, 12.0], 7, 2, 3),  # Coasting
+        (None, 7, 0, 4),  # Lost
+        (None, 7, 0, 5),
+        ([50.0, 60.0, 20.0, 20.0, 0.0], 8, 0, 9),  # A new track
+    ]
+    for state in states:
+        writer.write(set_state(tracker, *state), "B")
+    assert writer._buffered == 1  # The first block of 4 records was written
+    writer.close()
+
+    records = tracelog.open_trace(path)
+    assert len(records) == writer.frame_count == len(states)
+    assert list(records["frame"]) == [0, 2, 3, 4, 8]
+    assert list(records["flags"]) == [
+        tracelog.FLAG_TRACKED | tracelog.FLAG_DETECTED | tracelog.FLAG_REACQUIRED,
+        tracelog.FLAG_TRACKED,
+        tracelog.FLAG_LOST,
+        0,
+        tracelog.FLAG_TRACKED | tracelog.FLAG_DETECTED | tracelog.FLAG_REACQUIRED,
+    ]
+    assert list(records["track_id"]) == [7, 7, 7, 7, 8]
+    assert list(records["untracked"]) == [0, 2, 0, 0, 0]
+    assert all(records["mode"] == ord("B"))
+    assert all(records["n_candidates"] == 3)
+    assert records["feature"][1] == pytest.approx([2.0, 3.0, 30.0, 40.0, 12.0])
+    assert not records["feature"][2].any()
+    assert records["roi"][0].tolist() == [10, 20, 30, 40]
+    # The missing second threshold spans the full range
+    assert records["thresholds"][0].tolist() == [[30, 60, 10, 50, -20, 20], [-128, 127, -128, 127, -128, 127]]
+    assert list(tracelog.timing(records, "snapshot")) == [100] * 5
+    assert list(tracelog.timing(records, "detect")) == [0] * 5
+    assert records["rejections"][0].tolist() == list(range(1, len(GATE_STAGES) + 1))
+    assert list(records["frame_age_us"]) == [1500] * 5
+    assert list(records["dropped"]) == [1] * 5
+    assert np.all(np.diff(records["t_ms"].astype(np.int64)) >= 0)
+
+    summary = tracelog.summarize(records)
+    assert summary["frames"] == 5
+    assert summary["losses"] == 1
+    assert summary["tracks"] == 2
+
+
+def test_dual_mode_switch_is_not_a_reacquisition(tmp_path):
+    path = str(tmp_path / "dual.bct")
+    writer = TraceWriter(path)
+    balloon = set_state(make_tracker(), [1.0, 1.0, 10.0, 10.0, 0.0], 3, 0, 0)
+    goal = set_state(make_tracker(), [5.0, 5.0, 40.0, 40.0, 0.0], 9, 0, 0)
+    dual = make_tracker()  # Shows the state of the tracker of the last frame, like DualTracker
+    for frame in range(6):
+        dual.current = balloon if frame % 2 == 0 else goal
+        set_state(dual, dual.current.tracked_blob.feature_vector, dual.current.tracked_blob.id, 0, frame + 1)
+        writer.write(dual, "BG"[frame % 2])
+    writer.close()
+    flags = tracelog.open_trace(path)["flags"]
+    assert list(flags & tracelog.FLAG_REACQUIRED) == [tracelog.FLAG_REACQUIRED] * 2 + [0] * 4
+
+
+def test_truncated_and_foreign_files(tmp_path):
+    path = str(tmp_path / "cut.bct")
+    writer = TraceWriter(path)
+    tracker = make_tracker()
+    for frame in range(3):
+        writer.write(set_state(tracker, None, 0, 0, frame + 1))
+    writer.close()
+    with open(path, "ab") as f:
+        f.write(b"\x00" * 5)  # A record cut by a reset
+    assert len(tracelog.open_trace(path)) == 3
+
+    foreign = str(tmp_path / "foreign.bct")
+    with open(foreign, "wb") as f:
+        f.write(b"JUNK" + b"\x00" * 60)
+    with pytest.raises(ValueError):
+        tracelog.open_trace(foreign)
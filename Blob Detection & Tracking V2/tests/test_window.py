@@ -0,0 +1,84 @@
+"""
+Author       : agent
+Date         : 2026-10-19 14:01:45
+LastEditors  : agent
+LastEditTime : 2026-10-19 14:01:45
+FilePath     : /Bicopter-Vision-Control/Blob Detection & Tracking V2/tests/test_window.py
+Description  : The dynamic sensor window of lib/window.py converts between full-frame and window coordinates.
+"""
+
+import numpy as np
+import pytest
+import sensor
+
+from lib.window import MIN_WINDOW, WINDOW_ALIGN, SensorWindow
+
+# Macros
+FRAME = [0, 0, 240, 160]  # HQVGA
+
+
+@pytest.fixture
+def window():
+    sensor.reset()
+    sensor.set_pixformat(sensor.GRAYSCALE)
+    sensor.set_framesize(sensor.HQVGA)
+    return SensorWindow(FRAME)
+
+
+def test_fit_around_the_roi(window):
+    roi = [100, 60, 40, 30]
+    window.update(roi)
+    x, y, w, h = window.window
+    assert window.changes == 1
+    assert sensor.get_windowing() == tuple(window.window)
+    assert all(v % WINDOW_ALIGN == 0 for v in window.window)
+    assert w >= MIN_WINDOW[0] and h >= MIN_WINDOW[1]
+    assert x < roi[0] and y < roi[1] and x + w > roi[0] + roi[2] and y + h > roi[1] + roi[3]
+    # A small move inside the window does not reprogram the sensor
+    window.update([102, 61, 40, 30])
+    assert window.changes == 1
+    # Nearing an inner edge moves the window
+    window.update([x + w - 45, 61, 40, 30])
+    assert window.changes == 2
+    window.reset()
+    assert window.is_full() and window.changes == 3
+
+
+def test_window_stays_inside_the_frame(window):
+    window.update([0, 150, 10, 10])
+    x, y, w, h = window.window
+    assert x >= 0 and y >= 0 and x + w <= FRAME[2] and y + h <= FRAME[3]
+    assert w >= MIN_WINDOW[0] and h >= MIN_WINDOW[1]
+
+
+def test_local_coordinates(window):
+    window.update([100, 60, 40, 30])
+    x, y, w, h = window.window
+    assert window.rect_to_local([100, 60, 40, 30]) == (100 - x, 60 - y, 40, 30)
+    # to_local clips to the window, rect_to_local only translates
+    assert window.to_local([x - 10, y - 5, 30, 20]) == (0, 0, 20, 15)
+    assert window.rect_to_local([x - 10, y - 5, 30, 20]) == (-10, -5, 30, 20)
+    assert window.to_local([x + w + 1, y, 10, 10]) is None
+    # The window of the last snapshot is kept when the window moves afterwards
+    window.snapshot_taken()
+    taken = list(window.window)
+    window.reset()
+    assert window.image_window == taken
+    assert window.to_local([100, 60, 40, 30], window.image_window) == (100 - x, 60 - y, 40, 30)
+
+
+def test_blobs_of_the_window_in_full_frame_coordinates(window):
+    frame = np.zeros((FRAME[3], FRAME[2]), dtype=np.uint8)
+    frame[70:90, 110:130] = 255
+    sensor.set_source([frame, frame])
+    full = sensor.snapshot().find_blobs([(128, 255)], pixels_threshold=10)
+    window.update([110, 70, 20, 20])
+    img = sensor.snapshot()
+    assert (img.width(), img.height()) == tuple(window.window[2:4])
+    blobs = window.to_frame(img.find_blobs([(128, 255)], pixels_threshold=10))
+    assert [blob.rect() for blob in blobs] == [blob.rect() for blob in full] == [(110, 70, 20, 20)]
+    assert (blobs[0].cx(), blobs[0].cy()) == (full[0].cx(), full[0].cy())
+    assert blobs[0].pixels() == full[0].pixels()
+    # The full frame needs no translation
+    window.reset()
+    assert window.to_frame(full) is full